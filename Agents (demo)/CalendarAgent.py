@@ -45,7 +45,7 @@ def get_google_calendar_service():
         with open("token.json", "w") as token:
             token.write(creds.to_json())
     try:
-        service = build("calendar", "v3", credentials=creds)
+        service = build("calendar", "v3", credentials=creds, static_discovery=True)
         return service
     except Exception as e:
         print(f"Lỗi khi xây dựng service Google Calendar: {e}")
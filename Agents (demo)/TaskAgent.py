@@ -50,7 +50,7 @@ def get_google_tasks_service():
             token.write(creds.to_json())
             
     try:
-        service = build("tasks", "v1", credentials=creds)
+        service = build("tasks", "v1", credentials=creds, static_discovery=True)
         return service
     except Exception as e:
         print(f"Lỗi khi xây dựng service Google Tasks: {e}")
@@ -1,40 +1,296 @@
-from typing import Annotated, Sequence, TypedDict
-from langchain_core.messages import BaseMessage, AIMessage
+import asyncio
+import statistics
+import time
+from typing import Annotated, NotRequired, Sequence, TypedDict
+from langchain_core.messages import BaseMessage, AIMessage, HumanMessage, ToolMessage
 from langgraph.graph import StateGraph, END
 from langgraph.prebuilt import ToolNode
 from langchain_google_genai import ChatGoogleGenerativeAI
 from langgraph.graph.message import add_messages
 from tools.google_calendar_tools import calendar_tools
-from config import MODEL_NAME, MODEL_TEMPERATURE
+from config import MODEL_NAME, MODEL_TEMPERATURE, RESULT_ID_ALIASES, LLM_CACHE_ENABLED, FAST_PATH_ENABLED
+from history import HistoryManager
+from llm_cache import ResponseCache, get_response_cache, request_identity
+from fast_path import FastPath
+from tracing import with_tracing
+from tools.common_format import IdAliases, collect_ids
 import dotenv
 dotenv.load_dotenv()
+def _merge_aliases(current: dict, new: dict) -> dict:
+    return {**(current or {}), **(new or {})}
+
 class AgentState(TypedDict):
     messages: Annotated[Sequence[BaseMessage], add_messages]
+    # Tóm tắt các lượt cũ và ID của message cuối cùng đã được tóm tắt (xem history.HistoryManager)
+    summary: NotRequired[str]
+    summary_upto: NotRequired[str]
+    # Số token ước lượng trước/sau khi rút gọn lịch sử ở lượt hiện tại
+    history_stats: NotRequired[dict]
+    # Alias ngắn -> ID thật của các ID xuất hiện trong kết quả tool (xem tools.common_format.IdAliases)
+    id_aliases: NotRequired[Annotated[dict, _merge_aliases]]
 
-def create_agent(tools: list):
-    """
-    Tạo và biên dịch một LangGraph Agent với một bộ công cụ được cung cấp.
-    """
-    tool_node = ToolNode(tools)
-    model = ChatGoogleGenerativeAI(
-        model=MODEL_NAME, 
+def _default_model():
+    """Chat model mặc định là Gemini theo config."""
+    return ChatGoogleGenerativeAI(
+        model=MODEL_NAME,
         temperature=MODEL_TEMPERATURE,
 
-    ).bind_tools(tools)
+    )
 
-    def should_continue(state: AgentState):
-        if not isinstance(state["messages"][-1], AIMessage) or not state["messages"][-1].tool_calls:
-            return "end"
-        return "continue"
+def should_continue(state: AgentState):
+    if not isinstance(state["messages"][-1], AIMessage) or not state["messages"][-1].tool_calls:
+        return "end"
+    return "continue"
 
-    def call_model(state: AgentState):
-        return {"messages": [model.invoke(state["messages"])]}
+def _with_real_ids(state: AgentState, aliases: IdAliases) -> dict:
+    """Input cho ToolNode: tool call cuối cùng với alias trong tham số ID đã đổi về ID thật."""
+    *previous, last = state["messages"]
+    tool_calls = [{**call, "args": aliases.resolve_args(call["args"])} for call in last.tool_calls]
+    return {**state, "messages": [*previous, last.model_copy(update={"tool_calls": tool_calls})]}
+
+def _with_aliases(result: dict, aliases: IdAliases, collected: list) -> dict:
+    """Thay ID thật trong kết quả tool bằng alias; trả về update của node (kèm các alias mới)."""
+    for kind, real_id in collected:
+        aliases.alias(real_id, kind)
+    messages = [
+        message.model_copy(update={"content": aliases.shorten(message.content)}) if isinstance(message.content, str) else message
+        for message in result["messages"]
+    ]
+    return {"messages": messages, "id_aliases": aliases.added}
+
+def _tools_node(tools: list, is_async: bool, id_aliases: bool = RESULT_ID_ALIASES):
+    """ToolNode, bọc thêm bước đổi alias <-> ID thật khi `id_aliases` bật."""
+    tool_node = ToolNode(tools)
+    if not id_aliases:
+        return tool_node
+
+    if is_async:
+        async def run_tools(state: AgentState, config):
+            aliases = IdAliases(state.get("id_aliases"))
+            with collect_ids() as collected:
+                result = await tool_node.ainvoke(_with_real_ids(state, aliases), config)
+            return _with_aliases(result, aliases, collected)
+    else:
+        def run_tools(state: AgentState, config):
+            aliases = IdAliases(state.get("id_aliases"))
+            with collect_ids() as collected:
+                result = tool_node.invoke(_with_real_ids(state, aliases), config)
+            return _with_aliases(result, aliases, collected)
+    return run_tools
 
+def _fast_path_update(result) -> dict:
+    if result is None:
+        return {}
+    intent, answer = result
+    return {"messages": [AIMessage(content=answer, response_metadata={"fast_path": intent})]}
+
+def _fast_path_node(fast_path: FastPath, is_async: bool):
+    """Node đầu tiên của lượt: trả lời ngay nếu câu của người dùng khớp một ý định của fast path."""
+    if is_async:
+        async def run_fast_path(state: AgentState):
+            last = state["messages"][-1]
+            if not isinstance(last, HumanMessage):
+                return {}
+            return _fast_path_update(await asyncio.to_thread(fast_path.answer, last.text))
+    else:
+        def run_fast_path(state: AgentState):
+            last = state["messages"][-1]
+            if not isinstance(last, HumanMessage):
+                return {}
+            return _fast_path_update(fast_path.answer(last.text))
+    return run_fast_path
+
+def _after_fast_path(state: AgentState):
+    return "end" if isinstance(state["messages"][-1], AIMessage) else "continue"
+
+def _compile(tools: list, compact_history, call_model, checkpointer=None, is_async: bool = False, fast_path: FastPath = None,
+             id_aliases: bool = RESULT_ID_ALIASES):
     workflow = StateGraph(AgentState)
+    # Rút gọn lịch sử một lần ở đầu mỗi lượt, trước khi vào vòng lặp agent <-> tools
+    workflow.add_node("compact", compact_history)
     workflow.add_node("agent", call_model)
-    workflow.add_node("tools", tool_node)
-    workflow.set_entry_point("agent")
+    workflow.add_node("tools", _tools_node(tools, is_async, id_aliases))
+    if fast_path and fast_path.intents:
+        workflow.add_node("fast_path", _fast_path_node(fast_path, is_async))
+        workflow.set_entry_point("fast_path")
+        workflow.add_conditional_edges("fast_path", _after_fast_path, {"continue": "compact", "end": END})
+    else:
+        workflow.set_entry_point("compact")
+    workflow.add_edge("compact", "agent")
     workflow.add_conditional_edges("agent", should_continue, {"continue": "tools", "end": END})
     workflow.add_edge("tools", "agent")
 
-    return workflow.compile()
\ No newline at end of file
+    return with_tracing(workflow.compile(checkpointer=checkpointer))
+
+def create_agent(tools: list, model=None, history: HistoryManager = None, checkpointer=None, cache: ResponseCache = None, fast_path: FastPath = None,
+                 id_aliases: bool = RESULT_ID_ALIASES):
+    """
+    Tạo và biên dịch một LangGraph Agent với một bộ công cụ được cung cấp.
+    `history` quyết định phần lịch sử được gửi cho model (mặc định: ngân sách token trong config,
+    dùng chính model để tóm tắt các lượt cũ).
+    Nếu có `checkpointer` (xem checkpoint.create_checkpointer), state được lưu theo thread_id trong
+    config (checkpoint.thread_config), nên mỗi lượt chỉ cần gửi HumanMessage mới.
+    `cache` (xem llm_cache.ResponseCache) trả lại câu trả lời đã lưu khi input của model giống hệt lần trước;
+    mặc định dùng cache chung nếu LLM_CACHE_ENABLED bật.
+    `fast_path` (xem fast_path.FastPath) trả lời các câu lệnh thường gặp mà không gọi model;
+    mặc định bật theo FAST_PATH_ENABLED với các ý định mà bộ tools hỗ trợ.
+    `id_aliases` thay ID dài trong kết quả tool bằng alias ngắn (E1, T1...) lưu trong state của cuộc hội thoại;
+    mặc định theo RESULT_ID_ALIASES.
+    Khi TRACING_ENABLED bật, graph được gắn callback tracing (xem tracing.py): mỗi node, lần gọi model,
+    lần chạy tool và request Google API được ghi thành span.
+    """
+    model = model or _default_model()
+    history = history or HistoryManager(summarizer=model)
+    bound_model = model.bind_tools(tools)
+    cache = cache or (get_response_cache() if LLM_CACHE_ENABLED else None)
+    identity = request_identity(model, tools) if cache else None
+    fast_path = fast_path or (FastPath(tools) if FAST_PATH_ENABLED else None)
+
+    def call_model(state: AgentState):
+        messages = history.build_view(state)
+        key = cache.key(messages, identity) if cache else None
+        response = cache.get(key) if key else None
+        if response is None:
+            response = bound_model.invoke(messages)
+            if key:
+                cache.put(key, response)
+        return {"messages": [response]}
+
+    return _compile(tools, history.compact, call_model, checkpointer, fast_path=fast_path, id_aliases=id_aliases)
+
+def create_async_agent(tools: list, model=None, history: HistoryManager = None, checkpointer=None, cache: ResponseCache = None, fast_path: FastPath = None,
+                       id_aliases: bool = RESULT_ID_ALIASES):
+    """
+    Phiên bản bất đồng bộ của create_agent, dùng với `await agent.ainvoke(...)`.
+    Model được gọi bằng `ainvoke` và các tool chạy bằng coroutine của chúng (HTTP bất đồng bộ),
+    nên một event loop có thể phục vụ nhiều cuộc hội thoại cùng lúc.
+    `checkpointer` phải là checkpointer bất đồng bộ (checkpoint.acreate_checkpointer).
+    """
+    model = model or _default_model()
+    history = history or HistoryManager(summarizer=model)
+    bound_model = model.bind_tools(tools)
+    cache = cache or (get_response_cache() if LLM_CACHE_ENABLED else None)
+    identity = request_identity(model, tools) if cache else None
+    fast_path = fast_path or (FastPath(tools) if FAST_PATH_ENABLED else None)
+
+    async def call_model(state: AgentState):
+        messages = history.build_view(state)
+        key = cache.key(messages, identity) if cache else None
+        response = await cache.aget(key) if key else None
+        if response is None:
+            response = await bound_model.ainvoke(messages)
+            if key:
+                await cache.aput(key, response)
+        return {"messages": [response]}
+
+    return _compile(tools, history.acompact, call_model, checkpointer, is_async=True, fast_path=fast_path, id_aliases=id_aliases)
+
+# Các node sinh câu trả lời cho người dùng: "agent" của create_agent và "merge" của supervisor
+ANSWER_NODES = ("agent", "merge")
+
+class _TurnTracker:
+    """
+    Chuyển các sự kiện của graph.stream(stream_mode=["messages", "updates"]) thành các sự kiện
+    hiển thị cho giao diện, đồng thời đo time-to-first-token (TTFT) và tổng thời gian của lượt.
+    """
+
+    def __init__(self):
+        self.start = time.perf_counter()
+        self.first_token_at = None
+        self.tool_calls = 0
+        self.model_calls = 0
+        self.cached_model_calls = 0
+        self.final_message = None
+        self.tokens_saved = 0
+        self.fast_path = None
+
+    @staticmethod
+    def _is_answer(metadata: dict) -> bool:
+        # Chỉ token của graph ngoài cùng (không phải của sub-agent lồng bên trong, ví dụ trong supervisor)
+        if "|" in metadata.get("langgraph_checkpoint_ns", ""):
+            return False
+        return metadata.get("langgraph_node") in ANSWER_NODES
+
+    def feed(self, mode: str, chunk):
+        if mode == "messages":
+            message, metadata = chunk
+            if self._is_answer(metadata) and isinstance(message, AIMessage) and message.text:
+                if self.first_token_at is None:
+                    self.first_token_at = time.perf_counter()
+                yield "token", message.text
+        elif mode == "updates":
+            for node, update in chunk.items():
+                if not update:
+                    continue
+                if node == "compact":
+                    self.tokens_saved = update["history_stats"]["saved_tokens"]
+                    continue
+                if node == "fast_path":
+                    self.final_message = update["messages"][-1]
+                    self.fast_path = self.final_message.response_metadata["fast_path"]
+                    continue
+                if node == "plan":
+                    # Supervisor: mỗi bước được giao cho sub-agent được hiển thị như một lời gọi tool
+                    for step in update.get("plan", []):
+                        self.tool_calls += 1
+                        yield "tool_start", f"{step['agent']} agent"
+                    continue
+                if node == "worker":
+                    for index in update.get("results", {}):
+                        yield "tool_end", f"bước {index + 1}"
+                    continue
+                for message in update.get("messages", []):
+                    if node in ANSWER_NODES and isinstance(message, AIMessage):
+                        self.model_calls += 1
+                        if message.response_metadata.get("llm_cache") == "hit":
+                            self.cached_model_calls += 1
+                        self.final_message = message
+                        for tool_call in message.tool_calls:
+                            self.tool_calls += 1
+                            yield "tool_start", tool_call["name"]
+                    elif node == "tools" and isinstance(message, ToolMessage):
+                        yield "tool_end", message.name
+
+    def done(self):
+        end = time.perf_counter()
+        metrics = {
+            "ttft": (self.first_token_at - self.start) if self.first_token_at else None,
+            "total": end - self.start,
+            "model_calls": self.model_calls,
+            "cached_model_calls": self.cached_model_calls,
+            "tool_calls": self.tool_calls,
+            "tokens_saved": self.tokens_saved,
+            # Tên ý định nếu lượt được fast path trả lời (không gọi model), ngược lại None
+            "fast_path": self.fast_path,
+        }
+        return "done", {"message": self.final_message, "metrics": metrics}
+
+def summarize_turns(turn_metrics: list) -> dict:
+    """Tỷ lệ lượt được fast path trả lời và thời gian (median, giây) của lượt fast path so với lượt đi qua model."""
+    fast = [m["total"] for m in turn_metrics if m.get("fast_path")]
+    llm = [m["total"] for m in turn_metrics if not m.get("fast_path")]
+    return {
+        "turns": len(turn_metrics),
+        "fast_path_share": len(fast) / len(turn_metrics) if turn_metrics else 0.0,
+        "fast_path_median": statistics.median(fast) if fast else None,
+        "llm_median": statistics.median(llm) if llm else None,
+    }
+
+def stream_agent_turn(app, inputs: dict, config: dict = None):
+    """
+    Chạy một lượt hội thoại và phát ra sự kiện ngay khi có:
+    ("token", đoạn văn bản), ("tool_start", tên tool), ("tool_end", tên tool),
+    và cuối cùng ("done", {"message": AIMessage cuối, "metrics": {"ttft", "total", ...}}).
+    """
+    tracker = _TurnTracker()
+    for mode, chunk in app.stream(inputs, config, stream_mode=["messages", "updates"]):
+        yield from tracker.feed(mode, chunk)
+    yield tracker.done()
+
+async def astream_agent_turn(app, inputs: dict, config: dict = None):
+    """Phiên bản bất đồng bộ của stream_agent_turn (dùng với create_async_agent)."""
+    tracker = _TurnTracker()
+    async for mode, chunk in app.astream(inputs, config, stream_mode=["messages", "updates"]):
+        for event in tracker.feed(mode, chunk):
+            yield event
+    yield tracker.done()
@@ -1,18 +1,36 @@
 # intelligent_agent_platform/app.py
 
 import streamlit as st
+import contextlib
 import datetime
+import uuid
 from langchain_core.messages import SystemMessage, HumanMessage
 
 # Import các thành phần đã được tái cấu trúc
-from agent import create_agent
+from agent import create_agent, stream_agent_turn, summarize_turns
+from cassette import recording_cassette
+from checkpoint import create_checkpointer, thread_config
+from supervisor import create_supervisor
 from tools.google_tasks_tools import tasks_tools
 from tools.google_calendar_tools import calendar_tools
 from tools.google_gmail_tools import gmail_tools
+from tracing import start_metrics_server
 # --- Caching: Tối ưu hiệu suất ---
 # Streamlit sẽ chạy lại code từ đầu mỗi khi có tương tác.
 # @st.cache_resource đảm bảo rằng "nhà máy" tạo agent và các tài nguyên đắt đỏ khác
 # chỉ được tạo một lần duy nhất, giúp ứng dụng chạy nhanh hơn.
+@st.cache_resource
+def get_checkpointer():
+    """Một checkpointer SQLite dùng chung cho mọi phiên; state mỗi phiên nằm trong thread riêng."""
+    return create_checkpointer()
+
+@st.cache_resource
+def get_metrics_server():
+    """Endpoint /metrics (Prometheus) mở một lần cho cả ứng dụng, không mở lại sau mỗi lần Streamlit chạy lại script."""
+    return start_metrics_server()
+
+SUPERVISOR_CHOICE = "Tất cả (Supervisor)"
+
 @st.cache_resource
 def get_agent(agent_type: str):
     """Tải các tool phù hợp và tạo agent."""
@@ -22,9 +40,12 @@ def get_agent(agent_type: str):
         tools = calendar_tools
     elif agent_type == "Gmail": 
         tools = gmail_tools
+    elif agent_type == SUPERVISOR_CHOICE:
+        # Supervisor chia yêu cầu cho cả ba agent và chạy song song các phần độc lập
+        return create_supervisor(checkpointer=get_checkpointer())
     else:
         return None
-    return create_agent(tools)
+    return create_agent(tools, checkpointer=get_checkpointer())
 
 @st.cache_data
 def load_prompt_template(prompt_file: str):
@@ -42,6 +63,7 @@ def get_formatted_prompt(prompt_file: str):
 
 # --- Thiết lập giao diện chính ---
 st.set_page_config(page_title="Intelligent Agent Platform", page_icon="🤖")
+get_metrics_server()
 st.title("🤖 Nền tảng Agent Thông minh")
 st.caption("Trò chuyện với các Agent chuyên biệt cho Google Tasks và Calendar.")
 
@@ -50,18 +72,34 @@ with st.sidebar:
     st.header("Cấu hình Agent")
     agent_choice = st.selectbox(
         "Chọn Agent để tương tác:",
-        ("--- Vui lòng chọn ---", "Tasks", "Calendar", "Gmail")
+        ("--- Vui lòng chọn ---", "Tasks", "Calendar", "Gmail", SUPERVISOR_CHOICE)
     )
 
+    if st.session_state.get("turn_metrics"):
+        summary = summarize_turns(st.session_state.turn_metrics)
+        fmt = lambda value: f"{value:.2f}s" if value is not None else "-"
+        st.caption(
+            f"{summary['turns']} lượt · fast path trả lời {summary['fast_path_share']:.0%} "
+            f"(median {fmt(summary['fast_path_median'])}) · qua model: median {fmt(summary['llm_median'])}"
+        )
+
 # --- Logic chính của ứng dụng ---
 if agent_choice != "--- Vui lòng chọn ---":
     # Khởi tạo hoặc lấy lại Agent và prompt từ session state
     if "agent" not in st.session_state or st.session_state.agent_name != agent_choice:
         st.session_state.agent_name = agent_choice
         st.session_state.agent = get_agent(agent_choice)
-        prompt_file = f"prompts/{agent_choice.lower()}_agent_prompt.md"
-        st.session_state.system_prompt = SystemMessage(content=get_formatted_prompt(prompt_file))
-        st.session_state.messages = [st.session_state.system_prompt]
+        if agent_choice == SUPERVISOR_CHOICE:
+            # Supervisor dùng prompt riêng cho bước lập kế hoạch và cho từng sub-agent
+            st.session_state.system_prompt = None
+        else:
+            prompt_file = f"prompts/{agent_choice.lower()}_agent_prompt.md"
+            st.session_state.system_prompt = SystemMessage(content=get_formatted_prompt(prompt_file), id="system_prompt")
+        # Lịch sử đầy đủ nằm trong checkpointer theo thread_id; danh sách này chỉ dùng để hiển thị
+        st.session_state.thread_id = f"web-{uuid.uuid4().hex}"
+        st.session_state.messages = []
+        # Chế độ ghi (CASSETTE_RECORD_DIR): mỗi phiên trò chuyện ghi vào một cassette riêng (xem cassette.py)
+        st.session_state.cassette = recording_cassette(st.session_state.thread_id)
         st.success(f"Đã khởi tạo {agent_choice} Agent. Bạn có thể bắt đầu trò chuyện!")
     
     # Hiển thị lịch sử chat
@@ -81,25 +119,53 @@ if agent_choice != "--- Vui lòng chọn ---":
         with st.chat_message("user"):
             st.markdown(user_input)
         
-        # Gọi Agent và hiển thị trạng thái "đang suy nghĩ"
+        # Gọi Agent và hiển thị câu trả lời theo từng token ngay khi model sinh ra
         with st.chat_message("assistant"):
-            with st.spinner("Agent đang suy nghĩ..."):
-                try:
-                    # Chuẩn bị input cho agent
-                    inputs = {"messages": st.session_state.messages}
-                    
-                    # Gọi Agent
-                    final_state = st.session_state.agent.invoke(inputs)
-                    ai_response_message = final_state['messages'][-1]
-                    
-                    # Hiển thị câu trả lời của AI
-                    st.markdown(ai_response_message.content)
-                    
-                    # Thêm câu trả lời của AI vào lịch sử
-                    st.session_state.messages.append(ai_response_message)
-                except Exception as e:
-                    error_message = f"Đã có lỗi xảy ra: {e}"
-                    st.error(error_message)
-                    st.session_state.messages.append(SystemMessage(content=error_message)) # Lưu lỗi vào history để debug
+            progress = st.empty()
+            answer = st.empty()
+            try:
+                # Chỉ gửi message mới; system prompt chỉ gửi ở lượt đầu tiên của thread
+                config = thread_config(st.session_state.thread_id)
+                new_messages = [HumanMessage(content=user_input)]
+                if st.session_state.system_prompt and not st.session_state.agent.get_state(config).values.get("messages"):
+                    new_messages.insert(0, st.session_state.system_prompt)
+                inputs = {"messages": new_messages}
+                
+                progress.caption("Agent đang suy nghĩ...")
+                streamed_text = ""
+                cassette = st.session_state.get("cassette")
+                agent_key = "supervisor" if st.session_state.agent_name == SUPERVISOR_CHOICE else st.session_state.agent_name.lower()
+                recording = cassette.turn(agent_key, st.session_state.thread_id, new_messages, config) if cassette else contextlib.nullcontext(config)
+                with recording as turn_config:
+                    for kind, payload in stream_agent_turn(st.session_state.agent, inputs, turn_config):
+                        if kind == "token":
+                            streamed_text += payload
+                            answer.markdown(streamed_text + "▌")
+                        elif kind == "tool_start":
+                            # Phần văn bản trước lời gọi tool không phải câu trả lời cuối cùng
+                            streamed_text = ""
+                            answer.empty()
+                            progress.caption(f"Đang gọi {payload}…")
+                        elif kind == "tool_end":
+                            progress.caption(f"Đã xong {payload}, đang soạn câu trả lời...")
+                        elif kind == "done":
+                            ai_response_message = payload["message"]
+                            metrics = payload["metrics"]
+                
+                # Hiển thị câu trả lời đầy đủ của AI và thời gian xử lý
+                answer.markdown(ai_response_message.content)
+                ttft = f"{metrics['ttft']:.2f}s" if metrics["ttft"] is not None else "-"
+                progress.caption(f"TTFT: {ttft} · Tổng: {metrics['total']:.2f}s · {metrics['tool_calls']} lần gọi tool · Tiết kiệm ~{metrics['tokens_saved']} token lịch sử")
+                st.session_state.setdefault("turn_metrics", []).append(metrics)
+                if cassette:
+                    cassette.end_turn(metrics)
+                
+                # Thêm câu trả lời của AI vào lịch sử
+                st.session_state.messages.append(ai_response_message)
+            except Exception as e:
+                progress.empty()
+                error_message = f"Đã có lỗi xảy ra: {e}"
+                st.error(error_message)
+                st.session_state.messages.append(SystemMessage(content=error_message)) # Lưu lỗi vào history để debug
 else:
     st.info("Vui lòng chọn một Agent từ thanh bên để bắt đầu.")
\ No newline at end of file
@@ -0,0 +1,78 @@
+# intelligent_agent_platform/benchmarks/bench_async_throughput.py
+
+"""
+So sánh thông lượng (hội thoại/giây) giữa graph đồng bộ (create_agent, chạy trên thread pool)
+và graph bất đồng bộ (create_async_agent, tất cả hội thoại trên một event loop).
+Model là ScriptedChatModel (gọi list_emails rồi trả lời), Gmail API là server giả lập.
+
+Chạy từ thư mục gốc của dự án:
+    python -m benchmarks.bench_async_throughput
+"""
+
+import argparse
+import asyncio
+import contextlib
+import io
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from langchain_core.messages import HumanMessage
+
+import tools.common_cache as cache_module
+import tools.common_execution as execution_module
+import tools.google_gmail_tools as gmail_module
+from agent import create_agent, create_async_agent
+from benchmarks.fake_chat_model import ScriptedChatModel
+from benchmarks.fake_google_api import FakeGoogleAPIServer
+from tools.common_async import aclose_async_session
+from tools.common_execution import RequestGovernor
+
+
+def _inputs(i: int) -> dict:
+    return {"messages": [HumanMessage(content=f"Liệt kê email mới nhất #{i}")]}
+
+
+def run_sync(model, conversations: int, workers: int) -> float:
+    agent = create_agent(gmail_module.gmail_tools, model=model)
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        list(executor.map(lambda i: agent.invoke(_inputs(i)), range(conversations)))
+    return time.perf_counter() - start
+
+
+async def run_async(model, conversations: int) -> float:
+    agent = create_async_agent(gmail_module.gmail_tools, model=model)
+    start = time.perf_counter()
+    await asyncio.gather(*(agent.ainvoke(_inputs(i)) for i in range(conversations)))
+    elapsed = time.perf_counter() - start
+    await aclose_async_session()
+    return elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--conversations", type=int, nargs="+", default=[10, 50, 200])
+    parser.add_argument("--workers", type=int, default=8, help="Số thread cho graph đồng bộ")
+    parser.add_argument("--model-latency", type=float, default=0.2, help="Độ trễ mỗi lần gọi model (giây)")
+    parser.add_argument("--api-latency", type=float, default=0.03, help="Độ trễ mỗi round trip Google API (giây)")
+    args = parser.parse_args()
+    # Đo lớp bên dưới: tắt cache kết quả tool để mỗi lần gọi đều thật sự chạy tool,
+    # và bỏ token bucket vì server giả lập không có quota
+    cache_module.TOOL_CACHE_ENABLED = False
+    execution_module.request_governor = RequestGovernor(rate_limits={})
+
+    model = ScriptedChatModel(tool_name="list_emails", tool_args={"max_results": 5}, latency=args.model_latency)
+    with FakeGoogleAPIServer(latency=args.api_latency, subprocess=True) as server:
+        gmail_module.get_google_service = server.service_factory()
+
+        print(f"{'hội thoại':>9} | {'sync (hội thoại/s)':>18} | {'async (hội thoại/s)':>19}")
+        for conversations in args.conversations:
+            # Ẩn các dòng DEBUG mà tool in ra
+            with contextlib.redirect_stdout(io.StringIO()):
+                sync_elapsed = run_sync(model, conversations, args.workers)
+                async_elapsed = asyncio.run(run_async(model, conversations))
+            print(f"{conversations:>9} | {conversations / sync_elapsed:>18.1f} | {conversations / async_elapsed:>19.1f}")
+
+
+if __name__ == "__main__":
+    main()
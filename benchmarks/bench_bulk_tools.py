@@ -0,0 +1,96 @@
+# intelligent_agent_platform/benchmarks/bench_bulk_tools.py
+
+"""
+Đo các tool hàng loạt (create_tasks_bulk, update_tasks_bulk, create_events_bulk, delete_events_bulk) so với gọi
+tool đơn lẻ cho từng mục, trên server Google API giả lập: thời gian và số request HTTP cho một việc N mục.
+Gọi tool đơn lẻ còn tốn thêm một bước model cho mỗi mục (hoặc một lần gọi tool song song rất dài); phần đó
+không được tính ở đây.
+
+Chạy từ thư mục gốc của dự án:
+    python -m benchmarks.bench_bulk_tools
+"""
+
+import argparse
+import contextlib
+import datetime
+import io
+import time
+
+import tools.common_cache as cache_module
+import tools.common_execution as execution_module
+import tools.google_calendar_tools as calendar_module
+import tools.google_tasks_tools as tasks_module
+from benchmarks.fake_google_api import FakeCalendar, FakeGoogleAPIServer, FakeTasks
+from tools.calendar_mirror import CalendarMirror, LOCAL_TZ
+from tools.common_execution import RequestGovernor
+from tools.tasks_cache import TaskCache
+
+
+def _new_tasks(count: int) -> list:
+    return [{"title": f"Mục checklist {i}", "due_date": "2025-03-01"} for i in range(count)]
+
+
+def _new_events(count: int) -> list:
+    start = datetime.datetime.now(LOCAL_TZ).replace(hour=8, minute=0, second=0, microsecond=0) + datetime.timedelta(days=1)
+    return [
+        {"summary": f"Ca trực {i}", "start_time": (start + datetime.timedelta(hours=i)).isoformat(),
+         "end_time": (start + datetime.timedelta(hours=i, minutes=30)).isoformat()}
+        for i in range(count)
+    ]
+
+
+def _ids(result: str) -> list:
+    # Cột ID (thứ 3) của kết quả hàng loạt dạng compact
+    return [line.split(" | ")[2] for line in result.splitlines()[2:] if " | OK | " in line]
+
+
+def _measure(server, fn):
+    requests = server.request_count
+    start = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        result = fn()
+    return time.perf_counter() - start, server.request_count - requests, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--items", type=int, default=20, help="Số mục của mỗi việc hàng loạt")
+    parser.add_argument("--latency", type=float, default=0.1, help="Độ trễ mỗi round trip HTTP (giây)")
+    args = parser.parse_args()
+    cache_module.TOOL_CACHE_ENABLED = False
+    execution_module.request_governor = RequestGovernor(rate_limits={})
+
+    with FakeGoogleAPIServer(latency=args.latency, calendar=FakeCalendar(event_count=50), tasks=FakeTasks(task_count=50)) as server:
+        factory = server.service_factory()
+        calendar_module.get_google_service = tasks_module.get_google_service = factory
+        calendar_module.calendar_mirror = CalendarMirror()
+        tasks_module.task_cache = TaskCache()
+
+        rows = []
+        single = _measure(server, lambda: [tasks_module.create_task.invoke(item) for item in _new_tasks(args.items)])
+        bulk = _measure(server, lambda: tasks_module.create_tasks_bulk.invoke({"tasks": _new_tasks(args.items)}))
+        rows.append(("tạo công việc", single, bulk))
+
+        task_ids = _ids(bulk[2])
+        single = _measure(server, lambda: [tasks_module.update_task.invoke({"task_id": i, "new_status": "completed"}) for i in task_ids])
+        bulk = _measure(server, lambda: tasks_module.update_tasks_bulk.invoke({"updates": [{"task_id": i, "new_status": "needsAction"} for i in task_ids]}))
+        rows.append(("cập nhật công việc", single, bulk))
+
+        single = _measure(server, lambda: [calendar_module.create_event.invoke(item) for item in _new_events(args.items)])
+        bulk = _measure(server, lambda: calendar_module.create_events_bulk.invoke({"events": _new_events(args.items)}))
+        rows.append(("tạo sự kiện", single, bulk))
+
+        single_ids = [event_id for event_id, event in server.calendar.events.items() if event.get("summary", "").startswith("Ca trực")]
+        bulk_ids, single_ids = single_ids[:args.items], single_ids[args.items:]
+        single = _measure(server, lambda: [calendar_module.delete_event.invoke({"event_id": i}) for i in single_ids])
+        bulk = _measure(server, lambda: calendar_module.delete_events_bulk.invoke({"event_ids": bulk_ids}))
+        rows.append(("xóa sự kiện", single, bulk))
+
+    print(f"{args.items} mục mỗi việc, độ trễ giả lập {args.latency * 1000:.0f} ms/round trip")
+    print(f"{'':>20} | {'từng mục (s)':>12} | {'request':>7} | {'hàng loạt (s)':>13} | {'request':>7}")
+    for name, (single_time, single_requests, _), (bulk_time, bulk_requests, _) in rows:
+        print(f"{name:>20} | {single_time:>12.2f} | {single_requests:>7} | {bulk_time:>13.2f} | {bulk_requests:>7}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,83 @@
+# intelligent_agent_platform/benchmarks/bench_calendar_mirror.py
+
+"""
+So sánh độ trễ của list_events khi gọi events.list mỗi lần (cách cũ) và khi trả lời từ bản sao cục bộ
+(CalendarMirror: đồng bộ một lần, sau đó chỉ đồng bộ tăng dần bằng syncToken), trên server Calendar giả lập.
+Các truy vấn là những khoảng 7 ngày chồng lấn nhau, giống các lượt hội thoại hỏi lại cùng một tuần.
+
+Chạy từ thư mục gốc của dự án:
+    python -m benchmarks.bench_calendar_mirror
+"""
+
+import argparse
+import contextlib
+import datetime
+import io
+import statistics
+import time
+
+import tools.common_cache as cache_module
+import tools.common_execution as execution_module
+import tools.google_calendar_tools as calendar_module
+from benchmarks.fake_google_api import FakeCalendar, FakeGoogleAPIServer
+from tools.calendar_mirror import CalendarMirror, LOCAL_TZ, parse_time
+from tools.common_execution import RequestGovernor
+
+
+def _ranges(count: int):
+    today = datetime.datetime.now(LOCAL_TZ).replace(hour=0, minute=0, second=0, microsecond=0)
+    for i in range(count):
+        start = today + datetime.timedelta(days=i % 5)
+        yield start.isoformat(), (start + datetime.timedelta(days=7)).isoformat()
+
+
+def _measure(queries: list) -> list:
+    timings = []
+    for start_time, end_time in queries:
+        began = time.perf_counter()
+        with contextlib.redirect_stdout(io.StringIO()):
+            calendar_module.list_events.invoke({"start_time": start_time, "end_time": end_time})
+        timings.append((time.perf_counter() - began) * 1000)
+    return timings
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--latency", type=float, default=0.03, help="Độ trễ mỗi round trip HTTP (giây)")
+    parser.add_argument("--events", type=int, default=5000, help="Số sự kiện trong lịch giả lập")
+    parser.add_argument("--queries", type=int, default=50)
+    args = parser.parse_args()
+    # Đo lớp bên dưới: tắt cache kết quả tool để mỗi lần gọi đều thật sự chạy tool,
+    # và bỏ token bucket vì server giả lập không có quota
+    cache_module.TOOL_CACHE_ENABLED = False
+    execution_module.request_governor = RequestGovernor(rate_limits={})
+
+    queries = list(_ranges(args.queries))
+    with FakeGoogleAPIServer(latency=args.latency, calendar=FakeCalendar(event_count=args.events)) as server:
+        service = server.build_service("calendar", "v3")
+        calendar_module.get_google_service = lambda *_: service
+
+        calendar_module.CALENDAR_MIRROR_ENABLED = False
+        direct = _measure(queries)
+
+        mirror = calendar_module.calendar_mirror = CalendarMirror()
+        calendar_module.CALENDAR_MIRROR_ENABLED = True
+        mirrored = _measure(queries)
+
+        # Chỉ phần tra cứu chỉ mục, không tính định dạng kết quả
+        start, end = parse_time(queries[0][0]), parse_time(queries[0][1])
+        began = time.perf_counter()
+        for _ in range(1000):
+            mirror._index.query(start, end)
+        index_us = (time.perf_counter() - began) * 1000
+
+        print(f"{args.events} sự kiện, độ trễ giả lập {args.latency * 1000:.0f} ms, {args.queries} truy vấn 7 ngày chồng lấn")
+        print(f"{'':>22} | {'lần đầu (ms)':>12} | {'median (ms)':>11} | {'p95 (ms)':>8}")
+        for name, timings in (("gọi API mỗi lần", direct), ("bản sao cục bộ", mirrored)):
+            p95 = statistics.quantiles(timings, n=20)[-1]
+            print(f"{name:>22} | {timings[0]:>12.1f} | {statistics.median(timings):>11.2f} | {p95:>8.2f}")
+        print(f"Tra cứu chỉ mục: {index_us:.1f} µs/truy vấn; thống kê bản sao: {mirror.stats()}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,54 @@
+# intelligent_agent_platform/benchmarks/bench_client_startup.py
+
+"""
+Đo thời gian xây dựng client Google (calendar v3, tasks v1, gmail v1):
+- googleapiclient.discovery.build mặc định (cách cũ),
+- build_service lần đầu (cold: đọc và parse discovery document trong DISCOVERY_DIR),
+- build_service các lần sau (warm: dùng document đã parse sẵn trong bộ nhớ).
+
+Không cần credentials hay mạng. Chạy từ thư mục gốc của dự án:
+    python -m benchmarks.bench_client_startup
+"""
+
+import argparse
+import statistics
+import time
+
+import httplib2
+from googleapiclient.discovery import build
+
+from tools.common_auth import build_service, load_discovery_document
+
+APIS = [("calendar", "v3"), ("tasks", "v1"), ("gmail", "v1")]
+
+
+def _timed(fn) -> float:
+    start = time.perf_counter()
+    fn()
+    return (time.perf_counter() - start) * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    print(f"{'API':<12} | {'build() mặc định (ms)':>21} | {'cold (ms)':>9} | {'warm (ms)':>9}")
+    for service_name, version in APIS:
+        stock = statistics.median(
+            _timed(lambda: build(service_name, version, http=httplib2.Http())) for _ in range(args.repeat)
+        )
+
+        cold = []
+        for _ in range(args.repeat):
+            load_discovery_document.cache_clear()
+            cold.append(_timed(lambda: build_service(service_name, version, httplib2.Http())))
+
+        warm = statistics.median(
+            _timed(lambda: build_service(service_name, version, httplib2.Http())) for _ in range(args.repeat)
+        )
+        print(f"{service_name + ' ' + version:<12} | {stock:>21.2f} | {statistics.median(cold):>9.2f} | {warm:>9.2f}")
+
+
+if __name__ == "__main__":
+    main()
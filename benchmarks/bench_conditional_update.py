@@ -0,0 +1,119 @@
+# intelligent_agent_platform/benchmarks/bench_conditional_update.py
+
+"""
+Đo update_event/update_task (một request patch có If-Match từ bản sao/cache) so với cách cũ
+(GET toàn bộ rồi PUT lại cả sự kiện), trên server Google API giả lập:
+- thời gian và số request của một lần cập nhật;
+- số lần ghi đè mất thay đổi khi một phiên khác sửa cùng sự kiện giữa lần đọc và lần ghi của agent.
+
+Chạy từ thư mục gốc của dự án:
+    python -m benchmarks.bench_conditional_update
+"""
+
+import argparse
+import contextlib
+import io
+import statistics
+import time
+
+import tools.common_cache as cache_module
+import tools.common_execution as execution_module
+import tools.google_calendar_tools as calendar_module
+import tools.google_tasks_tools as tasks_module
+from benchmarks.fake_google_api import FakeCalendar, FakeGoogleAPIServer, FakeTasks
+from config import CALENDAR_ID
+from tools.calendar_mirror import CalendarMirror
+from tools.common_execution import RequestGovernor
+from tools.tasks_cache import TaskCache
+
+
+def _legacy_update_event(service, event_id: str, new_summary: str, between=None):
+    # Cách cũ của update_event: đọc toàn bộ sự kiện rồi ghi đè cả sự kiện
+    event = service.events().get(calendarId=CALENDAR_ID, eventId=event_id).execute()
+    if between:
+        between()
+    event["summary"] = new_summary
+    return service.events().update(calendarId=CALENDAR_ID, eventId=event_id, body=event).execute()
+
+
+def _measure(server, fn, calls: int):
+    requests = server.request_count
+    timings = []
+    for i in range(calls):
+        start = time.perf_counter()
+        with contextlib.redirect_stdout(io.StringIO()):
+            fn(i)
+        timings.append((time.perf_counter() - start) * 1000)
+    return statistics.median(timings), (server.request_count - requests) / calls
+
+
+def _lost_updates(server, event_ids: list, field: str, update) -> int:
+    """
+    Mỗi sự kiện: sau lần đọc của agent và trước lần ghi, một phiên khác đổi `field`; agent đổi tiêu đề.
+    Đếm số lần thay đổi của phiên khác bị ghi đè mất mà không ai được báo.
+    """
+    other = server.build_service("calendar", "v3")
+    lost = 0
+    for i, event_id in enumerate(event_ids):
+        value = f"Phiên khác {i}"
+        edit = lambda: other.events().patch(calendarId=CALENDAR_ID, eventId=event_id, body={field: value}).execute()
+        result = update(event_id, f"Tiêu đề mới {i}", edit)
+        lost += server.calendar.events[event_id].get(field) != value and not str(result).startswith("Lỗi")
+    return lost
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--latency", type=float, default=0.05, help="Độ trễ mỗi round trip HTTP (giây)")
+    parser.add_argument("--calls", type=int, default=20)
+    args = parser.parse_args()
+    cache_module.TOOL_CACHE_ENABLED = False
+    execution_module.request_governor = RequestGovernor(rate_limits={})
+
+    with FakeGoogleAPIServer(latency=args.latency, calendar=FakeCalendar(event_count=200, days=10), tasks=FakeTasks(task_count=50)) as server:
+        factory = server.service_factory()
+        calendar_module.get_google_service = tasks_module.get_google_service = factory
+        calendar_module.calendar_mirror = CalendarMirror()
+        tasks_module.task_cache = TaskCache()
+        service = factory("calendar", "v3")
+        with contextlib.redirect_stdout(io.StringIO()):
+            calendar_module.list_events.invoke({})
+            tasks_module.list_tasks.invoke({})
+        event_ids = sorted(calendar_module.calendar_mirror._index.events)
+        # Mỗi phép đo dùng một nhóm sự kiện riêng để lần ghi của phép đo trước không làm đổi ETag
+        legacy_ids, patch_ids, *race_ids = (event_ids[i * args.calls:(i + 1) * args.calls] for i in range(6))
+
+        rows = {
+            "sự kiện: GET + PUT (cũ)": _measure(server, lambda i: _legacy_update_event(service, legacy_ids[i], f"Cũ {i}"), args.calls),
+            "sự kiện: patch + If-Match": _measure(
+                server, lambda i: calendar_module.update_event.invoke({"event_id": patch_ids[i], "new_summary": f"Mới {i}"}), args.calls),
+            "công việc: patch + If-Match": _measure(
+                server, lambda i: tasks_module.update_task.invoke({"task_id": f"task{i:05d}", "new_title": f"Mới {i}"}), args.calls),
+        }
+
+        def legacy_update(event_id, summary, edit):
+            return _legacy_update_event(service, event_id, summary, between=edit)
+
+        def conditional_update(event_id, summary, edit):
+            # Bản đã đọc là bản sao cục bộ (đã đồng bộ ở trên); phiên khác sửa trước khi agent ghi
+            edit()
+            return calendar_module.update_event.invoke({"event_id": event_id, "new_summary": summary})
+
+        with contextlib.redirect_stdout(io.StringIO()):
+            lost = {
+                (field, name): _lost_updates(server, race_ids.pop(), field, update)
+                for field in ("description", "summary")
+                for name, update in (("GET + PUT", legacy_update), ("patch + If-Match", conditional_update))
+            }
+
+    print(f"{args.calls} lần cập nhật, độ trễ giả lập {args.latency * 1000:.0f} ms/round trip")
+    print(f"{'':>28} | {'median (ms)':>11} | {'request/lần':>11}")
+    for name, (median, requests) in rows.items():
+        print(f"{name:>28} | {median:>11.1f} | {requests:>11.1f}")
+    print("Sửa đồng thời (phiên khác sửa giữa lần đọc và lần ghi của agent), số lần thay đổi của phiên khác bị mất không báo:")
+    for (field, name), count in lost.items():
+        print(f"  phiên khác đổi {field:<11} | {name:<16} | {count}/{args.calls}")
+
+
+if __name__ == "__main__":
+    main()
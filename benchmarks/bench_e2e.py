@@ -0,0 +1,240 @@
+# intelligent_agent_platform/benchmarks/bench_e2e.py
+
+"""
+Bộ đo end-to-end không cần mạng: chạy create_agent với tasks_tools, calendar_tools và gmail_tools trên một tập
+kịch bản cố định (SCENARIOS), với model giả lập theo kịch bản (ScenarioChatModel) và server Google API giả lập
+trong cùng process. Mỗi lần lặp dùng dữ liệu Google giả lập và cache mới nên mọi lần lặp giống hệt nhau.
+
+Kết quả là JSON (stdout hoặc --output) để so sánh giữa các commit: với mỗi bộ tool và tổng cộng,
+số lượt/giây, độ trễ một lượt p50/p95/p99 (ms), số lần gọi model, số lần gọi tool và số request Google API mỗi lượt.
+--compare <file JSON cũ> in thêm bảng chênh lệch so với lần đo đó (ra stderr).
+
+Chạy từ thư mục gốc của dự án:
+    python -m benchmarks.bench_e2e --output e2e.json
+    python -m benchmarks.bench_e2e --compare e2e.json
+"""
+
+import argparse
+import contextlib
+import datetime
+import io
+import json
+import statistics
+import subprocess
+import sys
+
+from langchain_core.messages import HumanMessage
+from langgraph.checkpoint.memory import InMemorySaver
+
+import tools.common_cache as cache_module
+import tools.common_execution as execution_module
+import tools.google_calendar_tools as calendar_module
+import tools.google_gmail_tools as gmail_module
+import tools.google_tasks_tools as tasks_module
+from agent import create_agent, stream_agent_turn
+from benchmarks.fake_chat_model import ScenarioChatModel
+from benchmarks.fake_google_api import FakeCalendar, FakeGmail, FakeGoogleAPIServer, FakeTasks
+from checkpoint import thread_config
+from tools.calendar_mirror import CalendarMirror, LOCAL_TZ
+from tools.common_cache import ToolResultCache
+from tools.common_execution import RequestGovernor
+from tools.tasks_cache import TaskCache
+
+_TODAY = datetime.datetime.now(LOCAL_TZ).replace(hour=0, minute=0, second=0, microsecond=0)
+_TOMORROW = _TODAY + datetime.timedelta(days=1)
+
+
+def _at(day: datetime.datetime, hour: int, minute: int = 0) -> str:
+    return day.replace(hour=hour, minute=minute).isoformat()
+
+
+def _call(name: str, **args) -> dict:
+    return {"name": name, "args": args}
+
+
+# Bộ tool -> danh sách cuộc hội thoại; mỗi cuộc hội thoại là các lượt (câu của người dùng, kịch bản của model).
+# Kịch bản: mỗi bước là danh sách tool call của một lần trả lời, chuỗi là câu trả lời cuối (xem ScenarioChatModel).
+SCENARIOS = {
+    "tasks": [
+        [("Những việc nào tôi chưa làm xong?", [[_call("list_tasks", only_open=True)], "Bạn còn vài việc chưa xong."])],
+        [("Thêm việc gửi báo cáo quý, hạn thứ sáu", [
+            [_call("create_task", title="Gửi báo cáo quý", due_date=(_TODAY + datetime.timedelta(days=4)).date().isoformat())],
+            "Đã thêm công việc."])],
+        [("Đánh dấu Công việc 3 là đã xong", [
+            [_call("list_tasks")], [_call("update_task", task_id="task00003", new_status="completed")], "Đã cập nhật."])],
+        [("Tạo checklist chuyển nhà giúp tôi", [
+            [_call("create_tasks_bulk", tasks=[{"title": title} for title in ("Đóng thùng", "Thuê xe", "Báo điện nước", "Đổi địa chỉ", "Dọn nhà cũ")])],
+            "Đã tạo 5 việc."])],
+        [
+            ("Tuần này có việc nào đến hạn không?", [
+                [_call("list_tasks", due_from=_TODAY.date().isoformat(), due_to=(_TODAY + datetime.timedelta(days=7)).date().isoformat())],
+                "Có vài việc đến hạn."]),
+            ("Xoá Công việc 7 và đổi tên Công việc 8 thành 'Họp khách hàng'", [
+                [_call("delete_task", task_id="task00007"), _call("update_task", task_id="task00008", new_title="Họp khách hàng")],
+                "Đã xoá và đổi tên."]),
+        ],
+    ],
+    "calendar": [
+        [("Tuần này tôi có lịch gì?", [[_call("list_events")], "Đây là lịch tuần này."])],
+        [("Đặt lịch họp nhóm 3 giờ chiều mai trong một tiếng", [
+            [_call("create_event", summary="Họp nhóm", start_time=_at(_TOMORROW, 15), end_time=_at(_TOMORROW, 16), description="Họp hằng tuần")],
+            "Đã đặt lịch."])],
+        [("Dời Sự kiện 10 sang 9 giờ sáng mai", [
+            [_call("list_events", start_time=_TOMORROW.isoformat(), end_time=(_TOMORROW + datetime.timedelta(days=1)).isoformat())],
+            [_call("update_event", event_id="evt000010", new_start_time=_at(_TOMORROW, 9), new_end_time=_at(_TOMORROW, 10))],
+            "Đã dời lịch."])],
+        [("Hôm nay và ngày mai tôi bận những giờ nào?", [
+            [_call("list_events", start_time=_TODAY.isoformat(), end_time=_TOMORROW.isoformat()),
+             _call("list_events", start_time=_TOMORROW.isoformat(), end_time=(_TOMORROW + datetime.timedelta(days=1)).isoformat())],
+            "Đây là lịch hai ngày."])],
+        [
+            ("Đặt ba buổi trực sáng thứ hai, ba, tư tuần sau", [
+                [_call("create_events_bulk", events=[
+                    {"summary": "Trực", "start_time": _at(_TODAY + datetime.timedelta(days=7 + i), 8), "end_time": _at(_TODAY + datetime.timedelta(days=7 + i), 9)}
+                    for i in range(3)
+                ])],
+                "Đã đặt ba buổi."]),
+            ("Huỷ Sự kiện 11 và Sự kiện 12", [[_call("delete_events_bulk", event_ids=["evt000011", "evt000012"])], "Đã huỷ."]),
+        ],
+    ],
+    "gmail": [
+        [("Tôi có email nào chưa đọc?", [[_call("list_emails", is_unread=True, max_results=10)], "Bạn có vài email chưa đọc."])],
+        [("Đọc email mới nhất từ sender1@example.com", [
+            [_call("list_emails", from_sender="sender1@example.com", max_results=1)],
+            [_call("read_email_content", email_id="msg000001")],
+            "Đây là nội dung email."])],
+        [("Email nào thuộc nhãn Project X?", [[_call("list_emails", label="Project X", max_results=10)], "Đây là các email của Project X."])],
+        [
+            ("Tôi đang có những thư nháp nào?", [[_call("list_drafts", max_results=5)], "Đây là các thư nháp."]),
+            ("Mở thư nháp đầu tiên", [[_call("read_draft_content", draft_id="draft0000")], "Đây là thư nháp."]),
+        ],
+        [("Tìm email về hoá đơn", [[_call("list_emails", query="hoá đơn", max_results=10)], "Không có email nào về hoá đơn."])],
+    ],
+}
+
+TOOLSETS = {
+    "tasks": (tasks_module, lambda: tasks_module.tasks_tools),
+    "calendar": (calendar_module, lambda: calendar_module.calendar_tools),
+    "gmail": (gmail_module, lambda: gmail_module.gmail_tools),
+}
+
+
+def _percentile(values: list, q: int) -> float:
+    if len(values) == 1:
+        return values[0]
+    return statistics.quantiles(values, n=100, method="inclusive")[q - 1]
+
+
+def _summary(turns: list) -> dict:
+    latencies = [t["total"] * 1000 for t in turns]
+    elapsed = sum(t["total"] for t in turns)
+    return {
+        "turns": len(turns),
+        "turns_per_sec": round(len(turns) / elapsed, 2) if elapsed else None,
+        "latency_ms": {
+            "p50": round(_percentile(latencies, 50), 2),
+            "p95": round(_percentile(latencies, 95), 2),
+            "p99": round(_percentile(latencies, 99), 2),
+            "mean": round(statistics.mean(latencies), 2),
+        },
+        "model_calls_per_turn": round(statistics.mean(t["model_calls"] for t in turns), 3),
+        "tool_calls_per_turn": round(statistics.mean(t["tool_calls"] for t in turns), 3),
+        "api_requests_per_turn": round(statistics.mean(t["api_requests"] for t in turns), 3),
+    }
+
+
+def _reset_state():
+    # Mỗi lần lặp bắt đầu như một process mới: cache trống, không giới hạn tốc độ (server giả lập không có quota)
+    calendar_module.calendar_mirror = CalendarMirror()
+    tasks_module.task_cache = TaskCache()
+    cache_module.tool_result_cache = ToolResultCache()
+    execution_module.request_governor = RequestGovernor(rate_limits={})
+
+
+def _run_toolset(name: str, model_latency: float, api_latency: float) -> list:
+    """Chạy mọi cuộc hội thoại của một bộ tool trên dữ liệu Google giả lập mới; trả về số liệu của từng lượt."""
+    module, tools = TOOLSETS[name]
+    conversations = SCENARIOS[name]
+    model = ScenarioChatModel(scripts={text: steps for conversation in conversations for text, steps in conversation}, latency=model_latency)
+    _reset_state()
+    turns = []
+    with FakeGoogleAPIServer(latency=api_latency, gmail=FakeGmail(), calendar=FakeCalendar(), tasks=FakeTasks()) as server:
+        module.get_google_service = server.service_factory()
+        agent = create_agent(tools(), model=model, checkpointer=InMemorySaver())
+        for index, conversation in enumerate(conversations):
+            config = thread_config(f"e2e-{name}-{index}")
+            for text, _ in conversation:
+                requests = server.request_count
+                with contextlib.redirect_stdout(io.StringIO()):
+                    *_, (_, done) = stream_agent_turn(agent, {"messages": [HumanMessage(content=text)]}, config)
+                turns.append({**done["metrics"], "api_requests": server.request_count - requests})
+    return turns
+
+
+def _commit() -> str:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def _print_comparison(result: dict, baseline: dict):
+    print(f"So với {baseline.get('commit')} ({baseline.get('timestamp')}):", file=sys.stderr)
+    print(f"{'':>9} | {'lượt/s':>16} | {'p50 (ms)':>16} | {'p95 (ms)':>16} | {'request/lượt':>16}", file=sys.stderr)
+    for name, current in result["results"].items():
+        old = baseline.get("results", {}).get(name)
+        if not old:
+            continue
+        cells = [
+            (old["turns_per_sec"], current["turns_per_sec"]),
+            (old["latency_ms"]["p50"], current["latency_ms"]["p50"]),
+            (old["latency_ms"]["p95"], current["latency_ms"]["p95"]),
+            (old["api_requests_per_turn"], current["api_requests_per_turn"]),
+        ]
+        text = " | ".join(
+            f"{f'{new:g} ({(new - before) / before:+.0%})' if before else f'{new:g}':>16}" for before, new in cells
+        )
+        print(f"{name:>9} | {text}", file=sys.stderr)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--model-latency", type=float, default=0.05, help="Độ trễ mỗi lần gọi model (giây)")
+    parser.add_argument("--api-latency", type=float, default=0.01, help="Độ trễ mỗi round trip Google API (giây)")
+    parser.add_argument("--repeat", type=int, default=5, help="Số lần chạy lại toàn bộ kịch bản")
+    parser.add_argument("--warmup", type=int, default=1, help="Số lần chạy đầu không tính (nạp discovery, import, ...)")
+    parser.add_argument("--toolsets", nargs="+", choices=list(SCENARIOS), default=list(SCENARIOS))
+    parser.add_argument("--output", help="Ghi kết quả JSON vào file thay vì stdout")
+    parser.add_argument("--compare", help="File JSON của một lần đo trước để in chênh lệch")
+    args = parser.parse_args()
+
+    turns = {name: [] for name in args.toolsets}
+    for repetition in range(args.warmup + args.repeat):
+        for name in args.toolsets:
+            measured = _run_toolset(name, args.model_latency, args.api_latency)
+            if repetition >= args.warmup:
+                turns[name].extend(measured)
+
+    result = {
+        "benchmark": "e2e",
+        "commit": _commit(),
+        "timestamp": datetime.datetime.now(datetime.timezone.utc).isoformat(timespec="seconds"),
+        "config": {"model_latency": args.model_latency, "api_latency": args.api_latency, "repeat": args.repeat},
+        "results": {
+            **{name: _summary(values) for name, values in turns.items()},
+            "all": _summary([turn for values in turns.values() for turn in values]),
+        },
+    }
+    text = json.dumps(result, ensure_ascii=False, indent=2)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(text + "\n")
+    else:
+        print(text)
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            _print_comparison(result, json.load(f))
+
+
+if __name__ == "__main__":
+    main()
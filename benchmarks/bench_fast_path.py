@@ -0,0 +1,102 @@
+# intelligent_agent_platform/benchmarks/bench_fast_path.py
+
+"""
+Đo fast path (fast_path.FastPath) trên một tập câu lệnh hỗn hợp: tỷ lệ lượt được trả lời bằng luật và mẫu câu,
+và thời gian một lượt so với khi cùng câu lệnh đi qua vòng lặp model <-> tools (fast path tắt).
+Model là ScriptedSupervisorModel (gọi một tool list_* rồi trả lời, mỗi lần gọi mất --model-latency giây),
+Google API là server giả lập.
+
+Chạy từ thư mục gốc của dự án:
+    python -m benchmarks.bench_fast_path
+"""
+
+import argparse
+import contextlib
+import io
+import statistics
+
+from langchain_core.messages import HumanMessage
+
+import tools.common_cache as cache_module
+import tools.common_execution as execution_module
+import tools.google_calendar_tools as calendar_module
+import tools.google_gmail_tools as gmail_module
+import tools.google_tasks_tools as tasks_module
+from agent import create_agent, stream_agent_turn, summarize_turns
+from benchmarks.fake_chat_model import ScriptedSupervisorModel
+from benchmarks.fake_google_api import FakeCalendar, FakeGoogleAPIServer, FakeTasks
+from fast_path import FastPath
+from history import HistoryManager
+from tools.calendar_mirror import CalendarMirror
+from tools.common_execution import RequestGovernor
+from tools.tasks_cache import TaskCache
+
+UTTERANCES = [
+    "Liệt kê công việc",
+    "liệt kê các công việc chưa hoàn thành",
+    "show my open tasks",
+    "Lịch hôm nay",
+    "hôm nay tôi có cuộc họp gì không?",
+    "show tomorrow's events",
+    "lịch tuần này",
+    "liệt kê nhãn",
+    "Tạo cuộc họp với An lúc 3 giờ chiều mai",
+    "Email nào từ sếp tuần này chưa đọc?",
+    "Dời buổi họp sáng mai sang thứ sáu",
+    "công việc nào sắp đến hạn nhất?",
+]
+
+
+def _run(agent, repeat: int) -> list:
+    metrics = []
+    for _ in range(repeat):
+        for text in UTTERANCES:
+            with contextlib.redirect_stdout(io.StringIO()):
+                *_, (_, done) = stream_agent_turn(agent, {"messages": [HumanMessage(content=text)]})
+            metrics.append({**done["metrics"], "text": text})
+    return metrics
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--model-latency", type=float, default=0.5, help="Độ trễ mỗi lần gọi model (giây)")
+    parser.add_argument("--api-latency", type=float, default=0.03, help="Độ trễ mỗi round trip Google API (giây)")
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+    # Đo lớp bên dưới: tắt cache kết quả tool để mỗi lần gọi đều thật sự chạy tool,
+    # và bỏ token bucket vì server giả lập không có quota
+    cache_module.TOOL_CACHE_ENABLED = False
+    execution_module.request_governor = RequestGovernor(rate_limits={})
+
+    tools = tasks_module.tasks_tools + calendar_module.calendar_tools + gmail_module.gmail_tools
+    model = ScriptedSupervisorModel(latency=args.model_latency)
+    history = HistoryManager(summarizer=None)
+    with FakeGoogleAPIServer(latency=args.api_latency, calendar=FakeCalendar(event_count=500, days=30), tasks=FakeTasks(task_count=30)) as server:
+        factory = server.service_factory()
+        for module in (calendar_module, gmail_module, tasks_module):
+            module.get_google_service = factory
+        calendar_module.calendar_mirror = CalendarMirror()
+        tasks_module.task_cache = TaskCache()
+
+        fast_path = FastPath(tools)
+        with_fast_path = _run(create_agent(tools, model=model, history=history, fast_path=fast_path), args.repeat)
+        without = _run(create_agent(tools, model=model, history=history, fast_path=FastPath(tools, intents=[])), args.repeat)
+
+    summary = summarize_turns(with_fast_path)
+    served = {m["text"] for m in with_fast_path if m["fast_path"]}
+    same_llm = [m["total"] for m in without if m["text"] in served]
+    print(f"{len(UTTERANCES)} câu lệnh x {args.repeat} lần, model {args.model_latency * 1000:.0f} ms/lần gọi, API {args.api_latency * 1000:.0f} ms/round trip")
+    print(f"Fast path trả lời {summary['fast_path_share']:.0%} số lượt ({len(served)}/{len(UTTERANCES)} câu lệnh): {fast_path.stats()['by_intent']}")
+    print(f"{'':>36} | {'median (s)':>10} | {'lần gọi model/lượt':>18}")
+    rows = (
+        ("lượt fast path", summary["fast_path_median"], [m for m in with_fast_path if m["fast_path"]]),
+        ("cùng câu lệnh, qua model", statistics.median(same_llm) if same_llm else None, [m for m in without if m["text"] in served]),
+        ("các lượt còn lại (qua model)", summary["llm_median"], [m for m in with_fast_path if not m["fast_path"]]),
+    )
+    for name, median, turns in rows:
+        calls = statistics.mean(m["model_calls"] for m in turns) if turns else 0
+        print(f"{name:>36} | {median if median is not None else float('nan'):>10.3f} | {calls:>18.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,64 @@
+# intelligent_agent_platform/benchmarks/bench_gmail_batch.py
+
+"""
+So sánh độ trễ của list_emails / list_drafts khi lấy metadata tuần tự (cách cũ)
+và khi gửi theo Google batch HTTP, trên server Gmail giả lập.
+
+Chạy từ thư mục gốc của dự án:
+    python -m benchmarks.bench_gmail_batch
+"""
+
+import argparse
+import statistics
+import time
+
+import tools.common_cache as cache_module
+import tools.common_execution as execution_module
+import tools.google_gmail_tools as gmail_module
+from benchmarks.fake_google_api import FakeGoogleAPIServer
+from tools.common_execution import RequestGovernor
+
+
+def _serial_list_emails(service, max_results: int) -> int:
+    """Cách làm cũ: một request messages.get cho mỗi email."""
+    response = service.users().messages().list(userId='me', q='in:inbox', maxResults=max_results).execute()
+    for msg in response.get('messages', []):
+        service.users().messages().get(userId='me', id=msg['id'], format='metadata').execute()
+    return len(response.get('messages', []))
+
+
+def _measure(fn, repeat: int):
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        timings.append((time.perf_counter() - start) * 1000)
+    return statistics.median(timings)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--latency", type=float, default=0.03, help="Độ trễ mỗi round trip HTTP (giây)")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1, 5, 10, 25, 50, 100])
+    args = parser.parse_args()
+    # Đo lớp bên dưới: tắt cache kết quả tool để mỗi lần gọi đều thật sự chạy tool,
+    # và bỏ token bucket vì server giả lập không có quota
+    cache_module.TOOL_CACHE_ENABLED = False
+    execution_module.request_governor = RequestGovernor(rate_limits={})
+
+    with FakeGoogleAPIServer(latency=args.latency) as server:
+        service = server.build_service("gmail", "v1")
+        gmail_module.get_google_service = lambda *_: service
+
+        print(f"Độ trễ giả lập mỗi round trip: {args.latency * 1000:.0f} ms (median của {args.repeat} lần)")
+        print(f"{'max_results':>11} | {'tuần tự (ms)':>12} | {'batch (ms)':>10} | {'drafts batch (ms)':>17} | {'tăng tốc':>8}")
+        for size in args.sizes:
+            serial = _measure(lambda: _serial_list_emails(service, size), args.repeat)
+            batched = _measure(lambda: gmail_module.list_emails.invoke({"max_results": size}), args.repeat)
+            drafts = _measure(lambda: gmail_module.list_drafts.invoke({"max_results": size}), args.repeat)
+            print(f"{size:>11} | {serial:>12.1f} | {batched:>10.1f} | {drafts:>17.1f} | {serial / batched:>7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
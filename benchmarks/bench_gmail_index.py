@@ -0,0 +1,92 @@
+# intelligent_agent_platform/benchmarks/bench_gmail_index.py
+
+"""
+Đo chỉ mục Gmail cục bộ (tools/gmail_index.py) trên một hộp thư giả lập lớn (mặc định 100k message):
+thời gian đồng bộ lần đầu, dung lượng file SQLite, thời gian đồng bộ tăng dần, và độ trễ của list_emails
+khi gọi Gmail API (list + batch metadata) so với khi trả lời từ chỉ mục.
+
+Chạy từ thư mục gốc của dự án:
+    python -m benchmarks.bench_gmail_index
+"""
+
+import argparse
+import contextlib
+import io
+import os
+import statistics
+import tempfile
+import time
+
+import tools.common_cache as cache_module
+import tools.common_execution as execution_module
+import tools.google_gmail_tools as gmail_module
+from benchmarks.fake_google_api import FakeGmail, FakeGoogleAPIServer
+from tools.common_execution import RequestGovernor
+from tools.gmail_index import GmailIndex
+
+QUERIES = [
+    ("hộp thư đến", {}),
+    ("người gửi", {"from_sender": "sender3@example.com"}),
+    ("nhãn", {"label": "Project X"}),
+    ("chưa đọc", {"is_unread": True}),
+    ("từ khoá", {"query": "4242"}),
+    ("từ khoá + nhãn", {"query": "Email", "label": "INBOX", "is_unread": True}),
+]
+
+
+def _median_ms(fn, repeat: int) -> float:
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        with contextlib.redirect_stdout(io.StringIO()):
+            fn()
+        timings.append((time.perf_counter() - start) * 1000)
+    return statistics.median(timings)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--messages", type=int, default=100_000, help="Số message trong hộp thư giả lập")
+    parser.add_argument("--latency", type=float, default=0.03, help="Độ trễ mỗi round trip HTTP (giây)")
+    parser.add_argument("--max-results", type=int, default=10)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+    # Đo lớp bên dưới: tắt cache kết quả tool để mỗi lần gọi đều thật sự chạy tool,
+    # và bỏ token bucket vì server giả lập không có quota
+    cache_module.TOOL_CACHE_ENABLED = False
+    execution_module.request_governor = RequestGovernor(rate_limits={})
+
+    gmail = FakeGmail(message_count=args.messages)
+    with FakeGoogleAPIServer(gmail=gmail, latency=args.latency, batch_part_latency=0, subprocess=True) as server, \
+            tempfile.TemporaryDirectory() as tmp:
+        service = server.build_service("gmail", "v1")
+        gmail_module.get_google_service = lambda *_: service
+        path = os.path.join(tmp, "gmail_index.sqlite")
+        index = GmailIndex(path=path, max_messages=args.messages, max_staleness=0)
+        gmail_module.get_gmail_index = lambda: index
+
+        start = time.perf_counter()
+        index.sync(service)
+        full_sync = time.perf_counter() - start
+        start = time.perf_counter()
+        index.sync(service)
+        incremental_sync = time.perf_counter() - start
+        # Các truy vấn bên dưới chỉ đo phần tra cứu (chỉ mục vừa được đồng bộ)
+        index.max_staleness = 3600
+
+        print(f"Hộp thư giả lập: {args.messages} message, độ trễ mỗi round trip {args.latency * 1000:.0f} ms")
+        print(f"Đồng bộ lần đầu: {full_sync:.1f} s | đồng bộ tăng dần (không có thay đổi): {incremental_sync * 1000:.1f} ms"
+              f" | file SQLite: {os.path.getsize(path) / 1e6:.1f} MB")
+        print(f"{'truy vấn':>16} | {'Gmail API (ms)':>14} | {'chỉ mục (ms)':>12} | {'tăng tốc':>8}")
+        for name, params in QUERIES:
+            params = {**params, "max_results": args.max_results}
+            gmail_module.GMAIL_INDEX_ENABLED = False
+            api = _median_ms(lambda: gmail_module.list_emails.invoke(params), args.repeat)
+            gmail_module.GMAIL_INDEX_ENABLED = True
+            local = _median_ms(lambda: gmail_module.list_emails.invoke(params), args.repeat)
+            print(f"{name:>16} | {api:>14.1f} | {local:>12.2f} | {api / local:>7.0f}x")
+        print(f"Thống kê chỉ mục: {index.stats()}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,167 @@
+# intelligent_agent_platform/benchmarks/bench_replay.py
+
+"""
+Kiểm thử hồi quy hiệu năng từ cassette (xem cassette.py): phát lại các cuộc hội thoại thật đã ghi bằng main.py/app.py
+(CASSETTE_RECORD_DIR=cassettes) trên graph đã biên dịch của code hiện tại, với câu trả lời của model và
+của Google API lấy từ cassette nên không cần mạng, API key hay tài khoản Google.
+
+Với mỗi lượt, so sánh số lần gọi model và số request Google API khi phát lại với lúc ghi: một thay đổi prompt
+hay tool làm thêm bước model hoặc request sẽ hiện ra ở đây (cùng số lần không khớp bản ghi).
+Mặc định giữ nguyên thời gian đã ghi của từng lần gọi model/request nên độ trễ một lượt so sánh được với phiên thật;
+--no-timing trả lời ngay để chỉ đo phần xử lý cục bộ.
+
+Kết quả là JSON giống bench_e2e (stdout hoặc --output); --check trả mã lỗi 1 khi có lượt cần nhiều lần gọi model
+hoặc request hơn lúc ghi, hoặc chậm hơn lúc ghi quá --max-slowdown (+ --slack giây; chỉ khi giữ thời gian).
+
+Chạy từ thư mục gốc của dự án:
+    python -m benchmarks.bench_replay cassettes/*.jsonl --output replay.json
+    python -m benchmarks.bench_replay cassettes/cli-tasks-*.jsonl --no-timing --check
+"""
+
+import argparse
+import contextlib
+import datetime
+import io
+import json
+import sys
+
+from langchain_core.messages import messages_from_dict
+from langgraph.checkpoint.memory import InMemorySaver
+
+import tools.common_cache as cache_module
+import tools.common_execution as execution_module
+import tools.google_calendar_tools as calendar_module
+import tools.google_tasks_tools as tasks_module
+from agent import create_agent, stream_agent_turn
+from benchmarks.bench_e2e import _commit, _summary
+from cassette import Cassette, ReplayChatModel, use_cassette
+from checkpoint import thread_config
+from config import CASSETTE_REPLAY_TIMING
+from llm_cache import ResponseCache
+from supervisor import SUB_AGENTS, create_supervisor
+from tools.calendar_mirror import CalendarMirror
+from tools.common_cache import ToolResultCache
+from tools.common_execution import RequestGovernor
+from tools.tasks_cache import TaskCache
+
+
+def _reset_state():
+    # Mỗi cassette bắt đầu như process vừa ghi nó: bản sao lịch, cache công việc, cache tool và cache model đều trống
+    calendar_module.calendar_mirror = CalendarMirror()
+    tasks_module.task_cache = TaskCache()
+    cache_module.tool_result_cache = ToolResultCache()
+    execution_module.request_governor = RequestGovernor()
+
+
+def _recorded_turns(cassette: Cassette) -> dict:
+    """Số lần gọi model, số request và số liệu của từng lượt lúc ghi."""
+    turns = {turn["turn"]: {"model_calls": 0, "api_requests": 0, "metrics": None} for turn in cassette.turns}
+    for entry in cassette.entries:
+        if entry.get("turn") not in turns:
+            continue
+        if entry["type"] == "model":
+            turns[entry["turn"]]["model_calls"] += 1
+        elif entry["type"] == "http":
+            turns[entry["turn"]]["api_requests"] += 1
+        elif entry["type"] == "turn_end":
+            turns[entry["turn"]]["metrics"] = entry["metrics"]
+    return turns
+
+
+def replay(path: str, timing: bool) -> dict:
+    """Phát lại một cassette; trả về số liệu từng lượt (lúc ghi và khi phát lại) và thống kê khớp bản ghi."""
+    cassette = Cassette(path, mode="replay", timing=timing)
+    _reset_state()
+    model = ReplayChatModel(cassette=cassette)
+    checkpointer = InMemorySaver()
+    cache = ResponseCache(db_path=None)
+    agents = {}
+    recorded = _recorded_turns(cassette)
+    turns = []
+    with use_cassette(cassette):
+        for entry in cassette.entries:
+            if entry["type"] == "reset":
+                checkpointer.delete_thread(entry["thread"])
+                continue
+            if entry["type"] != "turn":
+                continue
+            name = entry["agent"]
+            if name not in agents:
+                agents[name] = (
+                    create_supervisor(model=model, checkpointer=checkpointer, cache=cache) if name == "supervisor"
+                    else create_agent(SUB_AGENTS[name][0], model=model, checkpointer=checkpointer, cache=cache)
+                )
+            before = cassette.stats()
+            with contextlib.redirect_stdout(io.StringIO()):
+                *_, (_, done) = stream_agent_turn(
+                    agents[name], {"messages": messages_from_dict(entry["messages"])}, thread_config(entry["thread"])
+                )
+            after = cassette.stats()
+            turns.append({
+                "turn": entry["turn"],
+                "agent": name,
+                "recorded": recorded[entry["turn"]],
+                **done["metrics"],
+                "model_requests": after["model_calls"] - before["model_calls"],
+                "api_requests": after["http_requests"] - before["http_requests"],
+            })
+    return {"turns": turns, "cassette": cassette.stats()}
+
+
+def _regressions(name: str, result: dict, timing: bool, max_slowdown: float, slack: float) -> list:
+    problems = []
+    for turn in result["turns"]:
+        recorded = turn["recorded"]
+        where = f"{name} lượt {turn['turn']}"
+        if turn["model_requests"] > recorded["model_calls"]:
+            problems.append(f"{where}: {turn['model_requests']} lần gọi model (lúc ghi {recorded['model_calls']})")
+        if turn["api_requests"] > recorded["api_requests"]:
+            problems.append(f"{where}: {turn['api_requests']} request Google (lúc ghi {recorded['api_requests']})")
+        if timing and recorded["metrics"] and turn["total"] > recorded["metrics"]["total"] * (1 + max_slowdown) + slack:
+            problems.append(f"{where}: {turn['total']:.2f}s (lúc ghi {recorded['metrics']['total']:.2f}s)")
+    return problems
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("cassettes", nargs="+", help="Các file cassette (.jsonl) cần phát lại")
+    parser.add_argument("--no-timing", action="store_true", help="Không chờ thời gian đã ghi, trả lời ngay")
+    parser.add_argument("--output", help="Ghi kết quả JSON vào file thay vì stdout")
+    parser.add_argument("--check", action="store_true", help="Trả mã lỗi 1 nếu có lượt chậm hơn hoặc nhiều lần gọi hơn lúc ghi")
+    parser.add_argument("--max-slowdown", type=float, default=0.2, help="Độ chậm hơn cho phép so với lúc ghi (0.2 = 20%%)")
+    parser.add_argument("--slack", type=float, default=0.05, help="Độ chậm hơn tuyệt đối cho phép thêm mỗi lượt (giây)")
+    args = parser.parse_args()
+    timing = CASSETTE_REPLAY_TIMING and not args.no_timing
+
+    results = {path: replay(path, timing) for path in args.cassettes}
+    result = {
+        "benchmark": "replay",
+        "commit": _commit(),
+        "timestamp": datetime.datetime.now(datetime.timezone.utc).isoformat(timespec="seconds"),
+        "config": {"timing": timing},
+        "results": {
+            path: {**_summary(value["turns"]), "cassette": value["cassette"], "turns_detail": value["turns"]}
+            for path, value in results.items() if value["turns"]
+        },
+    }
+    text = json.dumps(result, ensure_ascii=False, indent=2, default=str)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(text + "\n")
+    else:
+        print(text)
+
+    problems = [problem for path, value in results.items() for problem in _regressions(path, value, timing, args.max_slowdown, args.slack)]
+    for path, value in results.items():
+        stats = value["cassette"]
+        if stats["model_unmatched"] or stats["http_unmatched"] or stats["http_missing"]:
+            print(f"{path}: {stats['model_unmatched']} lần gọi model và {stats['http_unmatched'] + stats['http_missing']} request "
+                  f"không khớp bản ghi ({stats['http_missing']} request không có trong cassette)", file=sys.stderr)
+    for problem in problems:
+        print(problem, file=sys.stderr)
+    if args.check and problems:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
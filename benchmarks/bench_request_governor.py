@@ -0,0 +1,95 @@
+# intelligent_agent_platform/benchmarks/bench_request_governor.py
+
+"""
+Đo lớp thực thi request chung (tools.common_execution) khi Google trả lỗi, trên server Google API giả lập
+có tiêm lỗi (FakeGoogleAPIServer.fail_next), so với cách cũ (gọi `.execute()` trực tiếp, không thử lại):
+- đợt 429 kèm Retry-After trên các lần gọi tool đơn lẻ;
+- đợt 503 trên từng phần của một batch;
+- service lỗi kéo dài: số request vẫn dồn lên Google khi có / không có circuit breaker.
+
+Chạy từ thư mục gốc của dự án:
+    python -m benchmarks.bench_request_governor
+"""
+
+import argparse
+import contextlib
+import io
+import time
+
+import tools.common_cache as cache_module
+import tools.common_execution as execution_module
+import tools.google_tasks_tools as tasks_module
+from benchmarks.fake_google_api import FakeGoogleAPIServer, FakeTasks
+from tools.common_batch import execute_batch
+from tools.common_execution import RequestGovernor
+from tools.tasks_cache import TaskCache
+
+GOVERNORS = {
+    # Cách cũ: không giới hạn tốc độ, không thử lại, không circuit breaker
+    "cũ": lambda: RequestGovernor(rate_limits={}, max_retries=0, circuit_failures=10**9),
+    "lớp thực thi": lambda: RequestGovernor(rate_limits={}, backoff_base=0.05, circuit_cooldown=60),
+}
+
+
+def _run(server, name: str, fn):
+    execution_module.request_governor = GOVERNORS[name]()
+    tasks_module.task_cache = TaskCache(max_staleness=0)
+    requests = server.request_count
+    start = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        failed = fn()
+    return failed, time.perf_counter() - start, server.request_count - requests, execution_module.request_governor.stats().get("tasks", {})
+
+
+def _rate_limit_burst(server, calls: int):
+    def run():
+        server.fail_next(3, 429, retry_after=0.2)
+        results = [tasks_module.list_tasks.invoke({"only_open": False}) for _ in range(calls)]
+        return sum(str(result).startswith("Lỗi") for result in results)
+    return run
+
+
+def _batch_part_errors(server, items: int):
+    def run():
+        service = server.build_service("tasks", "v1")
+        requests = [service.tasks().get(tasklist="@default", task=f"task{i:05d}") for i in range(items)]
+        server.fail_next(items // 4, 503)
+        return sum(exception is not None for _, exception in execute_batch(service, requests))
+    return run
+
+
+def _outage(server, calls: int):
+    def run():
+        server.fail_next(10**6, 503)
+        try:
+            results = [tasks_module.list_tasks.invoke({"only_open": False}) for _ in range(calls)]
+        finally:
+            server.clear_faults()
+        return sum(str(result).startswith("Lỗi") for result in results)
+    return run
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--latency", type=float, default=0.02, help="Độ trễ mỗi round trip HTTP (giây)")
+    parser.add_argument("--calls", type=int, default=20, help="Số lần gọi tool mỗi kịch bản")
+    args = parser.parse_args()
+    cache_module.TOOL_CACHE_ENABLED = False
+
+    with FakeGoogleAPIServer(latency=args.latency, tasks=FakeTasks(task_count=100)) as server:
+        tasks_module.get_google_service = server.service_factory()
+        scenarios = {
+            "429 + Retry-After": _rate_limit_burst(server, args.calls),
+            "503 trong batch": _batch_part_errors(server, args.calls),
+            "service lỗi kéo dài": _outage(server, args.calls),
+        }
+        rows = [(scenario, name, _run(server, name, fn)) for scenario, fn in scenarios.items() for name in GOVERNORS]
+
+    print(f"{args.calls} lần gọi/mục mỗi kịch bản, độ trễ giả lập {args.latency * 1000:.0f} ms/round trip")
+    print(f"{'':>20} | {'':>12} | {'thất bại':>8} | {'thời gian (s)':>13} | {'request':>7} | bộ đếm")
+    for scenario, name, (failed, elapsed, requests, stats) in rows:
+        print(f"{scenario:>20} | {name:>12} | {failed:>8} | {elapsed:>13.2f} | {requests:>7} | {stats}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,156 @@
+# intelligent_agent_platform/benchmarks/bench_result_format.py
+
+"""
+So sánh kết quả của các tool dạng danh sách (list_events, list_tasks, list_emails, list_drafts, list_labels)
+ở định dạng cũ ('verbose', mỗi trường một dòng có nhãn) và định dạng 'compact' (bảng, kèm alias ID),
+trên dữ liệu giả lập có ID dài như của Google: số ký tự, số token và (tuỳ chọn) độ trễ của model
+khi nhận kết quả đó làm input.
+
+Số token mặc định là ước lượng (history.estimate_tokens). Với --gemini (cần GOOGLE_API_KEY), số token
+được đếm bằng Gemini và mỗi kết quả được gửi cho model MODEL_NAME --repeat lần để đo độ trễ.
+
+Chạy từ thư mục gốc của dự án:
+    python -m benchmarks.bench_result_format
+    python -m benchmarks.bench_result_format --gemini
+"""
+
+import argparse
+import random
+import statistics
+import string
+import time
+
+from langchain_core.messages import HumanMessage
+
+import tools.google_calendar_tools as calendar_module
+import tools.google_gmail_tools as gmail_module
+import tools.google_tasks_tools as tasks_module
+import tools.common_format as common_format
+from tools.common_format import IdAliases, collect_ids, count_text_tokens
+
+QUESTION = "Dựa vào kết quả tool ở trên, mục đầu tiên có ID là gì? Chỉ trả lời ID."
+
+
+def _random_id(alphabet: str, length: int) -> str:
+    return "".join(random.choice(alphabet) for _ in range(length))
+
+
+def _events(count: int) -> list:
+    return [
+        {
+            "id": _random_id(string.ascii_lowercase + string.digits, 26),
+            "summary": f"Họp dự án {i}",
+            "start": {"dateTime": f"2025-08-{1 + i % 28:02d}T{9 + i % 8:02d}:00:00+07:00"},
+            "description": "Trao đổi tiến độ và phân công công việc tuần tới." if i % 3 else "",
+        }
+        for i in range(count)
+    ]
+
+
+def _tasks(count: int) -> list:
+    return [
+        {
+            "id": _random_id(string.ascii_letters + string.digits + "_-", 22),
+            "title": f"Công việc {i}",
+            "due": f"2025-08-{1 + i % 28:02d}T00:00:00.000Z",
+            "status": "completed" if i % 4 == 0 else "needsAction",
+        }
+        for i in range(count)
+    ]
+
+
+def _emails(count: int) -> tuple:
+    messages = [{"id": _random_id("0123456789abcdef", 16)} for _ in range(count)]
+    results = [
+        ({"payload": {"headers": [
+            {"name": "Subject", "value": f"Báo cáo tuần {i}"},
+            {"name": "From", "value": f"Người gửi {i % 7} <sender{i % 7}@example.com>"},
+        ]}}, None)
+        for i in range(count)
+    ]
+    return messages, results
+
+
+def _drafts(count: int) -> tuple:
+    drafts = [{"id": "r" + _random_id(string.digits, 19)} for _ in range(count)]
+    results = [({"message": {"payload": {"headers": [{"name": "Subject", "value": f"Nháp {i}"}]}}}, None) for i in range(count)]
+    return drafts, results
+
+
+def _tool_results(items: int) -> dict:
+    """Hàm tạo kết quả của từng tool (dữ liệu cố định, chỉ định dạng thay đổi)."""
+    events, tasks, (messages, message_results), (drafts, draft_results) = (
+        _events(items), _tasks(items), _emails(items), _drafts(items)
+    )
+    labels = [{"name": name} for name in ("INBOX", "SENT", "DRAFT", "SPAM", "TRASH", "Project X", "Hoá đơn", "Gia đình")]
+    return {
+        "list_events": lambda: calendar_module._budget_from_list(events, "", "", 0).render(),
+        "list_tasks": lambda: tasks_module._format_tasks(tasks),
+        "list_emails": lambda: gmail_module._format_email_previews(messages, message_results),
+        "list_drafts": lambda: gmail_module._format_draft_previews(drafts, draft_results),
+        "list_labels": lambda: gmail_module._format_labels(labels),
+    }
+
+
+def _render(render, mode: str) -> str:
+    """Kết quả tool như model nhìn thấy: với 'compact', ID dài được thay bằng alias như trong agent."""
+    common_format.RESULT_FORMAT = mode
+    with collect_ids() as collected:
+        text = render()
+    if mode == "verbose":
+        return text
+    aliases = IdAliases()
+    for kind, real_id in collected:
+        aliases.alias(real_id, kind)
+    return aliases.shorten(text)
+
+
+def _model_latency(model, text: str, repeat: int) -> float:
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        model.invoke([HumanMessage(content=f"Kết quả tool:\n{text}\n\n{QUESTION}")])
+        timings.append((time.perf_counter() - start) * 1000)
+    return statistics.median(timings)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--items", type=int, default=20, help="Số mục trong mỗi kết quả")
+    parser.add_argument("--gemini", action="store_true", help="Đếm token và đo độ trễ bằng Gemini thật")
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    random.seed(0)
+    model = None
+    if args.gemini:
+        import dotenv
+        from langchain_google_genai import ChatGoogleGenerativeAI
+        from config import MODEL_NAME
+        dotenv.load_dotenv()
+        model = ChatGoogleGenerativeAI(model=MODEL_NAME, temperature=0, max_output_tokens=64)
+    # Các mục phải vừa ngân sách của list_events ở cả hai định dạng để so sánh cùng một dữ liệu
+    calendar_module.LIST_EVENTS_MAX_EVENTS = calendar_module.LIST_EVENTS_MAX_CHARS = 10 ** 6
+
+    print(f"{args.items} mục mỗi kết quả; token {'đếm bằng Gemini' if model else 'ước lượng (~4 ký tự/token)'}")
+    header = f"{'tool':>12} | {'ký tự cũ':>8} | {'ký tự mới':>9} | {'token cũ':>8} | {'token mới':>9} | {'giảm':>5}"
+    if model:
+        header += f" | {'model cũ (ms)':>13} | {'model mới (ms)':>14}"
+    print(header)
+    totals = [0, 0]
+    for name, render in _tool_results(args.items).items():
+        verbose, compact = _render(render, "verbose"), _render(render, "compact")
+        tokens = [count_text_tokens(verbose, model), count_text_tokens(compact, model)]
+        totals = [total + count for total, count in zip(totals, tokens)]
+        row = (f"{name:>12} | {len(verbose):>8} | {len(compact):>9} | {tokens[0]:>8} | {tokens[1]:>9}"
+               f" | {1 - tokens[1] / tokens[0]:>5.0%}")
+        if model:
+            row += f" | {_model_latency(model, verbose, args.repeat):>13.0f} | {_model_latency(model, compact, args.repeat):>14.0f}"
+        print(row)
+    print(f"{'tổng':>12} | {'':>8} | {'':>9} | {totals[0]:>8} | {totals[1]:>9} | {1 - totals[1] / totals[0]:>5.0%}")
+    if not model:
+        print("Độ trễ model: chạy lại với --gemini (cần GOOGLE_API_KEY) để đo.")
+
+
+if __name__ == "__main__":
+    main()
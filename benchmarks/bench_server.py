@@ -0,0 +1,189 @@
+# intelligent_agent_platform/benchmarks/bench_server.py
+
+"""
+Đo tải server nhiều người dùng (server.py): chạy server bằng uvicorn trong cùng process (trên thread riêng) với
+`--users` người dùng trong một kho credentials tạm (credentials giả, còn hạn), model là ScriptedChatModel
+(gọi list_emails rồi trả lời) và Gmail API là server giả lập trong process con.
+
+Mỗi người dùng mở một phiên (WebSocket, hoặc HTTP với --protocol http) và gửi `--turns` lượt liên tiếp;
+--burst N cho mỗi người dùng gửi N lượt cùng lúc (HTTP) để thấy hàng đợi theo người dùng và các lần bị từ chối 429/503.
+
+Kết quả là JSON (stdout hoặc --output): số lượt/giây, độ trễ một lượt p50/p95/p99 (ms) phía client,
+TTFT p50/p95 (WebSocket), số lượt bị từ chối theo mã lỗi và số liệu hàng đợi của server (/healthz).
+
+Chạy từ thư mục gốc của dự án:
+    python -m benchmarks.bench_server --users 300 --turns 3
+    python -m benchmarks.bench_server --users 100 --protocol http --burst 8 --max-concurrent 32
+"""
+
+import argparse
+import asyncio
+import contextlib
+import datetime
+import io
+import json
+import os
+import socket
+import tempfile
+import threading
+import time
+
+import aiohttp
+import uvicorn
+from cryptography.fernet import Fernet
+from google.oauth2.credentials import Credentials
+
+import tools.common_cache as cache_module
+import tools.common_execution as execution_module
+import tools.google_gmail_tools as gmail_module
+from benchmarks.bench_e2e import _commit, _percentile
+from benchmarks.fake_chat_model import ScriptedChatModel
+from benchmarks.fake_google_api import FakeGoogleAPIServer
+from config import SCOPES
+from server import TurnScheduler, create_app
+from tools.common_execution import RequestGovernor
+from tools.credential_store import CredentialStore
+
+
+def _fake_credentials() -> Credentials:
+    # Còn hạn một giờ nên server không cần làm mới token (không có mạng tới Google)
+    expiry = datetime.datetime.now(datetime.timezone.utc).replace(tzinfo=None) + datetime.timedelta(hours=1)
+    return Credentials(token="fake-token", refresh_token="fake-refresh", client_id="fake-client", client_secret="fake-secret",
+                       token_uri="https://oauth2.googleapis.com/token", scopes=SCOPES, expiry=expiry)
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+@contextlib.contextmanager
+def _running_server(app, port: int):
+    server = uvicorn.Server(uvicorn.Config(app, host="127.0.0.1", port=port, log_level="warning", backlog=4096))
+    thread = threading.Thread(target=server.run, daemon=True)
+    thread.start()
+    while not server.started:
+        time.sleep(0.01)
+    try:
+        yield
+    finally:
+        server.should_exit = True
+        thread.join()
+
+
+async def _ws_session(session, base: str, api_key: str, user: int, turns: int, results: list):
+    url = f"{base.replace('http', 'ws', 1)}/v1/ws?agent=gmail&conversation=bench"
+    async with session.ws_connect(url, headers={"Authorization": f"Bearer {api_key}"}, max_msg_size=0) as ws:
+        for turn in range(turns):
+            start = time.perf_counter()
+            first_token = None
+            await ws.send_json({"message": f"Người dùng {user}: liệt kê email mới nhất #{turn}"})
+            while True:
+                event = await ws.receive_json()
+                if event["type"] == "token" and first_token is None:
+                    first_token = time.perf_counter() - start
+                if event["type"] in ("done", "error"):
+                    break
+            results.append({
+                "status": event.get("status", 200), "latency": time.perf_counter() - start, "ttft": first_token,
+            })
+
+
+async def _http_session(session, base: str, api_key: str, user: int, turns: int, burst: int, results: list):
+    async def send(turn: int, copy: int):
+        start = time.perf_counter()
+        async with session.post(f"{base}/v1/chat", headers={"Authorization": f"Bearer {api_key}"}, json={
+            "agent": "gmail", "conversation": "bench", "message": f"Người dùng {user}: liệt kê email mới nhất #{turn}.{copy}",
+        }) as response:
+            await response.read()
+        results.append({"status": response.status, "latency": time.perf_counter() - start, "ttft": None})
+
+    for turn in range(turns):
+        await asyncio.gather(*(send(turn, copy) for copy in range(burst)))
+
+
+async def _load(base: str, api_keys: list, args) -> tuple:
+    results = []
+    connector = aiohttp.TCPConnector(limit=0)
+    async with aiohttp.ClientSession(connector=connector, timeout=aiohttp.ClientTimeout(total=None)) as session:
+        start = time.perf_counter()
+        if args.protocol == "ws":
+            sessions = [_ws_session(session, base, key, user, args.turns, results) for user, key in enumerate(api_keys)]
+        else:
+            sessions = [_http_session(session, base, key, user, args.turns, args.burst, results) for user, key in enumerate(api_keys)]
+        await asyncio.gather(*sessions)
+        elapsed = time.perf_counter() - start
+        async with session.get(f"{base}/healthz") as response:
+            health = await response.json()
+    return results, elapsed, health
+
+
+def _ms(values: list) -> dict:
+    values = [value * 1000 for value in values]
+    if not values:
+        return None
+    return {q: round(_percentile(values, int(q[1:])), 2) for q in ("p50", "p95", "p99")}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--users", type=int, default=200, help="Số người dùng (mỗi người một phiên đồng thời)")
+    parser.add_argument("--turns", type=int, default=3, help="Số lượt liên tiếp của mỗi phiên")
+    parser.add_argument("--protocol", choices=["ws", "http"], default="ws")
+    parser.add_argument("--burst", type=int, default=1, help="Số lượt mỗi người dùng gửi cùng lúc (chỉ với HTTP)")
+    parser.add_argument("--max-concurrent", type=int, default=None, help="Số lượt chạy cùng lúc (mặc định theo config)")
+    parser.add_argument("--model-latency", type=float, default=0.2, help="Độ trễ mỗi lần gọi model (giây)")
+    parser.add_argument("--api-latency", type=float, default=0.03, help="Độ trễ mỗi round trip Google API (giây)")
+    parser.add_argument("--output", help="Ghi kết quả JSON vào file thay vì stdout")
+    args = parser.parse_args()
+    # Server giả lập không có quota; tắt cache kết quả tool để mỗi lượt đều thật sự gọi API
+    cache_module.TOOL_CACHE_ENABLED = False
+    execution_module.request_governor = RequestGovernor(rate_limits={})
+
+    model = ScriptedChatModel(tool_name="list_emails", tool_args={"max_results": 5}, latency=args.model_latency, token_latency=0.005)
+    scheduler = TurnScheduler(**({"max_concurrent": args.max_concurrent} if args.max_concurrent else {}))
+    with tempfile.TemporaryDirectory() as tmp, FakeGoogleAPIServer(latency=args.api_latency, subprocess=True) as google:
+        gmail_module.get_google_service = google.service_factory()
+        store = CredentialStore(path=os.path.join(tmp, "credentials.sqlite"), key=Fernet.generate_key().decode())
+        api_keys = [store.add_user(f"user{i}", _fake_credentials()) for i in range(args.users)]
+        app = create_app(model=model, store=store, checkpoint_path=os.path.join(tmp, "checkpoints.sqlite"), scheduler=scheduler)
+        port = _free_port()
+        # Ẩn các dòng DEBUG mà tool in ra
+        with _running_server(app, port), contextlib.redirect_stdout(io.StringIO()):
+            results, elapsed, health = asyncio.run(_load(f"http://127.0.0.1:{port}", api_keys, args))
+
+    completed = [r for r in results if r["status"] == 200]
+    rejected = {}
+    for r in results:
+        if r["status"] != 200:
+            rejected[str(r["status"])] = rejected.get(str(r["status"]), 0) + 1
+    result = {
+        "benchmark": "server",
+        "commit": _commit(),
+        "timestamp": datetime.datetime.now(datetime.timezone.utc).isoformat(timespec="seconds"),
+        "config": {
+            "users": args.users, "turns": args.turns, "protocol": args.protocol, "burst": args.burst,
+            "max_concurrent": scheduler.max_concurrent, "model_latency": args.model_latency, "api_latency": args.api_latency,
+        },
+        "results": {
+            "turns": len(results),
+            "completed": len(completed),
+            "rejected": rejected,
+            "elapsed_s": round(elapsed, 2),
+            "turns_per_sec": round(len(completed) / elapsed, 2),
+            "latency_ms": _ms([r["latency"] for r in completed]),
+            "ttft_ms": _ms([r["ttft"] for r in completed if r["ttft"] is not None]),
+            "scheduler": health["scheduler"],
+        },
+    }
+    text = json.dumps(result, ensure_ascii=False, indent=2)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(text + "\n")
+    else:
+        print(text)
+
+
+if __name__ == "__main__":
+    main()
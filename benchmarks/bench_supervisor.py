@@ -0,0 +1,98 @@
+# intelligent_agent_platform/benchmarks/bench_supervisor.py
+
+"""
+Đo thời gian một lượt của supervisor (supervisor.create_supervisor) với một kế hoạch gồm các bước độc lập
+cho agent Tasks, Calendar và Gmail, so với chạy lần lượt từng sub-agent và với sub-agent chậm nhất.
+Model là ScriptedSupervisorModel (mỗi sub-agent gọi một tool list_* rồi trả lời), Google API là server giả lập.
+
+Chạy từ thư mục gốc của dự án:
+    python -m benchmarks.bench_supervisor
+"""
+
+import argparse
+import asyncio
+import contextlib
+import io
+import statistics
+import time
+
+from langchain_core.messages import HumanMessage
+
+import tools.common_cache as cache_module
+import tools.common_execution as execution_module
+import tools.google_calendar_tools as calendar_module
+import tools.google_gmail_tools as gmail_module
+import tools.google_tasks_tools as tasks_module
+from agent import create_agent
+from benchmarks.fake_chat_model import ScriptedSupervisorModel
+from benchmarks.fake_google_api import FakeCalendar, FakeGoogleAPIServer, FakeTasks
+from supervisor import SUB_AGENTS, _worker_input, create_async_supervisor, create_supervisor
+from tools.calendar_mirror import CalendarMirror
+from tools.common_async import aclose_async_session
+from tools.common_cache import ToolResultCache
+from tools.common_execution import RequestGovernor
+from tools.tasks_cache import TaskCache
+
+PLAN = [
+    {"agent": "calendar", "goal": "Liệt kê các sự kiện trong tuần này", "depends_on": []},
+    {"agent": "tasks", "goal": "Liệt kê các công việc chưa hoàn thành", "depends_on": []},
+    {"agent": "gmail", "goal": "Liệt kê 5 email mới nhất", "depends_on": []},
+]
+REQUEST = {"messages": [HumanMessage(content="Tuần này tôi có lịch gì, việc gì chưa xong và email mới nào?")]}
+
+
+def _reset_caches():
+    # Mỗi lần đo bắt đầu với cache trống để sub-agent thật sự gọi Google API
+    calendar_module.calendar_mirror = CalendarMirror()
+    tasks_module.task_cache = TaskCache(max_staleness=0)
+    cache_module.tool_result_cache = ToolResultCache()
+    execution_module.request_governor = RequestGovernor(rate_limits={})
+
+
+def _timed(fn) -> float:
+    _reset_caches()
+    start = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        fn()
+    return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--model-latency", type=float, default=0.5, help="Độ trễ mỗi lần gọi model (giây)")
+    parser.add_argument("--api-latency", type=float, default=0.05, help="Độ trễ mỗi round trip Google API (giây)")
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    model = ScriptedSupervisorModel(plan=PLAN, latency=args.model_latency)
+    with FakeGoogleAPIServer(latency=args.api_latency, calendar=FakeCalendar(event_count=200), tasks=FakeTasks(task_count=50)) as server:
+        factory = server.service_factory()
+        for module in (calendar_module, gmail_module, tasks_module):
+            module.get_google_service = factory
+
+        supervisor = create_supervisor(model=model)
+        async_supervisor = create_async_supervisor(model=model)
+        agents = {name: create_agent(tools, model=model) for name, (tools, _) in SUB_AGENTS.items()}
+
+        def run_step(index: int):
+            return agents[PLAN[index]["agent"]].invoke(_worker_input({"index": index, "step": PLAN[index], "context": []}))
+
+        async def run_async():
+            await async_supervisor.ainvoke(REQUEST)
+            await aclose_async_session()
+
+        results = {
+            "từng sub-agent lần lượt": [_timed(lambda: [run_step(i) for i in range(len(PLAN))]) for _ in range(args.repeat)],
+            "sub-agent chậm nhất": [max(_timed(lambda: run_step(i)) for i in range(len(PLAN))) for _ in range(args.repeat)],
+            "supervisor (đồng bộ)": [_timed(lambda: supervisor.invoke(REQUEST)) for _ in range(args.repeat)],
+            "supervisor (async)": [_timed(lambda: asyncio.run(run_async())) for _ in range(args.repeat)],
+        }
+
+    print(f"{len(PLAN)} bước độc lập, model {args.model_latency * 1000:.0f} ms/lần gọi, API {args.api_latency * 1000:.0f} ms/round trip")
+    print("(supervisor = lập kế hoạch + các sub-agent song song + tổng hợp: thêm 2 lần gọi model so với sub-agent chậm nhất)")
+    for name, timings in results.items():
+        print(f"{name:>24} | median {statistics.median(timings):.2f} s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,63 @@
+# intelligent_agent_platform/benchmarks/bench_tasks_cache.py
+
+"""
+So sánh chi phí của list_tasks khi lấy lại toàn bộ danh sách (mọi trang) ở mỗi lần gọi và khi dùng TaskCache
+(lấy toàn bộ một lần, sau đó làm mới bằng updatedMin + ETag), trên server Tasks giả lập.
+Mỗi lần gọi đều được coi là đã quá hạn (max_staleness=0) để đo đúng chi phí của một lần làm mới.
+
+Chạy từ thư mục gốc của dự án:
+    python -m benchmarks.bench_tasks_cache
+"""
+
+import argparse
+import statistics
+import time
+
+import tools.common_cache as cache_module
+import tools.common_execution as execution_module
+import tools.google_tasks_tools as tasks_module
+from benchmarks.fake_google_api import FakeGoogleAPIServer, FakeTasks
+from tools.common_execution import RequestGovernor
+from tools.tasks_cache import TaskCache, iter_task_pages
+
+
+def _measure(server, fn, calls: int):
+    requests, sent = server.request_count, server.bytes_sent
+    timings = []
+    for _ in range(calls):
+        start = time.perf_counter()
+        fn()
+        timings.append((time.perf_counter() - start) * 1000)
+    return statistics.median(timings), (server.request_count - requests) / calls, (server.bytes_sent - sent) / calls
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--tasks", type=int, default=1000, help="Số công việc trong danh sách giả lập")
+    parser.add_argument("--latency", type=float, default=0.03, help="Độ trễ mỗi round trip HTTP (giây)")
+    parser.add_argument("--calls", type=int, default=20)
+    args = parser.parse_args()
+    # Đo lớp bên dưới: tắt cache kết quả tool để mỗi lần gọi đều thật sự chạy tool,
+    # và bỏ token bucket vì server giả lập không có quota
+    cache_module.TOOL_CACHE_ENABLED = False
+    execution_module.request_governor = RequestGovernor(rate_limits={})
+
+    with FakeGoogleAPIServer(latency=args.latency, tasks=FakeTasks(task_count=args.tasks)) as server:
+        service = server.build_service("tasks", "v1")
+        tasks_module.get_google_service = lambda *_: service
+
+        full = _measure(server, lambda: [page.get("items", []) for page in iter_task_pages(service)], args.calls)
+
+        tasks_module.task_cache = TaskCache(max_staleness=0)
+        tasks_module.list_tasks.invoke({})
+        cached = _measure(server, lambda: tasks_module.list_tasks.invoke({"only_open": True}), args.calls)
+
+        print(f"{args.tasks} công việc, độ trễ giả lập {args.latency * 1000:.0f} ms, {args.calls} lần gọi")
+        print(f"{'':>26} | {'median (ms)':>11} | {'request/lần':>11} | {'byte/lần':>10}")
+        for name, (median, requests, sent) in (("lấy lại toàn bộ mỗi lần", full), ("cache updatedMin + ETag", cached)):
+            print(f"{name:>26} | {median:>11.1f} | {requests:>11.1f} | {sent:>10.0f}")
+        print(f"Thống kê cache: {tasks_module.task_cache.stats()}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,87 @@
+# intelligent_agent_platform/benchmarks/bench_tool_cache.py
+
+"""
+Đo cache kết quả tool (tools.common_cache) trên một chuỗi lần gọi tool giống một phiên hội thoại:
+các truy vấn đọc lặp lại (model hỏi lại cùng danh sách, xem lại email...) xen kẽ vài lần ghi.
+So sánh số request Google API và thời gian của cả chuỗi khi tắt và bật cache, trên server giả lập.
+
+Chạy từ thư mục gốc của dự án:
+    python -m benchmarks.bench_tool_cache
+"""
+
+import argparse
+import contextlib
+import datetime
+import io
+import time
+
+import tools.common_cache as cache_module
+import tools.common_execution as execution_module
+import tools.google_calendar_tools as calendar_module
+import tools.google_gmail_tools as gmail_module
+import tools.google_tasks_tools as tasks_module
+from benchmarks.fake_google_api import FakeCalendar, FakeGoogleAPIServer, FakeTasks
+from tools.calendar_mirror import CalendarMirror, LOCAL_TZ
+from tools.common_cache import ToolResultCache
+from tools.common_execution import RequestGovernor
+from tools.tasks_cache import TaskCache
+
+_TODAY = datetime.datetime.now(LOCAL_TZ).replace(hour=0, minute=0, second=0, microsecond=0)
+WEEK = {"start_time": _TODAY.isoformat(), "end_time": (_TODAY + datetime.timedelta(days=7)).isoformat()}
+
+# (tool, tham số); tham số khác nhau chỉ ở khoảng trắng/giá trị mặc định vẫn dùng chung một khoá
+SESSION = [
+    (tasks_module.list_tasks, {}),
+    (tasks_module.list_tasks, {"only_open": False}),
+    (gmail_module.list_labels, {}),
+    (gmail_module.list_emails, {"max_results": 10}),
+    (gmail_module.list_emails, {"max_results": 10, "is_unread": False}),
+    (calendar_module.list_events, WEEK),
+    (tasks_module.create_task, {"title": "Gửi báo cáo"}),
+    (tasks_module.list_tasks, {}),
+    (tasks_module.list_tasks, {"only_open": True}),
+    (tasks_module.list_tasks, {"only_open": True}),
+    (calendar_module.list_events, WEEK),
+    (gmail_module.list_drafts, {"max_results": 5}),
+    (gmail_module.list_drafts, {"max_results": 5}),
+    (gmail_module.list_labels, {}),
+    (calendar_module.create_event, {"summary": "Họp nhóm", "description": "Họp hằng tuần", **WEEK}),
+    (calendar_module.list_events, WEEK),
+    (calendar_module.list_events, WEEK),
+]
+
+
+def _run_session(server, enabled: bool):
+    cache_module.TOOL_CACHE_ENABLED = enabled
+    cache_module.tool_result_cache = ToolResultCache()
+    execution_module.request_governor = RequestGovernor(rate_limits={})
+    calendar_module.calendar_mirror = CalendarMirror()
+    tasks_module.task_cache = TaskCache(max_staleness=0)
+    requests = server.request_count
+    start = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        for tool, params in SESSION:
+            tool.invoke(params)
+    return time.perf_counter() - start, server.request_count - requests
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--latency", type=float, default=0.03, help="Độ trễ mỗi round trip HTTP (giây)")
+    args = parser.parse_args()
+
+    with FakeGoogleAPIServer(latency=args.latency, calendar=FakeCalendar(event_count=300), tasks=FakeTasks(task_count=100)) as server:
+        factory = server.service_factory()
+        for module in (calendar_module, gmail_module, tasks_module):
+            module.get_google_service = factory
+        results = {"tắt cache": _run_session(server, False), "bật cache": _run_session(server, True)}
+
+    print(f"{len(SESSION)} lần gọi tool, độ trễ giả lập {args.latency * 1000:.0f} ms, TTL {cache_module.tool_result_cache.ttl:.0f} s")
+    print(f"{'':>10} | {'tổng (s)':>8} | {'request API':>11}")
+    for name, (elapsed, requests) in results.items():
+        print(f"{name:>10} | {elapsed:>8.2f} | {requests:>11}")
+    print(f"Thống kê cache: {cache_module.tool_result_cache.stats()}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,142 @@
+# intelligent_agent_platform/benchmarks/fake_chat_model.py
+
+"""Chat model giả lập để đo hiệu năng vòng lặp agent mà không cần gọi Gemini."""
+
+import asyncio
+import json
+import time
+import uuid
+
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage, AIMessageChunk, HumanMessage, ToolMessage
+from langchain_core.outputs import ChatGeneration, ChatGenerationChunk, ChatResult
+
+
+class ScriptedChatModel(BaseChatModel):
+    """
+    Lượt đầu tiên gọi tool `tool_name` với `tool_args`; khi nhận được kết quả tool thì trả lời
+    bằng một câu cố định. Mỗi lần gọi model mất `latency` giây (sleep hoặc asyncio.sleep);
+    khi được stream, câu trả lời được chia thành từng từ, mỗi từ cách nhau `token_latency` giây.
+    """
+
+    tool_name: str
+    tool_args: dict = {}
+    latency: float = 0.1
+    token_latency: float = 0.0
+
+    @property
+    def _llm_type(self) -> str:
+        return "scripted"
+
+    def bind_tools(self, tools, **kwargs):
+        return self
+
+    def _respond(self, messages) -> ChatResult:
+        if isinstance(messages[-1], ToolMessage):
+            message = AIMessage(content=f"Kết quả: {messages[-1].content[:80]}")
+        else:
+            message = AIMessage(
+                content="",
+                tool_calls=[{"name": self.tool_name, "args": dict(self.tool_args), "id": f"call_{uuid.uuid4().hex[:8]}"}],
+            )
+        return ChatResult(generations=[ChatGeneration(message=message)])
+
+    def _generate(self, messages, stop=None, run_manager=None, **kwargs) -> ChatResult:
+        time.sleep(self.latency)
+        return self._respond(messages)
+
+    async def _agenerate(self, messages, stop=None, run_manager=None, **kwargs) -> ChatResult:
+        await asyncio.sleep(self.latency)
+        return self._respond(messages)
+
+    def _chunks(self, messages):
+        message = self._respond(messages).generations[0].message
+        if message.tool_calls:
+            yield ChatGenerationChunk(message=AIMessageChunk(content="", tool_call_chunks=[
+                {"name": call["name"], "args": json.dumps(call["args"]), "id": call["id"], "index": 0}
+                for call in message.tool_calls
+            ]))
+            return
+        for word in message.content.split(" "):
+            yield ChatGenerationChunk(message=AIMessageChunk(content=word + " "))
+
+    def _stream(self, messages, stop=None, run_manager=None, **kwargs):
+        time.sleep(self.latency)
+        for chunk in self._chunks(messages):
+            if run_manager:
+                run_manager.on_llm_new_token(chunk.text, chunk=chunk)
+            yield chunk
+            time.sleep(self.token_latency)
+
+    async def _astream(self, messages, stop=None, run_manager=None, **kwargs):
+        await asyncio.sleep(self.latency)
+        for chunk in self._chunks(messages):
+            if run_manager:
+                await run_manager.on_llm_new_token(chunk.text, chunk=chunk)
+            yield chunk
+            await asyncio.sleep(self.token_latency)
+
+
+class ScriptedSupervisorModel(ScriptedChatModel):
+    """
+    Model giả lập cho supervisor: với prompt lập kế hoạch thì trả về kế hoạch `plan` (JSON), với prompt tổng hợp
+    thì trả lời một câu cố định. Khi được bind vào tools của một sub-agent, nó gọi tool `list_*` của agent đó
+    rồi trả lời như ScriptedChatModel.
+    """
+
+    plan: list = []
+    tool_name: str = ""
+
+    def bind_tools(self, tools, **kwargs):
+        names = [t.name for t in tools]
+        return self.model_copy(update={"tool_name": next((n for n in names if n.startswith("list_")), names[0])})
+
+    def _respond(self, messages) -> ChatResult:
+        if not self.tool_name:
+            if isinstance(messages[-1], HumanMessage) and messages[-1].text.startswith("Người dùng yêu cầu:"):
+                message = AIMessage(content="Đã hoàn thành tất cả các bước.")
+            else:
+                message = AIMessage(content=json.dumps({"steps": self.plan, "reply": ""}, ensure_ascii=False))
+            return ChatResult(generations=[ChatGeneration(message=message)])
+        return super()._respond(messages)
+
+
+class ScenarioChatModel(BaseChatModel):
+    """
+    Model giả lập theo kịch bản: `scripts` ánh xạ câu của người dùng -> danh sách bước. Mỗi bước là một danh sách
+    tool call {"name", "args"} (gọi cùng lúc trong một câu trả lời) hoặc một chuỗi (câu trả lời cuối).
+    Bước hiện tại là số câu trả lời model đã đưa ra kể từ câu cuối cùng của người dùng; hết kịch bản thì trả lời
+    một câu cố định. Mỗi lần gọi model mất `latency` giây.
+    """
+
+    scripts: dict = {}
+    latency: float = 0.0
+
+    @property
+    def _llm_type(self) -> str:
+        return "scenario"
+
+    def bind_tools(self, tools, **kwargs):
+        return self
+
+    def _respond(self, messages) -> ChatResult:
+        turn = max((i for i, m in enumerate(messages) if isinstance(m, HumanMessage)), default=None)
+        steps = self.scripts.get(messages[turn].text, []) if turn is not None else []
+        step = sum(isinstance(m, AIMessage) for m in messages[turn:]) if turn is not None else 0
+        action = steps[step] if step < len(steps) else "Đã xong."
+        if isinstance(action, str):
+            message = AIMessage(content=action)
+        else:
+            message = AIMessage(content="", tool_calls=[
+                {"name": call["name"], "args": dict(call.get("args", {})), "id": f"call_{uuid.uuid4().hex[:8]}"}
+                for call in action
+            ])
+        return ChatResult(generations=[ChatGeneration(message=message)])
+
+    def _generate(self, messages, stop=None, run_manager=None, **kwargs) -> ChatResult:
+        time.sleep(self.latency)
+        return self._respond(messages)
+
+    async def _agenerate(self, messages, stop=None, run_manager=None, **kwargs) -> ChatResult:
+        await asyncio.sleep(self.latency)
+        return self._respond(messages)
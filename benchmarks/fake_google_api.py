@@ -0,0 +1,620 @@
+# intelligent_agent_platform/benchmarks/fake_google_api.py
+
+"""
+Server HTTP giả lập phần Gmail API, Calendar API và Tasks API mà các tool dùng (list/get/insert/patch/update/delete,
+drafts, labels, batch, phân trang), để đo hiệu năng và chạy thử tải mà không cần tài khoản thật.
+Mỗi request HTTP (kể cả một batch request) bị cộng thêm độ trễ `latency` (cố định hoặc theo phân phối) để mô phỏng
+round trip tới Google; mỗi phần trong batch chỉ tốn thêm `batch_part_latency` giây xử lý phía server.
+Lỗi 429/5xx có thể được tiêm vào các request tiếp theo bằng `fail_next`, theo tỷ lệ (`error_rate`) hoặc theo đợt 429.
+
+Chạy độc lập (ví dụ lịch 10.000 sự kiện, độ trễ lognormal, 1% lỗi 5xx, mỗi phút một đợt 429 dài 5 giây):
+    python -m benchmarks.fake_google_api --port 8765 --events 10000 --latency lognormal:0.05:0.4 --error-rate 0.01 --burst-every 60 --burst-length 5
+rồi trỏ các tool vào đó bằng GOOGLE_API_EMULATOR_URL=http://127.0.0.1:8765/ (biến môi trường hoặc config.py).
+"""
+
+import argparse
+import datetime
+import hashlib
+import itertools
+import json
+import math
+import multiprocessing
+import random
+import re
+import shlex
+import threading
+import time
+import urllib.parse
+import uuid
+from email.parser import BytesParser
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import httplib2
+from googleapiclient import discovery_cache
+from googleapiclient.discovery import build_from_document
+
+from tools.common_execution import GovernedHttpRequest
+
+
+class FakeGmail:
+    """Dữ liệu hộp thư giả lập (message mới nhất đứng đầu), kèm lịch sử thay đổi cho users.history.list."""
+
+    LABELS = [("INBOX", "INBOX"), ("UNREAD", "UNREAD"), ("SENT", "SENT"), ("Label_1", "Project X")]
+
+    def __init__(self, message_count: int = 500, draft_count: int = 50):
+        self._now_ms = int(time.time() * 1000)
+        self.messages = {}
+        self.order = []
+        for i in range(message_count):
+            self._store(self._make_message(i, self._now_ms - i * 60_000))
+        self.history_id = 1000
+        self.history = []
+        self.drafts = {
+            f"draft{i:04d}": {"id": f"draft{i:04d}", "message": {
+                "id": f"dmsg{i:04d}",
+                "payload": {"headers": [{"name": "Subject", "value": f"Thư nháp {i}"}]},
+            }}
+            for i in range(draft_count)
+        }
+
+    @staticmethod
+    def _make_message(i: int, internal_date: int) -> dict:
+        return {
+            "id": f"msg{i:06d}",
+            "threadId": f"thr{i:06d}",
+            "labelIds": ["INBOX"] + (["UNREAD"] if i % 3 == 0 else []) + (["Label_1"] if i % 10 == 0 else []),
+            "internalDate": str(internal_date),
+            "snippet": f"Nội dung tóm tắt của email số {i}",
+            "payload": {"headers": [
+                {"name": "Subject", "value": f"Email số {i}"},
+                {"name": "From", "value": f"sender{i % 17}@example.com"},
+            ]},
+        }
+
+    def _store(self, message: dict):
+        self.messages[message["id"]] = message
+        self.order.append(message["id"])
+
+    def _record(self, kind: str, message: dict):
+        self.history_id += 1
+        self.history.append({"id": str(self.history_id), kind: [{"message": {
+            "id": message["id"], "threadId": message["threadId"], "labelIds": list(message["labelIds"])}}]})
+
+    def receive(self, count: int = 1):
+        """Thêm `count` message mới (mới nhất) và ghi vào lịch sử."""
+        for _ in range(count):
+            i = len(self.messages)
+            message = self._make_message(i, int(time.time() * 1000))
+            self.messages[message["id"]] = message
+            self.order.insert(0, message["id"])
+            self._record("messagesAdded", message)
+
+    def mark_read(self, message_id: str):
+        message = self.messages[message_id]
+        message["labelIds"] = [label for label in message["labelIds"] if label != "UNREAD"]
+        self._record("labelsRemoved", message)
+
+    def delete(self, message_id: str):
+        message = self.messages.pop(message_id)
+        self.order.remove(message_id)
+        self._record("messagesDeleted", message)
+
+    def _label_id(self, name: str) -> str:
+        return next((label_id for label_id, label in self.LABELS if name.lower() in (label_id.lower(), label.lower())), name)
+
+    def _matches(self, message: dict, q: str, label_ids: list) -> bool:
+        """Một phần cú pháp tìm kiếm của Gmail: in:, is:unread/read, from:, label:, và từ khoá trong tiêu đề/snippet."""
+        labels = set(message["labelIds"])
+        if not set(label_ids) <= labels:
+            return False
+        headers = {h["name"]: h["value"] for h in message["payload"]["headers"]}
+        try:
+            terms = shlex.split(q)
+        except ValueError:
+            terms = q.split()
+        for term in terms:
+            operator, _, value = term.partition(":") if ":" in term else ("", "", term)
+            operator = operator.lower()
+            if operator in ("in", "label") and self._label_id(value) not in labels:
+                return False
+            if operator == "is" and value.lower() in ("unread", "read") and ("UNREAD" in labels) != (value.lower() == "unread"):
+                return False
+            if operator == "from" and value.lower() not in headers.get("From", "").lower():
+                return False
+            if not operator and value.lower() not in f"{headers.get('Subject', '')} {message['snippet']}".lower():
+                return False
+        return True
+
+    def handle(self, method: str, path: str, query: dict):
+        """Trả về (status, body) cho một request Gmail API."""
+        max_results = int(query.get("maxResults", ["100"])[0])
+        offset = int(query.get("pageToken", ["0"])[0])
+        if method == "GET" and path == "/gmail/v1/users/me/profile":
+            return 200, {"emailAddress": "me@example.com", "messagesTotal": len(self.messages), "historyId": str(self.history_id)}
+        if method == "GET" and path == "/gmail/v1/users/me/labels":
+            return 200, {"labels": [{"id": label_id, "name": name} for label_id, name in self.LABELS]}
+        if method == "GET" and path == "/gmail/v1/users/me/history":
+            start = int(query["startHistoryId"][0])
+            records = [r for r in self.history if int(r["id"]) > start]
+            page = records[offset:offset + max_results]
+            body = {"history": page, "historyId": str(self.history_id)}
+            if offset + max_results < len(records):
+                body["nextPageToken"] = str(offset + max_results)
+            return 200, body
+        if method == "GET" and path == "/gmail/v1/users/me/messages":
+            order = self.order
+            if "q" in query or "labelIds" in query:
+                order = [i for i in order if self._matches(self.messages[i], query.get("q", [""])[0], query.get("labelIds", []))]
+            ids = order[offset:offset + max_results]
+            body = {"messages": [{"id": i, "threadId": self.messages[i]["threadId"]} for i in ids], "resultSizeEstimate": len(order)}
+            if offset + max_results < len(order):
+                body["nextPageToken"] = str(offset + max_results)
+            return 200, body
+        if method == "GET" and path == "/gmail/v1/users/me/drafts":
+            ids = list(self.drafts)[offset:offset + max_results]
+            body = {"drafts": [{"id": i, "message": {"id": self.drafts[i]["message"]["id"]}} for i in ids]}
+            if offset + max_results < len(self.drafts):
+                body["nextPageToken"] = str(offset + max_results)
+            return 200, body
+        match = re.fullmatch(r"/gmail/v1/users/me/(messages|drafts)/([^/]+)", path)
+        if method == "GET" and match:
+            store = self.messages if match.group(1) == "messages" else self.drafts
+            item = store.get(match.group(2))
+            if item is None:
+                return 404, {"error": {"code": 404, "message": "Not Found"}}
+            return 200, item
+        return 404, {"error": {"code": 404, "message": f"Không hỗ trợ {method} {path}"}}
+
+
+def _timestamp(value: str) -> float:
+    dt = datetime.datetime.fromisoformat(value)
+    if dt.tzinfo is None:
+        dt = dt.replace(tzinfo=datetime.timezone(datetime.timedelta(hours=7)))
+    return dt.timestamp()
+
+
+def _precondition_failed(headers, resource: dict) -> bool:
+    if_match = headers.get("If-Match") if headers is not None else None
+    return if_match is not None and if_match != resource.get("etag")
+
+
+class FakeCalendar:
+    """
+    Lịch giả lập: events.list (timeMin/timeMax, phân trang, syncToken), get, insert, update/patch, delete.
+    Mỗi thay đổi tăng một số thứ tự; syncToken là số thứ tự tại thời điểm đồng bộ, ETag của sự kiện là số thứ tự
+    của lần thay đổi cuối (update/patch/delete có If-Match khác ETag hiện tại nhận 412).
+    """
+
+    def __init__(self, event_count: int = 1000, days: int = 120):
+        self._seq = itertools.count(1)
+        self.events = {}
+        self.versions = {}
+        origin = datetime.datetime.now(datetime.timezone(datetime.timedelta(hours=7))).replace(minute=0, second=0, microsecond=0)
+        origin -= datetime.timedelta(days=days // 2)
+        for i in range(event_count):
+            start = origin + datetime.timedelta(hours=(i * days * 24) // max(event_count, 1))
+            if i % 50 == 0:
+                # Một ít sự kiện cả ngày kéo dài nhiều ngày
+                event = {"start": {"date": start.date().isoformat()}, "end": {"date": (start + datetime.timedelta(days=3)).date().isoformat()}}
+            else:
+                event = {"start": {"dateTime": start.isoformat()}, "end": {"dateTime": (start + datetime.timedelta(hours=1)).isoformat()}}
+            event.update({"id": f"evt{i:06d}", "summary": f"Sự kiện {i}", "description": f"Mô tả sự kiện {i}", "status": "confirmed"})
+            self._store(event)
+
+    def _store(self, event: dict):
+        version = next(self._seq)
+        self.events[event["id"]] = {**event, "etag": f'"{version}"'}
+        self.versions[event["id"]] = version
+
+    @staticmethod
+    def _bounds(event: dict):
+        start = event["start"].get("dateTime", event["start"].get("date"))
+        end = event["end"].get("dateTime", event["end"].get("date"))
+        return _timestamp(start), _timestamp(end)
+
+    def _list(self, query: dict):
+        max_results = int(query.get("maxResults", ["250"])[0])
+        offset = int(query.get("pageToken", ["0"])[0])
+        if "syncToken" in query:
+            since = int(query["syncToken"][0])
+            items = [self.events[i] for i, v in sorted(self.versions.items(), key=lambda kv: kv[1]) if v > since]
+        else:
+            items = [e for e in self.events.values() if e["status"] != "cancelled"]
+            if "timeMin" in query:
+                time_min = _timestamp(query["timeMin"][0])
+                items = [e for e in items if self._bounds(e)[1] > time_min]
+            if "timeMax" in query:
+                time_max = _timestamp(query["timeMax"][0])
+                items = [e for e in items if self._bounds(e)[0] < time_max]
+            items.sort(key=lambda e: self._bounds(e)[0])
+        page = items[offset:offset + max_results]
+        body = {"items": page}
+        if offset + max_results < len(items):
+            body["nextPageToken"] = str(offset + max_results)
+        else:
+            body["nextSyncToken"] = str(max(self.versions.values(), default=0))
+        return 200, body
+
+    def handle(self, method: str, path: str, query: dict, body: bytes = b"", headers=None):
+        """Trả về (status, body) cho một request Calendar API."""
+        match = re.fullmatch(r"/calendar/v3/calendars/[^/]+/events(?:/([^/]+))?", path)
+        if not match:
+            return 404, {"error": {"code": 404, "message": f"Không hỗ trợ {method} {path}"}}
+        event_id = match.group(1)
+        if event_id is None:
+            if method == "GET":
+                return self._list(query)
+            if method == "POST":
+                event = {**json.loads(body or b"{}"), "id": f"new{uuid.uuid4().hex[:12]}", "status": "confirmed"}
+                self._store(event)
+                return 200, event
+        event = self.events.get(event_id)
+        if event is None or event["status"] == "cancelled":
+            return 404, {"error": {"code": 404, "message": "Not Found"}}
+        if method == "GET":
+            return 200, event
+        if _precondition_failed(headers, event):
+            return 412, {"error": {"code": 412, "message": "Precondition Failed"}}
+        if method in ("PUT", "PATCH"):
+            update = json.loads(body or b"{}")
+            event = {**(event if method == "PATCH" else {}), **update, "id": event_id, "status": "confirmed"}
+            self._store(event)
+            return 200, event
+        if method == "DELETE":
+            self._store({**event, "status": "cancelled"})
+            return 204, None
+        return 404, {"error": {"code": 404, "message": f"Không hỗ trợ {method} {path}"}}
+
+
+class FakeTasks:
+    """
+    Danh sách công việc giả lập: tasks.list (phân trang, updatedMin, showCompleted/showDeleted, ETag + If-None-Match),
+    insert, patch, delete. Mỗi thay đổi lấy một mốc `updated` mới, tăng dần; ETag của công việc đổi theo mốc đó
+    (patch/delete có If-Match khác ETag hiện tại nhận 412).
+    """
+
+    def __init__(self, task_count: int = 300):
+        self._clock = datetime.datetime(2025, 1, 1, tzinfo=datetime.timezone.utc)
+        self.tasks = {}
+        for i in range(task_count):
+            due = (datetime.date(2025, 1, 1) + datetime.timedelta(days=i % 90)).isoformat() + "T00:00:00.000Z"
+            self._store({"id": f"task{i:05d}", "title": f"Công việc {i}", "due": due, "position": f"{i:020d}",
+                         "status": "completed" if i % 4 == 0 else "needsAction"})
+
+    def _tick(self) -> str:
+        self._clock += datetime.timedelta(seconds=1)
+        return self._clock.strftime("%Y-%m-%dT%H:%M:%S.000Z")
+
+    def _store(self, task: dict):
+        updated = self._tick()
+        self.tasks[task["id"]] = {**task, "kind": "tasks#task", "updated": updated, "etag": f'"{updated}"'}
+
+    def _list(self, query: dict):
+        flag = lambda name, default: query.get(name, [default])[0] == "true"
+        max_results = int(query.get("maxResults", ["20"])[0])
+        offset = int(query.get("pageToken", ["0"])[0])
+        items = list(self.tasks.values())
+        if not flag("showDeleted", "false"):
+            items = [t for t in items if not t.get("deleted")]
+        if not flag("showCompleted", "true"):
+            items = [t for t in items if t["status"] != "completed"]
+        if "updatedMin" in query:
+            items = [t for t in items if t["updated"] >= query["updatedMin"][0]]
+        page = items[offset:offset + max_results]
+        body = {"kind": "tasks#tasks", "items": page}
+        if offset + max_results < len(items):
+            body["nextPageToken"] = str(offset + max_results)
+        body["etag"] = '"' + hashlib.sha1(json.dumps(body, sort_keys=True).encode()).hexdigest() + '"'
+        return 200, body
+
+    def handle(self, method: str, path: str, query: dict, body: bytes = b"", headers=None):
+        """Trả về (status, body) cho một request Tasks API."""
+        match = re.fullmatch(r"/tasks/v1/lists/[^/]+/tasks(?:/([^/]+))?", path)
+        if not match:
+            return 404, {"error": {"code": 404, "message": f"Không hỗ trợ {method} {path}"}}
+        task_id = match.group(1)
+        if task_id is None:
+            if method == "GET":
+                status, payload = self._list(query)
+                if headers is not None and headers.get("If-None-Match") == payload["etag"]:
+                    return 304, None
+                return status, payload
+            if method == "POST":
+                task = {"status": "needsAction", **json.loads(body or b"{}"), "id": f"new{uuid.uuid4().hex[:12]}",
+                        "position": f"{len(self.tasks):020d}"}
+                self._store(task)
+                return 200, self.tasks[task["id"]]
+        task = self.tasks.get(task_id)
+        if task is None or task.get("deleted"):
+            return 404, {"error": {"code": 404, "message": "Not Found"}}
+        if method == "GET":
+            return 200, task
+        if _precondition_failed(headers, task):
+            return 412, {"error": {"code": 412, "message": "Precondition Failed"}}
+        if method in ("PUT", "PATCH"):
+            self._store({**task, **json.loads(body or b"{}"), "id": task_id})
+            return 200, self.tasks[task_id]
+        if method == "DELETE":
+            self._store({**task, "deleted": True})
+            return 204, None
+        return 404, {"error": {"code": 404, "message": f"Không hỗ trợ {method} {path}"}}
+
+
+def latency_sampler(spec, rng: random.Random = None):
+    """
+    Hàm trả về độ trễ (giây) cho mỗi request từ `spec`: một số (cố định), một hàm không tham số, hoặc chuỗi
+    "fixed:0.03", "uniform:0.01:0.05", "normal:0.03:0.01", "lognormal:0.03:0.5" (median, sigma),
+    "exponential:0.03" (trung bình). Giá trị âm được đưa về 0.
+    """
+    rng = rng or random.Random()
+    if callable(spec):
+        return spec
+    if isinstance(spec, (int, float)):
+        return lambda: spec
+    kind, *params = str(spec).split(":")
+    params = [float(p) for p in params]
+    distributions = {
+        "fixed": lambda value: value,
+        "uniform": rng.uniform,
+        "normal": rng.gauss,
+        "lognormal": lambda median, sigma: median * math.exp(rng.gauss(0, sigma)),
+        "exponential": lambda mean: rng.expovariate(1 / mean),
+    }
+    if kind not in distributions:
+        raise ValueError(f"Phân phối độ trễ không hỗ trợ: {spec}")
+    distribution = distributions[kind]
+    # Gọi thử một lần để báo sai số tham số ngay khi khởi tạo thay vì trong thread của server
+    distribution(*params)
+    return lambda: max(distribution(*params), 0.0)
+
+
+class _Server(ThreadingHTTPServer):
+    daemon_threads = True
+    # Hàng đợi kết nối đủ lớn cho các bài đo có hàng trăm kết nối đồng thời
+    request_queue_size = 1024
+
+
+class FakeGoogleAPIServer:
+    """Chạy FakeGmail, FakeCalendar và FakeTasks trên một cổng cục bộ, trong một thread nền."""
+
+    def __init__(self, gmail: FakeGmail = None, latency=0.03, batch_part_latency=0.001, subprocess: bool = False,
+                 calendar: FakeCalendar = None, tasks: FakeTasks = None, error_rate: float = 0.0,
+                 burst_every: float = 0.0, burst_length: float = 0.0, seed: int = None, host: str = "127.0.0.1", port: int = 0):
+        """
+        subprocess=True chạy server trong một process con để các thread của server không tranh GIL
+        với code đang được đo (khi đó request_count không được cập nhật ở process cha).
+        `latency` và `batch_part_latency` nhận một số hoặc một phân phối (xem latency_sampler).
+        Lỗi ngẫu nhiên: tỷ lệ `error_rate` request (kể cả phần của batch) nhận 500/503; cứ mỗi `burst_every` giây
+        có một đợt `burst_length` giây mọi request nhận 429 kèm Retry-After tới hết đợt. `seed` cố định chuỗi ngẫu nhiên.
+        """
+        self.gmail = gmail or FakeGmail()
+        self.calendar = calendar or FakeCalendar()
+        self.tasks = tasks or FakeTasks()
+        self._rng = random.Random(seed)
+        self.latency = latency
+        self.batch_part_latency = batch_part_latency
+        self._latency = latency_sampler(latency, self._rng)
+        self._batch_part_latency = latency_sampler(batch_part_latency, self._rng)
+        self.error_rate = error_rate
+        self.burst_every = burst_every
+        self.burst_length = burst_length
+        self._started = time.monotonic()
+        self.request_count = 0
+        self.bytes_sent = 0
+        self.fault_count = {}
+        self._faults = []
+        self._lock = threading.Lock()
+        # Dữ liệu giả lập không thread-safe: mỗi lần xử lý một request (sau phần độ trễ) giữ khoá này
+        self._data_lock = threading.Lock()
+        self._server = _Server((host, port), self._make_handler())
+        if subprocess:
+            self._runner = multiprocessing.get_context("fork").Process(target=self._server.serve_forever, daemon=True)
+        else:
+            self._runner = threading.Thread(target=self._server.serve_forever, daemon=True)
+
+    @property
+    def root_url(self) -> str:
+        host, port = self._server.server_address
+        return f"http://{host}:{port}/"
+
+    def __enter__(self):
+        self._runner.start()
+        return self
+
+    def __exit__(self, *exc):
+        if isinstance(self._runner, threading.Thread):
+            self._server.shutdown()
+        else:
+            self._runner.terminate()
+            self._runner.join()
+        self._server.server_close()
+
+    def build_service(self, service_name: str = "gmail", version: str = "v1"):
+        """Tạo service googleapiclient trỏ vào server giả lập thay vì Google."""
+        doc = json.loads(discovery_cache.get_static_doc(service_name, version))
+        doc["rootUrl"] = self.root_url
+        return build_from_document(doc, http=httplib2.Http(), requestBuilder=GovernedHttpRequest)
+
+    def service_factory(self):
+        """
+        Hàm thay thế get_google_service: mỗi thread một service riêng (httplib2 không thread-safe),
+        tất cả đều trỏ vào server giả lập.
+        """
+        local = threading.local()
+
+        def get_google_service(service_name: str, version: str):
+            services = getattr(local, "services", None)
+            if services is None:
+                services = local.services = {}
+            if (service_name, version) not in services:
+                services[(service_name, version)] = self.build_service(service_name, version)
+            return services[(service_name, version)]
+
+        return get_google_service
+
+    def fail_next(self, count: int, status: int = 429, retry_after: float = None):
+        """`count` request tiếp theo (kể cả từng phần của batch) nhận lỗi `status`, có thể kèm header Retry-After."""
+        with self._lock:
+            self._faults.extend([(status, retry_after)] * count)
+
+    def clear_faults(self):
+        with self._lock:
+            self._faults.clear()
+
+    def _next_fault(self):
+        with self._lock:
+            if self._faults:
+                return self._faults.pop(0)
+            if self.burst_every and self.burst_length:
+                into_burst = (time.monotonic() - self._started) % self.burst_every
+                if into_burst < self.burst_length:
+                    return 429, math.ceil(self.burst_length - into_burst)
+            if self.error_rate and self._rng.random() < self.error_rate:
+                return self._rng.choice((500, 503)), None
+        return None
+
+    def _take_fault(self):
+        """(status, header, payload) của lỗi được tiêm tiếp theo (fail_next, đợt 429, error_rate), hoặc None."""
+        fault = self._next_fault()
+        if fault is None:
+            return None
+        status, retry_after = fault
+        with self._lock:
+            self.fault_count[status] = self.fault_count.get(status, 0) + 1
+        reason = "rateLimitExceeded" if status == 429 else "backendError"
+        payload = {"error": {"code": status, "message": reason, "errors": [{"reason": reason, "message": reason}]}}
+        return status, {"Retry-After": f"{retry_after:g}"} if retry_after is not None else {}, payload
+
+    def _dispatch(self, method: str, raw_path: str, body: bytes = b"", headers=None):
+        with self._data_lock:
+            return self._route(method, raw_path, body, headers)
+
+    def _route(self, method: str, raw_path: str, body: bytes, headers):
+        parsed = urllib.parse.urlsplit(raw_path)
+        query = urllib.parse.parse_qs(parsed.query)
+        if parsed.path.startswith("/tasks/"):
+            return self.tasks.handle(method, parsed.path, query, body, headers)
+        if parsed.path.startswith("/calendar/"):
+            return self.calendar.handle(method, parsed.path, query, body, headers)
+        return self.gmail.handle(method, parsed.path, query)
+
+    def _handle_batch(self, content_type: str, body: bytes):
+        envelope = BytesParser().parsebytes(b"Content-Type: " + content_type.encode() + b"\r\n\r\n" + body)
+        boundary = f"batch_{uuid.uuid4().hex}"
+        parts = []
+        for part in envelope.get_payload():
+            # Mỗi phần là một request HTTP đầy đủ: dòng request, header, dòng trống, body (insert/patch)
+            head, _, part_body = part.get_payload().lstrip().replace("\r\n", "\n").partition("\n\n")
+            request_line, *header_lines = head.split("\n")
+            method, raw_path, _ = request_line.strip().split(" ", 2)
+            headers = dict(line.split(": ", 1) for line in header_lines if ": " in line)
+            time.sleep(self._batch_part_latency())
+            fault = self._take_fault()
+            if fault:
+                status, extra_headers, payload = fault
+            else:
+                status, payload = self._dispatch(method, raw_path, part_body.strip().encode(), headers)
+                extra_headers = {}
+            parts.append(
+                f"--{boundary}\r\n"
+                f"Content-Type: application/http\r\n"
+                f"Content-ID: <response-{part['Content-ID'].strip('<>')}>\r\n\r\n"
+                f"HTTP/1.1 {status} {'OK' if status < 300 else 'Error'}\r\n"
+                f"Content-Type: application/json\r\n"
+                + "".join(f"{name}: {value}\r\n" for name, value in extra_headers.items()) + "\r\n"
+                f"{json.dumps(payload) if payload is not None else ''}\r\n"
+            )
+        parts.append(f"--{boundary}--\r\n")
+        return f"multipart/mixed; boundary={boundary}", "".join(parts).encode()
+
+    def _make_handler(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+            # Header và body được ghi riêng; tắt Nagle để không cộng thêm độ trễ delayed ACK (~40 ms)
+            disable_nagle_algorithm = True
+
+            def log_message(self, *args):
+                pass
+
+            def _reply(self, status: int, content_type: str, body: bytes, etag: str = None, headers: dict = None):
+                self.send_response(status)
+                self.send_header("Content-Type", content_type)
+                self.send_header("Content-Length", str(len(body)))
+                if etag:
+                    self.send_header("ETag", etag)
+                for name, value in (headers or {}).items():
+                    self.send_header(name, value)
+                self.end_headers()
+                self.wfile.write(body)
+                with server._lock:
+                    server.bytes_sent += len(body)
+
+            def _handle(self):
+                with server._lock:
+                    server.request_count += 1
+                time.sleep(server._latency())
+                body = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+                fault = None if self.path.startswith("/batch") else server._take_fault()
+                if fault:
+                    status, headers, payload = fault
+                    self._reply(status, "application/json", json.dumps(payload).encode(), headers=headers)
+                elif self.path.startswith("/batch"):
+                    content_type, payload = server._handle_batch(self.headers["Content-Type"], body)
+                    self._reply(200, content_type, payload)
+                else:
+                    status, payload = server._dispatch(self.command, self.path, body, self.headers)
+                    etag = payload.get("etag") if isinstance(payload, dict) else None
+                    self._reply(status, "application/json", json.dumps(payload).encode() if payload is not None else b"", etag)
+
+            do_GET = do_POST = do_PUT = do_PATCH = do_DELETE = _handle
+
+        return Handler
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--events", type=int, default=1000, help="Số sự kiện Calendar")
+    parser.add_argument("--days", type=int, default=120, help="Số ngày (quanh hôm nay) mà các sự kiện trải ra")
+    parser.add_argument("--tasks", type=int, default=300, help="Số công việc Tasks")
+    parser.add_argument("--messages", type=int, default=500, help="Số email Gmail")
+    parser.add_argument("--drafts", type=int, default=50, help="Số thư nháp Gmail")
+    parser.add_argument("--latency", default="0.03", help="Độ trễ mỗi request: số giây hoặc phân phối (xem latency_sampler)")
+    parser.add_argument("--batch-part-latency", default="0.001", help="Độ trễ thêm cho mỗi phần của batch")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Tỷ lệ request nhận lỗi 500/503")
+    parser.add_argument("--burst-every", type=float, default=0.0, help="Chu kỳ (giây) của các đợt 429; 0 = không có")
+    parser.add_argument("--burst-length", type=float, default=0.0, help="Độ dài (giây) của mỗi đợt 429")
+    parser.add_argument("--seed", type=int, default=None)
+    parser.add_argument("--report-every", type=float, default=10.0, help="In số request đã xử lý sau mỗi số giây này")
+    args = parser.parse_args()
+
+    def as_latency(value: str):
+        try:
+            return float(value)
+        except ValueError:
+            return value
+
+    server = FakeGoogleAPIServer(
+        gmail=FakeGmail(message_count=args.messages, draft_count=args.drafts),
+        calendar=FakeCalendar(event_count=args.events, days=args.days),
+        tasks=FakeTasks(task_count=args.tasks),
+        latency=as_latency(args.latency), batch_part_latency=as_latency(args.batch_part_latency),
+        error_rate=args.error_rate, burst_every=args.burst_every, burst_length=args.burst_length,
+        seed=args.seed, host=args.host, port=args.port,
+    )
+    with server:
+        print(f"Server Google API giả lập đang chạy tại {server.root_url}")
+        print(f"Đặt GOOGLE_API_EMULATOR_URL={server.root_url} để các tool dùng server này. Ctrl+C để dừng.")
+        try:
+            while True:
+                time.sleep(args.report_every)
+                print(f"{server.request_count} request, {server.bytes_sent} byte, lỗi đã tiêm: {server.fault_count}", flush=True)
+        except KeyboardInterrupt:
+            pass
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,421 @@
+# intelligent_agent_platform/cassette.py
+
+"""
+Cassette: ghi lại toàn bộ lưu lượng của một phiên thật (mỗi lần gọi model và mỗi request Google API, kèm thời gian)
+vào một file JSON Lines, rồi phát lại graph đã biên dịch trên file đó mà không cần mạng hay tài khoản Google.
+
+- Ghi: main.py / app.py khi CASSETTE_RECORD_DIR được đặt. Lần gọi model được ghi qua callback (Cassette.handler,
+  truyền vào config của lượt), request Google qua CassetteHttp (common_execution), aexecute và execute_batch.
+- Phát lại: ReplayChatModel trả lại các câu trả lời đã ghi, request Google được trả lời từ cassette
+  (get_google_service dựng service không cần credentials). `timing=True` chờ đúng thời gian đã ghi của từng
+  lần gọi model/request để độ trễ giống phiên thật; `timing=False` trả lời ngay để chỉ đo phần xử lý cục bộ.
+
+Cassette được chọn theo contextvars (use_cassette), nên mỗi phiên của app.py ghi vào file riêng và request của
+tool chạy trên thread khác hoặc trong task asyncio vẫn thuộc đúng phiên. Lần phát lại đếm các lần gọi model
+và request không khớp với bản ghi: đó là dấu hiệu một thay đổi prompt/tool đã thêm bước hoặc request mới
+(xem benchmarks/bench_replay.py).
+"""
+
+import asyncio
+import contextlib
+import contextvars
+import datetime
+import hashlib
+import json
+import os
+import re
+import threading
+import time
+import urllib.parse
+from collections import defaultdict, deque
+from typing import Any, Optional
+
+import httplib2
+from langchain_core.callbacks import BaseCallbackHandler
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage, AIMessageChunk, message_chunk_to_message, message_to_dict, messages_from_dict
+from langchain_core.outputs import ChatGeneration, ChatGenerationChunk, ChatResult
+
+from config import CASSETTE_RECORD_DIR, CASSETTE_REPLAY_TIMING
+from llm_cache import _message_payload
+
+FORMAT_VERSION = 1
+# Header phụ thuộc cách truyền tải: nội dung đã được giải nén khi ghi nên không phát lại các header này
+_TRANSPORT_HEADERS = {"content-encoding", "content-length", "transfer-encoding", "connection", "set-cookie"}
+# Boundary và Content-ID của batch HTTP được sinh ngẫu nhiên mỗi lần gửi
+_VOLATILE = re.compile(r"=+\d+=+|[0-9a-f]{8}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{12}")
+_BATCH_PART_ID = re.compile(r"Content-ID: <[^>]*\+ ?([^>]+)>")
+# Thời điểm hiện tại trong prompt (current_time, start_of_day) khác nhau giữa lúc ghi và lúc phát lại
+_TIMESTAMP = re.compile(r"\d{4}-\d{2}-\d{2}[T ]\d{2}:\d{2}(?::\d{2}(?:\.\d+)?)?(?:[+-]\d{2}:\d{2}|Z)?")
+
+_active = contextvars.ContextVar("cassette", default=None)
+
+
+def current_cassette() -> Optional["Cassette"]:
+    """Cassette của phiên đang chạy (đặt bằng use_cassette), hoặc None."""
+    return _active.get()
+
+
+def replaying() -> bool:
+    cassette = _active.get()
+    return cassette is not None and cassette.mode == "replay"
+
+
+@contextlib.contextmanager
+def use_cassette(cassette: Optional["Cassette"]):
+    """Mọi lần gọi model/request Google trong khối `with` (kể cả trên thread của tool) đi qua `cassette`."""
+    token = _active.set(cassette)
+    try:
+        yield cassette
+    finally:
+        _active.reset(token)
+
+
+def _text(value) -> Optional[str]:
+    if value is None or isinstance(value, str):
+        return value
+    return bytes(value).decode("utf-8", errors="replace")
+
+
+def _message_digests(messages: list) -> list:
+    """Hash của từng message (bỏ các mốc thời gian), để tìm bản ghi có phần đầu hội thoại giống nhất."""
+    return [
+        hashlib.sha256(_TIMESTAMP.sub("", json.dumps(_message_payload(m), sort_keys=True, ensure_ascii=False, default=str)).encode()).hexdigest()
+        for m in messages
+    ]
+
+
+def _common_prefix(a: list, b: list) -> int:
+    count = 0
+    for x, y in zip(a, b):
+        if x != y:
+            break
+        count += 1
+    return count
+
+
+def _request_digests(messages: list) -> tuple:
+    """Hash của input model: chính xác, và sau khi bỏ các mốc thời gian (để khớp prompt có thời gian hiện tại)."""
+    encoded = json.dumps([_message_payload(m) for m in messages], sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.sha256(encoded.encode()).hexdigest(), hashlib.sha256(_TIMESTAMP.sub("", encoded).encode()).hexdigest()
+
+
+def _http_keys(method: str, uri: str, body) -> tuple:
+    """
+    Hai mức khớp request: chính xác (method, URI, body bỏ phần ngẫu nhiên) và lỏng (method, path không có query,
+    ID các phần nếu là batch) cho request có tham số phụ thuộc thời điểm gọi (ví dụ timeMin của list_events).
+    """
+    body = _text(body) or ""
+    parts = urllib.parse.urlsplit(uri)
+    # Bỏ scheme và host: cassette ghi trên server giả lập (GOOGLE_API_EMULATOR_URL) vẫn khớp chính xác
+    exact = f"{method} {parts.path}?{parts.query} {_VOLATILE.sub('', body)}"
+    loose = f"{method} {parts.path} {','.join(_BATCH_PART_ID.findall(body))}"
+    return exact, loose
+
+
+class CassetteMissError(Exception):
+    """Phát lại cần một câu trả lời của model không có trong cassette."""
+
+
+class Cassette:
+    """
+    Một file cassette ở chế độ "record" (ghi nối tiếp từng dòng) hoặc "replay" (đọc toàn bộ, trả lời theo bản ghi).
+    Các dòng: `meta`, `turn` (input của người dùng), `reset` (bắt đầu hội thoại mới), `model`, `http`, `turn_end`.
+    """
+
+    def __init__(self, path: str, mode: str = "record", timing: bool = CASSETTE_REPLAY_TIMING, meta: dict = None):
+        if mode not in ("record", "replay"):
+            raise ValueError(f"mode không hợp lệ: {mode}")
+        self.path = path
+        self.mode = mode
+        self.timing = timing
+        self._lock = threading.Lock()
+        self._start = time.perf_counter()
+        self._turn = -1
+        if mode == "record":
+            # Ghi theo dòng: process bị dừng giữa chừng vẫn để lại các lượt đã ghi
+            self._file = open(path, "w", encoding="utf-8", buffering=1)
+            self._write({"type": "meta", "version": FORMAT_VERSION,
+                         "created": datetime.datetime.now(datetime.timezone.utc).isoformat(timespec="seconds"), **(meta or {})})
+            self.handler = CassetteRecorderHandler(self)
+            return
+
+        with open(path, encoding="utf-8") as f:
+            self.entries = [json.loads(line) for line in f if line.strip()]
+        self.meta = next((e for e in self.entries if e["type"] == "meta"), {})
+        self.turns = [e for e in self.entries if e["type"] == "turn"]
+        self._models = [e for e in self.entries if e["type"] == "model"]
+        self._model_used = set()
+        self._model_exact = defaultdict(deque)
+        self._model_loose = defaultdict(deque)
+        self._model_prefixes = [_message_digests(messages_from_dict(entry["request"])) for entry in self._models]
+        for i, entry in enumerate(self._models):
+            exact, loose = entry["digests"]
+            self._model_exact[exact].append(i)
+            self._model_loose[loose].append(i)
+        self._http_exact = defaultdict(deque)
+        self._http_loose = defaultdict(deque)
+        self._http_used = set()
+        self._http = [e for e in self.entries if e["type"] == "http"]
+        for i, entry in enumerate(self._http):
+            exact, loose = _http_keys(entry["method"], entry["uri"], entry["body"])
+            self._http_exact[exact].append(i)
+            self._http_loose[loose].append(i)
+        self._counts = {"model_calls": 0, "model_unmatched": 0, "http_requests": 0, "http_unmatched": 0, "http_missing": 0}
+
+    # --- Ghi ---
+    def _write(self, entry: dict):
+        line = json.dumps(entry, ensure_ascii=False, default=str)
+        with self._lock:
+            self._file.write(line + "\n")
+
+    def _offset(self) -> float:
+        return round(time.perf_counter() - self._start, 6)
+
+    def begin_turn(self, agent: str, thread: str, messages: list):
+        """Input của một lượt: tên agent ("tasks", "calendar", "gmail", "supervisor"), thread và các message gửi vào graph."""
+        self._turn += 1
+        self._write({"type": "turn", "turn": self._turn, "at": self._offset(), "agent": agent, "thread": thread,
+                     "messages": [message_to_dict(m) for m in messages]})
+
+    @contextlib.contextmanager
+    def turn(self, agent: str, thread: str, messages: list, config: dict):
+        """
+        Ghi một lượt: input được ghi ngay, trong khối `with` cassette là cassette của phiên và config trả về
+        (dùng cho stream_agent_turn) có thêm callback ghi các lần gọi model.
+        """
+        self.begin_turn(agent, thread, messages)
+        with use_cassette(self):
+            yield {**config, "callbacks": [*(config.get("callbacks") or []), self.handler]}
+
+    def end_turn(self, metrics: dict):
+        """Số liệu của lượt vừa ghi (từ sự kiện "done" của stream_agent_turn), làm mốc so sánh khi phát lại."""
+        self._write({"type": "turn_end", "turn": self._turn, "at": self._offset(), "metrics": metrics})
+
+    def reset(self, thread: str):
+        """Người dùng bắt đầu cuộc hội thoại mới trên `thread` (state cũ bị xoá)."""
+        self._write({"type": "reset", "turn": self._turn, "thread": thread})
+
+    def record_model(self, messages: list, message: AIMessage, duration: float, first_token: Optional[float]):
+        self._write({
+            "type": "model", "turn": self._turn, "at": self._offset(), "digests": _request_digests(messages),
+            "request": [message_to_dict(m) for m in messages], "response": message_to_dict(message),
+            "duration": round(duration, 6), "first_token": round(first_token, 6) if first_token is not None else None,
+        })
+
+    def record_http(self, method: str, uri: str, body, resp, content, duration: float):
+        headers = {k: v for k, v in dict(resp).items() if k.lower() not in _TRANSPORT_HEADERS and not k.startswith("-") and k != "status"}
+        self._write({
+            "type": "http", "turn": self._turn, "at": self._offset(), "method": method, "uri": uri, "body": _text(body),
+            "status": int(resp.status), "headers": headers, "content": _text(content), "duration": round(duration, 6),
+        })
+
+    def close(self):
+        if self.mode == "record":
+            self._file.close()
+
+    # --- Phát lại ---
+    @staticmethod
+    def _take(queue: Optional[deque], used) -> Optional[int]:
+        # Bỏ các bản ghi đã được dùng bởi lần gọi khác (qua khoá khác) rồi lấy bản ghi đầu tiên còn lại
+        while queue and queue[0] in used:
+            queue.popleft()
+        return queue.popleft() if queue else None
+
+    def next_model(self, messages: list) -> dict:
+        """
+        Bản ghi cho lần gọi model này: ưu tiên bản ghi có cùng danh sách message (chính xác, rồi bỏ qua các mốc
+        thời gian), nếu không có thì bản ghi chưa dùng giống nhất (được đếm là model_unmatched).
+        """
+        exact, loose = _request_digests(messages)
+        with self._lock:
+            self._counts["model_calls"] += 1
+            index = self._take(self._model_exact.get(exact), self._model_used)
+            if index is None:
+                index = self._take(self._model_loose.get(loose), self._model_used)
+            if index is None:
+                # Không khớp (ví dụ kết quả tool đã khác): bản ghi chưa dùng có phần đầu hội thoại giống nhất, để các
+                # sub-agent chạy song song của supervisor vẫn nhận đúng câu trả lời của mình
+                self._counts["model_unmatched"] += 1
+                unused = [i for i in range(len(self._models)) if i not in self._model_used]
+                if not unused:
+                    raise CassetteMissError(f"Cassette {self.path} không còn câu trả lời nào của model")
+                prefix = _message_digests(messages)
+                index = max(unused, key=lambda i: (_common_prefix(self._model_prefixes[i], prefix), -i))
+            self._model_used.add(index)
+            return self._models[index]
+
+    def _http_entry(self, method: str, uri: str, body) -> Optional[dict]:
+        exact, loose = _http_keys(method, uri, body)
+        with self._lock:
+            self._counts["http_requests"] += 1
+            index = self._take(self._http_exact.get(exact), self._http_used)
+            if index is None:
+                index = self._take(self._http_loose.get(loose), self._http_used)
+                if index is None:
+                    self._counts["http_missing"] += 1
+                    return None
+                self._counts["http_unmatched"] += 1
+            self._http_used.add(index)
+            return self._http[index]
+
+    @staticmethod
+    def _response(method: str, uri: str, entry: Optional[dict]) -> tuple:
+        if entry is None:
+            # Request mới so với phiên đã ghi: trả lỗi (không thử lại) để tool báo lỗi như với Google
+            content = json.dumps({"error": {"code": 501, "message": f"Request không có trong cassette: {method} {uri}"}})
+            return httplib2.Response({"status": 501, "content-type": "application/json"}), content.encode()
+        return httplib2.Response({**entry["headers"], "status": entry["status"]}), (entry["content"] or "").encode("utf-8")
+
+    def replay_http(self, method: str, uri: str, body) -> tuple:
+        """(httplib2.Response, nội dung) đã ghi cho request này, sau khi chờ thời gian đã ghi nếu `timing` bật."""
+        entry = self._http_entry(method, uri, body)
+        if entry and self.timing:
+            time.sleep(entry["duration"])
+        return self._response(method, uri, entry)
+
+    async def areplay_http(self, method: str, uri: str, body) -> tuple:
+        entry = self._http_entry(method, uri, body)
+        if entry and self.timing:
+            await asyncio.sleep(entry["duration"])
+        return self._response(method, uri, entry)
+
+    def stats(self) -> dict:
+        """Số bản ghi và số lần gọi model/request khi phát lại (kể cả số lần không khớp bản ghi)."""
+        with self._lock:
+            return {
+                "recorded_model_calls": len(self._models),
+                "recorded_http_requests": len(self._http),
+                "unused_model_calls": len(self._models) - len(self._model_used),
+                "unused_http_requests": len(self._http) - len(self._http_used),
+                **self._counts,
+            }
+
+
+def recording_cassette(session: str) -> Optional[Cassette]:
+    """Cassette mới trong CASSETTE_RECORD_DIR cho phiên `session`, hoặc None nếu không bật chế độ ghi."""
+    if not CASSETTE_RECORD_DIR:
+        return None
+    os.makedirs(CASSETTE_RECORD_DIR, exist_ok=True)
+    stamp = datetime.datetime.now().strftime("%Y%m%d-%H%M%S")
+    return Cassette(os.path.join(CASSETTE_RECORD_DIR, f"{session}-{stamp}.jsonl"), meta={"session": session})
+
+
+class CassetteHttp:
+    """Bọc một đối tượng httplib2.Http: request được ghi vào (hoặc trả lời từ) cassette đang dùng."""
+
+    def __init__(self, http, cassette: Cassette):
+        self._http = http
+        self._cassette = cassette
+
+    def __getattr__(self, name):
+        # credentials, timeout, ... của kết nối gốc (BatchHttpRequest đọc credentials để làm mới token)
+        return getattr(self._http, name)
+
+    def request(self, uri, method="GET", body=None, headers=None, *args, **kwargs):
+        if self._cassette.mode == "replay":
+            return self._cassette.replay_http(method, uri, body)
+        start = time.perf_counter()
+        resp, content = self._http.request(uri, method, body, headers, *args, **kwargs)
+        self._cassette.record_http(method, uri, body, resp, content, time.perf_counter() - start)
+        return resp, content
+
+
+def cassette_http(http):
+    """`http` bọc bởi cassette của phiên hiện tại, hoặc chính `http` nếu không ghi/phát lại."""
+    cassette = _active.get()
+    return CassetteHttp(http, cassette) if cassette is not None else http
+
+
+class CassetteRecorderHandler(BaseCallbackHandler):
+    """Callback ghi mỗi lần gọi chat model (input, AIMessage trả về, thời gian và thời điểm token đầu tiên)."""
+
+    # Chạy ngay trên thread của model để thời gian đo được không gồm độ trễ của hàng đợi callback
+    run_inline = True
+
+    def __init__(self, cassette: Cassette):
+        self.cassette = cassette
+        self._calls = {}
+
+    def on_chat_model_start(self, serialized, messages, *, run_id, **kwargs):
+        self._calls[run_id] = [messages[0], time.perf_counter(), None]
+
+    def on_llm_new_token(self, token, *, run_id, **kwargs):
+        call = self._calls.get(run_id)
+        if call and call[2] is None:
+            call[2] = time.perf_counter() - call[1]
+
+    def on_llm_end(self, response, *, run_id, **kwargs):
+        call = self._calls.pop(run_id, None)
+        if call is None:
+            return
+        # Khi model được stream, câu trả lời là AIMessageChunk đã gộp
+        message = message_chunk_to_message(response.generations[0][0].message)
+        messages, start, first_token = call
+        self.cassette.record_model(messages, message, time.perf_counter() - start, first_token)
+
+    def on_llm_error(self, error, *, run_id, **kwargs):
+        self._calls.pop(run_id, None)
+
+
+class ReplayChatModel(BaseChatModel):
+    """
+    Chat model trả lại các câu trả lời đã ghi trong `cassette` (xem Cassette.next_model). Khi `cassette.timing` bật,
+    token đầu tiên đến sau `first_token` giây và lần gọi kết thúc sau `duration` giây như lúc ghi.
+    """
+
+    cassette: Any
+
+    @property
+    def _llm_type(self) -> str:
+        return "cassette-replay"
+
+    def bind_tools(self, tools, **kwargs):
+        return self
+
+    def _next(self, messages) -> tuple:
+        entry = self.cassette.next_model(messages)
+        message = messages_from_dict([entry["response"]])[0]
+        duration = entry["duration"] if self.cassette.timing else 0.0
+        first_token = min(entry["first_token"] if entry["first_token"] is not None else duration, duration) if self.cassette.timing else 0.0
+        return message, first_token, duration
+
+    def _generate(self, messages, stop=None, run_manager=None, **kwargs) -> ChatResult:
+        message, _, duration = self._next(messages)
+        time.sleep(duration)
+        return ChatResult(generations=[ChatGeneration(message=message)])
+
+    async def _agenerate(self, messages, stop=None, run_manager=None, **kwargs) -> ChatResult:
+        message, _, duration = self._next(messages)
+        await asyncio.sleep(duration)
+        return ChatResult(generations=[ChatGeneration(message=message)])
+
+    @staticmethod
+    def _chunk(message: AIMessage) -> ChatGenerationChunk:
+        # Cả câu trả lời trong một chunk: thời điểm token đầu tiên và tổng thời gian vẫn giống lúc ghi
+        return ChatGenerationChunk(message=AIMessageChunk(
+            content=message.content, id=message.id, usage_metadata=message.usage_metadata,
+            response_metadata=message.response_metadata, additional_kwargs=message.additional_kwargs,
+            tool_call_chunks=[
+                {"name": call["name"], "args": json.dumps(call["args"]), "id": call["id"], "index": i}
+                for i, call in enumerate(message.tool_calls)
+            ],
+        ))
+
+    def _stream(self, messages, stop=None, run_manager=None, **kwargs):
+        message, first_token, duration = self._next(messages)
+        time.sleep(first_token)
+        chunk = self._chunk(message)
+        if run_manager:
+            run_manager.on_llm_new_token(chunk.text, chunk=chunk)
+        yield chunk
+        time.sleep(duration - first_token)
+
+    async def _astream(self, messages, stop=None, run_manager=None, **kwargs):
+        message, first_token, duration = self._next(messages)
+        await asyncio.sleep(first_token)
+        chunk = self._chunk(message)
+        if run_manager:
+            await run_manager.on_llm_new_token(chunk.text, chunk=chunk)
+        yield chunk
+        await asyncio.sleep(duration - first_token)
@@ -0,0 +1,114 @@
+# intelligent_agent_platform/checkpoint.py
+
+import sqlite3
+import zlib
+
+import aiosqlite
+from langgraph.checkpoint.serde.jsonplus import JsonPlusSerializer
+from langgraph.checkpoint.sqlite import SqliteSaver
+from langgraph.checkpoint.sqlite.aio import AsyncSqliteSaver
+
+from config import CHECKPOINT_DB, CHECKPOINT_KEEP_LAST, CHECKPOINT_COMPRESS_MIN_BYTES
+
+# Tiền tố của cột `type` cho các blob đã được nén (ví dụ "zlib+msgpack")
+_ZLIB_PREFIX = "zlib+"
+
+# Xoá các checkpoint (và pending writes của chúng) cũ hơn `keep_last` checkpoint gần nhất của một thread.
+# checkpoint_id là UUID v6 nên thứ tự chuỗi cũng là thứ tự thời gian.
+_PRUNE_WRITES_SQL = """
+DELETE FROM writes WHERE thread_id = ? AND checkpoint_ns = ? AND checkpoint_id NOT IN (
+    SELECT checkpoint_id FROM checkpoints WHERE thread_id = ? AND checkpoint_ns = ?
+    ORDER BY checkpoint_id DESC LIMIT ?)
+"""
+_PRUNE_CHECKPOINTS_SQL = """
+DELETE FROM checkpoints WHERE thread_id = ? AND checkpoint_ns = ? AND checkpoint_id NOT IN (
+    SELECT checkpoint_id FROM checkpoints WHERE thread_id = ? AND checkpoint_ns = ?
+    ORDER BY checkpoint_id DESC LIMIT ?)
+"""
+
+
+class CompressedSerializer(JsonPlusSerializer):
+    """
+    Serializer mặc định của LangGraph (msgpack) cộng thêm nén zlib cho các blob lớn
+    (checkpoint chứa toàn bộ danh sách message, gồm cả kết quả tool dài).
+    Blob nhỏ hơn `min_bytes` được giữ nguyên vì nén không có lợi.
+    """
+
+    def __init__(self, min_bytes: int = CHECKPOINT_COMPRESS_MIN_BYTES, level: int = 6):
+        super().__init__()
+        self.min_bytes = min_bytes
+        self.level = level
+
+    def dumps_typed(self, obj):
+        type_, data = super().dumps_typed(obj)
+        if type_ == "null" or len(data) < self.min_bytes:
+            return type_, data
+        return _ZLIB_PREFIX + type_, zlib.compress(data, self.level)
+
+    def loads_typed(self, data):
+        type_, payload = data
+        if type_.startswith(_ZLIB_PREFIX):
+            return super().loads_typed((type_[len(_ZLIB_PREFIX):], zlib.decompress(payload)))
+        return super().loads_typed(data)
+
+
+def _prune_params(config: dict, keep_last: int) -> tuple:
+    thread_id = str(config["configurable"]["thread_id"])
+    checkpoint_ns = config["configurable"]["checkpoint_ns"]
+    return (thread_id, checkpoint_ns, thread_id, checkpoint_ns, keep_last)
+
+
+class PrunedSqliteSaver(SqliteSaver):
+    """SqliteSaver chỉ giữ lại `keep_last` checkpoint gần nhất cho mỗi thread."""
+
+    def __init__(self, conn: sqlite3.Connection, keep_last: int = CHECKPOINT_KEEP_LAST, serde=None):
+        super().__init__(conn, serde=serde or CompressedSerializer())
+        self.keep_last = keep_last
+
+    def put(self, config, checkpoint, metadata, new_versions):
+        saved = super().put(config, checkpoint, metadata, new_versions)
+        params = _prune_params(saved, self.keep_last)
+        with self.cursor() as cur:
+            cur.execute(_PRUNE_WRITES_SQL, params)
+            cur.execute(_PRUNE_CHECKPOINTS_SQL, params)
+        return saved
+
+
+class PrunedAsyncSqliteSaver(AsyncSqliteSaver):
+    """Phiên bản bất đồng bộ của PrunedSqliteSaver (dùng với create_async_agent)."""
+
+    def __init__(self, conn, keep_last: int = CHECKPOINT_KEEP_LAST, serde=None):
+        super().__init__(conn, serde=serde or CompressedSerializer())
+        self.keep_last = keep_last
+
+    async def aput(self, config, checkpoint, metadata, new_versions):
+        saved = await super().aput(config, checkpoint, metadata, new_versions)
+        params = _prune_params(saved, self.keep_last)
+        async with self.lock:
+            await self.conn.execute(_PRUNE_WRITES_SQL, params)
+            await self.conn.execute(_PRUNE_CHECKPOINTS_SQL, params)
+            await self.conn.commit()
+        return saved
+
+
+def create_checkpointer(path: str = CHECKPOINT_DB, keep_last: int = CHECKPOINT_KEEP_LAST) -> PrunedSqliteSaver:
+    """
+    Checkpointer SQLite cục bộ cho create_agent. State của mỗi cuộc hội thoại được lưu theo
+    `thread_id` trong config, nên mỗi lượt chỉ cần gửi message mới và phiên vẫn còn sau khi khởi động lại.
+    """
+    # Streamlit/ThreadPool có thể dùng checkpointer từ nhiều thread; SqliteSaver tự khoá khi truy cập
+    conn = sqlite3.connect(path, check_same_thread=False)
+    conn.execute("PRAGMA journal_mode=WAL")
+    return PrunedSqliteSaver(conn, keep_last=keep_last)
+
+
+async def acreate_checkpointer(path: str = CHECKPOINT_DB, keep_last: int = CHECKPOINT_KEEP_LAST) -> PrunedAsyncSqliteSaver:
+    """Checkpointer cho create_async_agent; phải được tạo bên trong event loop sẽ dùng nó."""
+    conn = await aiosqlite.connect(path)
+    await conn.execute("PRAGMA journal_mode=WAL")
+    return PrunedAsyncSqliteSaver(conn, keep_last=keep_last)
+
+
+def thread_config(thread_id: str) -> dict:
+    """Config của LangGraph cho một cuộc hội thoại."""
+    return {"configurable": {"thread_id": thread_id}}
@@ -1,4 +1,5 @@
 # google_calendar_agent/config.py
+import os
 
 # --- Cấu hình API của Google ---
 SCOPES = [
@@ -13,7 +14,180 @@ CALENDAR_ID = 'primary'
 # Tên file xác thực
 TOKEN_FILE = 'token.json'
 CREDENTIALS_FILE = 'credentials.json'
+# Làm mới access token trước khi hết hạn bao nhiêu giây (chạy nền, không chặn lượt chat)
+TOKEN_REFRESH_MARGIN = 300
+# Thời gian chờ trước khi thử làm mới lại nếu lần trước thất bại (giây)
+TOKEN_REFRESH_RETRY = 30
+# Thread làm mới kiểm tra lại token ít nhất sau mỗi khoảng này (giây), kể cả khi token.json không ghi thời hạn
+TOKEN_REFRESH_MAX_INTERVAL = 3600
+# Thư mục chứa discovery document (calendar v3, tasks v1, gmail v1) được lưu sẵn cùng dự án
+DISCOVERY_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'discovery')
+# Địa chỉ server Google API giả lập (python -m benchmarks.fake_google_api), ví dụ 'http://127.0.0.1:8765/'.
+# Khi đặt, mọi tool gọi server này thay vì Google và không cần token.json; None = dùng Google thật.
+GOOGLE_API_EMULATOR_URL = os.environ.get('GOOGLE_API_EMULATOR_URL') or None
 # --- Cấu hình Model ---
 # Chọn model mạnh mẽ để xử lý các yêu cầu phức tạp về thời gian
 MODEL_NAME = "gemini-2.5-flash" 
-MODEL_TEMPERATURE = 0.2
\ No newline at end of file
+MODEL_TEMPERATURE = 0.2
+
+# --- Cấu hình quản lý lịch sử hội thoại ---
+# Ngân sách token (ước lượng) cho toàn bộ input gửi tới model mỗi lần gọi
+HISTORY_TOKEN_BUDGET = 8000
+# Số lượt hội thoại gần nhất luôn được giữ nguyên văn
+HISTORY_KEEP_RECENT_TURNS = 4
+# Kết quả tool cũ (từ các lượt trước) dài hơn số ký tự này sẽ được thay bằng một dòng tóm tắt
+HISTORY_STUB_MIN_CHARS = 300
+# --- Cấu hình Batch HTTP của Google ---
+# Số request tối đa trong một batch (Gmail khuyến nghị không quá 50)
+BATCH_CHUNK_SIZE = 50
+# Số batch được gửi đồng thời
+BATCH_MAX_CONCURRENCY = 4
+# Số mục tối đa mỗi lần gọi một tool hàng loạt (create_tasks_bulk, delete_events_bulk, ...)
+BULK_MAX_ITEMS = 100
+
+# --- Cấu hình lớp thực thi request Google API (giới hạn tốc độ, thử lại, circuit breaker) ---
+# (request/giây, số request tối đa dồn một lúc) cho mỗi service, ước lượng theo quota mặc định cho mỗi người dùng;
+# chỉnh theo quota thực tế của dự án trên Google Cloud Console. Service không có trong danh sách không bị giới hạn.
+GOOGLE_API_RATE_LIMITS = {'gmail': (50, 100), 'calendar': (10, 50), 'tasks': (10, 50)}
+# Thử lại khi gặp 429/5xx: tối đa số lần, thời gian chờ cơ sở và tối đa (giây) của exponential backoff.
+# Retry-After dài hơn GOOGLE_API_BACKOFF_MAX thì không chờ trong lượt chat mà báo lỗi ngay.
+GOOGLE_API_MAX_RETRIES = 4
+GOOGLE_API_BACKOFF_BASE = 0.5
+GOOGLE_API_BACKOFF_MAX = 20
+# Sau số lần thất bại liên tiếp này (đã hết lượt thử lại), ngừng gọi service trong GOOGLE_API_CIRCUIT_COOLDOWN giây
+GOOGLE_API_CIRCUIT_FAILURES = 5
+GOOGLE_API_CIRCUIT_COOLDOWN = 30
+
+# --- Cấu hình cập nhật có điều kiện (ETag) ---
+# update_event/update_task gửi If-Match là ETag của lần đọc trước; số lần đọc lại và gửi lại khi nhận 412
+CONDITIONAL_UPDATE_MAX_RETRIES = 2
+
+# --- Cấu hình HTTP bất đồng bộ (agent async) ---
+# Số kết nối tối đa trong pool của mỗi event loop
+ASYNC_HTTP_MAX_CONNECTIONS = 100
+# Số request song song tối đa khi một tool cần gửi nhiều request (ví dụ lấy metadata email)
+ASYNC_FETCH_CONCURRENCY = 10
+ASYNC_HTTP_TIMEOUT = 30.0
+
+
+# --- Cấu hình định dạng kết quả tool ---
+# 'compact': một dòng tiêu đề cột, sau đó mỗi mục một dòng (các cột cách nhau bởi '|');
+# 'verbose': mỗi mục là một khối, mỗi trường một dòng có nhãn
+RESULT_FORMAT = 'compact'
+# Thay các ID dài (sự kiện, công việc, email, thư nháp) trong kết quả tool bằng alias ngắn theo phiên (E1, T2, M3, D4);
+# alias được đổi lại thành ID thật khi model truyền vào tham số *_id của tool
+RESULT_ID_ALIASES = True
+# Chỉ ID dài từ số ký tự này trở lên mới được thay bằng alias
+RESULT_ID_ALIAS_MIN_LENGTH = 12
+
+# --- Cấu hình bản sao cục bộ của Google Calendar ---
+# Trả lời list_events từ bản sao trong bộ nhớ (đồng bộ tăng dần bằng syncToken) thay vì gọi API mỗi lần
+CALENDAR_MIRROR_ENABLED = True
+# Bản sao cũ hơn số giây này sẽ được đồng bộ tăng dần trước khi trả lời truy vấn
+CALENDAR_MIRROR_MAX_STALENESS = 60
+# Lần đồng bộ toàn bộ lấy các sự kiện từ số ngày này trước hôm nay trở đi; truy vấn sớm hơn sẽ gọi API trực tiếp
+CALENDAR_MIRROR_PAST_DAYS = 30
+# Giới hạn kết quả của list_events: số sự kiện và số ký tự tối đa mỗi lần trả về (phần còn lại có page_token để xem tiếp)
+LIST_EVENTS_MAX_EVENTS = 25
+LIST_EVENTS_MAX_CHARS = 4000
+# Mô tả sự kiện dài hơn số ký tự này sẽ bị cắt
+EVENT_DESCRIPTION_MAX_CHARS = 200
+
+# --- Cấu hình cache Google Tasks ---
+# Cache danh sách công việc cũ hơn số giây này sẽ được làm mới (updatedMin + ETag, thường chỉ tốn một phản hồi 304)
+TASKS_CACHE_MAX_STALENESS = 30
+
+# --- Cấu hình cache kết quả tool chỉ đọc ---
+# Cùng tool + cùng tham số trong TOOL_CACHE_TTL giây được trả lời từ bộ nhớ; mỗi tool ghi của một service
+# (create/update/delete) xoá cache của service đó
+TOOL_CACHE_ENABLED = True
+TOOL_CACHE_TTL = 30
+# Số kết quả tối đa giữ cho mỗi service (LRU)
+TOOL_CACHE_MAX_ENTRIES = 200
+
+# --- Cấu hình chỉ mục Gmail cục bộ (tuỳ chọn) ---
+# Trả lời list_emails từ chỉ mục SQLite (FTS5) của header/nhãn/snippet, đồng bộ bằng historyId
+GMAIL_INDEX_ENABLED = False
+GMAIL_INDEX_DB = 'gmail_index.sqlite'
+# Số message mới nhất được đưa vào chỉ mục ở lần đồng bộ đầu tiên
+GMAIL_INDEX_MAX_MESSAGES = 20000
+# Chỉ mục cũ hơn số giây này sẽ được đồng bộ tăng dần trước khi trả lời truy vấn
+GMAIL_INDEX_MAX_STALENESS = 60
+
+# --- Cấu hình lưu state hội thoại (checkpointer SQLite) ---
+CHECKPOINT_DB = 'checkpoints.sqlite'
+# Số checkpoint gần nhất được giữ lại cho mỗi thread hội thoại (các checkpoint cũ hơn bị xoá)
+CHECKPOINT_KEEP_LAST = 5
+# Blob checkpoint lớn hơn số byte này sẽ được nén bằng zlib
+CHECKPOINT_COMPRESS_MIN_BYTES = 512
+
+# --- Cấu hình cache câu trả lời của model (tuỳ chọn) ---
+# Trả lại câu trả lời đã lưu khi input gửi cho model giống hệt một lần gọi trước
+# (cùng danh sách message, schema tool, model và temperature)
+LLM_CACHE_ENABLED = False
+# Số câu trả lời tối đa giữ trong bộ nhớ (LRU) và thời gian sống của mỗi câu trả lời (giây)
+LLM_CACHE_MAX_ENTRIES = 1000
+LLM_CACHE_TTL = 24 * 3600
+# File SQLite để dùng lại cache giữa các lần chạy (ví dụ 'llm_cache.sqlite'); None = chỉ giữ trong bộ nhớ
+LLM_CACHE_DB = None
+# Kết quả của các tool này phụ thuộc thời điểm gọi: input chứa chúng chỉ được dùng lại trong cùng một khung
+# LLM_CACHE_TIME_BUCKET giây (0 = không cache các input đó)
+LLM_CACHE_TIME_DEPENDENT_TOOLS = ['list_events', 'list_tasks', 'list_emails', 'list_drafts']
+LLM_CACHE_TIME_BUCKET = 300
+
+# --- Cấu hình Supervisor (điều phối agent Tasks, Calendar, Gmail) ---
+# Số message gần nhất của cuộc hội thoại được gửi cho bước lập kế hoạch
+SUPERVISOR_HISTORY_MESSAGES = 10
+# Số bước tối đa trong kế hoạch của một lượt
+SUPERVISOR_MAX_STEPS = 6
+
+# --- Cấu hình fast path (trả lời các câu lệnh thường gặp không cần gọi model) ---
+FAST_PATH_ENABLED = True
+# Các ý định được xử lý bằng luật (xem fast_path.INTENTS); câu không khớp hoặc mơ hồ vẫn do model xử lý
+FAST_PATH_INTENTS = [
+    'list_tasks', 'list_open_tasks', 'complete_task',
+    'events_today', 'events_tomorrow', 'events_week',
+    'list_labels',
+]
+
+# --- Cấu hình tracing (span cho node, model, tool và request Google API) ---
+# Tắt mặc định; bật qua biến môi trường, ví dụ: TRACING_ENABLED=1 TRACE_FILE=traces.jsonl METRICS_PORT=9464 python main.py
+TRACING_ENABLED = os.environ.get('TRACING_ENABLED', '').lower() in ('1', 'true', 'yes')
+# File JSONL nhận mỗi span một dòng; None = chỉ giữ số liệu trong bộ nhớ cho endpoint metrics
+TRACE_FILE = os.environ.get('TRACE_FILE') or None
+# Khi TRACE_FILE vượt quá số byte này thì được đổi tên thành TRACE_FILE.1 (giữ TRACE_FILE_BACKUPS file cũ)
+TRACE_FILE_MAX_BYTES = 50 * 1024 * 1024
+TRACE_FILE_BACKUPS = 3
+# Các mốc (giây) của histogram độ trễ
+TRACE_LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+# Endpoint Prometheus text tại http://METRICS_HOST:METRICS_PORT/metrics; None = không mở
+METRICS_HOST = '127.0.0.1'
+METRICS_PORT = int(os.environ['METRICS_PORT']) if os.environ.get('METRICS_PORT') else None
+
+# --- Cấu hình cassette (ghi lại lưu lượng model và Google API của phiên thật, xem cassette.py) ---
+# Thư mục nhận cassette khi main.py / app.py chạy ở chế độ ghi (mỗi phiên một file); None = không ghi.
+# Đặt qua biến môi trường, ví dụ: CASSETTE_RECORD_DIR=cassettes python main.py
+CASSETTE_RECORD_DIR = os.environ.get('CASSETTE_RECORD_DIR') or None
+# Khi phát lại (benchmarks/bench_replay.py): chờ đúng thời gian đã ghi của mỗi lần gọi model/request
+# để độ trễ giống phiên thật; False = trả lời ngay, chỉ đo phần xử lý cục bộ
+CASSETTE_REPLAY_TIMING = True
+
+# --- Cấu hình server nhiều người dùng (server.py: HTTP + WebSocket, mỗi người dùng một tài khoản Google) ---
+SERVER_HOST = '127.0.0.1'
+SERVER_PORT = 8000
+# Số lượt hội thoại được xử lý cùng lúc trên toàn server; các lượt khác chờ trong hàng đợi
+SERVER_MAX_CONCURRENT_TURNS = 64
+# Số lượt tối đa đang chờ hoặc đang chạy của một người dùng (các lượt của một người chạy lần lượt); vượt quá trả 429
+SERVER_MAX_QUEUED_PER_USER = 4
+# Tổng số lượt đang chờ hoặc đang chạy tối đa của server; vượt quá trả 503 kèm Retry-After
+SERVER_MAX_PENDING_TURNS = 1000
+# Thời gian chờ tối đa trong hàng đợi (giây) trước khi trả 503
+SERVER_QUEUE_TIMEOUT = 30
+# Thời gian tối đa của một lượt (giây)
+SERVER_TURN_TIMEOUT = 120
+# Số người dùng gần nhất được giữ state trong bộ nhớ (credentials, bản sao lịch, cache công việc, cache tool)
+SERVER_MAX_CACHED_USERS = 500
+# Kho credentials Google theo người dùng (SQLite); token được mã hoá bằng khoá Fernet trong biến môi trường
+# CREDENTIAL_STORE_KEY. Thêm người dùng: python server.py add-user <user_id> --token-file token.json
+CREDENTIAL_STORE_DB = 'credential_store.sqlite'
+CREDENTIAL_STORE_KEY = os.environ.get('CREDENTIAL_STORE_KEY') or None
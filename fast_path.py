@@ -0,0 +1,250 @@
+# intelligent_agent_platform/fast_path.py
+
+import datetime
+import re
+import statistics
+import threading
+import time
+from collections import deque
+from typing import Callable, NamedTuple, Optional
+
+import tools.google_calendar_tools as calendar_module
+import tools.google_gmail_tools as gmail_module
+import tools.google_tasks_tools as tasks_module
+from config import FAST_PATH_INTENTS, LIST_EVENTS_MAX_EVENTS
+from tools.calendar_mirror import LOCAL_TZ
+
+# --- CÁC MẪU CÂU TRẢ LỜI ---
+TASKS_TEMPLATE = "Bạn có {count} công việc{scope}:\n{lines}"
+NO_TASKS_TEMPLATE = "Bạn không có công việc nào{scope}."
+EVENTS_TEMPLATE = "Lịch {label} của bạn có {count} sự kiện:\n{lines}"
+NO_EVENTS_TEMPLATE = "Bạn không có sự kiện nào {label}."
+MORE_EVENTS_TEMPLATE = "\n… và {count} sự kiện khác."
+TASK_COMPLETED_TEMPLATE = "Đã đánh dấu hoàn thành công việc '{title}'."
+LABELS_TEMPLATE = "Hộp thư của bạn có {count} nhãn: {names}."
+
+# Tiền tố lịch sự thường gặp, bỏ đi trước khi so khớp
+_POLITE = r"(?:(?:hãy|vui lòng|làm ơn|giúp tôi|cho tôi|please|can you)\s+)*"
+_SHOW = r"(?:liệt kê|xem|cho (?:tôi )?xem|hiển thị|show|list)(?: me)?"
+# Số lượt fast path gần nhất dùng để tính median thời gian trả lời trong stats()
+LATENCY_WINDOW = 1000
+
+
+class Intent(NamedTuple):
+    name: str
+    # Tool mà agent phải có thì intent mới được bật (fast path làm thay đúng việc của tool đó)
+    tool: str
+    patterns: list
+    # Nhận các nhóm đã khớp, trả về câu trả lời hoặc None nếu không chắc chắn (để model xử lý)
+    handler: Callable[[dict], Optional[str]]
+
+
+def _compile(*patterns: str) -> list:
+    return [re.compile(_POLITE + pattern, re.IGNORECASE) for pattern in patterns]
+
+
+def _normalize(text: str) -> str:
+    return " ".join(text.split()).strip(" .!?…")
+
+
+# --- Công việc ---
+def _task_line(index: int, task: dict) -> str:
+    line = f"{index}. {task.get('title', 'Không có tiêu đề')}"
+    if task.get("due"):
+        line += f" (hạn {datetime.date.fromisoformat(task['due'][:10]).strftime('%d/%m/%Y')})"
+    if task.get("status") == "completed":
+        line += " ✓"
+    return line
+
+
+def _tasks_answer(only_open: bool) -> str:
+    service = tasks_module.get_google_service(tasks_module.SERVICE_NAME, tasks_module.VERSION)
+    tasks = tasks_module.task_cache.query(service, only_open=only_open)
+    scope = " chưa hoàn thành" if only_open else ""
+    if not tasks:
+        return NO_TASKS_TEMPLATE.format(scope=scope)
+    lines = "\n".join(_task_line(i, task) for i, task in enumerate(tasks, start=1))
+    return TASKS_TEMPLATE.format(count=len(tasks), scope=scope, lines=lines)
+
+
+def _complete_task(groups: dict) -> Optional[str]:
+    title = groups["title"].strip(" '\"“”‘’")
+    service = tasks_module.get_google_service(tasks_module.SERVICE_NAME, tasks_module.VERSION)
+    tasks = tasks_module.task_cache.query(service, only_open=True)
+    matches = [t for t in tasks if t.get("title", "").casefold() == title.casefold()]
+    if len(matches) != 1:
+        # Không có hoặc có nhiều công việc trùng đúng tiêu đề (kể cả chỉ khớp một phần): để model hỏi lại người dùng
+        return None
+    result = tasks_module.update_task.invoke({"task_id": matches[0]["id"], "new_status": "completed"})
+    if not result.startswith("Đã cập nhật"):
+        # Lỗi (kể cả xung đột chỉnh sửa) được viết cho model: để model xử lý và trả lời người dùng
+        return None
+    return TASK_COMPLETED_TEMPLATE.format(title=matches[0].get("title", title))
+
+
+# --- Lịch ---
+def _day_range(offset_days: int, length_days: int):
+    start = datetime.datetime.now(LOCAL_TZ).replace(hour=0, minute=0, second=0, microsecond=0) + datetime.timedelta(days=offset_days)
+    return start, start + datetime.timedelta(days=length_days)
+
+
+def _week_range():
+    today, _ = _day_range(0, 1)
+    start = today - datetime.timedelta(days=today.weekday())
+    return start, start + datetime.timedelta(days=7)
+
+
+def _events_between(start: datetime.datetime, end: datetime.datetime) -> list:
+    """Các sự kiện trong khoảng, theo cùng đường dữ liệu với list_events (bản sao cục bộ nếu bật, nếu không thì API)."""
+    service = calendar_module.get_google_service(calendar_module.SERVICE_NAME, calendar_module.VERSION)
+    start_time, end_time = start.isoformat(), end.isoformat()
+    events = None
+    if calendar_module.CALENDAR_MIRROR_ENABLED:
+        events = calendar_module.calendar_mirror.query(service, start_time, end_time)
+    if events is None:
+        events = [
+            event
+            for _, response in calendar_module.iter_event_pages(service, start_time, end_time)
+            for event in response.get("items", [])
+        ]
+    return events
+
+
+def _event_line(event: dict, with_day: bool) -> str:
+    summary = event.get("summary", "Không có tiêu đề")
+    if "dateTime" not in event["start"]:
+        when = "Cả ngày"
+        if with_day:
+            when += " " + datetime.date.fromisoformat(event["start"]["date"]).strftime("%d/%m")
+        return f"- {when}: {summary}"
+    start = datetime.datetime.fromisoformat(event["start"]["dateTime"]).astimezone(LOCAL_TZ)
+    when = start.strftime("%d/%m %H:%M" if with_day else "%H:%M")
+    if "dateTime" in event.get("end", {}):
+        when += "–" + datetime.datetime.fromisoformat(event["end"]["dateTime"]).astimezone(LOCAL_TZ).strftime("%H:%M")
+    return f"- {when}: {summary}"
+
+
+def _events_answer(label: str, bounds) -> str:
+    start, end = bounds
+    events = _events_between(start, end)
+    if not events:
+        return NO_EVENTS_TEMPLATE.format(label=label)
+    with_day = end - start > datetime.timedelta(days=1)
+    lines = "\n".join(_event_line(event, with_day) for event in events[:LIST_EVENTS_MAX_EVENTS])
+    if len(events) > LIST_EVENTS_MAX_EVENTS:
+        lines += MORE_EVENTS_TEMPLATE.format(count=len(events) - LIST_EVENTS_MAX_EVENTS)
+    return EVENTS_TEMPLATE.format(label=label, count=len(events), lines=lines)
+
+
+# --- Gmail ---
+def _labels_answer() -> str:
+    service = gmail_module.get_google_service(gmail_module.SERVICE_NAME, gmail_module.VERSION)
+    labels = service.users().labels().list(userId='me').execute().get("labels", [])
+    names = sorted(label["name"] for label in labels)
+    return LABELS_TEMPLATE.format(count=len(names), names=", ".join(names))
+
+
+_TASK = r"(?:công việc|task|tasks|việc)"
+_EVENTS = r"(?:lịch|lịch trình|sự kiện|các sự kiện|cuộc họp)(?: của tôi)?"
+
+INTENTS = [
+    Intent("list_open_tasks", "list_tasks", _compile(
+        rf"(?:{_SHOW} )?(?:các |những )?{_TASK}(?: của tôi)? (?:chưa (?:hoàn thành|xong|làm)|còn lại|đang mở)",
+        r"(?:show|list)(?: me)?(?: my)? (?:open|pending|unfinished|incomplete) tasks",
+    ), lambda groups: _tasks_answer(only_open=True)),
+    Intent("list_tasks", "list_tasks", _compile(
+        rf"{_SHOW} (?:tất cả |các |danh sách )*{_TASK}(?: của tôi)?",
+        rf"danh sách {_TASK}(?: của tôi)?",
+        r"(?:show|list)(?: me)?(?: all)?(?: my)? tasks",
+    ), lambda groups: _tasks_answer(only_open=False)),
+    Intent("complete_task", "update_task", _compile(
+        rf"(?:đánh dấu|check) {_TASK} (?P<title>.+?) (?:là )?(?:đã )?(?:hoàn thành|xong)",
+        rf"hoàn thành {_TASK} (?P<title>.+)",
+        r"mark (?:the )?task (?P<title>.+?) (?:as )?(?:done|complete|completed)",
+        r"(?:complete|finish) (?:the )?task (?P<title>.+)",
+    ), _complete_task),
+    Intent("events_today", "list_events", _compile(
+        rf"(?:{_SHOW} )?{_EVENTS} hôm nay",
+        r"hôm nay (?:tôi )?có (?:lịch|sự kiện|cuộc họp) gì(?: không)?",
+        r"(?:show|list)(?: me)?(?: my)? (?:today's|todays) (?:events|schedule|calendar)",
+        r"(?:show|list)(?: me)?(?: my)? (?:events|schedule|calendar) (?:for )?today",
+    ), lambda groups: _events_answer("hôm nay", _day_range(0, 1))),
+    Intent("events_tomorrow", "list_events", _compile(
+        rf"(?:{_SHOW} )?{_EVENTS} ngày mai",
+        r"ngày mai (?:tôi )?có (?:lịch|sự kiện|cuộc họp) gì(?: không)?",
+        r"(?:show|list)(?: me)?(?: my)? (?:tomorrow's|tomorrows) (?:events|schedule|calendar)",
+        r"(?:show|list)(?: me)?(?: my)? (?:events|schedule|calendar) (?:for )?tomorrow",
+    ), lambda groups: _events_answer("ngày mai", _day_range(1, 1))),
+    Intent("events_week", "list_events", _compile(
+        rf"(?:{_SHOW} )?{_EVENTS} tuần này",
+        r"tuần này (?:tôi )?có (?:lịch|sự kiện|cuộc họp) gì(?: không)?",
+        r"(?:show|list)(?: me)?(?: my)? (?:events|schedule|calendar) (?:for )?this week",
+    ), lambda groups: _events_answer("tuần này", _week_range())),
+    Intent("list_labels", "list_labels", _compile(
+        rf"{_SHOW} (?:tất cả |các |danh sách )*nhãn(?: gmail| email)?(?: của tôi)?",
+        r"(?:show|list)(?: me)?(?: my)?(?: gmail)? labels",
+    ), lambda groups: _labels_answer()),
+]
+
+
+class FastPath:
+    """
+    Bộ so khớp ý định theo luật, đặt trước vòng lặp agent <-> tools: các câu lệnh thường gặp (liệt kê công việc,
+    lịch hôm nay, đánh dấu hoàn thành...) được thực hiện trực tiếp và trả lời bằng mẫu câu, không cần gọi model.
+    Chỉ câu khớp trọn vẹn một mẫu mới được xử lý; câu mơ hồ (khớp nhiều công việc, lỗi khi đọc dữ liệu...)
+    được chuyển tiếp cho model như bình thường.
+    """
+
+    def __init__(self, tools: list, intents=FAST_PATH_INTENTS):
+        names = {t.name for t in tools}
+        self.intents = [intent for intent in INTENTS if intent.name in intents and intent.tool in names]
+        self._lock = threading.Lock()
+        self._served = {}
+        self._fallthrough = 0
+        self._errors = 0
+        self._latencies = deque(maxlen=LATENCY_WINDOW)
+
+    def match(self, text: str):
+        """(intent, các nhóm đã khớp) hoặc None."""
+        text = _normalize(text)
+        for intent in self.intents:
+            for pattern in intent.patterns:
+                match = pattern.fullmatch(text)
+                if match:
+                    return intent, match.groupdict()
+        return None
+
+    def answer(self, text: str):
+        """(tên intent, câu trả lời) nếu fast path xử lý được, ngược lại None."""
+        start = time.perf_counter()
+        matched = self.match(text)
+        answer = None
+        failed = False
+        if matched:
+            intent, groups = matched
+            try:
+                answer = intent.handler(groups)
+            except Exception:
+                # Lỗi khi đọc dữ liệu: chuyển cho model (model gọi tool và nhận thông báo lỗi đầy đủ)
+                failed = True
+        with self._lock:
+            self._errors += failed
+            if answer is None:
+                self._fallthrough += 1
+                return None
+            self._served[intent.name] = self._served.get(intent.name, 0) + 1
+            self._latencies.append((time.perf_counter() - start) * 1000)
+        return intent.name, answer
+
+    def stats(self) -> dict:
+        with self._lock:
+            served = sum(self._served.values())
+            turns = served + self._fallthrough
+            return {
+                "turns": turns,
+                "served": served,
+                "share": served / turns if turns else 0.0,
+                "by_intent": dict(self._served),
+                "errors": self._errors,
+                "median_ms": statistics.median(self._latencies) if self._latencies else None,
+            }
@@ -0,0 +1,166 @@
+# intelligent_agent_platform/history.py
+
+import json
+from typing import Optional
+
+from langchain_core.messages import AIMessage, BaseMessage, HumanMessage, SystemMessage, ToolMessage
+
+from config import HISTORY_TOKEN_BUDGET, HISTORY_KEEP_RECENT_TURNS, HISTORY_STUB_MIN_CHARS
+
+# Ước lượng thô: khoảng 4 ký tự cho một token (đủ dùng để so với ngân sách, không cần gọi API)
+CHARS_PER_TOKEN = 4
+
+SUMMARY_PROMPT = """Bạn đang duy trì bản tóm tắt của một cuộc hội thoại giữa người dùng và agent.
+Hãy cập nhật bản tóm tắt hiện có với phần hội thoại mới bên dưới.
+Giữ lại các thông tin cần cho các lượt sau: yêu cầu của người dùng, quyết định đã chốt,
+ID (sự kiện, công việc, email), thời gian, và các việc chưa hoàn thành. Viết ngắn gọn, dạng gạch đầu dòng.
+
+## Bản tóm tắt hiện có
+{summary}
+
+## Phần hội thoại mới
+{transcript}"""
+
+
+def estimate_tokens(text: str) -> int:
+    """Ước lượng số token của một đoạn văn bản."""
+    return (len(text) + CHARS_PER_TOKEN - 1) // CHARS_PER_TOKEN
+
+
+def message_tokens(message: BaseMessage) -> int:
+    """Ước lượng số token của một message, tính cả tham số của các lời gọi tool."""
+    tokens = estimate_tokens(message.text)
+    if isinstance(message, AIMessage) and message.tool_calls:
+        tokens += sum(estimate_tokens(call["name"] + json.dumps(call["args"], ensure_ascii=False)) for call in message.tool_calls)
+    return tokens
+
+
+def count_tokens(messages) -> int:
+    return sum(message_tokens(m) for m in messages)
+
+
+class HistoryManager:
+    """
+    Giữ input của model trong ngân sách token:
+    1. Kết quả tool của các lượt trước (dài hơn `stub_min_chars`) được thay bằng một dòng ngắn.
+    2. Nếu vẫn vượt ngân sách, các lượt cũ hơn `keep_recent_turns` lượt gần nhất được gộp vào
+       bản tóm tắt (cập nhật tăng dần, chỉ tóm tắt phần mới) bằng `summarizer`.
+    Bản tóm tắt và ID của message cuối cùng đã được tóm tắt nằm trong state của graph
+    (`summary`, `summary_upto`); danh sách `messages` của state được giữ nguyên.
+    """
+
+    def __init__(
+        self,
+        summarizer=None,
+        token_budget: int = HISTORY_TOKEN_BUDGET,
+        keep_recent_turns: int = HISTORY_KEEP_RECENT_TURNS,
+        stub_min_chars: int = HISTORY_STUB_MIN_CHARS,
+    ):
+        self.summarizer = summarizer
+        self.token_budget = token_budget
+        self.keep_recent_turns = keep_recent_turns
+        self.stub_min_chars = stub_min_chars
+
+    # --- Dựng input cho model ---
+    def _split(self, state: dict):
+        """Tách (system prompt, tóm tắt hiện hành, các message chưa được tóm tắt)."""
+        messages = list(state["messages"])
+        head_len = 0
+        while head_len < len(messages) and isinstance(messages[head_len], SystemMessage):
+            head_len += 1
+        head, body = messages[:head_len], messages[head_len:]
+
+        summary, upto = state.get("summary"), state.get("summary_upto")
+        ids = [m.id for m in body]
+        if summary and upto in ids:
+            return head, summary, body[ids.index(upto) + 1:]
+        # Không tìm thấy mốc (ví dụ caller gửi lại toàn bộ lịch sử): coi như chưa có tóm tắt
+        return head, None, body
+
+    def _stub_stale_tool_outputs(self, body: list) -> list:
+        last_human = max((i for i, m in enumerate(body) if isinstance(m, HumanMessage)), default=-1)
+        compacted = []
+        for i, message in enumerate(body):
+            if i < last_human and isinstance(message, ToolMessage) and len(message.text) > self.stub_min_chars:
+                message = ToolMessage(
+                    content=f"[Đã rút gọn kết quả cũ của {message.name} ({len(message.text)} ký tự). Gọi lại tool nếu cần dữ liệu này.]",
+                    tool_call_id=message.tool_call_id,
+                    name=message.name,
+                    id=message.id,
+                )
+            compacted.append(message)
+        return compacted
+
+    @staticmethod
+    def _with_summary(head: list, summary: Optional[str]) -> list:
+        if not summary:
+            return head
+        note = f"## TÓM TẮT CÁC LƯỢT HỘI THOẠI TRƯỚC\n{summary}"
+        if head:
+            return [SystemMessage(content=f"{head[0].text}\n\n{note}", id=head[0].id)] + head[1:]
+        return [SystemMessage(content=note)]
+
+    def build_view(self, state: dict) -> list:
+        """Danh sách message thực sự gửi cho model."""
+        head, summary, body = self._split(state)
+        return self._with_summary(head, summary) + self._stub_stale_tool_outputs(body)
+
+    # --- Gộp các lượt cũ vào bản tóm tắt ---
+    def _plan(self, state: dict):
+        """Trả về (tóm tắt hiện hành, các message cần gộp thêm vào tóm tắt)."""
+        head, summary, body = self._split(state)
+        view = self._with_summary(head, summary) + self._stub_stale_tool_outputs(body)
+        if self.summarizer is None or count_tokens(view) <= self.token_budget:
+            return summary, []
+
+        # Chỉ cắt tại đầu một lượt (HumanMessage) để không tách lời gọi tool khỏi kết quả của nó
+        turn_starts = [i for i, m in enumerate(body) if isinstance(m, HumanMessage)]
+        if len(turn_starts) <= self.keep_recent_turns:
+            return summary, []
+        return summary, body[:turn_starts[-self.keep_recent_turns]]
+
+    @staticmethod
+    def _transcript(messages: list) -> str:
+        lines = []
+        for m in messages:
+            if isinstance(m, HumanMessage):
+                lines.append(f"Người dùng: {m.text}")
+            elif isinstance(m, AIMessage):
+                if m.text:
+                    lines.append(f"Agent: {m.text}")
+                for call in m.tool_calls:
+                    lines.append(f"Agent gọi {call['name']}({json.dumps(call['args'], ensure_ascii=False)})")
+            elif isinstance(m, ToolMessage):
+                lines.append(f"Kết quả {m.name}: {m.text[:500]}")
+        return "\n".join(lines)
+
+    def _summary_prompt(self, summary: Optional[str], to_fold: list) -> list:
+        return [HumanMessage(content=SUMMARY_PROMPT.format(summary=summary or "(chưa có)", transcript=self._transcript(to_fold)))]
+
+    def _result(self, state: dict, summary: Optional[str], upto: Optional[str], folded: int) -> dict:
+        update = {"summary": summary, "summary_upto": upto}
+        original = count_tokens(state["messages"])
+        sent = count_tokens(self.build_view({**state, **update}))
+        update["history_stats"] = {
+            "original_tokens": original,
+            "sent_tokens": sent,
+            "saved_tokens": original - sent,
+            "summarized_messages": folded,
+        }
+        return update
+
+    def compact(self, state: dict) -> dict:
+        """Node của graph (đồng bộ): cập nhật tóm tắt nếu cần và báo số token tiết kiệm được."""
+        summary, to_fold = self._plan(state)
+        if not to_fold:
+            return self._result(state, summary, state.get("summary_upto") if summary else None, 0)
+        new_summary = self.summarizer.invoke(self._summary_prompt(summary, to_fold)).text
+        return self._result(state, new_summary, to_fold[-1].id, len(to_fold))
+
+    async def acompact(self, state: dict) -> dict:
+        """Node của graph (bất đồng bộ)."""
+        summary, to_fold = self._plan(state)
+        if not to_fold:
+            return self._result(state, summary, state.get("summary_upto") if summary else None, 0)
+        new_summary = (await self.summarizer.ainvoke(self._summary_prompt(summary, to_fold))).text
+        return self._result(state, new_summary, to_fold[-1].id, len(to_fold))
@@ -0,0 +1,200 @@
+# intelligent_agent_platform/llm_cache.py
+
+import asyncio
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from typing import Optional
+
+from langchain_core.messages import AIMessage, BaseMessage, ToolMessage, message_to_dict, messages_from_dict
+from langchain_core.utils.function_calling import convert_to_openai_tool
+
+from config import (
+    LLM_CACHE_MAX_ENTRIES, LLM_CACHE_TTL, LLM_CACHE_DB,
+    LLM_CACHE_TIME_DEPENDENT_TOOLS, LLM_CACHE_TIME_BUCKET,
+)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS responses (
+    key TEXT PRIMARY KEY,
+    created REAL NOT NULL,
+    message TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS responses_created ON responses (created);
+"""
+
+# Số lần ghi giữa hai lần dọn các dòng đã hết hạn trong SQLite
+_PURGE_EVERY = 100
+
+
+def request_identity(model, tools: list) -> dict:
+    """Phần không đổi giữa các lần gọi của một agent: tên model, temperature và schema của các tool."""
+    return {
+        "model": getattr(model, "model", None) or getattr(model, "model_name", None) or model._llm_type,
+        "temperature": getattr(model, "temperature", None),
+        "tools": [convert_to_openai_tool(t) for t in tools],
+    }
+
+
+def _message_payload(message: BaseMessage) -> dict:
+    # Bỏ qua ID của message và của tool call: chúng ngẫu nhiên và không ảnh hưởng tới câu trả lời
+    payload = {"type": message.type, "content": message.content}
+    if isinstance(message, AIMessage) and message.tool_calls:
+        payload["tool_calls"] = [{"name": call["name"], "args": call["args"]} for call in message.tool_calls]
+    if isinstance(message, ToolMessage):
+        payload["name"] = message.name
+    return payload
+
+
+class ResponseCache:
+    """
+    Cache khớp chính xác cho câu trả lời của model: key là hash SHA-256 của danh sách message gửi đi,
+    schema các tool, tên model và temperature. Hai tầng: LRU trong bộ nhớ (`max_entries`) và,
+    nếu có `db_path`, một bảng SQLite dùng lại được giữa các lần chạy. Mục cũ hơn `ttl` giây bị bỏ.
+
+    Input có kết quả của các tool phụ thuộc thời điểm gọi (LLM_CACHE_TIME_DEPENDENT_TOOLS, ví dụ
+    list_events mặc định là "7 ngày tới") được gắn thêm khung thời gian `time_bucket` giây vào key;
+    `time_bucket` <= 0 nghĩa là không cache các input đó.
+    """
+
+    def __init__(
+        self,
+        max_entries: int = LLM_CACHE_MAX_ENTRIES,
+        ttl: float = LLM_CACHE_TTL,
+        db_path: Optional[str] = LLM_CACHE_DB,
+        time_dependent_tools=LLM_CACHE_TIME_DEPENDENT_TOOLS,
+        time_bucket: float = LLM_CACHE_TIME_BUCKET,
+    ):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.time_dependent_tools = set(time_dependent_tools)
+        self.time_bucket = time_bucket
+        self._lock = threading.Lock()
+        self._memory = OrderedDict()
+        self._conn = None
+        if db_path:
+            self._conn = sqlite3.connect(db_path, check_same_thread=False)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.executescript(SCHEMA)
+        self._writes = 0
+        self._counts = {"memory_hits": 0, "disk_hits": 0, "misses": 0, "expired": 0, "bypassed": 0, "stores": 0}
+
+    # --- Key ---
+    def key(self, messages: list, identity: dict) -> Optional[str]:
+        """Key của một lần gọi model; None nghĩa là không được cache (input phụ thuộc thời điểm gọi)."""
+        payload = {**identity, "messages": [_message_payload(m) for m in messages]}
+        called = {m.name for m in messages if isinstance(m, ToolMessage)}
+        if called & self.time_dependent_tools:
+            if self.time_bucket <= 0:
+                with self._lock:
+                    self._counts["bypassed"] += 1
+                return None
+            payload["time_bucket"] = int(time.time() // self.time_bucket)
+        encoded = json.dumps(payload, sort_keys=True, ensure_ascii=False, default=str)
+        return hashlib.sha256(encoded.encode()).hexdigest()
+
+    # --- Đọc / ghi ---
+    @staticmethod
+    def _fresh_copy(stored: dict) -> AIMessage:
+        """Bản sao của câu trả lời đã lưu với ID mới, để add_messages thêm vào thay vì thay thế message cũ."""
+        message = messages_from_dict([stored])[0]
+        message.id = None
+        message.tool_calls = [{**call, "id": f"call_{uuid.uuid4().hex[:12]}"} for call in message.tool_calls]
+        message.response_metadata = {**message.response_metadata, "llm_cache": "hit"}
+        return message
+
+    def _read_disk(self, key: str, now: float) -> Optional[dict]:
+        if self._conn is None:
+            return None
+        with self._lock:
+            row = self._conn.execute("SELECT created, message FROM responses WHERE key = ?", (key,)).fetchone()
+        if row is None:
+            return None
+        created, message = row
+        if now - created > self.ttl:
+            return None
+        stored = json.loads(message)
+        with self._lock:
+            self._remember(key, created, stored)
+        return stored
+
+    def _remember(self, key: str, created: float, stored: dict):
+        self._memory[key] = (created, stored)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_entries:
+            self._memory.popitem(last=False)
+
+    def get(self, key: str) -> Optional[AIMessage]:
+        now = time.time()
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None and now - entry[0] > self.ttl:
+                del self._memory[key]
+                self._counts["expired"] += 1
+                entry = None
+            if entry is not None:
+                self._memory.move_to_end(key)
+                self._counts["memory_hits"] += 1
+                return self._fresh_copy(entry[1])
+        stored = self._read_disk(key, now)
+        with self._lock:
+            self._counts["disk_hits" if stored is not None else "misses"] += 1
+        return self._fresh_copy(stored) if stored is not None else None
+
+    def put(self, key: str, message: AIMessage):
+        created = time.time()
+        stored = message_to_dict(message)
+        with self._lock:
+            self._remember(key, created, stored)
+            self._counts["stores"] += 1
+            if self._conn is None:
+                return
+            self._conn.execute(
+                "INSERT OR REPLACE INTO responses (key, created, message) VALUES (?, ?, ?)",
+                (key, created, json.dumps(stored, ensure_ascii=False)),
+            )
+            self._writes += 1
+            if self._writes % _PURGE_EVERY == 0:
+                self._conn.execute("DELETE FROM responses WHERE created < ?", (created - self.ttl,))
+            self._conn.commit()
+
+    async def aget(self, key: str) -> Optional[AIMessage]:
+        # Tầng SQLite là I/O đĩa: chạy trong thread để không chặn event loop
+        if self._conn is None:
+            return self.get(key)
+        return await asyncio.to_thread(self.get, key)
+
+    async def aput(self, key: str, message: AIMessage):
+        if self._conn is None:
+            return self.put(key, message)
+        await asyncio.to_thread(self.put, key, message)
+
+    def clear(self):
+        with self._lock:
+            self._memory.clear()
+            if self._conn is not None:
+                self._conn.execute("DELETE FROM responses")
+                self._conn.commit()
+
+    def stats(self) -> dict:
+        with self._lock:
+            counts = dict(self._counts)
+            counts["entries"] = len(self._memory)
+        lookups = counts["memory_hits"] + counts["disk_hits"] + counts["misses"]
+        counts["hit_rate"] = (counts["memory_hits"] + counts["disk_hits"]) / lookups if lookups else 0.0
+        return counts
+
+
+_response_cache = None
+
+
+def get_response_cache() -> ResponseCache:
+    """Cache dùng chung trong tiến trình (tạo khi cần, theo cấu hình trong config)."""
+    global _response_cache
+    if _response_cache is None:
+        _response_cache = ResponseCache()
+    return _response_cache
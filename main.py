@@ -1,16 +1,23 @@
 
+import contextlib
 import datetime
+import os
+import uuid
 from langchain_core.messages import SystemMessage, HumanMessage
 from dotenv import load_dotenv
 
-from agent import create_agent
+from agent import create_agent, stream_agent_turn, summarize_turns
+from cassette import recording_cassette
+from checkpoint import create_checkpointer, thread_config
+from supervisor import create_supervisor
 from tools.google_tasks_tools import tasks_tools
 from tools.google_calendar_tools import calendar_tools
 from tools.google_gmail_tools import gmail_tools
+from tracing import start_metrics_server
 def select_agent():
     """Cho phép người dùng chọn agent để tương tác."""
     while True:
-        choice = input("Bạn muốn sử dụng Agent nào? (1: Tasks, 2: Calendar, 3: Gmail): ")
+        choice = input("Bạn muốn sử dụng Agent nào? (1: Tasks, 2: Calendar, 3: Gmail, 4: Tất cả): ")
         if choice == '1':
             print("\nĐang khởi tạo Task Agent...")
             return tasks_tools, "prompts/tasks_agent_prompt.md"
@@ -20,6 +27,10 @@ def select_agent():
         elif choice == '3': # <-- THÊM LỰA CHỌN GMAIL
             print("\nĐang khởi tạo Gmail Agent...")
             return gmail_tools, "prompts/gmail_agent_prompt.md"
+        elif choice == '4':
+            # Supervisor tự chia yêu cầu cho các agent trên và tự dùng prompt riêng cho từng agent
+            print("\nĐang khởi tạo Supervisor (Tasks + Calendar + Gmail)...")
+            return None, None
         else:
             print("Lựa chọn không hợp lệ. Vui lòng nhập 1 hoặc 2.")
 
@@ -29,36 +40,101 @@ def load_and_format_prompt(prompt_file: str):
         prompt_template = f.read()
     return prompt_template.format(current_time=datetime.datetime.now(datetime.timezone(datetime.timedelta(hours=7))), start_of_day=datetime.datetime.now(datetime.timezone(datetime.timedelta(hours=7))).replace(hour=0, minute=0, second=0, microsecond=0).isoformat())
 
+def print_streamed_turn(app, inputs: dict, config: dict, turn_metrics: list):
+    """In câu trả lời theo từng token và tiến trình gọi tool; trả về AIMessage cuối cùng."""
+    answering = False
+    for kind, payload in stream_agent_turn(app, inputs, config):
+        if kind == "token":
+            if not answering:
+                print(">> Agent: ", end="", flush=True)
+                answering = True
+            print(payload, end="", flush=True)
+        elif kind == "tool_start":
+            if answering:
+                print()
+                answering = False
+            print(f"   ... đang gọi {payload}…", flush=True)
+        elif kind == "done":
+            ai_response, metrics = payload["message"], payload["metrics"]
+            if not answering:
+                print(f">> Agent: {ai_response.content}", end="")
+            turn_metrics.append(metrics)
+            ttft = f"{metrics['ttft']:.2f}s" if metrics["ttft"] is not None else "-"
+            print(f"\n   (TTFT: {ttft} | tổng: {metrics['total']:.2f}s | {metrics['tool_calls']} lần gọi tool | tiết kiệm ~{metrics['tokens_saved']} token lịch sử)")
+            return ai_response
+
+def print_turn_summary(turn_metrics: list):
+    """In tỷ lệ lượt được fast path trả lời và thời gian so với các lượt phải gọi model."""
+    if not turn_metrics:
+        return
+    summary = summarize_turns(turn_metrics)
+    fmt = lambda value: f"{value:.2f}s" if value is not None else "-"
+    print(f"   ({summary['turns']} lượt | fast path: {summary['fast_path_share']:.0%} số lượt, median {fmt(summary['fast_path_median'])}"
+          f" | qua model: median {fmt(summary['llm_median'])})")
+
 def main():
     """Hàm chính để chọn và chạy Agent."""
     load_dotenv()
+    # Endpoint /metrics (Prometheus) cho span của model, tool và Google API; chỉ mở khi bật TRACING_ENABLED và đặt METRICS_PORT
+    start_metrics_server()
     
     tools, prompt_file = select_agent()
     
-    app = create_agent(tools)
-    
-    formatted_prompt = load_and_format_prompt(prompt_file)
-    system_prompt = SystemMessage(content=formatted_prompt)
+    # State hội thoại được lưu trong SQLite theo thread_id: mỗi lượt chỉ gửi message mới,
+    # và chạy lại chương trình sẽ tiếp tục cuộc hội thoại trước đó của agent này
+    checkpointer = create_checkpointer()
+    if tools is None:
+        app = create_supervisor(checkpointer=checkpointer)
+        agent_name = "supervisor"
+        system_prompt = None
+    else:
+        app = create_agent(tools, checkpointer=checkpointer)
+        agent_name = os.path.basename(prompt_file).split('_')[0]
+        formatted_prompt = load_and_format_prompt(prompt_file)
+        # ID cố định: gửi lại prompt sẽ thay thế (cập nhật thời gian hiện tại) thay vì thêm một bản mới
+        system_prompt = SystemMessage(content=formatted_prompt, id="system_prompt")
+    thread_id = f"cli-{agent_name}"
+    # Chế độ ghi (CASSETTE_RECORD_DIR): mọi lần gọi model và request Google của phiên được ghi vào một cassette
+    # để phát lại bằng benchmarks/bench_replay.py; phiên ghi dùng thread mới để cassette chứa cả cuộc hội thoại
+    cassette = recording_cassette(f"cli-{agent_name}")
+    if cassette:
+        thread_id = f"{thread_id}-{uuid.uuid4().hex[:8]}"
+        print(f"Đang ghi cassette vào {cassette.path}")
+    config = thread_config(thread_id)
+    send_system_prompt = system_prompt is not None
     
-    conversation_history = []
-    print("Agent đã sẵn sàng. (gõ 'exit' để thoát)")
+    turn_metrics = []
+    print("Agent đã sẵn sàng. (gõ 'new' để bắt đầu cuộc hội thoại mới, 'exit' để thoát)")
 
     while True:
         user_input = input(">> Bạn: ")
         if user_input.lower() == "exit":
+            print_turn_summary(turn_metrics)
+            if cassette:
+                cassette.close()
             print("Tạm biệt!")
             break
+        if user_input.lower() == "new":
+            checkpointer.delete_thread(thread_id)
+            if cassette:
+                cassette.reset(thread_id)
+            send_system_prompt = system_prompt is not None
+            print("Đã bắt đầu cuộc hội thoại mới.")
+            continue
 
-        conversation_history.append(HumanMessage(content=user_input))
-        messages_for_graph = [system_prompt] + conversation_history
+        new_messages = [HumanMessage(content=user_input)]
+        if send_system_prompt:
+            new_messages.insert(0, system_prompt)
         
         try:
-            final_state = app.invoke({"messages": messages_for_graph})
-            ai_response = final_state['messages'][-1]
-            print(f">> Agent: {ai_response.content}")
-            conversation_history.append(ai_response)
+            recording = cassette.turn(agent_name, thread_id, new_messages, config) if cassette else contextlib.nullcontext(config)
+            with recording as turn_config:
+                print_streamed_turn(app, {"messages": new_messages}, turn_config, turn_metrics)
+            if cassette:
+                cassette.end_turn(turn_metrics[-1])
+            send_system_prompt = False
         except Exception as e:
-            print(f"Đã có lỗi nghiêm trọng xảy ra: {e}")
+            print(f"\nĐã có lỗi nghiêm trọng xảy ra: {e}")
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
@@ -0,0 +1,350 @@
+# intelligent_agent_platform/server.py
+
+"""
+Server HTTP + WebSocket (ASGI, Starlette + uvicorn) cho nhiều người dùng cùng lúc. Mỗi người dùng có tài khoản
+Google riêng: credentials được lấy từ kho mã hoá (tools/credential_store.py) theo API key của request, và mọi tool
+của lượt đó dùng credentials, bản sao lịch, cache công việc và cache tool của riêng người dùng đó.
+Các graph (create_async_agent / create_async_supervisor) được biên dịch một lần và dùng chung; state hội thoại
+nằm trong checkpointer theo thread "<user>:<agent>:<conversation>".
+
+Số lượt chạy cùng lúc bị giới hạn (SERVER_MAX_CONCURRENT_TURNS); các lượt của một người dùng chạy lần lượt theo
+thứ tự đến, tối đa SERVER_MAX_QUEUED_PER_USER lượt chờ (vượt quá: 429), và tổng số lượt chờ của server tối đa
+SERVER_MAX_PENDING_TURNS (vượt quá hoặc chờ quá SERVER_QUEUE_TIMEOUT giây: 503 kèm Retry-After).
+
+API (xác thực bằng header "Authorization: Bearer <API key>", WebSocket có thể dùng ?api_key=<API key>):
+    POST   /v1/chat                               {"message", "agent", "conversation"} -> {"answer", "metrics"}
+    WS     /v1/ws?agent=...&conversation=...     gửi {"message": ...}; nhận các sự kiện
+                                                  {"type": "token" | "tool_start" | "tool_end" | "done" | "error", ...}
+    DELETE /v1/conversations/{agent}/{conversation}   xoá cuộc hội thoại
+    GET    /healthz                               số liệu hàng đợi (không cần xác thực)
+agent là "tasks", "calendar", "gmail" hoặc "supervisor".
+
+Chạy từ thư mục gốc của dự án (cần CREDENTIAL_STORE_KEY):
+    python server.py add-user alice --token-file token.json     # in ra API key của alice
+    python server.py serve --port 8000
+"""
+
+import argparse
+import asyncio
+import contextlib
+import json
+import time
+
+import uvicorn
+from dotenv import load_dotenv
+from google.oauth2.credentials import Credentials
+from langchain_core.messages import HumanMessage, SystemMessage
+from starlette.applications import Starlette
+from starlette.responses import JSONResponse
+from starlette.routing import Route, WebSocketRoute
+from starlette.websockets import WebSocket, WebSocketDisconnect
+
+from agent import astream_agent_turn, create_async_agent
+from checkpoint import acreate_checkpointer, thread_config
+from config import (
+    CHECKPOINT_DB, SCOPES, SERVER_HOST, SERVER_PORT, SERVER_MAX_CONCURRENT_TURNS, SERVER_MAX_QUEUED_PER_USER,
+    SERVER_MAX_PENDING_TURNS, SERVER_QUEUE_TIMEOUT, SERVER_TURN_TIMEOUT,
+)
+from supervisor import SUB_AGENTS, create_async_supervisor, format_prompt
+from tools.common_async import aclose_async_session
+from tools.common_auth import use_google_user, user_credentials
+from tools.credential_store import get_credential_store
+
+AGENTS = (*SUB_AGENTS, "supervisor")
+
+
+class Rejected(Exception):
+    """Lượt bị từ chối trước khi chạy (quá tải, hết thời gian chờ, credentials không dùng được)."""
+
+    def __init__(self, status: int, message: str, retry_after: float = None):
+        super().__init__(message)
+        self.status = status
+        self.message = message
+        self.retry_after = retry_after
+
+
+class _UserQueue:
+    def __init__(self):
+        # asyncio.Lock đánh thức các lượt chờ theo đúng thứ tự đến
+        self.lock = asyncio.Lock()
+        self.pending = 0
+
+
+class TurnScheduler:
+    """
+    Hàng đợi lượt của server: mỗi người dùng một hàng FIFO (các lượt của một người chạy lần lượt, tối đa
+    `max_per_user` lượt chờ hoặc đang chạy), và tối đa `max_concurrent` lượt chạy cùng lúc trên toàn server.
+    Vượt giới hạn thì từ chối ngay (429 / 503) thay vì nhận thêm việc không kịp xử lý.
+    """
+
+    def __init__(self, max_concurrent: int = SERVER_MAX_CONCURRENT_TURNS, max_per_user: int = SERVER_MAX_QUEUED_PER_USER,
+                 max_pending: int = SERVER_MAX_PENDING_TURNS, queue_timeout: float = SERVER_QUEUE_TIMEOUT):
+        self.max_concurrent = max_concurrent
+        self.max_per_user = max_per_user
+        self.max_pending = max_pending
+        self.queue_timeout = queue_timeout
+        self._slots = asyncio.Semaphore(max_concurrent)
+        self._queues = {}
+        self._pending = 0
+        self._running = 0
+        self._stats = {"accepted": 0, "completed": 0, "rejected_user": 0, "rejected_server": 0, "queue_timeouts": 0, "queue_wait": 0.0}
+
+    def _retry_after(self) -> float:
+        # Ước lượng thô: số lượt đứng trước chia cho số lượt chạy cùng lúc, mỗi lượt khoảng một giây
+        return max(1, round(self._pending / self.max_concurrent))
+
+    @contextlib.asynccontextmanager
+    async def turn(self, user_id: str):
+        """Chờ tới lượt của `user_id` (hoặc ném Rejected); khối `with` là lúc lượt được chạy."""
+        if self._pending >= self.max_pending:
+            self._stats["rejected_server"] += 1
+            raise Rejected(503, "Server đang quá tải, vui lòng thử lại sau.", self._retry_after())
+        queue = self._queues.get(user_id)
+        if queue is None:
+            queue = self._queues[user_id] = _UserQueue()
+        if queue.pending >= self.max_per_user:
+            self._stats["rejected_user"] += 1
+            raise Rejected(429, f"Bạn đã có {queue.pending} yêu cầu đang chờ xử lý, vui lòng đợi.", self._retry_after())
+
+        queue.pending += 1
+        self._pending += 1
+        self._stats["accepted"] += 1
+        start = time.perf_counter()
+        try:
+            try:
+                async with asyncio.timeout(self.queue_timeout):
+                    await queue.lock.acquire()
+                    try:
+                        await self._slots.acquire()
+                    except BaseException:
+                        queue.lock.release()
+                        raise
+            except TimeoutError:
+                self._stats["queue_timeouts"] += 1
+                raise Rejected(503, "Hết thời gian chờ trong hàng đợi, vui lòng thử lại sau.", self._retry_after())
+            self._stats["queue_wait"] += time.perf_counter() - start
+            self._running += 1
+            try:
+                yield
+            finally:
+                self._running -= 1
+                self._stats["completed"] += 1
+                self._slots.release()
+                queue.lock.release()
+        finally:
+            queue.pending -= 1
+            self._pending -= 1
+            if queue.pending == 0:
+                self._queues.pop(user_id, None)
+
+    def stats(self) -> dict:
+        stats = dict(self._stats)
+        started = stats["completed"] + self._running
+        stats["queue_wait_mean"] = stats.pop("queue_wait") / started if started else 0.0
+        return {**stats, "running": self._running, "waiting": self._pending - self._running, "users": len(self._queues)}
+
+
+class AgentService:
+    """Các graph đã biên dịch (mỗi loại agent một graph, dùng chung cho mọi người dùng) và việc chạy một lượt."""
+
+    def __init__(self, model=None, checkpointer=None, scheduler: TurnScheduler = None, turn_timeout: float = SERVER_TURN_TIMEOUT):
+        self.model = model
+        self.checkpointer = checkpointer
+        self.scheduler = scheduler or TurnScheduler()
+        self.turn_timeout = turn_timeout
+        self.agents = {}
+
+    def start(self, checkpointer):
+        self.checkpointer = self.checkpointer or checkpointer
+        self.agents = {
+            name: create_async_agent(tools, model=self.model, checkpointer=self.checkpointer)
+            for name, (tools, _) in SUB_AGENTS.items()
+        }
+        self.agents["supervisor"] = create_async_supervisor(model=self.model, checkpointer=self.checkpointer)
+
+    async def run_turn(self, user_id: str, agent_name: str, conversation: str, message: str, emit=None) -> dict:
+        """
+        Chạy một lượt của `user_id` khi tới lượt trong hàng đợi; `emit(event)` (nếu có) nhận từng sự kiện ngay khi có.
+        Trả về {"answer", "metrics"}; ném Rejected nếu lượt không được chạy.
+        """
+        try:
+            # Đọc/làm mới credentials trên thread riêng trước khi chiếm chỗ chạy, để token hỏng bị từ chối sớm
+            await asyncio.to_thread(user_credentials.get, user_id)
+        except Exception as e:
+            raise Rejected(403, f"Không dùng được tài khoản Google của người dùng: {e}")
+
+        agent = self.agents[agent_name]
+        config = thread_config(f"{user_id}:{agent_name}:{conversation}")
+        async with self.scheduler.turn(user_id):
+            messages = [HumanMessage(content=message)]
+            prompt_file = SUB_AGENTS.get(agent_name, (None, None))[1]
+            if prompt_file and not (await agent.aget_state(config)).values.get("messages"):
+                # Lượt đầu của cuộc hội thoại: thêm system prompt (ID cố định như main.py)
+                messages.insert(0, SystemMessage(content=format_prompt(prompt_file), id="system_prompt"))
+            with use_google_user(user_id):
+                async with asyncio.timeout(self.turn_timeout):
+                    async for kind, payload in astream_agent_turn(agent, {"messages": messages}, config):
+                        if kind == "done":
+                            result = {"answer": payload["message"].text if payload["message"] else "", "metrics": payload["metrics"]}
+                        elif emit is not None:
+                            await emit({"type": kind, "data": payload})
+        if emit is not None:
+            await emit({"type": "done", **result})
+        return result
+
+    async def delete_conversation(self, user_id: str, agent_name: str, conversation: str):
+        await self.checkpointer.adelete_thread(f"{user_id}:{agent_name}:{conversation}")
+
+
+def _error(status: int, message: str, retry_after: float = None) -> JSONResponse:
+    headers = {"Retry-After": str(int(retry_after))} if retry_after else None
+    return JSONResponse({"error": message}, status_code=status, headers=headers)
+
+
+def _message_of(body) -> str:
+    """Câu của người dùng trong body JSON của request, hoặc chuỗi rỗng nếu body sai dạng."""
+    message = body.get("message") if isinstance(body, dict) else None
+    return message if isinstance(message, str) else ""
+
+
+async def _authenticate(connection, store):
+    """user_id của request (API key trong header Authorization hoặc ?api_key=), hoặc None."""
+    header = connection.headers.get("authorization", "")
+    api_key = header[len("Bearer "):] if header.startswith("Bearer ") else connection.query_params.get("api_key")
+    if not api_key:
+        return None
+    return await asyncio.to_thread(store.authenticate, api_key)
+
+
+def create_app(model=None, store=None, checkpointer=None, checkpoint_path: str = CHECKPOINT_DB,
+               scheduler: TurnScheduler = None) -> Starlette:
+    """
+    Tạo ứng dụng ASGI. `model`, `store` (CredentialStore), `checkpointer` và `scheduler` có thể được thay
+    (ví dụ trong benchmark); mặc định là Gemini, kho credentials theo config và checkpointer SQLite tại `checkpoint_path`.
+    """
+    service = AgentService(model=model, checkpointer=checkpointer, scheduler=scheduler)
+    if store is not None:
+        user_credentials.store = store
+
+    def get_store():
+        return store or get_credential_store()
+
+    @contextlib.asynccontextmanager
+    async def lifespan(app):
+        owned = None if checkpointer is not None else await acreate_checkpointer(checkpoint_path)
+        service.start(owned)
+        try:
+            yield
+        finally:
+            await aclose_async_session()
+            if owned is not None:
+                await owned.conn.close()
+
+    async def healthz(request):
+        return JSONResponse({"status": "ok", "scheduler": service.scheduler.stats()})
+
+    async def chat(request):
+        user_id = await _authenticate(request, get_store())
+        if user_id is None:
+            return _error(401, "API key không hợp lệ.")
+        try:
+            body = await request.json()
+        except ValueError:
+            return _error(400, "Body phải là JSON.")
+        if not isinstance(body, dict):
+            return _error(400, "Body phải là một object JSON.")
+        agent_name = body.get("agent", "supervisor")
+        if agent_name not in AGENTS or not _message_of(body):
+            return _error(400, f"Cần 'message' và 'agent' thuộc {', '.join(AGENTS)}.")
+        try:
+            result = await service.run_turn(user_id, agent_name, str(body.get("conversation", "default")), _message_of(body))
+        except Rejected as e:
+            return _error(e.status, e.message, e.retry_after)
+        except TimeoutError:
+            return _error(504, "Lượt hội thoại chạy quá lâu.")
+        return JSONResponse(result)
+
+    async def delete_conversation(request):
+        user_id = await _authenticate(request, get_store())
+        if user_id is None:
+            return _error(401, "API key không hợp lệ.")
+        agent_name = request.path_params["agent"]
+        if agent_name not in AGENTS:
+            return _error(404, f"Không có agent '{agent_name}'.")
+        await service.delete_conversation(user_id, agent_name, request.path_params["conversation"])
+        return JSONResponse({"deleted": True})
+
+    async def websocket_chat(websocket: WebSocket):
+        user_id = await _authenticate(websocket, get_store())
+        agent_name = websocket.query_params.get("agent", "supervisor")
+        if user_id is None or agent_name not in AGENTS:
+            await websocket.close(code=1008)
+            return
+        conversation = websocket.query_params.get("conversation", "default")
+        await websocket.accept()
+        try:
+            while True:
+                frame = await websocket.receive()
+                if frame["type"] == "websocket.disconnect":
+                    break
+                try:
+                    message = _message_of(json.loads(frame.get("text") or frame.get("bytes") or ""))
+                except ValueError:
+                    message = ""
+                if not message:
+                    # Frame không phải JSON hoặc không có 'message': báo lỗi, giữ kết nối cho các lượt sau
+                    await websocket.send_json({"type": "error", "status": 400, "error": "Cần một object JSON có 'message'."})
+                    continue
+                try:
+                    await service.run_turn(user_id, agent_name, conversation, message, emit=websocket.send_json)
+                except Rejected as e:
+                    await websocket.send_json({"type": "error", "status": e.status, "error": e.message, "retry_after": e.retry_after})
+                except TimeoutError:
+                    await websocket.send_json({"type": "error", "status": 504, "error": "Lượt hội thoại chạy quá lâu."})
+        except WebSocketDisconnect:
+            pass
+
+    return Starlette(
+        routes=[
+            Route("/healthz", healthz),
+            Route("/v1/chat", chat, methods=["POST"]),
+            Route("/v1/conversations/{agent}/{conversation}", delete_conversation, methods=["DELETE"]),
+            WebSocketRoute("/v1/ws", websocket_chat),
+        ],
+        lifespan=lifespan,
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    commands = parser.add_subparsers(dest="command", required=True)
+    serve = commands.add_parser("serve", help="Chạy server")
+    serve.add_argument("--host", default=SERVER_HOST)
+    serve.add_argument("--port", type=int, default=SERVER_PORT)
+    add_user = commands.add_parser("add-user", help="Thêm người dùng từ token.json đã đăng nhập; in ra API key")
+    add_user.add_argument("user_id")
+    add_user.add_argument("--token-file", required=True, help="File token OAuth (như token.json của chế độ một người dùng)")
+    remove_user = commands.add_parser("remove-user", help="Xoá người dùng khỏi kho credentials")
+    remove_user.add_argument("user_id")
+    commands.add_parser("list-users", help="Liệt kê người dùng trong kho credentials")
+    args = parser.parse_args()
+    load_dotenv()
+
+    if args.command == "serve":
+        uvicorn.run(create_app(), host=args.host, port=args.port)
+    elif args.command == "add-user":
+        creds = Credentials.from_authorized_user_file(args.token_file, SCOPES)
+        if not creds.refresh_token:
+            parser.error("Token không có refresh token; hãy đăng nhập lại bằng main.py.")
+        print(get_credential_store().add_user(args.user_id, creds))
+    elif args.command == "remove-user":
+        removed = get_credential_store().remove(args.user_id)
+        user_credentials.forget(args.user_id)
+        print("Đã xoá." if removed else "Không có người dùng này.")
+    else:
+        for user_id in get_credential_store().users():
+            print(user_id)
+
+
+if __name__ == "__main__":
+    main()
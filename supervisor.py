@@ -0,0 +1,207 @@
+# intelligent_agent_platform/supervisor.py
+
+import datetime
+import json
+from typing import Annotated, NotRequired, Sequence, TypedDict
+
+from langchain_core.messages import AIMessage, BaseMessage, HumanMessage, SystemMessage
+from langgraph.graph import END, StateGraph
+from langgraph.graph.message import add_messages
+from langgraph.types import Send
+
+from agent import _default_model, create_agent, create_async_agent
+from config import SUPERVISOR_HISTORY_MESSAGES, SUPERVISOR_MAX_STEPS
+from tools.google_calendar_tools import calendar_tools
+from tools.google_gmail_tools import gmail_tools
+from tools.google_tasks_tools import tasks_tools
+from tracing import with_tracing
+
+SUPERVISOR_PROMPT_FILE = "prompts/supervisor_prompt.md"
+
+# Các sub-agent mà supervisor có thể giao việc: tên -> (tools, file prompt)
+SUB_AGENTS = {
+    "tasks": (tasks_tools, "prompts/tasks_agent_prompt.md"),
+    "calendar": (calendar_tools, "prompts/calendar_agent_prompt.md"),
+    "gmail": (gmail_tools, "prompts/gmail_agent_prompt.md"),
+}
+
+MERGE_PROMPT = """Người dùng yêu cầu: {request}
+
+Các agent chuyên biệt đã thực hiện các bước sau:
+{results}
+
+Hãy viết MỘT câu trả lời ngắn gọn cho người dùng, tổng hợp kết quả của tất cả các bước.
+Nêu rõ bước nào thất bại hoặc cần người dùng cung cấp thêm thông tin."""
+
+
+def _merge_results(current: dict, new: dict) -> dict:
+    # None là tín hiệu bắt đầu lượt mới: xoá kết quả của lượt trước
+    if new is None:
+        return {}
+    return {**(current or {}), **new}
+
+
+class SupervisorState(TypedDict):
+    messages: Annotated[Sequence[BaseMessage], add_messages]
+    # Kế hoạch của lượt hiện tại: [{"agent", "goal", "depends_on"}], và câu trả lời trực tiếp nếu không cần agent nào
+    plan: NotRequired[list]
+    reply: NotRequired[str]
+    # Chỉ số bước -> câu trả lời cuối cùng của sub-agent
+    results: NotRequired[Annotated[dict, _merge_results]]
+
+
+def format_prompt(prompt_file: str) -> str:
+    """Tải prompt từ file và điền thời gian hiện tại."""
+    with open(prompt_file, "r", encoding="utf-8") as f:
+        prompt_template = f.read()
+    now = datetime.datetime.now(datetime.timezone(datetime.timedelta(hours=7)))
+    return prompt_template.format(current_time=now, start_of_day=now.replace(hour=0, minute=0, second=0, microsecond=0).isoformat())
+
+
+# --- CÁC HÀM HỖ TRỢ (dùng chung cho bản đồng bộ và bất đồng bộ) ---
+def _planner_input(state: SupervisorState) -> list:
+    conversation = [m for m in state["messages"] if isinstance(m, (HumanMessage, AIMessage))]
+    return [SystemMessage(content=format_prompt(SUPERVISOR_PROMPT_FILE))] + conversation[-SUPERVISOR_HISTORY_MESSAGES:]
+
+
+def _parse_plan(text: str):
+    """(các bước hợp lệ, câu trả lời trực tiếp) từ câu trả lời JSON của planner."""
+    try:
+        data = json.loads(text[text.index("{"):text.rindex("}") + 1])
+    except ValueError:
+        # Planner không trả về JSON: coi câu trả lời của nó là câu trả lời cho người dùng
+        return [], text
+    if not isinstance(data, dict):
+        return [], text
+    raw_steps = data.get("steps")
+    steps = []
+    # Chỉ số bước của planner -> chỉ số trong danh sách đã lọc (bước sai dạng bị bỏ làm lệch chỉ số)
+    positions = {}
+    for raw_index, raw in enumerate((raw_steps if isinstance(raw_steps, list) else [])[:SUPERVISOR_MAX_STEPS]):
+        # Bỏ qua bước sai dạng (không phải object, agent lạ, thiếu mục tiêu)
+        if not isinstance(raw, dict) or raw.get("agent") not in SUB_AGENTS or not raw.get("goal"):
+            continue
+        raw_depends = raw.get("depends_on")
+        # Chỉ giữ phụ thuộc vào bước hợp lệ đứng trước; phụ thuộc vào bước bị bỏ hoặc bước sau bị loại
+        depends_on = [positions[i] for i in (raw_depends if isinstance(raw_depends, list) else []) if isinstance(i, int) and i in positions]
+        positions[raw_index] = len(steps)
+        steps.append({"agent": raw["agent"], "goal": str(raw["goal"]), "depends_on": depends_on})
+    reply = data.get("reply")
+    return steps, reply if isinstance(reply, str) else ""
+
+
+def _plan_update(response: AIMessage) -> dict:
+    steps, reply = _parse_plan(response.text)
+    return {"plan": steps, "reply": reply, "results": None}
+
+
+def _next_steps(state: SupervisorState):
+    """Giao song song mọi bước chưa chạy mà các bước phụ thuộc đã xong; hết bước thì tổng hợp."""
+    results = state.get("results") or {}
+    ready = [
+        Send("worker", {"index": i, "step": step, "context": [results[d] for d in step["depends_on"]]})
+        for i, step in enumerate(state.get("plan") or [])
+        if i not in results and all(d in results for d in step["depends_on"])
+    ]
+    return ready or "merge"
+
+
+def _worker_input(task: dict) -> dict:
+    step = task["step"]
+    goal = step["goal"]
+    if task["context"]:
+        goal += "\n\nKết quả của các bước trước:\n" + "\n".join(f"- {text}" for text in task["context"])
+    system_prompt = SystemMessage(content=format_prompt(SUB_AGENTS[step["agent"]][1]), id="system_prompt")
+    return {"messages": [system_prompt, HumanMessage(content=goal)]}
+
+
+def _worker_update(task: dict, answer: str) -> dict:
+    return {"results": {task["index"]: answer}}
+
+
+def _merge_plan(state: SupervisorState):
+    """Trả về (AIMessage cuối cùng, None) nếu không cần gọi model, hoặc (None, input cho model)."""
+    plan, results = state.get("plan") or [], state.get("results") or {}
+    if not plan:
+        return AIMessage(content=state.get("reply") or "Tôi chưa hiểu yêu cầu của bạn, bạn có thể nói rõ hơn không?"), None
+    if len(plan) == 1 and 0 in results:
+        # Một bước: câu trả lời của sub-agent chính là câu trả lời cuối cùng
+        return AIMessage(content=results[0]), None
+    request = next((m.text for m in reversed(state["messages"]) if isinstance(m, HumanMessage)), "")
+    lines = [
+        f"{i + 1}. [{step['agent']}] {step['goal']}\n   Kết quả: {results.get(i, 'Không thực hiện được (bước phụ thuộc chưa xong).')}"
+        for i, step in enumerate(plan)
+    ]
+    return None, [HumanMessage(content=MERGE_PROMPT.format(request=request, results="\n".join(lines)))]
+
+
+def _compile(plan, worker, merge, checkpointer=None):
+    workflow = StateGraph(SupervisorState)
+    workflow.add_node("plan", plan)
+    # Nút chặn: chỉ chạy một lần sau mỗi đợt worker song song, rồi quyết định đợt tiếp theo
+    workflow.add_node("dispatch", lambda state: {})
+    workflow.add_node("worker", worker)
+    workflow.add_node("merge", merge)
+    workflow.set_entry_point("plan")
+    workflow.add_edge("plan", "dispatch")
+    workflow.add_conditional_edges("dispatch", _next_steps, ["worker", "merge"])
+    workflow.add_edge("worker", "dispatch")
+    workflow.add_edge("merge", END)
+    return with_tracing(workflow.compile(checkpointer=checkpointer))
+
+
+def create_supervisor(model=None, checkpointer=None, cache=None):
+    """
+    Tạo graph supervisor: model lập kế hoạch tách yêu cầu thành các bước cho agent Tasks/Calendar/Gmail,
+    các bước độc lập chạy song song trên sub-agent (create_agent), rồi kết quả được tổng hợp thành một câu trả lời.
+    Thời gian một lượt xấp xỉ sub-agent chậm nhất của mỗi đợt thay vì tổng của tất cả.
+    Dùng được với stream_agent_turn và checkpointer giống create_agent; sub-agent không lưu state riêng,
+    nên sub-agent không dùng alias ID (E1, T1...): alias của một bước sẽ không còn ý nghĩa ở lượt sau,
+    còn ID thật trong câu trả lời thì dùng lại được.
+    """
+    model = model or _default_model()
+    agents = {
+        name: create_agent(tools, model=model, checkpointer=False, cache=cache, id_aliases=False)
+        for name, (tools, _) in SUB_AGENTS.items()
+    }
+
+    def plan(state: SupervisorState):
+        return _plan_update(model.invoke(_planner_input(state)))
+
+    def worker(task: dict):
+        try:
+            output = agents[task["step"]["agent"]].invoke(_worker_input(task))
+            return _worker_update(task, output["messages"][-1].text)
+        except Exception as e:
+            return _worker_update(task, f"Lỗi khi thực hiện bước: {e}")
+
+    def merge(state: SupervisorState):
+        message, prompt = _merge_plan(state)
+        return {"messages": [message or model.invoke(prompt)]}
+
+    return _compile(plan, worker, merge, checkpointer)
+
+
+def create_async_supervisor(model=None, checkpointer=None, cache=None):
+    """Phiên bản bất đồng bộ của create_supervisor (sub-agent là create_async_agent), dùng với `ainvoke`/`astream`."""
+    model = model or _default_model()
+    agents = {
+        name: create_async_agent(tools, model=model, checkpointer=False, cache=cache, id_aliases=False)
+        for name, (tools, _) in SUB_AGENTS.items()
+    }
+
+    async def plan(state: SupervisorState):
+        return _plan_update(await model.ainvoke(_planner_input(state)))
+
+    async def worker(task: dict):
+        try:
+            output = await agents[task["step"]["agent"]].ainvoke(_worker_input(task))
+            return _worker_update(task, output["messages"][-1].text)
+        except Exception as e:
+            return _worker_update(task, f"Lỗi khi thực hiện bước: {e}")
+
+    async def merge(state: SupervisorState):
+        message, prompt = _merge_plan(state)
+        return {"messages": [message or await model.ainvoke(prompt)]}
+
+    return _compile(plan, worker, merge, checkpointer)
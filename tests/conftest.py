@@ -0,0 +1,40 @@
+# intelligent_agent_platform/tests/conftest.py
+
+"""
+Fixture dùng chung cho bộ test: các tool chạy trên server Google API giả lập (benchmarks/fake_google_api.py)
+thay vì Google thật, với RequestGovernor không giới hạn tốc độ và backoff ngắn để test chạy nhanh.
+
+Chạy từ thư mục gốc của dự án:
+    python -m pytest -q
+"""
+
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import tools.common_cache as cache_module  # noqa: E402
+import tools.common_execution as execution_module  # noqa: E402
+from benchmarks.fake_google_api import FakeCalendar, FakeGmail, FakeGoogleAPIServer, FakeTasks  # noqa: E402
+from tools.common_execution import RequestGovernor  # noqa: E402
+
+
+@pytest.fixture
+def governor(monkeypatch):
+    """RequestGovernor của process cho test: không có token bucket, backoff vài mili giây."""
+    instance = RequestGovernor(rate_limits={}, max_retries=3, backoff_base=0.001, backoff_max=0.01,
+                               circuit_failures=3, circuit_cooldown=0.05)
+    monkeypatch.setattr(execution_module, "request_governor", instance)
+    return instance
+
+
+@pytest.fixture
+def google_api(governor, monkeypatch):
+    """Server giả lập (dữ liệu nhỏ, không có độ trễ); cache kết quả tool tắt để mỗi lần gọi đều tới server."""
+    monkeypatch.setattr(cache_module, "TOOL_CACHE_ENABLED", False)
+    server = FakeGoogleAPIServer(gmail=FakeGmail(message_count=60, draft_count=5), calendar=FakeCalendar(event_count=200, days=20),
+                                 tasks=FakeTasks(task_count=30), latency=0, batch_part_latency=0)
+    with server:
+        yield server
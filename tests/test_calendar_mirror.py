@@ -0,0 +1,135 @@
+# intelligent_agent_platform/tests/test_calendar_mirror.py
+
+import asyncio
+import datetime
+
+import pytest
+
+from config import CALENDAR_ID
+from tools.calendar_mirror import LOCAL_TZ, CalendarMirror, parse_time
+
+
+def _day(offset: int) -> str:
+    start = datetime.datetime.now(LOCAL_TZ).replace(hour=0, minute=0, second=0, microsecond=0)
+    return (start + datetime.timedelta(days=offset)).isoformat()
+
+
+def _new_event(summary: str) -> dict:
+    # Lệch khỏi giờ tròn để không trùng thời điểm bắt đầu (thứ tự khi bằng nhau không xác định) với sự kiện có sẵn
+    start = datetime.datetime.fromisoformat(_day(0)) + datetime.timedelta(hours=10, minutes=17)
+    return {"summary": summary, "start": {"dateTime": start.isoformat()}, "end": {"dateTime": (start + datetime.timedelta(hours=1)).isoformat()}}
+
+
+def _api_ids(service, start_time: str, end_time: str) -> list:
+    response = service.events().list(calendarId=CALENDAR_ID, timeMin=start_time, timeMax=end_time, maxResults=2500).execute()
+    return sorted(event["id"] for event in response["items"])
+
+
+def _ids(events: list) -> list:
+    # Thứ tự giữa các sự kiện bắt đầu cùng lúc không xác định (kể cả ở Google): so sánh tập ID
+    starts = [parse_time(event["start"].get("dateTime", event["start"].get("date"))) for event in events]
+    assert starts == sorted(starts)
+    return sorted(event["id"] for event in events)
+
+
+@pytest.fixture
+def service(google_api):
+    return google_api.build_service("calendar", "v3")
+
+
+@pytest.mark.parametrize("start, end", [(-3, 0), (0, 1), (-7, 10), (2, 2)])
+def test_range_query_matches_api(service, start, end):
+    mirror = CalendarMirror(max_staleness=60, past_days=7)
+    events = mirror.query(service, _day(start), _day(end))
+    assert _ids(events) == _api_ids(service, _day(start), _day(end))
+
+
+def test_multi_day_event_is_found_from_inside(service, google_api):
+    mirror = CalendarMirror(max_staleness=60, past_days=7)
+    all_day = next(e for e in google_api.calendar.events.values() if "date" in e["start"] and e["start"]["date"] >= _day(-5)[:10])
+    inside = datetime.date.fromisoformat(all_day["start"]["date"]) + datetime.timedelta(days=1)
+    start = datetime.datetime.combine(inside, datetime.time(12), LOCAL_TZ)
+    events = mirror.query(service, start.isoformat(), (start + datetime.timedelta(hours=1)).isoformat())
+    assert all_day["id"] in [event["id"] for event in events]
+
+
+def test_range_before_coverage_is_not_answered(service, google_api):
+    mirror = CalendarMirror(max_staleness=60, past_days=7)
+    assert mirror.query(service, _day(-8), _day(0)) is None
+    # Không đồng bộ chỉ để trả lời None
+    assert google_api.request_count == 0
+    assert mirror.query(service, _day(-7), _day(0)) is not None
+    assert mirror.stats()["misses"] == 1
+
+
+def test_fresh_mirror_does_not_call_api(service, google_api):
+    mirror = CalendarMirror(max_staleness=60, past_days=7)
+    mirror.query(service, _day(0), _day(1))
+    requests = google_api.request_count
+    mirror.query(service, _day(-2), _day(3))
+    assert google_api.request_count == requests
+    assert mirror.stats()["full_syncs"] == 1
+
+
+def test_incremental_sync_applies_changes_and_deletes(service, google_api):
+    mirror = CalendarMirror(max_staleness=0, past_days=7)
+    before = [event["id"] for event in mirror.query(service, _day(0), _day(1))]
+    removed, moved = before[0], before[1]
+
+    service.events().delete(calendarId=CALENDAR_ID, eventId=removed).execute()
+    tomorrow = datetime.datetime.fromisoformat(_day(5)) + datetime.timedelta(hours=9)
+    service.events().patch(calendarId=CALENDAR_ID, eventId=moved, body={
+        "start": {"dateTime": tomorrow.isoformat()}, "end": {"dateTime": (tomorrow + datetime.timedelta(hours=1)).isoformat()},
+    }).execute()
+    created = service.events().insert(calendarId=CALENDAR_ID, body=_new_event("Họp mới")).execute()
+
+    today = _ids(mirror.query(service, _day(0), _day(1)))
+    assert removed not in today and moved not in today
+    assert created["id"] in today
+    assert today == _api_ids(service, _day(0), _day(1))
+    assert moved in [event["id"] for event in mirror.query(service, _day(5), _day(6))]
+    assert mirror.stats()["full_syncs"] == 1
+    assert mirror.stats()["incremental_syncs"] >= 1
+
+
+def test_expired_sync_token_forces_full_resync(service, google_api):
+    mirror = CalendarMirror(max_staleness=0, past_days=7)
+    mirror.query(service, _day(0), _day(1))
+    service.events().insert(calendarId=CALENDAR_ID, body=_new_event("Sau 410")).execute()
+
+    google_api.fail_next(1, status=410)
+    events = mirror.query(service, _day(0), _day(1))
+    assert "Sau 410" in [event["summary"] for event in events]
+    assert _ids(events) == _api_ids(service, _day(0), _day(1))
+    assert mirror.stats()["full_syncs"] == 2
+
+
+def test_async_query_matches_sync_query(service, google_api):
+    mirror = CalendarMirror(max_staleness=0, past_days=7)
+    expected = _ids(mirror.query(service, _day(-1), _day(2)))
+    google_api.fail_next(1, status=410)
+    events = asyncio.run(mirror.aquery(service, _day(-1), _day(2)))
+    assert _ids(events) == expected
+    assert mirror.stats()["full_syncs"] == 2
+
+
+def test_write_patches_are_visible_before_next_sync(service):
+    mirror = CalendarMirror(max_staleness=60, past_days=7)
+    mirror.query(service, _day(0), _day(1))
+    created = service.events().insert(calendarId=CALENDAR_ID, body=_new_event("Vừa tạo")).execute()
+    mirror.upsert(created)
+    assert created["id"] in [event["id"] for event in mirror.query(service, _day(0), _day(1))]
+    mirror.remove(created["id"])
+    assert mirror.get(created["id"]) is None
+
+
+def test_concurrent_async_syncs_are_serialized(service):
+    mirror = CalendarMirror(max_staleness=60, past_days=7)
+
+    async def scenario():
+        return await asyncio.gather(*(mirror.aquery(service, _day(0), _day(1)) for _ in range(4)))
+
+    results = asyncio.run(scenario())
+    assert all(_ids(events) == _api_ids(service, _day(0), _day(1)) for events in results)
+    assert mirror.stats()["full_syncs"] == 1
+    assert mirror.stats()["incremental_syncs"] == 0
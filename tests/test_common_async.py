@@ -0,0 +1,49 @@
+# intelligent_agent_platform/tests/test_common_async.py
+
+import asyncio
+import threading
+
+from google.oauth2.credentials import Credentials
+from google_auth_httplib2 import AuthorizedHttp
+
+import tools.common_async as common_async
+from config import TASK_LIST_ID
+from tools.common_async import aexecute, async_lock
+
+
+def test_expired_credentials_are_refreshed_off_the_event_loop(google_api, monkeypatch):
+    service = google_api.build_service("tasks", "v1")
+    threads = []
+
+    def get_credentials():
+        threads.append(threading.current_thread())
+        return Credentials(token="moi")
+
+    monkeypatch.setattr(common_async, "get_credentials", get_credentials)
+
+    async def scenario():
+        request = service.tasks().list(tasklist=TASK_LIST_ID)
+        request.http = AuthorizedHttp(Credentials(token=None))
+        return threading.current_thread(), await aexecute(request)
+
+    loop_thread, response = asyncio.run(scenario())
+    assert "items" in response
+    assert threads and threads[0] is not loop_thread
+
+
+def test_async_lock_excludes_threads_and_survives_cancellation():
+    lock = threading.Lock()
+
+    async def scenario():
+        lock.acquire()
+        waiter = asyncio.create_task(async_lock(lock).__aenter__())
+        await asyncio.sleep(0.03)
+        assert not waiter.done()
+        waiter.cancel()
+        await asyncio.gather(waiter, return_exceptions=True)
+        lock.release()
+        async with async_lock(lock):
+            assert lock.locked()
+
+    asyncio.run(scenario())
+    assert not lock.locked()
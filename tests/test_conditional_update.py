@@ -0,0 +1,175 @@
+# intelligent_agent_platform/tests/test_conditional_update.py
+
+import asyncio
+
+import pytest
+from googleapiclient.errors import HttpError
+
+import tools.google_calendar_tools as calendar_module
+import tools.google_tasks_tools as tasks_module
+from config import CALENDAR_ID, CONDITIONAL_UPDATE_MAX_RETRIES, TASK_LIST_ID
+from tools.calendar_mirror import CalendarMirror
+from tools.common_patch import ConcurrentEditError, apatch_if_unchanged, patch_if_unchanged
+from tools.tasks_cache import TaskCache
+
+
+@pytest.fixture
+def service(google_api):
+    return google_api.build_service("calendar", "v3")
+
+
+@pytest.fixture
+def other(google_api):
+    """Service của một phiên khác sửa cùng dữ liệu."""
+    return google_api.build_service("calendar", "v3")
+
+
+def _requests(service, event_id: str, patch: dict):
+    return (
+        lambda: service.events().patch(calendarId=CALENDAR_ID, eventId=event_id, body=patch),
+        lambda: service.events().get(calendarId=CALENDAR_ID, eventId=event_id),
+    )
+
+
+def _read(service, event_id: str) -> dict:
+    return service.events().get(calendarId=CALENDAR_ID, eventId=event_id).execute()
+
+
+def test_unchanged_resource_is_patched_in_one_request(service, google_api):
+    known = _read(service, "evt000010")
+    requests = google_api.request_count
+    patch = {"summary": "Tiêu đề mới"}
+    updated = patch_if_unchanged(patch, *_requests(service, "evt000010", patch), known)
+    assert updated["summary"] == "Tiêu đề mới"
+    assert google_api.request_count == requests + 1
+
+
+def test_412_on_other_field_is_retried_without_losing_it(service, other, google_api):
+    known = _read(service, "evt000010")
+    other.events().patch(calendarId=CALENDAR_ID, eventId="evt000010", body={"description": "Phiên khác"}).execute()
+    patch = {"summary": "Tiêu đề mới"}
+    updated = patch_if_unchanged(patch, *_requests(service, "evt000010", patch), known)
+    assert updated["summary"] == "Tiêu đề mới"
+    assert google_api.calendar.events["evt000010"]["description"] == "Phiên khác"
+
+
+def test_412_on_same_field_raises_conflict(service, other, google_api):
+    known = _read(service, "evt000010")
+    other.events().patch(calendarId=CALENDAR_ID, eventId="evt000010", body={"summary": "Phiên khác"}).execute()
+    patch = {"summary": "Tiêu đề mới", "location": "Phòng 2"}
+    with pytest.raises(ConcurrentEditError) as info:
+        patch_if_unchanged(patch, *_requests(service, "evt000010", patch), known)
+    assert info.value.fields == ["summary"]
+    assert info.value.latest["summary"] == "Phiên khác"
+    assert google_api.calendar.events["evt000010"]["summary"] == "Phiên khác"
+    assert "location" not in google_api.calendar.events["evt000010"]
+
+
+def test_412_with_same_value_is_not_a_conflict(service, other, google_api):
+    known = _read(service, "evt000010")
+    other.events().patch(calendarId=CALENDAR_ID, eventId="evt000010", body={"summary": "Tiêu đề mới"}).execute()
+    patch = {"summary": "Tiêu đề mới", "location": "Phòng 2"}
+    updated = patch_if_unchanged(patch, *_requests(service, "evt000010", patch), known)
+    assert updated["summary"] == "Tiêu đề mới" and updated["location"] == "Phòng 2"
+
+
+def test_async_conflict_detection(service, other, google_api):
+    known = _read(service, "evt000011")
+    other.events().patch(calendarId=CALENDAR_ID, eventId="evt000011", body={"description": "Phiên khác"}).execute()
+
+    async def scenario():
+        patch = {"description": "Của agent"}
+        await apatch_if_unchanged(patch, *_requests(service, "evt000011", patch), known)
+
+    with pytest.raises(ConcurrentEditError):
+        asyncio.run(scenario())
+    assert google_api.calendar.events["evt000011"]["description"] == "Phiên khác"
+
+
+def test_gives_up_after_max_retries(service, other):
+    known = _read(service, "evt000012")
+    patch = {"summary": "Tiêu đề mới"}
+    make_patch, make_get = _requests(service, "evt000012", patch)
+    edits = []
+
+    def edit():
+        # Phiên khác sửa một trường khác giữa mỗi lần agent đọc lại và ghi lại
+        edits.append(1)
+        other.events().patch(calendarId=CALENDAR_ID, eventId="evt000012", body={"description": f"Lần {len(edits)}"}).execute()
+
+    class EditAfterRead:
+        def execute(self):
+            latest = make_get().execute()
+            edit()
+            return latest
+
+    edit()
+    with pytest.raises(HttpError) as info:
+        patch_if_unchanged(patch, make_patch, EditAfterRead, known)
+    assert info.value.resp.status == 412
+    assert len(edits) == CONDITIONAL_UPDATE_MAX_RETRIES + 1
+
+
+@pytest.fixture
+def calendar_tools(google_api, monkeypatch):
+    monkeypatch.setattr(calendar_module, "get_google_service", google_api.service_factory())
+    monkeypatch.setattr(calendar_module, "calendar_mirror", CalendarMirror())
+    calendar_module.list_events.invoke({})
+    return calendar_module
+
+
+def test_update_event_reports_conflict_instead_of_overwriting(calendar_tools, other, google_api):
+    event_id = next(iter(calendar_tools.calendar_mirror._index.events))
+    other.events().patch(calendarId=CALENDAR_ID, eventId=event_id, body={"summary": "Phiên khác"}).execute()
+    result = calendar_tools.update_event.invoke({"event_id": event_id, "new_summary": "Của agent"})
+    assert result.startswith("Lỗi: Sự kiện 'Phiên khác' vừa bị thay đổi")
+    assert google_api.calendar.events[event_id]["summary"] == "Phiên khác"
+    # Bản sao được cập nhật bằng bản mới nhất: lần gọi lại (sau khi người dùng xác nhận) sẽ thành công
+    assert calendar_tools.calendar_mirror.get(event_id)["summary"] == "Phiên khác"
+    result = calendar_tools.update_event.invoke({"event_id": event_id, "new_summary": "Của agent"})
+    assert result.startswith("Đã cập nhật")
+    assert google_api.calendar.events[event_id]["summary"] == "Của agent"
+
+
+def test_async_update_event_retries_unrelated_change(calendar_tools, other, google_api):
+    event_id = next(iter(calendar_tools.calendar_mirror._index.events))
+    other.events().patch(calendarId=CALENDAR_ID, eventId=event_id, body={"location": "Phòng 3"}).execute()
+    result = asyncio.run(calendar_tools.update_event.ainvoke({"event_id": event_id, "new_summary": "Của agent"}))
+    assert result.startswith("Đã cập nhật")
+    assert google_api.calendar.events[event_id]["summary"] == "Của agent"
+    assert google_api.calendar.events[event_id]["location"] == "Phòng 3"
+
+
+@pytest.fixture
+def tasks_tools(google_api, monkeypatch):
+    monkeypatch.setattr(tasks_module, "get_google_service", google_api.service_factory())
+    monkeypatch.setattr(tasks_module, "task_cache", TaskCache())
+    tasks_module.list_tasks.invoke({})
+    return tasks_module
+
+
+def test_update_task_conflict_and_retry(tasks_tools, google_api):
+    other = google_api.build_service("tasks", "v1")
+    other.tasks().patch(tasklist=TASK_LIST_ID, task="task00001", body={"notes": "Phiên khác"}).execute()
+    result = tasks_tools.update_task.invoke({"task_id": "task00001", "new_status": "completed"})
+    assert result.startswith("Đã cập nhật")
+    assert google_api.tasks.tasks["task00001"]["notes"] == "Phiên khác"
+
+    other.tasks().patch(tasklist=TASK_LIST_ID, task="task00001", body={"status": "needsAction"}).execute()
+    result = tasks_tools.update_task.invoke({"task_id": "task00001", "new_status": "completed"})
+    assert "vừa bị thay đổi ở nơi khác" in result
+    assert google_api.tasks.tasks["task00001"]["status"] == "needsAction"
+
+
+def test_bulk_update_rejects_only_stale_items(tasks_tools, google_api):
+    other = google_api.build_service("tasks", "v1")
+    other.tasks().patch(tasklist=TASK_LIST_ID, task="task00002", body={"title": "Phiên khác"}).execute()
+    result = tasks_tools.update_tasks_bulk.invoke({"updates": [
+        {"task_id": "task00001", "new_title": "Một"},
+        {"task_id": "task00002", "new_title": "Hai"},
+    ]})
+    assert google_api.tasks.tasks["task00001"]["title"] == "Một"
+    assert google_api.tasks.tasks["task00002"]["title"] == "Phiên khác"
+    lines = result.splitlines()
+    assert any("task00001" in line and "OK" in line for line in lines)
+    assert any("task00002" in line and "đã bị thay đổi ở nơi khác" in line for line in lines)
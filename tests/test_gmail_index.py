@@ -0,0 +1,122 @@
+# intelligent_agent_platform/tests/test_gmail_index.py
+
+import gc
+import weakref
+
+import pytest
+
+import tools.gmail_index as gmail_index_module
+import tools.google_gmail_tools as gmail_module
+from tools.common_auth import UserScoped, use_google_user
+from tools.gmail_index import GmailIndex, get_gmail_index
+from tools.google_gmail_tools import _build_search_query
+
+
+@pytest.fixture
+def service(google_api):
+    return google_api.build_service("gmail", "v1")
+
+
+@pytest.fixture
+def index(tmp_path, service):
+    index = GmailIndex(path=str(tmp_path / "gmail_index.sqlite"), max_messages=1000, max_staleness=0)
+    index.sync(service)
+    return index
+
+
+def _api_ids(service, query=None, from_sender=None, label=None, is_unread=False, max_results=5) -> list:
+    q = _build_search_query(query, from_sender, label, is_unread)
+    response = service.users().messages().list(userId="me", q=q, maxResults=max_results).execute()
+    return [message["id"] for message in response.get("messages", [])]
+
+
+@pytest.mark.parametrize("filters", [
+    {},
+    {"is_unread": True},
+    {"label": "Project X"},
+    {"label": "inbox", "is_unread": True, "max_results": 3},
+    {"from_sender": "sender5@example.com"},
+    {"query": "Email", "max_results": 10},
+])
+def test_search_matches_api(index, service, filters):
+    filters = {"query": None, "from_sender": None, "label": None, "is_unread": False, "max_results": 5, **filters}
+    rows = index.search(**filters)
+    assert [row[0] for row in rows] == _api_ids(service, **filters)
+
+
+@pytest.mark.parametrize("query", ["báo cáo OR hợp đồng", "-quảng cáo", "subject:họp", '"Email số 3"', "có*"])
+def test_search_operators_fall_back_to_api(index, query):
+    assert index.search(query, None, None, False, 5) is None
+    assert index.stats()["misses"] == 1
+
+
+def test_unknown_label_falls_back_to_api(index):
+    assert index.search(None, None, "Nhãn không tồn tại", False, 5) is None
+
+
+def test_search_before_first_sync_falls_back_to_api(tmp_path):
+    index = GmailIndex(path=str(tmp_path / "empty.sqlite"))
+    assert index.search(None, None, None, False, 5) is None
+
+
+def test_partial_index_only_answers_when_enough_rows(tmp_path, service):
+    index = GmailIndex(path=str(tmp_path / "partial.sqlite"), max_messages=20, max_staleness=0)
+    index.sync(service)
+    assert index.stats()["messages"] == 20
+    # Đủ kết quả trong phần mới nhất của hộp thư: chỉ mục trả lời được
+    assert [row[0] for row in index.search(None, None, None, True, 3)] == _api_ids(service, is_unread=True, max_results=3)
+    # Ít kết quả hơn max_results: có thể còn message cũ hơn ngoài chỉ mục
+    assert index.search(None, "sender5@example.com", None, False, 5) is None
+
+
+def test_incremental_sync_applies_history(index, service, google_api):
+    google_api.gmail.receive(2)
+    newest = google_api.gmail.order[0]
+    google_api.gmail.mark_read(newest)
+    google_api.gmail.delete("msg000003")
+    index.sync(service)
+    assert index.stats()["full_syncs"] == 1
+    assert index.stats()["incremental_syncs"] == 1
+    assert [row[0] for row in index.search(None, None, None, False, 5)] == _api_ids(service)
+    assert [row[0] for row in index.search(None, None, None, True, 5)] == _api_ids(service, is_unread=True)
+
+
+def test_expired_history_id_forces_full_sync(index, service, google_api):
+    google_api.gmail.receive(1)
+    google_api.fail_next(1, status=404)
+    index.sync(service)
+    assert index.stats()["full_syncs"] == 2
+    assert [row[0] for row in index.search(None, None, None, False, 5)] == _api_ids(service)
+
+
+def test_list_emails_counts_index_errors_and_uses_api(google_api, index, monkeypatch, capsys):
+    monkeypatch.setattr(gmail_module, "get_google_service", google_api.service_factory())
+    monkeypatch.setattr(gmail_module, "GMAIL_INDEX_ENABLED", True)
+    monkeypatch.setattr(gmail_module, "get_gmail_index", lambda: index)
+
+    assert "msg000000" in gmail_module.list_emails.invoke({"max_results": 3})
+    assert index.stats()["hits"] == 1
+
+    # Lần đồng bộ tăng dần bị lỗi (400 không thử lại): vẫn trả lời bằng Gmail API và đếm lỗi
+    google_api.fail_next(1, status=400)
+    result = gmail_module.list_emails.invoke({"max_results": 3})
+    assert not result.startswith("Lỗi") and "msg000000" in result
+    assert index.stats()["errors"] == 1
+    assert index.stats()["hits"] == 1
+
+
+def test_per_user_indexes_are_bounded_and_closed(tmp_path, monkeypatch):
+    monkeypatch.setattr(gmail_index_module, "GMAIL_INDEX_DB", str(tmp_path / "gmail_index.sqlite"))
+    scoped = UserScoped(gmail_index_module._gmail_index._factory, max_users=2)
+    monkeypatch.setattr(gmail_index_module, "_gmail_index", scoped)
+    indexes = {}
+    for user_id in ("a", "b", "a", "c"):
+        with use_google_user(user_id):
+            indexes.setdefault(user_id, get_gmail_index())
+            assert get_gmail_index() is indexes[user_id]
+    assert set(scoped._instances) == {"a", "c"}
+    assert len(list(tmp_path.glob("gmail_index.*.sqlite"))) == 3
+    # Chỉ mục bị loại không còn ai giữ thì kết nối sqlite được đóng theo
+    evicted = weakref.ref(indexes.pop("b"))
+    gc.collect()
+    assert evicted() is None
@@ -0,0 +1,107 @@
+# intelligent_agent_platform/tests/test_id_aliases.py
+
+import pytest
+from langchain_core.messages import HumanMessage, ToolMessage
+from langgraph.checkpoint.memory import InMemorySaver
+
+import tools.common_format as format_module
+import tools.google_tasks_tools as tasks_module
+from agent import create_agent
+from benchmarks.fake_chat_model import ScenarioChatModel
+from checkpoint import thread_config
+from fast_path import FastPath
+from tools.common_format import EVENT_ID, TASK_ID, IdAliases, collect_ids, register_id
+from tools.tasks_cache import TaskCache
+
+
+def test_aliases_are_numbered_per_kind_and_stable():
+    aliases = IdAliases()
+    assert aliases.alias("task-aaa", TASK_ID) == "T1"
+    assert aliases.alias("evt-bbb", EVENT_ID) == "E1"
+    assert aliases.alias("task-ccc", TASK_ID) == "T2"
+    assert aliases.alias("task-aaa", TASK_ID) == "T1"
+    assert aliases.added == {"T1": "task-aaa", "E1": "evt-bbb", "T2": "task-ccc"}
+
+
+def test_existing_mapping_continues_numbering():
+    aliases = IdAliases({"T1": "task-aaa", "T2": "task-ccc"})
+    assert aliases.alias("task-ddd", TASK_ID) == "T3"
+    assert aliases.added == {"T3": "task-ddd"}
+
+
+def test_resolve_args_only_touches_id_parameters():
+    aliases = IdAliases({"T1": "task-aaa", "T2": "task-ccc", "E1": "evt-bbb"})
+    args = {"task_id": " T1 ", "new_title": "T2", "event_ids": ["E1", "khong-phai-alias"]}
+    assert aliases.resolve_args(args) == {"task_id": "task-aaa", "new_title": "T2", "event_ids": ["evt-bbb", "khong-phai-alias"]}
+
+
+def test_resolve_args_inside_bulk_items():
+    aliases = IdAliases({"T1": "task-aaa", "T2": "task-ccc"})
+    args = {"updates": [{"task_id": "T1", "new_title": "T2"}, {"task_id": "T2", "new_status": "completed"}]}
+    assert aliases.resolve_args(args) == {
+        "updates": [{"task_id": "task-aaa", "new_title": "T2"}, {"task_id": "task-ccc", "new_status": "completed"}],
+    }
+
+
+def test_shorten_prefers_longer_ids():
+    aliases = IdAliases()
+    aliases.alias("abc", TASK_ID)
+    aliases.alias("abc123", TASK_ID)
+    assert aliases.shorten("abc123 | abc") == "T2 | T1"
+
+
+def test_short_ids_are_not_collected():
+    with collect_ids() as collected:
+        register_id("x" * (format_module.RESULT_ID_ALIAS_MIN_LENGTH - 1), TASK_ID)
+        register_id("y" * format_module.RESULT_ID_ALIAS_MIN_LENGTH, TASK_ID)
+    assert collected == [(TASK_ID, "y" * format_module.RESULT_ID_ALIAS_MIN_LENGTH)]
+
+
+@pytest.fixture
+def tasks_agent(google_api, monkeypatch):
+    # ID của server giả lập (task00000) ngắn hơn ID thật của Google
+    monkeypatch.setattr(format_module, "RESULT_ID_ALIAS_MIN_LENGTH", 5)
+    monkeypatch.setattr(tasks_module, "get_google_service", google_api.service_factory())
+    monkeypatch.setattr(tasks_module, "task_cache", TaskCache())
+    model = ScenarioChatModel(scripts={
+        "Liệt kê công việc": [[{"name": "list_tasks", "args": {}}], "Đây là danh sách."],
+        "Đánh dấu việc thứ hai là xong": [[{"name": "update_task", "args": {"task_id": "T2", "new_status": "completed"}}], "Xong."],
+        "Xoá hai việc đầu": [[{"name": "delete_task", "args": {"task_id": "T1"}}, {"name": "delete_task", "args": {"task_id": "T2"}}], "Đã xoá."],
+    })
+    tools = tasks_module.tasks_tools
+    return create_agent(tools, model=model, checkpointer=InMemorySaver(), fast_path=FastPath(tools, intents=[]), id_aliases=True)
+
+
+def _turn(agent, text: str, thread: str = "aliases") -> dict:
+    return agent.invoke({"messages": [HumanMessage(content=text)]}, thread_config(thread))
+
+
+def test_follow_up_turn_resolves_alias_from_checkpoint(google_api, tasks_agent):
+    state = _turn(tasks_agent, "Liệt kê công việc")
+    listing = next(m for m in state["messages"] if isinstance(m, ToolMessage)).content
+    # Model chỉ thấy alias, không thấy ID thật
+    assert "T1" in listing and "task00000" not in listing
+    real_id = state["id_aliases"]["T2"]
+    assert google_api.tasks.tasks[real_id]["status"] == "needsAction"
+
+    state = _turn(tasks_agent, "Đánh dấu việc thứ hai là xong")
+    assert google_api.tasks.tasks[real_id]["status"] == "completed"
+    assert "không tìm thấy" not in state["messages"][-2].content.lower()
+
+
+def test_parallel_tool_calls_resolve_their_own_alias(google_api, tasks_agent):
+    state = _turn(tasks_agent, "Liệt kê công việc")
+    first, second = state["id_aliases"]["T1"], state["id_aliases"]["T2"]
+    _turn(tasks_agent, "Xoá hai việc đầu")
+    assert google_api.tasks.tasks[first].get("deleted")
+    assert google_api.tasks.tasks[second].get("deleted")
+    assert not google_api.tasks.tasks[state["id_aliases"]["T3"]].get("deleted")
+
+
+def test_aliases_are_per_conversation(google_api, tasks_agent):
+    _turn(tasks_agent, "Liệt kê công việc", thread="a")
+    statuses = {task_id: task["status"] for task_id, task in google_api.tasks.tasks.items()}
+    state = _turn(tasks_agent, "Đánh dấu việc thứ hai là xong", thread="b")
+    # Cuộc hội thoại mới chưa có alias nào: "T2" được gửi nguyên cho API và không khớp công việc nào
+    assert "Không tìm thấy công việc" in state["messages"][-2].content
+    assert {task_id: task["status"] for task_id, task in google_api.tasks.tasks.items()} == statuses
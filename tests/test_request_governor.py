@@ -0,0 +1,208 @@
+# intelligent_agent_platform/tests/test_request_governor.py
+
+import asyncio
+import time
+
+import aiohttp
+import httplib2
+import pytest
+from googleapiclient.errors import HttpError
+
+from config import TASK_LIST_ID
+from tools.common_execution import CircuitBreaker, CircuitOpenError
+
+
+def _open(breaker: CircuitBreaker):
+    for _ in range(breaker.threshold):
+        breaker.record(success=False)
+
+
+def test_breaker_opens_after_threshold_failures():
+    breaker = CircuitBreaker(threshold=3, cooldown=60)
+    breaker.record(success=False)
+    breaker.record(success=False)
+    assert breaker.state == "closed"
+    assert breaker.before_call() is None
+    breaker.record(success=False)
+    assert breaker.state == "open"
+    assert 0 < breaker.before_call() <= 60
+
+
+def test_success_resets_failure_count():
+    breaker = CircuitBreaker(threshold=2, cooldown=60)
+    breaker.record(success=False)
+    breaker.record(success=True)
+    breaker.record(success=False)
+    assert breaker.state == "closed"
+
+
+def test_half_open_admits_a_single_probe():
+    breaker = CircuitBreaker(threshold=1, cooldown=0.01)
+    _open(breaker)
+    time.sleep(0.02)
+    assert breaker.state == "half_open"
+    assert breaker.before_call() is None
+    # Các request khác chờ kết quả của lượt thử
+    assert breaker.before_call() == breaker.cooldown
+
+
+def test_probe_result_closes_or_reopens():
+    breaker = CircuitBreaker(threshold=1, cooldown=0.01)
+    _open(breaker)
+    time.sleep(0.02)
+    breaker.before_call()
+    breaker.record(success=False)
+    assert breaker.state == "open"
+
+    time.sleep(0.02)
+    assert breaker.before_call() is None
+    breaker.record(success=True)
+    assert breaker.state == "closed"
+    assert breaker.before_call() is None
+
+
+def test_retry_after_beyond_backoff_opens_immediately():
+    breaker = CircuitBreaker(threshold=5, cooldown=0.01)
+    breaker.record(success=False, open_for=30)
+    assert breaker.state == "open"
+    assert breaker.before_call() > 1
+
+
+def _half_open(governor, service: str) -> CircuitBreaker:
+    breaker = governor._breaker(service)
+    _open(breaker)
+    time.sleep(breaker.cooldown + 0.01)
+    return breaker
+
+
+def test_probe_released_when_call_raises_unexpected_error(governor):
+    breaker = _half_open(governor, "tasks")
+
+    def broken():
+        raise RuntimeError("lỗi ngoài dự kiến")
+
+    with pytest.raises(RuntimeError):
+        governor.call("tasks", broken)
+    # Lượt thử đã được trả lại: request sau vẫn được gọi thay vì bị CircuitOpenError mãi mãi
+    assert governor.call("tasks", lambda: "ok") == "ok"
+    assert breaker.state == "closed"
+
+
+def test_probe_released_when_acall_is_cancelled(governor):
+    breaker = _half_open(governor, "tasks")
+
+    async def scenario():
+        task = asyncio.create_task(governor.acall("tasks", lambda: asyncio.sleep(10)))
+        await asyncio.sleep(0.01)
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+
+        async def ok():
+            return "ok"
+
+        return await governor.acall("tasks", ok)
+
+    assert asyncio.run(scenario()) == "ok"
+    assert breaker.state == "closed"
+
+
+@pytest.mark.parametrize("error", [
+    aiohttp.ClientConnectionError("kết nối bị đóng"),
+    aiohttp.ServerDisconnectedError(),
+    httplib2.ServerNotFoundError("không phân giải được tên miền"),
+    ConnectionResetError(),
+    TimeoutError(),
+])
+def test_transient_errors_are_retried_for_idempotent_requests(governor, error):
+    attempts = []
+
+    def flaky():
+        attempts.append(1)
+        if len(attempts) == 1:
+            raise error
+        return "ok"
+
+    assert governor.call("gmail", flaky, "GET") == "ok"
+    assert len(attempts) == 2
+    assert governor.stats()["gmail"]["retried"] == 1
+
+
+def test_transient_errors_are_not_retried_for_post(governor):
+    attempts = []
+
+    def flaky():
+        attempts.append(1)
+        raise aiohttp.ClientConnectionError()
+
+    with pytest.raises(aiohttp.ClientConnectionError):
+        governor.call("gmail", flaky, "POST")
+    assert len(attempts) == 1
+
+
+def test_async_transient_errors_are_retried(governor):
+    attempts = []
+
+    async def flaky():
+        attempts.append(1)
+        if len(attempts) < 3:
+            raise aiohttp.ClientConnectionError()
+        return "ok"
+
+    assert asyncio.run(governor.acall("calendar", flaky, "GET")) == "ok"
+    assert len(attempts) == 3
+
+
+def test_server_errors_are_retried_for_get(google_api, governor):
+    service = google_api.build_service("tasks", "v1")
+    google_api.fail_next(2, status=503)
+    response = service.tasks().list(tasklist=TASK_LIST_ID).execute()
+    assert response["items"]
+    assert governor.stats()["tasks"]["retried"] == 2
+    assert governor.stats()["tasks"]["circuit"] == "closed"
+
+
+def test_server_errors_are_not_retried_for_post(google_api, governor):
+    service = google_api.build_service("tasks", "v1")
+    tasks_before = len(google_api.tasks.tasks)
+    google_api.fail_next(1, status=500)
+    with pytest.raises(HttpError) as info:
+        service.tasks().insert(tasklist=TASK_LIST_ID, body={"title": "Không tạo trùng"}).execute()
+    assert info.value.resp.status == 500
+    assert len(google_api.tasks.tasks) == tasks_before
+    assert "retried" not in governor.stats()["tasks"]
+
+
+def test_rate_limited_post_is_retried(google_api, governor):
+    service = google_api.build_service("tasks", "v1")
+    google_api.fail_next(1, status=429, retry_after=0)
+    created = service.tasks().insert(tasklist=TASK_LIST_ID, body={"title": "Sau 429"}).execute()
+    assert google_api.tasks.tasks[created["id"]]["title"] == "Sau 429"
+    assert governor.stats()["tasks"]["retry_after"] == 1
+
+
+def test_open_circuit_rejects_without_calling_google(google_api, governor):
+    service = google_api.build_service("tasks", "v1")
+    # Mỗi request hết lượt thử lại (1 + max_retries lần 503) là một lần thất bại của breaker
+    google_api.fail_next(governor._circuit_failures * (governor.max_retries + 1), status=503)
+    for _ in range(governor._circuit_failures):
+        with pytest.raises(HttpError):
+            service.tasks().list(tasklist=TASK_LIST_ID).execute()
+    requests = google_api.request_count
+    with pytest.raises(CircuitOpenError):
+        service.tasks().list(tasklist=TASK_LIST_ID).execute()
+    assert google_api.request_count == requests
+    assert governor.stats()["tasks"]["circuit"] == "open"
+
+    # Hết cooldown: lượt thử thành công đóng mạch
+    time.sleep(governor._circuit_cooldown + 0.01)
+    assert service.tasks().list(tasklist=TASK_LIST_ID).execute()["items"]
+    assert governor.stats()["tasks"]["circuit"] == "closed"
+
+
+def test_client_errors_do_not_open_the_circuit(google_api, governor):
+    service = google_api.build_service("tasks", "v1")
+    for _ in range(governor._circuit_failures + 1):
+        with pytest.raises(HttpError):
+            service.tasks().get(tasklist=TASK_LIST_ID, task="khong-ton-tai").execute()
+    assert governor.stats()["tasks"]["circuit"] == "closed"
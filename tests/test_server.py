@@ -0,0 +1,193 @@
+# intelligent_agent_platform/tests/test_server.py
+
+import asyncio
+
+import pytest
+from cryptography.fernet import Fernet
+from starlette.testclient import TestClient
+
+import tools.google_gmail_tools as gmail_module
+from benchmarks.bench_server import _fake_credentials
+from benchmarks.fake_chat_model import ScriptedChatModel
+from server import Rejected, TurnScheduler, create_app
+from tools.common_auth import user_credentials
+from tools.credential_store import CredentialStore
+
+
+async def _hold(scheduler: TurnScheduler, user_id: str, release: asyncio.Event, log: list = None, name: str = None):
+    async with scheduler.turn(user_id):
+        if log is not None:
+            log.append(name)
+        await release.wait()
+
+
+async def _started(*tasks):
+    # Cho các task chạy tới điểm chờ đầu tiên
+    for _ in range(5):
+        await asyncio.sleep(0)
+    return tasks
+
+
+def test_per_user_limit_returns_429():
+    async def scenario():
+        scheduler = TurnScheduler(max_concurrent=4, max_per_user=2, max_pending=10, queue_timeout=5)
+        release = asyncio.Event()
+        held = await _started(*(asyncio.create_task(_hold(scheduler, "a", release)) for _ in range(2)))
+        with pytest.raises(Rejected) as info:
+            async with scheduler.turn("a"):
+                pass
+        assert info.value.status == 429 and info.value.retry_after >= 1
+        # Người dùng khác không bị ảnh hưởng
+        async with scheduler.turn("b"):
+            pass
+        release.set()
+        await asyncio.gather(*held)
+        return scheduler.stats()
+
+    stats = asyncio.run(scenario())
+    assert stats["rejected_user"] == 1
+    assert stats["completed"] == 3
+    assert stats["users"] == 0 and stats["running"] == 0 and stats["waiting"] == 0
+
+
+def test_server_pending_limit_returns_503():
+    async def scenario():
+        scheduler = TurnScheduler(max_concurrent=1, max_per_user=5, max_pending=3, queue_timeout=5)
+        release = asyncio.Event()
+        held = await _started(*(asyncio.create_task(_hold(scheduler, f"user{i}", release)) for i in range(3)))
+        assert scheduler.stats()["running"] == 1 and scheduler.stats()["waiting"] == 2
+        with pytest.raises(Rejected) as info:
+            async with scheduler.turn("user9"):
+                pass
+        assert info.value.status == 503
+        release.set()
+        await asyncio.gather(*held)
+        return scheduler.stats()
+
+    stats = asyncio.run(scenario())
+    assert stats["rejected_server"] == 1
+    assert stats["completed"] == 3
+
+
+def test_queue_timeout_returns_503_and_releases_the_queue():
+    async def scenario():
+        scheduler = TurnScheduler(max_concurrent=1, max_per_user=5, max_pending=10, queue_timeout=0.05)
+        release = asyncio.Event()
+        (held,) = await _started(asyncio.create_task(_hold(scheduler, "a", release)))
+        for user_id in ("b", "a"):
+            with pytest.raises(Rejected) as info:
+                async with scheduler.turn(user_id):
+                    pass
+            assert info.value.status == 503
+        release.set()
+        await held
+        # Hàng đợi của "a" không bị kẹt sau lượt hết giờ chờ
+        async with scheduler.turn("a"):
+            pass
+        return scheduler.stats()
+
+    stats = asyncio.run(scenario())
+    assert stats["queue_timeouts"] == 2
+    assert stats["completed"] == 2
+    assert stats["users"] == 0 and stats["waiting"] == 0
+
+
+def test_turns_of_one_user_run_in_order():
+    async def scenario():
+        scheduler = TurnScheduler(max_concurrent=8, max_per_user=5, max_pending=10, queue_timeout=5)
+        log = []
+        releases = [asyncio.Event() for _ in range(4)]
+        tasks = [asyncio.create_task(_hold(scheduler, "a", release, log, i)) for i, release in enumerate(releases)]
+        await _started(*tasks)
+        for i, release in enumerate(releases):
+            assert log == list(range(i + 1))
+            assert scheduler.stats()["running"] == 1
+            release.set()
+            await tasks[i]
+            await _started()
+        return log
+
+    assert asyncio.run(scenario()) == [0, 1, 2, 3]
+
+
+def test_concurrency_limit_across_users():
+    async def scenario():
+        scheduler = TurnScheduler(max_concurrent=2, max_per_user=5, max_pending=10, queue_timeout=5)
+        release = asyncio.Event()
+        held = await _started(*(asyncio.create_task(_hold(scheduler, f"user{i}", release)) for i in range(5)))
+        stats = scheduler.stats()
+        release.set()
+        await asyncio.gather(*held)
+        return stats
+
+    stats = asyncio.run(scenario())
+    assert stats["running"] == 2 and stats["waiting"] == 3
+
+
+def test_cancelled_waiting_turn_frees_its_place():
+    async def scenario():
+        scheduler = TurnScheduler(max_concurrent=1, max_per_user=5, max_pending=10, queue_timeout=5)
+        release = asyncio.Event()
+        held, waiting = await _started(*(asyncio.create_task(_hold(scheduler, "a", release)) for _ in range(2)))
+        waiting.cancel()
+        await asyncio.gather(waiting, return_exceptions=True)
+        release.set()
+        await held
+        async with scheduler.turn("a"):
+            pass
+        return scheduler.stats()
+
+    stats = asyncio.run(scenario())
+    assert stats["waiting"] == 0 and stats["users"] == 0
+
+
+@pytest.fixture
+def make_client(google_api, tmp_path, monkeypatch):
+    monkeypatch.setattr(gmail_module, "get_google_service", google_api.service_factory())
+    store = CredentialStore(path=str(tmp_path / "credentials.sqlite"), key=Fernet.generate_key().decode())
+    monkeypatch.setattr(user_credentials, "_store", store)
+    api_key = store.add_user("alice", _fake_credentials())
+
+    def make_client(scheduler: TurnScheduler = None):
+        model = ScriptedChatModel(tool_name="list_emails", tool_args={"max_results": 3}, latency=0)
+        app = create_app(model=model, store=store, checkpoint_path=str(tmp_path / "checkpoints.sqlite"), scheduler=scheduler)
+        return TestClient(app, headers={"Authorization": f"Bearer {api_key}"})
+
+    return make_client
+
+
+def test_chat_runs_a_turn(make_client, google_api):
+    with make_client() as client:
+        response = client.post("/v1/chat", json={"agent": "gmail", "message": "Tóm tắt hộp thư giúp tôi"})
+        assert response.status_code == 200
+        assert response.json()["answer"].startswith("Kết quả:")
+        assert google_api.request_count > 0
+        assert client.get("/healthz").json()["scheduler"]["completed"] == 1
+
+
+def test_chat_rejects_bad_requests(make_client):
+    with make_client() as client:
+        assert client.post("/v1/chat", json={"message": "x"}, headers={"Authorization": "Bearer sai"}).status_code == 401
+        assert client.post("/v1/chat", content=b"{not json").status_code == 400
+        assert client.post("/v1/chat", json=["message"]).status_code == 400
+        assert client.post("/v1/chat", json={"agent": "gmail", "message": {"text": "x"}}).status_code == 400
+        assert client.post("/v1/chat", json={"agent": "khong-co", "message": "x"}).status_code == 400
+
+
+@pytest.mark.parametrize("limits, status", [({"max_per_user": 0}, 429), ({"max_pending": 0}, 503)])
+def test_chat_maps_rejections_to_status(make_client, limits, status):
+    with make_client(TurnScheduler(**limits)) as client:
+        response = client.post("/v1/chat", json={"agent": "gmail", "message": "Tóm tắt hộp thư giúp tôi"})
+        assert response.status_code == status
+        assert int(response.headers["Retry-After"]) >= 1
+
+
+def test_websocket_survives_bad_frames(make_client):
+    with make_client() as client, client.websocket_connect("/v1/ws?agent=gmail&conversation=ws") as ws:
+        for frame in ("không phải JSON", "[1, 2]", '{"message": ""}'):
+            ws.send_text(frame)
+            assert ws.receive_json() == {"type": "error", "status": 400, "error": "Cần một object JSON có 'message'."}
+        ws.send_json({"message": "Tóm tắt hộp thư giúp tôi"})
+        while (event := ws.receive_json())["type"] != "done":
+            assert event["type"] != "error"
+        assert event["answer"].startswith("Kết quả:")
@@ -0,0 +1,34 @@
+# intelligent_agent_platform/tests/test_supervisor.py
+
+import json
+
+from supervisor import _parse_plan
+
+
+def _plan(*steps) -> str:
+    return json.dumps({"steps": list(steps)})
+
+
+def test_skipped_step_does_not_shift_dependencies():
+    steps, reply = _parse_plan(_plan(
+        {"agent": "khong-co", "goal": "x"},
+        {"agent": "gmail", "goal": "A"},
+        {"agent": "calendar", "goal": "B"},
+        {"agent": "tasks", "goal": "C", "depends_on": [1]},
+    ))
+    assert [step["goal"] for step in steps] == ["A", "B", "C"]
+    assert steps[2]["depends_on"] == [0]
+    assert reply == ""
+
+
+def test_dependencies_on_skipped_or_later_steps_are_dropped():
+    steps, _ = _parse_plan(_plan(
+        {"agent": "gmail", "goal": "A", "depends_on": [0, 1, 2, "0"]},
+        {"agent": "calendar"},
+        {"agent": "tasks", "goal": "C", "depends_on": [0, 1, 3]},
+    ))
+    assert [step["depends_on"] for step in steps] == [[], [0]]
+
+
+def test_non_json_answer_is_the_reply():
+    assert _parse_plan("Chào bạn!") == ([], "Chào bạn!")
@@ -0,0 +1,135 @@
+# intelligent_agent_platform/tests/test_tasks_cache.py
+
+import asyncio
+
+import pytest
+
+import tools.tasks_cache as tasks_cache_module
+from config import TASK_LIST_ID
+from tools.tasks_cache import TaskCache
+
+
+@pytest.fixture
+def service(google_api):
+    return google_api.build_service("tasks", "v1")
+
+
+def _latest_update(google_api) -> str:
+    return max(task["updated"] for task in google_api.tasks.tasks.values())
+
+
+def _live_tasks(google_api) -> dict:
+    return {task_id: task for task_id, task in google_api.tasks.tasks.items() if not task.get("deleted")}
+
+
+def test_full_sync_then_cursor_is_latest_update(service, google_api):
+    cache = TaskCache(max_staleness=0)
+    assert {task["id"] for task in cache.query(service)} == set(_live_tasks(google_api))
+    assert cache._plan() == (_latest_update(google_api), None)
+    assert cache.stats()["full_syncs"] == 1
+
+
+def test_unchanged_list_costs_a_single_304(service, google_api):
+    cache = TaskCache(max_staleness=0)
+    cache.query(service)
+    # Lần làm mới đầu tiên: updatedMin lấy lại công việc ở đúng mốc (>=), cursor không đổi nên giữ được ETag
+    cache.query(service)
+    assert cache._plan()[1] is not None
+    requests = google_api.request_count
+    tasks = cache.query(service)
+    assert google_api.request_count == requests + 1
+    assert cache.stats()["not_modified"] == 1
+    assert len(tasks) == len(_live_tasks(google_api))
+
+
+def test_refresh_applies_changes_and_deletes(service, google_api):
+    cache = TaskCache(max_staleness=0)
+    cache.query(service)
+    service.tasks().patch(tasklist=TASK_LIST_ID, task="task00001", body={"title": "Đã đổi tên"}).execute()
+    service.tasks().delete(tasklist=TASK_LIST_ID, task="task00002").execute()
+    created = service.tasks().insert(tasklist=TASK_LIST_ID, body={"title": "Việc mới"}).execute()
+
+    tasks = {task["id"]: task for task in cache.query(service)}
+    assert tasks["task00001"]["title"] == "Đã đổi tên"
+    assert "task00002" not in tasks
+    assert created["id"] in tasks
+    assert set(tasks) == set(_live_tasks(google_api))
+    assert cache._plan()[0] == _latest_update(google_api)
+    assert cache.stats() == {"tasks": len(tasks), "full_syncs": 1, "refreshes": 1, "not_modified": 0}
+
+
+def test_etag_is_dropped_when_the_cursor_moves(service, google_api):
+    cache = TaskCache(max_staleness=0)
+    cache.query(service)
+    cache.query(service)
+    service.tasks().patch(tasklist=TASK_LIST_ID, task="task00003", body={"status": "completed"}).execute()
+    cache.query(service)
+    # ETag của lần trước thuộc về câu truy vấn với updatedMin cũ
+    assert cache._plan() == (_latest_update(google_api), None)
+    assert cache.get("task00003")["status"] == "completed"
+
+
+def test_multi_page_refresh_does_not_keep_etag(service, google_api, monkeypatch):
+    monkeypatch.setattr(tasks_cache_module, "PAGE_SIZE", 5)
+    cache = TaskCache(max_staleness=0)
+    assert len(cache.query(service)) == len(_live_tasks(google_api))
+    cursor = cache._plan()[0]
+    for i in range(12):
+        service.tasks().patch(tasklist=TASK_LIST_ID, task=f"task{i:05d}", body={"notes": "sửa"}).execute()
+    cache.query(service)
+    assert cache._plan() == (_latest_update(google_api), None)
+    assert cache._plan()[0] > cursor
+    assert all(cache.get(f"task{i:05d}")["notes"] == "sửa" for i in range(12))
+
+
+def test_fresh_cache_does_not_call_api(service, google_api):
+    cache = TaskCache(max_staleness=60)
+    cache.query(service)
+    requests = google_api.request_count
+    open_tasks = cache.query(service, only_open=True, due_from="2025-01-05", due_to="2025-01-10")
+    assert google_api.request_count == requests
+    assert [task["id"] for task in open_tasks] == [f"task{i:05d}" for i in range(4, 10) if i % 4]
+
+
+def test_async_refresh_handles_304(service, google_api):
+    cache = TaskCache(max_staleness=0)
+
+    async def scenario():
+        await cache.aquery(service)
+        await cache.aquery(service)
+        service.tasks().patch(tasklist=TASK_LIST_ID, task="task00005", body={"title": "Bất đồng bộ"}).execute()
+        await cache.aquery(service)
+        await cache.aquery(service)
+        return await cache.aquery(service)
+
+    tasks = {task["id"]: task for task in asyncio.run(scenario())}
+    assert tasks["task00005"]["title"] == "Bất đồng bộ"
+    assert cache.stats()["not_modified"] == 1
+    assert cache.stats()["refreshes"] == 3
+
+
+def test_concurrent_async_refreshes_are_serialized(service, google_api):
+    cache = TaskCache(max_staleness=60)
+
+    async def scenario():
+        return await asyncio.gather(*(cache.aquery(service) for _ in range(4)))
+
+    results = asyncio.run(scenario())
+    assert all(len(tasks) == len(_live_tasks(google_api)) for tasks in results)
+    assert cache.stats()["full_syncs"] == 1
+    assert cache.stats()["refreshes"] == 0
+
+
+def test_async_refresh_waits_for_sync_refresh(service, google_api):
+    cache = TaskCache(max_staleness=60)
+
+    async def scenario():
+        # Giả lập một lần refresh đồng bộ đang chạy trên thread khác
+        cache._refresh_lock.acquire()
+        task = asyncio.create_task(cache.aquery(service))
+        await asyncio.sleep(0.05)
+        assert not task.done() and google_api.request_count == 0
+        cache._refresh_lock.release()
+        return await task
+
+    assert len(asyncio.run(scenario())) == len(_live_tasks(google_api))
@@ -0,0 +1,149 @@
+# intelligent_agent_platform/tests/test_tool_cache.py
+
+import asyncio
+
+import pytest
+from langchain_core.tools import tool
+
+import tools.common_cache as cache_module
+import tools.google_tasks_tools as tasks_module
+from tools.common_cache import ToolResultCache, cache_reads, invalidates
+from tools.tasks_cache import TaskCache
+
+
+@pytest.fixture
+def cache(monkeypatch):
+    instance = ToolResultCache(ttl=60, max_entries=10)
+    monkeypatch.setattr(cache_module, "tool_result_cache", instance)
+    monkeypatch.setattr(cache_module, "TOOL_CACHE_ENABLED", True)
+    return instance
+
+
+def _read_tool(calls: list, during=None):
+    """Tool chỉ đọc giả: đếm số lần thật sự chạy; `during()` chạy giữa lúc đọc (mô phỏng một lần ghi xen vào)."""
+
+    @tool
+    def read_items(query: str, limit: int = 5) -> str:
+        """Đọc các mục."""
+        calls.append(query)
+        if during:
+            during()
+        return f"Kết quả {len(calls)}"
+
+    async def aread_items(query: str, limit: int = 5) -> str:
+        calls.append(query)
+        if during:
+            await during()
+        return f"Kết quả {len(calls)}"
+
+    read_items.coroutine = aread_items
+    return cache_reads(read_items, "tasks")
+
+
+def test_stale_generation_put_is_dropped():
+    cache = ToolResultCache()
+    generation = cache.generation("tasks")
+    cache.invalidate("tasks")
+    cache.put("tasks", "k", generation, "kết quả cũ", [])
+    assert cache.get("tasks", "k") is None
+
+    cache.put("tasks", "k", cache.generation("tasks"), "kết quả mới", [])
+    assert cache.get("tasks", "k") == ("kết quả mới", [])
+
+
+def test_invalidation_is_per_service():
+    cache = ToolResultCache()
+    cache.put("tasks", "k", 0, "công việc", [])
+    cache.put("calendar", "k", 0, "sự kiện", [])
+    cache.invalidate("tasks")
+    assert cache.get("tasks", "k") is None
+    assert cache.get("calendar", "k") == ("sự kiện", [])
+    assert cache.stats()["invalidated_entries"] == 1
+
+
+def test_clear_drops_in_flight_puts():
+    cache = ToolResultCache()
+    generation = cache.generation("gmail")
+    cache.clear()
+    cache.put("gmail", "k", generation, "kết quả", [])
+    assert cache.get("gmail", "k") is None
+
+
+def test_lru_bound():
+    cache = ToolResultCache(max_entries=2)
+    for key in ("a", "b", "c"):
+        cache.put("tasks", key, 0, key, [])
+    assert cache.get("tasks", "a") is None
+    assert cache.stats()["entries"] == {"tasks": 2}
+
+
+def test_repeated_read_is_served_from_cache(cache):
+    calls = []
+    read_items = _read_tool(calls)
+    first = read_items.invoke({"query": "  báo   cáo "})
+    # Cùng truy vấn sau khi chuẩn hoá khoảng trắng và điền giá trị mặc định
+    assert read_items.invoke({"query": "báo cáo", "limit": 5}) == first
+    assert len(calls) == 1
+    assert cache.stats()["hits"] == 1
+
+
+def test_read_overlapping_a_write_is_not_cached(cache):
+    calls = []
+    read_items = _read_tool(calls, during=lambda: cache.invalidate("tasks"))
+    read_items.invoke({"query": "x"})
+    read_items.invoke({"query": "x"})
+    assert len(calls) == 2
+
+
+def test_async_read_overlapping_a_write_is_not_cached(cache):
+    calls = []
+
+    @tool
+    def write_item(title: str) -> str:
+        """Ghi một mục."""
+        return "Đã tạo."
+
+    write_item = invalidates(write_item, "tasks")
+
+    async def concurrent_write():
+        write_item.invoke({"title": "mới"})
+
+    read_items = _read_tool(calls, during=concurrent_write)
+
+    async def scenario():
+        await read_items.ainvoke({"query": "x"})
+        await read_items.ainvoke({"query": "x"})
+
+    asyncio.run(scenario())
+    assert len(calls) == 2
+    assert cache.stats()["invalidations"] == 2
+
+
+def test_errors_are_not_cached(cache):
+    calls = []
+
+    @tool
+    def failing(query: str) -> str:
+        """Luôn lỗi."""
+        calls.append(query)
+        return "Lỗi khi đọc: mất kết nối"
+
+    failing = cache_reads(failing, "tasks")
+    failing.invoke({"query": "x"})
+    failing.invoke({"query": "x"})
+    assert len(calls) == 2
+
+
+def test_write_tool_invalidates_only_its_service(google_api, cache, monkeypatch):
+    monkeypatch.setattr(tasks_module, "get_google_service", google_api.service_factory())
+    monkeypatch.setattr(tasks_module, "task_cache", TaskCache())
+    cache.put("calendar", "k", 0, "sự kiện", [])
+
+    before = tasks_module.list_tasks.invoke({})
+    assert tasks_module.list_tasks.invoke({}) == before
+    assert cache.stats()["hits"] == 1
+
+    assert tasks_module.create_task.invoke({"title": "Việc mới sau khi cache"}).startswith("Đã tạo")
+    after = tasks_module.list_tasks.invoke({})
+    assert "Việc mới sau khi cache" in after
+    assert cache.get("calendar", "k") == ("sự kiện", [])
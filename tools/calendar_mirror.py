@@ -0,0 +1,269 @@
+# intelligent_agent_platform/tools/calendar_mirror.py
+
+import bisect
+import datetime
+import threading
+import time
+from typing import Optional
+
+from googleapiclient.errors import HttpError
+
+from config import CALENDAR_ID, CALENDAR_MIRROR_MAX_STALENESS, CALENDAR_MIRROR_PAST_DAYS
+from .common_async import aexecute, async_lock
+from .common_auth import UserScoped
+
+# Múi giờ mặc định của dự án, dùng cho sự kiện cả ngày (chỉ có 'date')
+LOCAL_TZ = datetime.timezone(datetime.timedelta(hours=7))
+# Sự kiện dài hơn ngưỡng này được giữ trong một danh sách riêng và duyệt tuần tự,
+# để phần chỉ mục chính chỉ cần lùi tối đa một ngày khi tìm các sự kiện giao với khoảng truy vấn
+LONG_EVENT_SECONDS = 24 * 3600
+# Số sự kiện mỗi trang khi đồng bộ (tối đa của Calendar API)
+SYNC_PAGE_SIZE = 2500
+
+
+def parse_time(value: str) -> float:
+    """Chuỗi RFC 3339 hoặc ngày 'YYYY-MM-DD' -> timestamp (giây)."""
+    dt = datetime.datetime.fromisoformat(value)
+    if dt.tzinfo is None:
+        dt = dt.replace(tzinfo=LOCAL_TZ)
+    return dt.timestamp()
+
+
+def _event_bounds(event: dict):
+    start = event["start"].get("dateTime", event["start"].get("date"))
+    end = event.get("end", {}).get("dateTime", event.get("end", {}).get("date", start))
+    return parse_time(start), parse_time(end)
+
+
+class EventIntervalIndex:
+    """
+    Chỉ mục khoảng thời gian của các sự kiện trong bộ nhớ.
+    Sự kiện ngắn được sắp xếp theo thời điểm bắt đầu: các sự kiện giao với [start, end) đều bắt đầu
+    trong [start - LONG_EVENT_SECONDS, end), nên chỉ cần hai lần bisect. Sự kiện dài (ít) được duyệt tuần tự.
+    """
+
+    def __init__(self):
+        self.events = {}
+        self._bounds = {}
+        self._short = []
+        self._long = {}
+
+    def __len__(self):
+        return len(self.events)
+
+    def upsert(self, event: dict):
+        self.remove(event["id"])
+        start, end = _event_bounds(event)
+        self.events[event["id"]] = event
+        self._bounds[event["id"]] = (start, end)
+        if end - start > LONG_EVENT_SECONDS:
+            self._long[event["id"]] = (start, end)
+        else:
+            bisect.insort(self._short, (start, end, event["id"]))
+
+    def remove(self, event_id: str):
+        bounds = self._bounds.pop(event_id, None)
+        if bounds is None:
+            return
+        self.events.pop(event_id)
+        if self._long.pop(event_id, None) is None:
+            entry = (bounds[0], bounds[1], event_id)
+            i = bisect.bisect_left(self._short, entry)
+            if i < len(self._short) and self._short[i] == entry:
+                del self._short[i]
+
+    def query(self, start: float, end: float) -> list:
+        """Các sự kiện giao với [start, end), sắp xếp theo thời điểm bắt đầu (như orderBy='startTime')."""
+        lo = bisect.bisect_left(self._short, (start - LONG_EVENT_SECONDS,))
+        hi = bisect.bisect_left(self._short, (end,))
+        # Sự kiện không có thời lượng (start == end) vẫn được tính nếu nằm trong khoảng, giống Calendar API
+        hits = [(s, e, i) for s, e, i in self._short[lo:hi] if e > start or s == e >= start]
+        hits += [(s, e, i) for i, (s, e) in self._long.items() if s < end and e > start]
+        hits.sort()
+        return [self.events[i] for _, _, i in hits]
+
+
+class CalendarMirror:
+    """
+    Bản sao cục bộ của lịch CALENDAR_ID.
+    Lần đầu đồng bộ toàn bộ (từ CALENDAR_MIRROR_PAST_DAYS ngày trước trở đi), sau đó chỉ lấy phần thay đổi
+    bằng syncToken khi bản sao cũ hơn CALENDAR_MIRROR_MAX_STALENESS giây. Các truy vấn theo khoảng thời gian
+    được trả lời từ EventIntervalIndex; các tool ghi (create/update/delete_event) vá trực tiếp vào bản sao.
+    """
+
+    def __init__(self, max_staleness: float = CALENDAR_MIRROR_MAX_STALENESS, past_days: int = CALENDAR_MIRROR_PAST_DAYS):
+        self.max_staleness = max_staleness
+        self.past_days = past_days
+        self._lock = threading.Lock()
+        self._sync_lock = threading.Lock()
+        self.reset()
+        self._hits = 0
+        self._misses = 0
+        self._full_syncs = 0
+        self._incremental_syncs = 0
+
+    def reset(self):
+        """Bỏ toàn bộ bản sao; lần truy vấn sau sẽ đồng bộ lại từ đầu."""
+        with self._lock:
+            self._index = EventIntervalIndex()
+            self._sync_token = None
+            self._coverage_start = None
+            self._synced_at = 0.0
+
+    # --- Đồng bộ ---
+    def _is_fresh(self) -> bool:
+        return self._sync_token is not None and time.monotonic() - self._synced_at < self.max_staleness
+
+    def _sync_request(self, service, sync_token: Optional[str], page_token: Optional[str], time_min: Optional[str]):
+        params = {"calendarId": CALENDAR_ID, "singleEvents": True, "maxResults": SYNC_PAGE_SIZE}
+        if page_token:
+            params["pageToken"] = page_token
+        if sync_token:
+            params["syncToken"] = sync_token
+        else:
+            # Đồng bộ toàn bộ: sự kiện đã bị xoá không cần thiết
+            params["timeMin"] = time_min
+            params["showDeleted"] = False
+        return service.events().list(**params)
+
+    def _full_sync_window(self):
+        start = datetime.datetime.now(LOCAL_TZ).replace(hour=0, minute=0, second=0, microsecond=0)
+        start -= datetime.timedelta(days=self.past_days)
+        return start.isoformat(), start.timestamp()
+
+    def _apply_page(self, index: EventIntervalIndex, response: dict):
+        for event in response.get("items", []):
+            if event.get("status") == "cancelled" or "start" not in event:
+                index.remove(event["id"])
+            else:
+                index.upsert(event)
+
+    def _plan_sync(self):
+        """(syncToken, chỉ mục đích, timeMin của lần đồng bộ toàn bộ, timestamp tương ứng)."""
+        if self._sync_token:
+            return self._sync_token, self._index, None, None
+        time_min, coverage_start = self._full_sync_window()
+        # Đồng bộ toàn bộ vào một chỉ mục mới rồi mới thay thế, để truy vấn song song không thấy dữ liệu dở dang
+        return None, EventIntervalIndex(), time_min, coverage_start
+
+    def _finish_sync(self, index, sync_token, next_sync_token, coverage_start):
+        with self._lock:
+            if sync_token is None:
+                self._index = index
+                self._coverage_start = coverage_start
+                self._full_syncs += 1
+            else:
+                self._incremental_syncs += 1
+            self._sync_token = next_sync_token
+            self._synced_at = time.monotonic()
+
+    def sync(self, service):
+        """Đồng bộ (toàn bộ hoặc tăng dần) bằng googleapiclient."""
+        with self._sync_lock:
+            if self._is_fresh():
+                return
+            sync_token, index, time_min, coverage_start = self._plan_sync()
+            page_token = None
+            while True:
+                try:
+                    response = self._sync_request(service, sync_token, page_token, time_min).execute()
+                except HttpError as e:
+                    if e.resp.status == 410 and sync_token:
+                        # syncToken đã hết hạn: Google yêu cầu đồng bộ lại toàn bộ
+                        self.reset()
+                        sync_token, index, time_min, coverage_start = self._plan_sync()
+                        page_token = None
+                        continue
+                    raise
+                with self._lock:
+                    self._apply_page(index, response)
+                page_token = response.get("nextPageToken")
+                if not page_token:
+                    self._finish_sync(index, sync_token, response.get("nextSyncToken"), coverage_start)
+                    return
+
+    async def async_sync(self, service):
+        """Phiên bản bất đồng bộ của sync (dùng aexecute), giữ cùng _sync_lock với sync."""
+        async with async_lock(self._sync_lock):
+            if self._is_fresh():
+                return
+            sync_token, index, time_min, coverage_start = self._plan_sync()
+            page_token = None
+            while True:
+                try:
+                    response = await aexecute(self._sync_request(service, sync_token, page_token, time_min))
+                except HttpError as e:
+                    if e.resp.status == 410 and sync_token:
+                        self.reset()
+                        sync_token, index, time_min, coverage_start = self._plan_sync()
+                        page_token = None
+                        continue
+                    raise
+                with self._lock:
+                    self._apply_page(index, response)
+                page_token = response.get("nextPageToken")
+                if not page_token:
+                    self._finish_sync(index, sync_token, response.get("nextSyncToken"), coverage_start)
+                    return
+
+    # --- Truy vấn ---
+    def _covers(self, start: float) -> bool:
+        return self._coverage_start is not None and start >= self._coverage_start
+
+    def _lookup(self, start_time: str, end_time: str) -> Optional[list]:
+        start = parse_time(start_time)
+        with self._lock:
+            if not self._covers(start):
+                self._misses += 1
+                return None
+            self._hits += 1
+            return self._index.query(start, parse_time(end_time))
+
+    def query(self, service, start_time: str, end_time: str) -> Optional[list]:
+        """
+        Các sự kiện giao với [start_time, end_time), sắp theo thời gian bắt đầu.
+        Trả về None nếu khoảng thời gian nằm ngoài phạm vi của bản sao (caller gọi API như bình thường).
+        """
+        if parse_time(start_time) < self._full_sync_window()[1]:
+            self._misses += 1
+            return None
+        self.sync(service)
+        return self._lookup(start_time, end_time)
+
+    async def aquery(self, service, start_time: str, end_time: str) -> Optional[list]:
+        if parse_time(start_time) < self._full_sync_window()[1]:
+            self._misses += 1
+            return None
+        await self.async_sync(service)
+        return self._lookup(start_time, end_time)
+
+    # --- Vá bản sao sau khi ghi ---
+    def upsert(self, event: dict):
+        """Cập nhật bản sao bằng sự kiện vừa được tạo/sửa (không cần chờ lần đồng bộ sau)."""
+        with self._lock:
+            if self._sync_token is not None:
+                self._index.upsert(event)
+
+    def remove(self, event_id: str):
+        with self._lock:
+            self._index.remove(event_id)
+
+    def get(self, event_id: str) -> Optional[dict]:
+        """Bản đã đồng bộ của một sự kiện (kèm ETag), hoặc None nếu sự kiện không có trong bản sao."""
+        with self._lock:
+            return self._index.events.get(event_id)
+
+    def stats(self) -> dict:
+        total = self._hits + self._misses
+        return {
+            "events": len(self._index),
+            "hits": self._hits,
+            "misses": self._misses,
+            "full_syncs": self._full_syncs,
+            "incremental_syncs": self._incremental_syncs,
+            "hit_rate": self._hits / total if total else 0.0,
+        }
+
+
+# Mỗi người dùng của server nhiều người dùng có bản sao riêng (xem common_auth.UserScoped)
+calendar_mirror = UserScoped(CalendarMirror)
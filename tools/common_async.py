@@ -0,0 +1,116 @@
+# intelligent_agent_platform/tools/common_async.py
+
+import asyncio
+import contextlib
+import threading
+import time
+import weakref
+
+import aiohttp
+import httplib2
+from google_auth_httplib2 import AuthorizedHttp
+from googleapiclient.errors import HttpError
+from yarl import URL
+
+from cassette import current_cassette
+from config import ASYNC_HTTP_MAX_CONNECTIONS, ASYNC_HTTP_TIMEOUT
+from tracing import span
+from .common_auth import get_credentials
+from .common_execution import agoverned, service_of
+
+# Khoảng nghỉ giữa hai lần thử lấy threading.Lock đang bận từ một coroutine (xem async_lock)
+LOCK_POLL_INTERVAL = 0.01
+
+# aiohttp.ClientSession gắn với event loop đã tạo ra nó, nên mỗi event loop có một session (pool kết nối) riêng
+_sessions = weakref.WeakKeyDictionary()
+
+
+def get_async_session() -> aiohttp.ClientSession:
+    """Session HTTP bất đồng bộ (có pool kết nối) của event loop hiện tại."""
+    loop = asyncio.get_running_loop()
+    session = _sessions.get(loop)
+    if session is None or session.closed:
+        session = _sessions[loop] = aiohttp.ClientSession(
+            connector=aiohttp.TCPConnector(limit=ASYNC_HTTP_MAX_CONNECTIONS),
+            timeout=aiohttp.ClientTimeout(total=ASYNC_HTTP_TIMEOUT),
+        )
+    return session
+
+
+async def aclose_async_session():
+    """Đóng session của event loop hiện tại (gọi trước khi event loop kết thúc)."""
+    session = _sessions.pop(asyncio.get_running_loop(), None)
+    if session is not None:
+        await session.close()
+
+
+@contextlib.asynccontextmanager
+async def async_lock(lock: threading.Lock):
+    """
+    Giữ `lock` (threading.Lock) trong một coroutine mà không chặn event loop: lock đang bận thì nhường
+    event loop rồi thử lại. Nhờ vậy bản đồng bộ (thread của ToolNode) và bản bất đồng bộ của cùng một
+    đối tượng dùng chung một lock. Không dùng thread chờ lock nên huỷ coroutine không làm kẹt lock.
+    """
+    while not lock.acquire(blocking=False):
+        await asyncio.sleep(LOCK_POLL_INTERVAL)
+    try:
+        yield
+    finally:
+        lock.release()
+
+
+async def aexecute(request):
+    """
+    Phiên bản bất đồng bộ của `request.execute()` cho một HttpRequest của googleapiclient.
+    Request vẫn được dựng bằng service thông thường (không tốn network), chỉ phần gửi đi
+    dùng aiohttp nên không chặn event loop. Lỗi HTTP được ném ra dưới dạng HttpError như bản đồng bộ,
+    sau khi đã qua giới hạn tốc độ và thử lại của lớp thực thi chung.
+    """
+    headers = dict(request.headers)
+    if isinstance(request.http, AuthorizedHttp):
+        creds = request.http.credentials
+        if not creds.valid:
+            # Thông thường thread nền đã làm mới token; đây chỉ là phương án dự phòng. Làm mới token là
+            # request HTTP chặn (kèm khoá file), nên chạy trong thread để không dừng mọi coroutine khác
+            creds = await asyncio.to_thread(get_credentials)
+        creds.apply(headers)
+
+    async def _send():
+        cassette = current_cassette()
+        if cassette is not None and cassette.mode == "replay":
+            resp, content = await cassette.areplay_http(request.method, request.uri, request.body)
+        else:
+            start = time.perf_counter()
+            # URI do googleapiclient dựng đã được encode sẵn, không để aiohttp encode lại
+            async with get_async_session().request(
+                request.method, URL(request.uri, encoded=True), data=request.body, headers=headers
+            ) as response:
+                content = await response.read()
+            resp = httplib2.Response({"status": response.status, **{k.lower(): v for k, v in response.headers.items()}})
+            if cassette is not None:
+                cassette.record_http(request.method, request.uri, request.body, resp, content, time.perf_counter() - start)
+        attrs.update(response_bytes=len(content), status=resp.status)
+        if resp.status >= 300:
+            raise HttpError(resp, content, uri=request.uri)
+        return request.postproc(resp, content)
+
+    service = service_of(request.uri)
+    with span("http", f"{service} {request.method}", request_bytes=len(request.body or "")) as attrs:
+        return await agoverned(service, _send, request.method)
+
+
+async def aexecute_all(requests: list, max_concurrency: int) -> list:
+    """
+    Gửi song song nhiều request (tối đa `max_concurrency` request cùng lúc) trên pool kết nối.
+    Trả về danh sách (response, exception) theo đúng thứ tự của `requests`, giống execute_batch.
+    """
+    semaphore = asyncio.Semaphore(max_concurrency)
+
+    async def _run(request):
+        async with semaphore:
+            try:
+                return await aexecute(request), None
+            except HttpError as e:
+                return None, e
+
+    return await asyncio.gather(*(_run(request) for request in requests))
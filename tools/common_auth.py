@@ -1,53 +1,423 @@
 # intelligent_agent_platform/tools/common_auth.py
 
+import contextlib
+import contextvars
+import datetime
+import functools
+import hashlib
+import json
 import os
-import streamlit as st  # <-- THÊM IMPORT NÀY
+import threading
+from collections import OrderedDict
+from typing import Optional
+
+if os.name == "nt":
+    import msvcrt
+else:
+    import fcntl
+
+import httplib2
 from google.auth.transport.requests import Request
 from google.oauth2.credentials import Credentials
+from google_auth_httplib2 import AuthorizedHttp
 from google_auth_oauthlib.flow import InstalledAppFlow
-from googleapiclient.discovery import build
-from config import SCOPES, TOKEN_FILE, CREDENTIALS_FILE
+from googleapiclient import discovery_cache
+from googleapiclient.discovery import build, build_from_document
+from cassette import replaying
+from config import SCOPES, TOKEN_FILE, CREDENTIALS_FILE, DISCOVERY_DIR, TOKEN_REFRESH_MARGIN, TOKEN_REFRESH_RETRY, GOOGLE_API_EMULATOR_URL
+from config import TOKEN_REFRESH_MAX_INTERVAL
+from config import SERVER_MAX_CACHED_USERS
+from .common_execution import GovernedHttpRequest
+from .credential_store import get_credential_store
 
-def get_google_service(service_name: str, version: str):
+# Số khoá làm mới token dùng chung cho mọi người dùng (mỗi người dùng luôn rơi vào cùng một khoá)
+USER_LOCK_STRIPES = 64
+
+# Người dùng của lượt đang chạy trong server nhiều người dùng (server.py); None = chế độ một người dùng (token.json)
+_google_user = contextvars.ContextVar("google_user", default=None)
+
+
+def current_google_user() -> Optional[str]:
+    return _google_user.get()
+
+
+@contextlib.contextmanager
+def use_google_user(user_id: str):
+    """Mọi tool chạy trong khối `with` (kể cả trên thread/task con) dùng credentials và state của `user_id`."""
+    token = _google_user.set(user_id)
+    try:
+        yield
+    finally:
+        _google_user.reset(token)
+
+
+class CredentialManager:
     """
-    Xác thực và xây dựng một đối tượng service của Google.
-    Sử dụng st.session_state để cache service một cách an toàn cho mỗi session người dùng.
-    """
-    # Khởi tạo kho chứa services trong session_state nếu chưa có
-    if 'services' not in st.session_state:
-        st.session_state.services = {}
-
-    # Kiểm tra cache trong session_state
-    if service_name in st.session_state.services:
-        return st.session_state.services[service_name]
-
-    # --- Phần code xác thực giữ nguyên ---
-    creds = None
-    if os.path.exists(TOKEN_FILE):
-        creds = Credentials.from_authorized_user_file(TOKEN_FILE, SCOPES)
-    if not creds or not creds.valid:
-        if creds and creds.expired and creds.refresh_token:
-            # Hiển thị thông báo trên giao diện khi đang làm mới token
-            with st.spinner(f"Đang làm mới quyền truy cập cho Google {service_name.capitalize()}..."):
-                creds.refresh(Request())
-        else:
-            # Logic này sẽ không chạy tốt trên server Streamlit đã deploy
-            # vì nó yêu cầu tương tác cục bộ. Nó chỉ hoạt động khi bạn chạy trên máy.
-            if not os.path.exists(CREDENTIALS_FILE):
-                raise FileNotFoundError(f"Lỗi: Không tìm thấy file {CREDENTIALS_FILE}.")
-            flow = InstalledAppFlow.from_client_secrets_file(CREDENTIALS_FILE, SCOPES)
-            creds = flow.run_local_server(port=0)
-        
-        # Lưu lại token mới
-        with open(TOKEN_FILE, "w") as token:
+    Giữ credentials trong bộ nhớ và dùng chung cho mọi service.
+    Một thread nền làm mới access token trước khi hết hạn TOKEN_REFRESH_MARGIN giây, nên việc
+    làm mới không rơi vào lượt chat của người dùng. token.json được đọc/ghi dưới khóa advisory
+    (token.json.lock) để nhiều process không ghi đè lẫn nhau; nếu process khác vừa làm mới
+    token, manager dùng lại token đó thay vì gọi Google thêm một lần.
+    """
+
+    def __init__(self, token_file: str = TOKEN_FILE, credentials_file: str = CREDENTIALS_FILE):
+        self.token_file = token_file
+        self.credentials_file = credentials_file
+        self._creds = None
+        self._lock = threading.RLock()
+        self._request = Request()
+        self._refresher = None
+        self._stop = threading.Event()
+
+    @contextlib.contextmanager
+    def _file_lock(self):
+        with open(self.token_file + ".lock", "a+") as lock_file:
+            if os.name == "nt":
+                msvcrt.locking(lock_file.fileno(), msvcrt.LK_LOCK, 1)
+            else:
+                fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                if os.name == "nt":
+                    lock_file.seek(0)
+                    msvcrt.locking(lock_file.fileno(), msvcrt.LK_UNLCK, 1)
+                else:
+                    fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def _read_token_file(self):
+        if not os.path.exists(self.token_file):
+            return None
+        return Credentials.from_authorized_user_file(self.token_file, SCOPES)
+
+    def _write_token_file(self, creds):
+        # Ghi ra file tạm rồi đổi tên để process khác không bao giờ đọc phải file ghi dở
+        tmp_file = f"{self.token_file}.{os.getpid()}.tmp"
+        with open(tmp_file, "w") as token:
             token.write(creds.to_json())
-    
-    try:
-        # Build service
-        service = build(service_name, version, credentials=creds)
-        # Lưu vào cache của session_state
-        st.session_state.services[service_name] = service
+        os.replace(tmp_file, self.token_file)
+
+    @staticmethod
+    def _seconds_until_expiry(creds) -> float:
+        if creds.expiry is None:
+            return float("inf")
+        now = datetime.datetime.now(datetime.timezone.utc).replace(tzinfo=None)
+        return (creds.expiry - now).total_seconds()
+
+    def _load(self):
+        with self._file_lock():
+            creds = self._read_token_file()
+            if not creds or not creds.refresh_token:
+                # Logic này sẽ không chạy tốt trên server đã deploy
+                # vì nó yêu cầu tương tác cục bộ. Nó chỉ hoạt động khi bạn chạy trên máy.
+                if not os.path.exists(self.credentials_file):
+                    raise FileNotFoundError(f"Lỗi: Không tìm thấy file {self.credentials_file}.")
+                flow = InstalledAppFlow.from_client_secrets_file(self.credentials_file, SCOPES)
+                creds = flow.run_local_server(port=0)
+                self._write_token_file(creds)
+        return creds
+
+    def refresh(self):
+        """Làm mới token (hoặc dùng lại token mà process khác vừa làm mới)."""
+        with self._lock, self._file_lock():
+            creds = self._creds
+            on_disk = self._read_token_file()
+            if (
+                on_disk is not None
+                and on_disk.token != creds.token
+                and self._seconds_until_expiry(on_disk) > TOKEN_REFRESH_MARGIN
+            ):
+                # Cập nhật tại chỗ để mọi AuthorizedHttp đang giữ object này đều thấy token mới
+                creds.token = on_disk.token
+                creds.expiry = on_disk.expiry
+                return
+            creds.refresh(self._request)
+            self._write_token_file(creds)
+
+    def _refresh_loop(self):
+        while True:
+            # Token không ghi thời hạn (vô hạn) hoặc hạn rất xa: Event.wait không nhận vô hạn, chờ tối đa một khoảng cố định
+            delay = min(self._seconds_until_expiry(self._creds) - TOKEN_REFRESH_MARGIN, TOKEN_REFRESH_MAX_INTERVAL)
+            if self._stop.wait(max(delay, 0)):
+                return
+            try:
+                self.refresh()
+            except Exception as e:
+                print(f"Lỗi khi làm mới token Google: {e}")
+                if self._stop.wait(TOKEN_REFRESH_RETRY):
+                    return
+
+    def get(self) -> Credentials:
+        """Trả về credentials dùng chung; lần gọi đầu tiên sẽ tải token và khởi động thread làm mới."""
+        creds = self._creds
+        if creds is not None and creds.valid:
+            return creds
+
+        with self._lock:
+            if self._creds is None:
+                self._creds = self._load()
+            if not self._creds.valid:
+                # Chỉ xảy ra khi token đã hết hạn lúc khởi động hoặc thread nền làm mới thất bại
+                self.refresh()
+            if self._refresher is None:
+                self._refresher = threading.Thread(target=self._refresh_loop, name="google-token-refresher", daemon=True)
+                self._refresher.start()
+            return self._creds
+
+    def stop(self):
+        self._stop.set()
+
+
+credential_manager = CredentialManager()
+
+
+class UserCredentialManager:
+    """
+    Credentials theo người dùng cho server nhiều người dùng: đọc từ kho mã hoá (credential_store) ở lần dùng đầu,
+    giữ trong bộ nhớ cho SERVER_MAX_CACHED_USERS người dùng gần nhất, làm mới khi còn dưới TOKEN_REFRESH_MARGIN giây
+    và ghi token mới lại vào kho. Không có thread nền cho từng người dùng: server gọi `get` trên thread riêng
+    trước mỗi lượt, nên việc làm mới không rơi vào event loop.
+    """
+
+    def __init__(self, store=None, max_users: int = SERVER_MAX_CACHED_USERS):
+        self._store = store
+        self.max_users = max_users
+        self._creds = OrderedDict()
+        # Khoá theo nhóm người dùng thay vì theo từng người: số khoá cố định và không bao giờ bị bỏ khi người dùng
+        # ra khỏi cache, nên hai thread của cùng một người dùng luôn dùng cùng một khoá
+        self._user_locks = [threading.Lock() for _ in range(USER_LOCK_STRIPES)]
+        self._lock = threading.Lock()
+        self._request = Request()
+
+    @property
+    def store(self):
+        return self._store or get_credential_store()
+
+    @store.setter
+    def store(self, store):
+        self._store = store
+
+    def _fresh(self, creds) -> bool:
+        return creds.valid and CredentialManager._seconds_until_expiry(creds) > TOKEN_REFRESH_MARGIN
+
+    def get(self, user_id: str) -> Credentials:
+        with self._lock:
+            creds = self._creds.get(user_id)
+            if creds is not None:
+                self._creds.move_to_end(user_id)
+        if creds is not None and self._fresh(creds):
+            return creds
+
+        # Nhiều lượt cùng lúc của một người dùng chỉ đọc kho / làm mới token một lần
+        with self._user_locks[hash(user_id) % USER_LOCK_STRIPES]:
+            with self._lock:
+                creds = self._creds.get(user_id)
+            creds = creds or self.store.load(user_id)
+            if not self._fresh(creds):
+                creds.refresh(self._request)
+                self.store.save(user_id, creds)
+            with self._lock:
+                self._creds[user_id] = creds
+                self._creds.move_to_end(user_id)
+                while len(self._creds) > self.max_users:
+                    self._creds.popitem(last=False)
+        return creds
+
+    def forget(self, user_id: str):
+        with self._lock:
+            self._creds.pop(user_id, None)
+
+
+user_credentials = UserCredentialManager()
+
+
+class UserScoped:
+    """
+    State riêng của từng người dùng (bản sao lịch, cache công việc, cache kết quả tool) dưới cùng một tên trong module.
+    Ngoài server nhiều người dùng (không có use_google_user) là một instance dùng chung như trước; trong server mỗi
+    người dùng một instance tạo bằng `factory` khi cần, chỉ giữ `max_users` người dùng dùng gần nhất.
+    Mọi thuộc tính được chuyển tới instance của người dùng hiện tại.
+    """
+
+    def __init__(self, factory, max_users: int = SERVER_MAX_CACHED_USERS):
+        self._factory = factory
+        self._max_users = max_users
+        self._shared = None
+        self._instances = OrderedDict()
+        self._scope_lock = threading.Lock()
+
+    def current(self):
+        user = _google_user.get()
+        with self._scope_lock:
+            if user is None:
+                if self._shared is None:
+                    self._shared = self._factory()
+                return self._shared
+            instance = self._instances.get(user)
+            if instance is None:
+                instance = self._instances[user] = self._factory()
+                while len(self._instances) > self._max_users:
+                    self._instances.popitem(last=False)
+            else:
+                self._instances.move_to_end(user)
+            return instance
+
+    def __getattr__(self, name):
+        return getattr(self.current(), name)
+
+
+def get_credentials() -> Credentials:
+    """Credentials của người dùng hiện tại (server nhiều người dùng), hoặc credentials dùng chung của process (token.json)."""
+    user = _google_user.get()
+    if user is not None:
+        return user_credentials.get(user)
+    return credential_manager.get()
+
+
+@functools.lru_cache(maxsize=None)
+def load_discovery_document(service_name: str, version: str):
+    """
+    Đọc và parse discovery document được lưu sẵn trong DISCOVERY_DIR (chỉ một lần cho mỗi API).
+    Trả về None nếu dự án không có sẵn document cho API này.
+    """
+    path = os.path.join(DISCOVERY_DIR, f"{service_name}.{version}.json")
+    if not os.path.exists(path):
+        return None
+    with open(path, "r", encoding="utf-8") as f:
+        doc = json.load(f)
+    # googleapiclient bổ sung tham số vào document trong lần tạo resource đầu tiên.
+    # Tạo trước toàn bộ resource một lần để các thread dùng chung document về sau chỉ còn đọc.
+    _touch_resources(build_from_document(doc, http=httplib2.Http()), doc)
+    return doc
+
+
+def _touch_resources(resource, desc: dict):
+    for name, child_desc in desc.get("resources", {}).items():
+        _touch_resources(getattr(resource, name)(), child_desc)
+
+
+def build_service(service_name: str, version: str, http, root_url: str = None):
+    """
+    Xây dựng service từ discovery document đã cache, không cần request mạng.
+    Mọi `.execute()` của service đi qua lớp thực thi chung (giới hạn tốc độ, thử lại, circuit breaker).
+    `root_url` thay địa chỉ của Google (ví dụ trỏ vào server giả lập, xem GOOGLE_API_EMULATOR_URL).
+    """
+    doc = load_discovery_document(service_name, version)
+    if root_url:
+        doc = doc or json.loads(discovery_cache.get_static_doc(service_name, version))
+        return build_from_document({**doc, "rootUrl": root_url}, http=http, requestBuilder=GovernedHttpRequest)
+    if doc is None:
+        return build(service_name, version, http=http, static_discovery=True, requestBuilder=GovernedHttpRequest)
+    return build_from_document(doc, http=http, requestBuilder=GovernedHttpRequest)
+
+
+def _credentials_key(creds) -> str:
+    """Định danh ổn định của một bộ credentials (không phụ thuộc access token hiện tại)."""
+    refresh_token = getattr(creds, "refresh_token", None)
+    if not refresh_token:
+        return f"object:{id(creds)}"
+    raw = f"{getattr(creds, 'client_id', '')}:{refresh_token}"
+    return hashlib.sha256(raw.encode()).hexdigest()[:16]
+
+
+class ServicePool:
+    """
+    Kho service Google dùng chung cho toàn bộ process (CLI, Streamlit, batch job, test).
+    Khóa cache là (định danh credentials, tên service, version). Vì httplib2.Http không
+    thread-safe, mỗi thread nhận một service riêng gắn với kết nối HTTP riêng của thread đó;
+    kết nối này được giữ lại và tái sử dụng giữa các lần gọi tool.
+    Mỗi thread chỉ giữ kết nối và service của `max_users` bộ credentials dùng gần nhất (server nhiều người dùng);
+    kết nối của bộ bị bỏ ra được đóng.
+    """
+
+    def __init__(self, max_users: int = SERVER_MAX_CACHED_USERS):
+        self.max_users = max_users
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._stats = {"hits": 0, "misses": 0, "http_created": 0, "evicted": 0}
+
+    def _count(self, name: str):
+        with self._lock:
+            self._stats[name] += 1
+
+    def _entry(self, key: str) -> dict:
+        """{"http", "services"} của bộ credentials `key` trên thread hiện tại (LRU theo max_users)."""
+        entries = getattr(self._local, "entries", None)
+        if entries is None:
+            entries = self._local.entries = OrderedDict()
+        entry = entries.get(key)
+        if entry is not None:
+            entries.move_to_end(key)
+            return entry
+        entry = entries[key] = {"http": None, "services": {}}
+        while len(entries) > self.max_users:
+            _, evicted = entries.popitem(last=False)
+            self._count("evicted")
+            for http in {evicted["http"], *(service._http for service in evicted["services"].values())}:
+                if http is not None:
+                    http.close()
+        return entry
+
+    def get_http(self, creds) -> AuthorizedHttp:
+        """Kết nối HTTP (đã gắn credentials) của thread hiện tại."""
+        entry = self._entry(_credentials_key(creds))
+        http = entry["http"]
+        if http is None or http.credentials is not creds:
+            http = entry["http"] = AuthorizedHttp(creds, http=httplib2.Http())
+            self._count("http_created")
+        return http
+
+    def get_service(self, creds, service_name: str, version: str):
+        services = self._entry(_credentials_key(creds))["services"]
+        key = (service_name, version)
+        service = services.get(key)
+        if service is not None and service._http.credentials is creds:
+            self._count("hits")
+            return service
+
+        self._count("misses")
+        service = build_service(service_name, version, self.get_http(creds))
+        services[key] = service
+        return service
+
+    def get_offline_service(self, service_name: str, version: str, root_url: str = None):
+        """
+        Service không gắn credentials, mỗi thread một kết nối HTTP: trỏ vào server giả lập tại `root_url`,
+        hoặc vào địa chỉ thật của Google khi request được trả lời từ cassette (xem cassette.py).
+        """
+        services = self._entry(f"offline:{root_url}")["services"]
+        key = (service_name, version)
+        service = services.get(key)
+        if service is not None:
+            self._count("hits")
+            return service
+
+        self._count("misses")
+        service = services[key] = build_service(service_name, version, httplib2.Http(), root_url=root_url)
         return service
-    except Exception as e:
-        st.error(f"Lỗi khi xây dựng service Google {service_name.capitalize()}: {e}")
-        return None
\ No newline at end of file
+
+    def stats(self) -> dict:
+        """Số liệu hit/miss của pool."""
+        with self._lock:
+            stats = dict(self._stats)
+        total = stats["hits"] + stats["misses"]
+        stats["hit_rate"] = stats["hits"] / total if total else 0.0
+        return stats
+
+
+service_pool = ServicePool()
+
+
+def get_google_service(service_name: str, version: str):
+    """
+    Xác thực và trả về một đối tượng service của Google từ pool dùng chung.
+    Service trả về chỉ nên được dùng trên thread đã gọi hàm này.
+    Nếu GOOGLE_API_EMULATOR_URL được đặt, service trỏ vào server giả lập đó thay vì Google (không cần đăng nhập);
+    khi đang phát lại một cassette cũng không cần đăng nhập.
+    """
+    if GOOGLE_API_EMULATOR_URL:
+        return service_pool.get_offline_service(service_name, version, root_url=GOOGLE_API_EMULATOR_URL)
+    if replaying():
+        # Phát lại cassette: mọi request được trả lời từ bản ghi, không cần đăng nhập
+        return service_pool.get_offline_service(service_name, version)
+    return service_pool.get_service(get_credentials(), service_name, version)
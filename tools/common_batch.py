@@ -0,0 +1,131 @@
+# intelligent_agent_platform/tools/common_batch.py
+
+import asyncio
+import contextvars
+import itertools
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import httplib2
+from google_auth_httplib2 import AuthorizedHttp
+from googleapiclient.errors import HttpError
+
+from cassette import cassette_http
+from config import BATCH_CHUNK_SIZE, BATCH_MAX_CONCURRENCY, BULK_MAX_ITEMS
+from tracing import span
+from .common_auth import service_pool
+from .common_execution import governed, is_retryable, part_retry_delay, service_of
+
+# Executor dùng chung cho toàn bộ process, giới hạn số batch chạy song song
+_executor = None
+_executor_lock = threading.Lock()
+# Mỗi thread giữ một kết nối HTTP riêng vì httplib2.Http không thread-safe
+_local = threading.local()
+
+
+def _get_executor() -> ThreadPoolExecutor:
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(max_workers=BATCH_MAX_CONCURRENCY, thread_name_prefix="google-batch")
+        return _executor
+
+
+def thread_http(service):
+    """Trả về kết nối HTTP của thread hiện tại, dùng cùng credentials với service."""
+    base = service._http
+    if isinstance(base, AuthorizedHttp):
+        return service_pool.get_http(base.credentials)
+
+    # Service không gắn credentials (ví dụ server giả lập): mỗi thread một httplib2.Http
+    http = getattr(_local, "http", None)
+    if http is None:
+        http = _local.http = httplib2.Http()
+    return http
+
+
+def execute_batch(service, requests: list, chunk_size: int = BATCH_CHUNK_SIZE) -> list:
+    """
+    Gửi nhiều request của cùng một service dưới dạng Google batch HTTP.
+    Các request được chia thành từng nhóm `chunk_size`, các nhóm được gửi song song
+    (tối đa BATCH_MAX_CONCURRENCY nhóm cùng lúc).
+    Các phần bị 429/5xx được gửi lại trong batch sau, theo backoff của lớp thực thi chung.
+    Trả về danh sách (response, exception) theo đúng thứ tự của `requests`.
+    """
+    if not requests:
+        return []
+
+    results = [(None, None)] * len(requests)
+    name = service_of(requests[0].uri)
+
+    def _callback(request_id, response, exception):
+        results[int(request_id)] = (response, exception)
+
+    def _run_chunk(indices: list):
+        batch = service.new_batch_http_request(callback=_callback)
+        for index in indices:
+            batch.add(requests[index], request_id=str(index))
+        # Cả batch đi qua giới hạn tốc độ với chi phí bằng số phần (Google tính quota theo từng phần)
+        with span("http", f"{name} batch", requests=len(indices)):
+            governed(name, lambda: batch.execute(http=cassette_http(thread_http(service))), "POST", cost=len(indices))
+
+    pending = list(range(len(requests)))
+    for attempt in itertools.count():
+        chunks = [pending[start:start + chunk_size] for start in range(0, len(pending), chunk_size)]
+        if len(chunks) == 1:
+            # Chỉ có một batch: chạy trực tiếp, không cần chuyển sang thread khác
+            _run_chunk(chunks[0])
+        else:
+            # Mỗi nhóm chạy trong context của lời gọi để span HTTP vẫn gắn vào span của tool
+            futures = [_get_executor().submit(contextvars.copy_context().run, _run_chunk, chunk) for chunk in chunks]
+            for future in futures:
+                future.result()
+
+        # Chỉ gửi lại các phần bị 429/5xx, các phần đã thành công hoặc lỗi của chính request thì giữ nguyên
+        pending = [i for i in pending if results[i][1] is not None and is_retryable(results[i][1], requests[i].method)]
+        delay = part_retry_delay(name, [results[i][1] for i in pending], attempt)
+        if delay is None:
+            return results
+        time.sleep(delay)
+
+
+async def aexecute_batch(service, requests: list, chunk_size: int = BATCH_CHUNK_SIZE) -> list:
+    """Phiên bản bất đồng bộ của execute_batch: batch HTTP của googleapiclient chạy trong thread, không chặn event loop."""
+    return await asyncio.to_thread(execute_batch, service, requests, chunk_size)
+
+
+# --- CÁC HÀM HỖ TRỢ CHO TOOL HÀNG LOẠT ---
+def prepare_bulk(items: list, build) -> tuple:
+    """
+    Kiểm tra toàn bộ các mục trước khi gửi request nào. `build(item)` trả về (giá trị, lỗi) cho một mục.
+    Trả về (danh sách giá trị, None), hoặc (None, thông báo lỗi liệt kê mọi mục không hợp lệ) để model sửa
+    và gọi lại một lần, thay vì một nửa danh sách đã được thực hiện.
+    """
+    if not items:
+        return None, "Lỗi: Danh sách trống, không có mục nào để thực hiện."
+    if len(items) > BULK_MAX_ITEMS:
+        return None, f"Lỗi: Tối đa {BULK_MAX_ITEMS} mục mỗi lần gọi, nhận được {len(items)}. Hãy chia nhỏ danh sách."
+    values, errors = [], []
+    for index, item in enumerate(items, start=1):
+        try:
+            value, error = build(item)
+        except (TypeError, KeyError, AttributeError, ValueError) as e:
+            value, error = None, f"mục không hợp lệ ({e})"
+        if error:
+            errors.append(f"- Mục {index}: {error.removeprefix('Lỗi: ')}")
+        values.append(value)
+    if errors:
+        return None, f"Lỗi: Có {len(errors)}/{len(items)} mục không hợp lệ, chưa thực hiện mục nào:\n" + "\n".join(errors)
+    return values, None
+
+
+def batch_item_error(exception: Exception) -> str:
+    """Thông báo lỗi ngắn gọn cho một request thất bại trong batch."""
+    if isinstance(exception, HttpError):
+        if exception.resp.status == 404:
+            return "Lỗi: không tìm thấy"
+        if exception.resp.status == 412:
+            return "Lỗi: đã bị thay đổi ở nơi khác, hãy đọc lại rồi thử lại"
+        return f"Lỗi HTTP {exception.resp.status}: {exception.reason}"
+    return f"Lỗi: {exception}"
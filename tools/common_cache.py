@@ -0,0 +1,209 @@
+# intelligent_agent_platform/tools/common_cache.py
+
+"""
+Cache đọc xuyên (read-through) cho kết quả của các tool chỉ đọc, dùng chung cho Calendar, Tasks và Gmail.
+
+Khoá là tên tool + tham số đã chuẩn hoá (giá trị mặc định được điền, chuỗi bỏ khoảng trắng thừa), nên cùng một
+truy vấn lặp lại trong vài giây (model hỏi lại, fast path rồi model, supervisor giao hai bước giống nhau...)
+không gọi lại Google API. Mỗi tool ghi (create/update/delete) xoá toàn bộ kết quả đã cache của đúng service
+của nó, các service khác giữ nguyên.
+
+Cách dùng (sau khi đã gắn `.coroutine` cho tool):
+    cache_reads(list_tasks, SERVICE_NAME)
+    invalidates(create_task, SERVICE_NAME)
+"""
+
+import functools
+import inspect
+import json
+import threading
+import time
+from collections import OrderedDict
+
+from config import TOOL_CACHE_ENABLED, TOOL_CACHE_MAX_ENTRIES, TOOL_CACHE_TTL
+from .common_auth import UserScoped
+from .common_format import collect_ids, register_id
+
+
+class ToolResultCache:
+    """
+    Cache LRU có thời gian sống của kết quả tool, chia theo service. Mỗi service có một "thế hệ" tăng lên
+    mỗi lần bị xoá cache: kết quả của lần đọc bắt đầu trước một lần ghi không được lưu lại sau lần ghi đó.
+    """
+
+    def __init__(self, ttl: float = TOOL_CACHE_TTL, max_entries: int = TOOL_CACHE_MAX_ENTRIES):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        # service -> OrderedDict(khoá -> (thời điểm hết hạn, kết quả, các ID đã register_id))
+        self._entries = {}
+        self._generations = {}
+        # Số lần clear(): cộng vào thế hệ của mọi service, kể cả service chưa có gì trong cache
+        self._clears = 0
+        self._hits = 0
+        self._misses = 0
+        self._invalidations = 0
+        self._invalidated_entries = 0
+
+    def get(self, service: str, key: str):
+        """(kết quả, các ID) nếu còn hạn, ngược lại None."""
+        with self._lock:
+            entries = self._entries.get(service, {})
+            entry = entries.get(key)
+            if entry is None or entry[0] < time.monotonic():
+                entries.pop(key, None)
+                self._misses += 1
+                return None
+            entries.move_to_end(key)
+            self._hits += 1
+            return entry[1], entry[2]
+
+    def _generation(self, service: str) -> int:
+        return self._clears + self._generations.get(service, 0)
+
+    def generation(self, service: str) -> int:
+        with self._lock:
+            return self._generation(service)
+
+    def put(self, service: str, key: str, generation: int, result: str, ids: list):
+        with self._lock:
+            if self._generation(service) != generation:
+                # Đã có lần ghi xen giữa: kết quả này có thể đã cũ
+                return
+            entries = self._entries.setdefault(service, OrderedDict())
+            entries[key] = (time.monotonic() + self.ttl, result, ids)
+            entries.move_to_end(key)
+            while len(entries) > self.max_entries:
+                entries.popitem(last=False)
+
+    def invalidate(self, service: str):
+        """Xoá mọi kết quả đã cache của một service (gọi sau mỗi tool ghi của service đó)."""
+        with self._lock:
+            self._generations[service] = self._generations.get(service, 0) + 1
+            self._invalidations += 1
+            self._invalidated_entries += len(self._entries.pop(service, {}))
+
+    def clear(self):
+        with self._lock:
+            self._clears += 1
+            self._entries.clear()
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self._hits + self._misses
+            return {
+                "hits": self._hits,
+                "misses": self._misses,
+                "hit_rate": self._hits / lookups if lookups else 0.0,
+                "invalidations": self._invalidations,
+                "invalidated_entries": self._invalidated_entries,
+                "entries": {service: len(entries) for service, entries in self._entries.items()},
+            }
+
+
+# Cache dùng chung của tiến trình, riêng cho từng người dùng trong server nhiều người dùng (xem common_auth.UserScoped);
+# benchmark có thể thay bằng instance khác qua thuộc tính module
+tool_result_cache = UserScoped(ToolResultCache)
+
+
+def _normalize(value):
+    if isinstance(value, str):
+        return " ".join(value.split())
+    if isinstance(value, (list, tuple)):
+        return [_normalize(v) for v in value]
+    if isinstance(value, dict):
+        return {k: _normalize(v) for k, v in value.items()}
+    return value
+
+
+def _cache_key(name: str, signature: inspect.Signature, args: tuple, kwargs: dict) -> str:
+    bound = signature.bind(*args, **kwargs)
+    bound.apply_defaults()
+    return json.dumps([name, _normalize(bound.arguments)], sort_keys=True, ensure_ascii=False, default=str)
+
+
+def _is_cacheable(result) -> bool:
+    # Không cache thông báo lỗi: lần gọi sau nên thử lại API
+    return isinstance(result, str) and not result.startswith("Lỗi")
+
+
+def _replay_ids(ids: list):
+    # Kết quả lấy từ cache không đi qua format_item: ghi nhận lại các ID để agent vẫn đổi được alias
+    for kind, value in ids:
+        register_id(value, kind)
+
+
+def cache_reads(tool, service: str):
+    """Bọc `func` và `coroutine` của một tool chỉ đọc bằng tool_result_cache."""
+    func, coroutine = tool.func, tool.coroutine
+    signature = inspect.signature(func)
+
+    @functools.wraps(func)
+    def cached(*args, **kwargs):
+        if not TOOL_CACHE_ENABLED:
+            return func(*args, **kwargs)
+        key = _cache_key(tool.name, signature, args, kwargs)
+        hit = tool_result_cache.get(service, key)
+        if hit is None:
+            generation = tool_result_cache.generation(service)
+            with collect_ids() as ids:
+                result = func(*args, **kwargs)
+            if not _is_cacheable(result):
+                _replay_ids(ids)
+                return result
+            hit = result, list(ids)
+            tool_result_cache.put(service, key, generation, *hit)
+        _replay_ids(hit[1])
+        return hit[0]
+
+    tool.func = cached
+    if coroutine is None:
+        return tool
+
+    @functools.wraps(coroutine)
+    async def acached(*args, **kwargs):
+        if not TOOL_CACHE_ENABLED:
+            return await coroutine(*args, **kwargs)
+        key = _cache_key(tool.name, signature, args, kwargs)
+        hit = tool_result_cache.get(service, key)
+        if hit is None:
+            generation = tool_result_cache.generation(service)
+            with collect_ids() as ids:
+                result = await coroutine(*args, **kwargs)
+            if not _is_cacheable(result):
+                _replay_ids(ids)
+                return result
+            hit = result, list(ids)
+            tool_result_cache.put(service, key, generation, *hit)
+        _replay_ids(hit[1])
+        return hit[0]
+
+    tool.coroutine = acached
+    return tool
+
+
+def invalidates(tool, service: str):
+    """Bọc `func` và `coroutine` của một tool ghi: sau mỗi lần chạy (kể cả lỗi), xoá cache của service."""
+    func, coroutine = tool.func, tool.coroutine
+
+    @functools.wraps(func)
+    def invalidating(*args, **kwargs):
+        try:
+            return func(*args, **kwargs)
+        finally:
+            # Lỗi (timeout, 5xx...) không chắc là thay đổi chưa được áp dụng, nên vẫn xoá
+            tool_result_cache.invalidate(service)
+
+    tool.func = invalidating
+    if coroutine is None:
+        return tool
+
+    @functools.wraps(coroutine)
+    async def ainvalidating(*args, **kwargs):
+        try:
+            return await coroutine(*args, **kwargs)
+        finally:
+            tool_result_cache.invalidate(service)
+
+    tool.coroutine = ainvalidating
+    return tool
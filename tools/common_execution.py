@@ -0,0 +1,345 @@
+# intelligent_agent_platform/tools/common_execution.py
+
+"""
+Lớp thực thi request Google API dùng chung cho mọi tool (mọi thread, mọi phiên trong process):
+
+- Token bucket theo service (gmail, calendar, tasks) theo GOOGLE_API_RATE_LIMITS: request vượt quota
+  được giữ lại chờ token thay vì bị Google trả 429.
+- Thử lại với exponential backoff + jitter khi gặp 429, 403 rateLimitExceeded, 5xx hoặc lỗi kết nối,
+  tôn trọng header Retry-After. Request không idempotent (POST) chỉ được thử lại khi chắc chắn Google
+  chưa xử lý (429 / quá quota), để không tạo trùng sự kiện hay công việc.
+- Circuit breaker theo service: sau GOOGLE_API_CIRCUIT_FAILURES lần thất bại liên tiếp (đã hết lượt thử lại),
+  request mới bị từ chối ngay trong GOOGLE_API_CIRCUIT_COOLDOWN giây thay vì dồn thêm tải lên Google.
+
+Request đồng bộ đi qua lớp này nhờ GovernedHttpRequest (requestBuilder của service, xem common_auth.build_service),
+request bất đồng bộ qua common_async.aexecute và batch qua common_batch.execute_batch.
+"""
+
+import asyncio
+import email.utils
+import math
+import random
+import threading
+import time
+import urllib.parse
+from typing import Optional
+
+import aiohttp
+import httplib2
+from googleapiclient.errors import HttpError
+from googleapiclient.http import HttpRequest
+
+from cassette import cassette_http
+from config import (
+    GOOGLE_API_BACKOFF_BASE, GOOGLE_API_BACKOFF_MAX, GOOGLE_API_CIRCUIT_COOLDOWN, GOOGLE_API_CIRCUIT_FAILURES,
+    GOOGLE_API_MAX_RETRIES, GOOGLE_API_RATE_LIMITS,
+)
+from tracing import span
+
+RETRYABLE_STATUSES = {429, 500, 502, 503, 504}
+# Lý do 403 mà Google dùng cho việc vượt quota (thử lại được, khác với 403 không có quyền)
+RATE_LIMIT_REASONS = {"rateLimitExceeded", "userRateLimitExceeded"}
+IDEMPOTENT_METHODS = {"GET", "HEAD", "PUT", "PATCH", "DELETE"}
+# Lỗi kết nối của httplib2 (request đồng bộ) và aiohttp (request bất đồng bộ, xem common_async.aexecute)
+TRANSIENT_ERRORS = (ConnectionError, TimeoutError, httplib2.ServerNotFoundError, aiohttp.ClientConnectionError)
+
+
+class CircuitOpenError(Exception):
+    """Service đang bị tạm ngừng gọi vì lỗi liên tục."""
+
+    def __init__(self, service: str, retry_in: float):
+        super().__init__(f"Google {service} đang quá tải hoặc lỗi liên tục, tạm ngừng gọi trong {math.ceil(retry_in)} giây. Hãy thử lại sau.")
+        self.service = service
+        self.retry_in = retry_in
+
+
+def service_of(uri: str) -> str:
+    """Tên service từ URI của request: phần đầu của path (gmail/v1/..., calendar/v3/..., tasks/v1/...)."""
+    path = urllib.parse.urlsplit(uri).path.strip("/").split("/")
+    if path[0] == "batch" and len(path) > 1:
+        return path[1]
+    return path[0]
+
+
+def _is_rate_limited(error: HttpError) -> bool:
+    if error.resp.status == 429:
+        return True
+    if error.resp.status != 403:
+        return False
+    try:
+        return any(detail.get("reason") in RATE_LIMIT_REASONS for detail in error.error_details or [])
+    except (AttributeError, TypeError):
+        return False
+
+
+def retry_after(error: Exception) -> Optional[float]:
+    """Số giây trong header Retry-After (dạng số giây hoặc ngày HTTP), hoặc None."""
+    resp = getattr(error, "resp", None)
+    value = resp.get("retry-after") if resp is not None else None
+    if not value:
+        return None
+    try:
+        return max(float(value), 0.0)
+    except ValueError:
+        parsed = email.utils.parsedate_to_datetime(value)
+        return max(parsed.timestamp() - time.time(), 0.0) if parsed else None
+
+
+def is_retryable(error: Exception, method: str) -> bool:
+    if isinstance(error, HttpError):
+        if _is_rate_limited(error):
+            return True
+        return error.resp.status in RETRYABLE_STATUSES and method in IDEMPOTENT_METHODS
+    return isinstance(error, TRANSIENT_ERRORS) and method in IDEMPOTENT_METHODS
+
+
+class TokenBucket:
+    """Token bucket an toàn giữa các thread; `reserve` trả về số giây phải chờ (token được đặt trước, có thể âm)."""
+
+    def __init__(self, rate: float, capacity: float):
+        self.rate = rate
+        self.capacity = capacity
+        self._tokens = capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def reserve(self, cost: float = 1) -> float:
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+            self._tokens -= cost
+            return max(-self._tokens / self.rate, 0.0)
+
+
+class CircuitBreaker:
+    """closed -> open sau `threshold` lần thất bại liên tiếp -> half-open sau `cooldown` giây (cho một request thử)."""
+
+    def __init__(self, threshold: int, cooldown: float):
+        self.threshold = threshold
+        self.cooldown = cooldown
+        self._failures = 0
+        self._open_until = 0.0
+        self._probing = False
+        self._lock = threading.Lock()
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            if self._open_until > time.monotonic():
+                return "open"
+            return "half_open" if self._open_until else "closed"
+
+    def before_call(self) -> Optional[float]:
+        """None nếu được gọi, ngược lại số giây còn phải chờ."""
+        with self._lock:
+            now = time.monotonic()
+            if self._open_until > now:
+                return self._open_until - now
+            if self._open_until:
+                # Half-open: chỉ một request thử, các request khác chờ kết quả của nó
+                if self._probing:
+                    return self.cooldown
+                self._probing = True
+            return None
+
+    def record(self, success: bool, open_for: Optional[float] = None):
+        """Ghi nhận kết quả; `open_for` mở mạch ngay trong số giây đó (Google yêu cầu chờ lâu qua Retry-After)."""
+        with self._lock:
+            self._probing = False
+            if success:
+                self._failures = 0
+                self._open_until = 0.0
+                return
+            self._failures += 1
+            if open_for or self._failures >= self.threshold:
+                self._open_until = time.monotonic() + (open_for or self.cooldown)
+
+    def release_probe(self):
+        """Trả lại lượt thử half-open khi request kết thúc mà không biết kết quả (bị huỷ, lỗi ngoài dự kiến)."""
+        with self._lock:
+            self._probing = False
+
+
+class RequestGovernor:
+    """Token bucket, thử lại và circuit breaker cho từng service, kèm bộ đếm."""
+
+    def __init__(self, rate_limits: dict = GOOGLE_API_RATE_LIMITS, max_retries: int = GOOGLE_API_MAX_RETRIES,
+                 backoff_base: float = GOOGLE_API_BACKOFF_BASE, backoff_max: float = GOOGLE_API_BACKOFF_MAX,
+                 circuit_failures: int = GOOGLE_API_CIRCUIT_FAILURES, circuit_cooldown: float = GOOGLE_API_CIRCUIT_COOLDOWN):
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self._buckets = {service: TokenBucket(rate, burst) for service, (rate, burst) in rate_limits.items()}
+        self._circuit_failures = circuit_failures
+        self._circuit_cooldown = circuit_cooldown
+        self._breakers = {}
+        self._lock = threading.Lock()
+        self._counters = {}
+
+    def _breaker(self, service: str) -> CircuitBreaker:
+        with self._lock:
+            breaker = self._breakers.get(service)
+            if breaker is None:
+                breaker = self._breakers[service] = CircuitBreaker(self._circuit_failures, self._circuit_cooldown)
+            return breaker
+
+    def _count(self, service: str, name: str, amount: float = 1):
+        with self._lock:
+            counters = self._counters.setdefault(service, {})
+            counters[name] = counters.get(name, 0) + amount
+
+    def _throttle_delay(self, service: str, cost: float) -> float:
+        bucket = self._buckets.get(service)
+        delay = bucket.reserve(cost) if bucket else 0.0
+        self._count(service, "requests", cost)
+        if delay > 0:
+            self._count(service, "throttled")
+            self._count(service, "throttle_wait", delay)
+        return delay
+
+    def _admit(self, service: str):
+        retry_in = self._breaker(service).before_call()
+        if retry_in is not None:
+            self._count(service, "circuit_rejected")
+            raise CircuitOpenError(service, retry_in)
+
+    def backoff(self, attempt: int, error: Exception) -> Optional[float]:
+        """Số giây chờ trước lần thử lại thứ `attempt` (bắt đầu từ 0); None nếu không nên chờ trong lượt này."""
+        delay = random.uniform(0, min(self.backoff_max, self.backoff_base * 2 ** attempt))
+        after = retry_after(error)
+        if after is not None:
+            if after > self.backoff_max:
+                return None
+            delay = max(delay, after)
+        return delay
+
+    def _on_error(self, service: str, error: Exception, method: str, attempt: int) -> float:
+        """Số giây chờ trước khi thử lại; ném lại `error` nếu không thử lại."""
+        breaker = self._breaker(service)
+        if not is_retryable(error, method):
+            # Lỗi của chính request (404, 412, 400...): service vẫn hoạt động bình thường.
+            # 5xx của POST không được thử lại nhưng vẫn tính là service đang lỗi.
+            server_error = is_retryable(error, "GET")
+            if server_error:
+                self._count(service, "failed")
+            breaker.record(success=not server_error)
+            raise error
+        after = retry_after(error)
+        delay = self.backoff(attempt, error) if attempt < self.max_retries else None
+        if delay is None:
+            self._count(service, "failed")
+            breaker.record(success=False, open_for=after if after and after > self.backoff_max else None)
+            raise error
+        self._count(service, "retried")
+        if after is not None:
+            self._count(service, "retry_after")
+        return delay
+
+    def part_retry_delay(self, service: str, errors: list, attempt: int) -> Optional[float]:
+        """
+        Số giây chờ trước khi gửi lại các phần thất bại (đều thử lại được) của một batch, hoặc None nếu bỏ cuộc.
+        Batch không được thử lại cả khối: chỉ các phần bị 429/5xx mới được gửi lại.
+        """
+        if not errors:
+            return None
+        delays = [self.backoff(attempt, error) for error in errors] if attempt < self.max_retries else [None]
+        if None in delays:
+            self._count(service, "failed", len(errors))
+            return None
+        self._count(service, "retried", len(errors))
+        return max(delays)
+
+    def call(self, service: str, fn, method: str = "GET", cost: float = 1):
+        """Chạy `fn()` (gửi một request hoặc một batch `cost` request) qua token bucket, thử lại và circuit breaker."""
+        attempt = 0
+        try:
+            while True:
+                if attempt == 0:
+                    self._admit(service)
+                time.sleep(self._throttle_delay(service, cost))
+                try:
+                    result = fn()
+                except (HttpError, *TRANSIENT_ERRORS) as e:
+                    time.sleep(self._on_error(service, e, method, attempt))
+                    attempt += 1
+                    continue
+                self._breaker(service).record(success=True)
+                return result
+        except (HttpError, CircuitOpenError, *TRANSIENT_ERRORS):
+            # Đã được ghi nhận trong _on_error, hoặc bị từ chối trước khi giữ lượt thử
+            raise
+        except BaseException:
+            self._breaker(service).release_probe()
+            raise
+
+    async def acall(self, service: str, fn, method: str = "GET", cost: float = 1):
+        """Phiên bản bất đồng bộ của call: `fn()` trả về coroutine, mọi lần chờ đều không chặn event loop."""
+        attempt = 0
+        try:
+            while True:
+                if attempt == 0:
+                    self._admit(service)
+                await asyncio.sleep(self._throttle_delay(service, cost))
+                try:
+                    result = await fn()
+                except (HttpError, *TRANSIENT_ERRORS) as e:
+                    await asyncio.sleep(self._on_error(service, e, method, attempt))
+                    attempt += 1
+                    continue
+                self._breaker(service).record(success=True)
+                return result
+        except (HttpError, CircuitOpenError, *TRANSIENT_ERRORS):
+            # Đã được ghi nhận trong _on_error, hoặc bị từ chối trước khi giữ lượt thử
+            raise
+        except BaseException:
+            self._breaker(service).release_probe()
+            raise
+
+    def stats(self) -> dict:
+        """Bộ đếm theo service: requests, throttled, throttle_wait (giây), retried, retry_after, failed, circuit_rejected."""
+        with self._lock:
+            services = set(self._counters) | set(self._breakers)
+            counters = {service: dict(self._counters.get(service, {})) for service in services}
+            breakers = dict(self._breakers)
+        for service, breaker in breakers.items():
+            counters[service]["circuit"] = breaker.state
+        return counters
+
+
+# Dùng chung cho toàn process; benchmark có thể thay bằng instance khác qua thuộc tính module
+request_governor = RequestGovernor()
+
+
+def governed(service: str, fn, method: str = "GET", cost: float = 1):
+    return request_governor.call(service, fn, method, cost)
+
+
+async def agoverned(service: str, fn, method: str = "GET", cost: float = 1):
+    return await request_governor.acall(service, fn, method, cost)
+
+
+def part_retry_delay(service: str, errors: list, attempt: int) -> Optional[float]:
+    return request_governor.part_retry_delay(service, errors, attempt)
+
+
+class GovernedHttpRequest(HttpRequest):
+    """HttpRequest của googleapiclient có `execute()` đi qua request_governor."""
+
+    def execute(self, http=None, num_retries=0):
+        parent = super().execute
+        service = service_of(self.uri)
+        with span("http", f"{service} {self.method}", request_bytes=len(self.body or "")) as attrs:
+            postproc = self.postproc
+
+            def measured(resp, content):
+                attrs["response_bytes"] = len(content or b"")
+                attrs["status"] = resp.status
+                return postproc(resp, content)
+
+            # postproc nhận nội dung response thô: đo kích thước ở đó, không cần parse lại kết quả
+            self.postproc = measured
+            try:
+                return governed(service, lambda: parent(http=cassette_http(http or self.http), num_retries=0), self.method)
+            finally:
+                self.postproc = postproc
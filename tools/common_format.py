@@ -0,0 +1,161 @@
+# intelligent_agent_platform/tools/common_format.py
+
+"""
+Định dạng kết quả dạng danh sách của các tool, dùng chung cho Calendar, Tasks và Gmail.
+
+- 'verbose': mỗi mục là một khối, mỗi trường một dòng có nhãn ("- ID: ...\\n  Tiêu đề: ...").
+- 'compact': một dòng tiêu đề cột, sau đó mỗi mục một dòng, các cột cách nhau bởi " | ".
+  Nhãn chỉ xuất hiện một lần nên kết quả ngắn hơn nhiều khi có nhiều mục.
+
+Các ID dài trong kết quả được ghi nhận lại (register_id) để lớp chạy tool của agent thay chúng bằng
+alias ngắn (E1, T2, M3, ...) theo từng phiên hội thoại, xem IdAliases.
+"""
+
+import contextlib
+import contextvars
+import re
+from typing import Optional
+
+from config import RESULT_FORMAT, RESULT_ID_ALIAS_MIN_LENGTH
+from history import estimate_tokens
+
+COLUMN_SEPARATOR = " | "
+
+# Tiền tố alias theo loại ID
+EVENT_ID = "E"
+TASK_ID = "T"
+MESSAGE_ID = "M"
+DRAFT_ID = "D"
+
+# Các ID (loại, giá trị) xuất hiện trong kết quả của lần chạy tool hiện tại; None khi không có ai thu thập
+_collected_ids = contextvars.ContextVar("collected_ids", default=None)
+
+
+def _cell(value) -> str:
+    # Một ô phải nằm trên một dòng và không chứa ký tự phân cách cột
+    return " ".join(str(value).split()).replace("|", "/")
+
+
+def register_id(value: str, kind: str):
+    """Ghi nhận một ID thật vừa được đưa vào kết quả tool để có thể thay bằng alias."""
+    collected = _collected_ids.get()
+    if collected is not None and value and len(value) >= RESULT_ID_ALIAS_MIN_LENGTH:
+        collected.append((kind, value))
+
+
+@contextlib.contextmanager
+def collect_ids():
+    """Thu thập các ID được register_id trong khối `with` (kể cả trong thread/task con được tạo từ đó)."""
+    collected = []
+    token = _collected_ids.set(collected)
+    try:
+        yield collected
+    finally:
+        _collected_ids.reset(token)
+
+
+def format_item(fields: list, record: dict, mode: Optional[str] = None, id_kind: Optional[str] = None) -> str:
+    """
+    Định dạng một mục. `fields` là danh sách (key, nhãn) theo thứ tự hiển thị; `record` chứa giá trị
+    (đã có giá trị mặc định) của từng key. Nếu có `id_kind`, giá trị của key "id" được ghi nhận để đổi alias.
+    """
+    if id_kind and record.get("id"):
+        register_id(record["id"], id_kind)
+    if (mode or RESULT_FORMAT) == "compact":
+        return COLUMN_SEPARATOR.join(_cell(record.get(key, "")) for key, _ in fields)
+    lines = [f"{label}: {record.get(key, '')}" for key, label in fields]
+    return "- " + "\n  ".join(lines)
+
+
+def format_items(intro: str, fields: list, items: list, mode: Optional[str] = None, footer: Optional[str] = None) -> str:
+    """Ghép các mục đã được format_item thành kết quả hoàn chỉnh."""
+    if (mode or RESULT_FORMAT) == "compact":
+        header = COLUMN_SEPARATOR.join(label for _, label in fields)
+        text = f"{intro}\n{header}\n" + "\n".join(items)
+    else:
+        text = f"{intro}\n" + "\n\n".join(items)
+    if footer:
+        text += f"\n\n{footer}"
+    return text
+
+
+def format_records(intro: str, fields: list, records: list, empty: str, mode: Optional[str] = None,
+                   id_kind: Optional[str] = None, footer: Optional[str] = None) -> str:
+    """Định dạng danh sách `records`; trả về `empty` khi danh sách rỗng."""
+    if not records:
+        return empty
+    items = [format_item(fields, record, mode, id_kind) for record in records]
+    return format_items(intro, fields, items, mode, footer)
+
+
+# Kết quả của tool hàng loạt: mỗi mục một dòng, theo thứ tự của danh sách đầu vào
+BULK_FIELDS = [("index", "#"), ("result", "Kết quả"), ("id", "ID"), ("title", "Tiêu đề")]
+
+
+def format_bulk_result(action: str, records: list, id_kind: Optional[str] = None, mode: Optional[str] = None) -> str:
+    """Định dạng kết quả của một tool hàng loạt; `result` của mỗi record là "OK" hoặc thông báo lỗi của mục đó."""
+    succeeded = sum(1 for record in records if record["result"] == "OK")
+    intro = f"{action}: thành công {succeeded}/{len(records)} mục."
+    return format_records(intro, BULK_FIELDS, records, "Không có mục nào.", mode, id_kind)
+
+
+def count_text_tokens(text: str, model=None) -> int:
+    """
+    Số token của một đoạn văn bản: đếm chính xác bằng `model.get_num_tokens` nếu có model
+    (với Gemini là một lần gọi API), nếu không thì dùng ước lượng của history.estimate_tokens.
+    """
+    if model is not None:
+        return model.get_num_tokens(text)
+    return estimate_tokens(text)
+
+
+class IdAliases:
+    """
+    Bản đồ alias -> ID thật của một phiên hội thoại (nằm trong state của graph, key `id_aliases`,
+    nên được checkpointer lưu cùng hội thoại). Một ID luôn nhận cùng một alias trong phiên.
+    """
+
+    def __init__(self, mapping: Optional[dict] = None):
+        self.mapping = dict(mapping or {})
+        self._by_id = {real: alias for alias, real in self.mapping.items()}
+        # Các alias mới tạo trong lần chạy tool hiện tại (được trả về để gộp vào state)
+        self.added = {}
+
+    def alias(self, real_id: str, kind: str) -> str:
+        if real_id in self._by_id:
+            return self._by_id[real_id]
+        number = sum(1 for alias in self.mapping if re.fullmatch(rf"{kind}\d+", alias)) + 1
+        alias = f"{kind}{number}"
+        self.mapping[alias] = self.added[alias] = real_id
+        self._by_id[real_id] = alias
+        return alias
+
+    def _resolve_value(self, value):
+        if isinstance(value, str):
+            return self.mapping.get(value.strip(), value)
+        if isinstance(value, list):
+            return [self._resolve_value(item) for item in value]
+        return value
+
+    def _resolve_nested(self, value):
+        # Danh sách các mục của tool hàng loạt, ví dụ updates=[{"task_id": "T1", ...}]
+        if isinstance(value, dict):
+            return self.resolve_args(value)
+        if isinstance(value, list):
+            return [self._resolve_nested(item) for item in value]
+        return value
+
+    def resolve_args(self, args: dict) -> dict:
+        """Đổi alias trong các tham số ID (tên kết thúc bằng 'id' hoặc 'ids', kể cả bên trong các mục lồng nhau) về ID thật."""
+        return {
+            key: self._resolve_value(value) if key.lower().endswith(("id", "ids")) else self._resolve_nested(value)
+            for key, value in args.items()
+        }
+
+    def shorten(self, text: str) -> str:
+        """Thay mọi ID thật đã biết trong `text` bằng alias của nó."""
+        # ID dài trước để một ID không bị thay một phần bởi ID ngắn hơn nằm trong nó
+        for real_id in sorted(self._by_id, key=len, reverse=True):
+            if real_id in text:
+                text = text.replace(real_id, self._by_id[real_id])
+        return text
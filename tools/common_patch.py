@@ -0,0 +1,77 @@
+# intelligent_agent_platform/tools/common_patch.py
+
+"""
+Cập nhật có điều kiện bằng ETag, dùng chung cho update_event và update_task.
+
+Tool gửi MỘT request patch chỉ chứa các trường thay đổi, kèm `If-Match` là ETag của bản đã đọc trước đó
+(bản sao Calendar / cache Tasks), nên không cần GET trước mỗi lần sửa. Nếu Google trả 412 (tài nguyên đã bị
+phiên khác sửa sau lần đọc đó), bản mới nhất được đọc lại:
+- các trường định sửa không bị ai đổi -> gửi lại patch với ETag mới;
+- có trường định sửa đã bị đổi -> ném ConcurrentEditError để tool báo cho người dùng thay vì ghi đè.
+"""
+
+from typing import Callable, Optional
+
+from googleapiclient.errors import HttpError
+
+from config import CONDITIONAL_UPDATE_MAX_RETRIES
+from .common_async import aexecute
+
+
+class ConcurrentEditError(Exception):
+    """Các trường định sửa đã bị thay đổi ở nơi khác kể từ lần đọc gần nhất."""
+
+    def __init__(self, fields: list, latest: dict):
+        super().__init__(", ".join(fields))
+        self.fields = fields
+        self.latest = latest
+
+
+def if_match(request, etag: Optional[str]):
+    """Gắn header If-Match vào một HttpRequest (nếu có ETag) và trả về chính request đó."""
+    if etag:
+        request.headers["If-Match"] = etag
+    return request
+
+
+def _conflicts(known: Optional[dict], latest: dict, patch: dict) -> list:
+    # Phiên khác đã ghi đúng giá trị agent định ghi: không phải xung đột
+    keys = [key for key in patch if latest.get(key) != patch[key]]
+    # Không có bản đã đọc để so sánh: chỉ biết ETag đã đổi, coi như mọi trường định sửa đều có thể bị đổi
+    if known is None:
+        return keys
+    return [key for key in keys if known.get(key) != latest.get(key)]
+
+
+def patch_if_unchanged(patch: dict, make_patch: Callable, make_get: Callable, known: Optional[dict]) -> dict:
+    """
+    Gửi `make_patch()` (HttpRequest patch với body `patch`) kèm If-Match là ETag của `known` (nếu có).
+    `make_get()` dựng request đọc lại tài nguyên khi nhận 412.
+    Trả về tài nguyên sau khi sửa.
+    """
+    for attempt in range(CONDITIONAL_UPDATE_MAX_RETRIES + 1):
+        try:
+            return if_match(make_patch(), (known or {}).get("etag")).execute()
+        except HttpError as e:
+            if e.resp.status != 412 or attempt == CONDITIONAL_UPDATE_MAX_RETRIES:
+                raise
+        refetched = make_get().execute()
+        conflicts = _conflicts(known, refetched, patch)
+        if conflicts:
+            raise ConcurrentEditError(conflicts, refetched)
+        known = refetched
+
+
+async def apatch_if_unchanged(patch: dict, make_patch: Callable, make_get: Callable, known: Optional[dict]) -> dict:
+    """Phiên bản bất đồng bộ của patch_if_unchanged."""
+    for attempt in range(CONDITIONAL_UPDATE_MAX_RETRIES + 1):
+        try:
+            return await aexecute(if_match(make_patch(), (known or {}).get("etag")))
+        except HttpError as e:
+            if e.resp.status != 412 or attempt == CONDITIONAL_UPDATE_MAX_RETRIES:
+                raise
+        refetched = await aexecute(make_get())
+        conflicts = _conflicts(known, refetched, patch)
+        if conflicts:
+            raise ConcurrentEditError(conflicts, refetched)
+        known = refetched
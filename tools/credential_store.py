@@ -0,0 +1,103 @@
+# intelligent_agent_platform/tools/credential_store.py
+
+import hashlib
+import json
+import secrets
+import sqlite3
+import threading
+import time
+from typing import Optional
+
+from cryptography.fernet import Fernet, InvalidToken
+from google.oauth2.credentials import Credentials
+
+from config import CREDENTIAL_STORE_DB, CREDENTIAL_STORE_KEY, SCOPES
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS users (
+    user_id TEXT PRIMARY KEY,
+    api_key_hash TEXT NOT NULL UNIQUE,
+    credentials BLOB NOT NULL,
+    updated REAL NOT NULL
+);
+"""
+
+
+def _hash_key(api_key: str) -> str:
+    return hashlib.sha256(api_key.encode()).hexdigest()
+
+
+class CredentialStore:
+    """
+    Kho credentials Google theo người dùng cho server nhiều người dùng (server.py), lưu trong SQLite.
+    Token của mỗi người dùng (gồm refresh token) được mã hoá bằng Fernet với khoá CREDENTIAL_STORE_KEY;
+    API key của người dùng chỉ được lưu dưới dạng hash SHA-256.
+    """
+
+    def __init__(self, path: str = CREDENTIAL_STORE_DB, key: Optional[str] = CREDENTIAL_STORE_KEY):
+        if not key:
+            raise ValueError(
+                "Chưa có CREDENTIAL_STORE_KEY. Tạo khoá bằng: "
+                "python -c \"from cryptography.fernet import Fernet; print(Fernet.generate_key().decode())\""
+            )
+        self._fernet = Fernet(key.encode() if isinstance(key, str) else key)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.executescript(SCHEMA)
+
+    def add_user(self, user_id: str, creds: Credentials) -> str:
+        """Thêm (hoặc thay) người dùng với credentials đã đăng nhập; trả về API key mới để gọi server."""
+        api_key = secrets.token_urlsafe(32)
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO users (user_id, api_key_hash, credentials, updated) VALUES (?, ?, ?, ?)",
+                (user_id, _hash_key(api_key), self._fernet.encrypt(creds.to_json().encode()), time.time()),
+            )
+        return api_key
+
+    def authenticate(self, api_key: str) -> Optional[str]:
+        """user_id của API key, hoặc None nếu key không hợp lệ."""
+        with self._lock:
+            row = self._conn.execute("SELECT user_id FROM users WHERE api_key_hash = ?", (_hash_key(api_key),)).fetchone()
+        return row[0] if row else None
+
+    def load(self, user_id: str) -> Credentials:
+        with self._lock:
+            row = self._conn.execute("SELECT credentials FROM users WHERE user_id = ?", (user_id,)).fetchone()
+        if row is None:
+            raise KeyError(f"Không có credentials của người dùng {user_id}")
+        try:
+            info = json.loads(self._fernet.decrypt(row[0]))
+        except InvalidToken:
+            raise ValueError(f"Không giải mã được credentials của người dùng {user_id} (sai CREDENTIAL_STORE_KEY?)")
+        return Credentials.from_authorized_user_info(info, SCOPES)
+
+    def save(self, user_id: str, creds: Credentials):
+        """Ghi lại credentials sau khi làm mới access token."""
+        with self._lock, self._conn:
+            self._conn.execute(
+                "UPDATE users SET credentials = ?, updated = ? WHERE user_id = ?",
+                (self._fernet.encrypt(creds.to_json().encode()), time.time(), user_id),
+            )
+
+    def remove(self, user_id: str) -> bool:
+        with self._lock, self._conn:
+            return self._conn.execute("DELETE FROM users WHERE user_id = ?", (user_id,)).rowcount > 0
+
+    def users(self) -> list:
+        with self._lock:
+            return [row[0] for row in self._conn.execute("SELECT user_id FROM users ORDER BY user_id")]
+
+
+_store = None
+_store_lock = threading.Lock()
+
+
+def get_credential_store() -> CredentialStore:
+    """Kho dùng chung cho cả process, được mở ở lần dùng đầu tiên."""
+    global _store
+    with _store_lock:
+        if _store is None:
+            _store = CredentialStore()
+        return _store
@@ -0,0 +1,341 @@
+# intelligent_agent_platform/tools/gmail_index.py
+
+import hashlib
+import os
+import re
+import sqlite3
+import threading
+import time
+from typing import Optional
+
+from googleapiclient.errors import HttpError
+
+from config import GMAIL_INDEX_DB, GMAIL_INDEX_MAX_MESSAGES, GMAIL_INDEX_MAX_STALENESS
+from .common_auth import UserScoped, current_google_user
+from .common_batch import execute_batch, thread_http
+
+# Số message mỗi trang khi liệt kê/đồng bộ (tối đa của Gmail API)
+SYNC_PAGE_SIZE = 500
+HISTORY_TYPES = ['messageAdded', 'messageDeleted', 'labelAdded', 'labelRemoved']
+# Nhãn làm message bị loại khỏi kết quả tìm kiếm mặc định của Gmail
+EXCLUDED_LABELS = {'SPAM', 'TRASH'}
+# Từ khoá chỉ gồm chữ, số và vài ký tự thường gặp trong địa chỉ email; mọi cú pháp khác
+# (from:, OR, -từ, "cụm từ", ngoặc...) được để Gmail API xử lý
+_PLAIN_KEYWORDS = re.compile(r"[\w\s.@'-]+")
+_OPERATORS = re.compile(r"(^|\s)((OR|AND)(\s|$)|-)")
+
+# rowid = internalDate (giây) * ROWID_SLOTS + số thứ tự, nên thứ tự rowid cũng là thứ tự thời gian:
+# "ORDER BY rowid DESC LIMIT n" dừng sớm trên cả bảng messages lẫn bảng FTS5, kể cả khi từ khoá khớp rất nhiều message
+ROWID_SLOTS = 1000
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT);
+CREATE TABLE IF NOT EXISTS labels (id TEXT PRIMARY KEY, name TEXT);
+CREATE TABLE IF NOT EXISTS messages (
+    rowid INTEGER PRIMARY KEY,
+    id TEXT UNIQUE NOT NULL,
+    thread_id TEXT,
+    sender TEXT,
+    subject TEXT,
+    snippet TEXT
+);
+CREATE TABLE IF NOT EXISTS message_labels (
+    label_id TEXT NOT NULL,
+    message_rowid INTEGER NOT NULL,
+    PRIMARY KEY (label_id, message_rowid)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS message_labels_by_message ON message_labels (message_rowid);
+-- External content: văn bản chỉ lưu một lần trong bảng messages; không cần bm25 nên bỏ bảng docsize
+CREATE VIRTUAL TABLE IF NOT EXISTS messages_fts USING fts5 (
+    subject, snippet, sender, content = 'messages', content_rowid = 'rowid',
+    columnsize = 0, tokenize = 'unicode61 remove_diacritics 2'
+);
+"""
+
+
+def _header(message: dict, name: str) -> str:
+    headers = message.get('payload', {}).get('headers', [])
+    return next((h['value'] for h in headers if h['name'].lower() == name), '')
+
+
+class GmailIndex:
+    """
+    Chỉ mục cục bộ (SQLite + FTS5) của header, nhãn và snippet trong hộp thư.
+    Lần đầu đồng bộ toàn bộ (tối đa GMAIL_INDEX_MAX_MESSAGES message mới nhất), sau đó cập nhật bằng
+    users.history.list từ historyId đã lưu khi chỉ mục cũ hơn GMAIL_INDEX_MAX_STALENESS giây.
+    `search` trả về None cho các truy vấn chỉ mục không trả lời được; khi đó caller gọi Gmail API như cũ.
+    """
+
+    def __init__(self, path: str = GMAIL_INDEX_DB, max_messages: int = GMAIL_INDEX_MAX_MESSAGES, max_staleness: float = GMAIL_INDEX_MAX_STALENESS):
+        self.max_messages = max_messages
+        self.max_staleness = max_staleness
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.executescript(SCHEMA)
+        self._lock = threading.Lock()
+        self._sync_lock = threading.Lock()
+        self._synced_at = 0.0
+        self._hits = 0
+        self._misses = 0
+        self._errors = 0
+        self._full_syncs = 0
+        self._incremental_syncs = 0
+
+    # --- Trạng thái ---
+    def _get_meta(self, key: str) -> Optional[str]:
+        row = self._conn.execute("SELECT value FROM meta WHERE key = ?", (key,)).fetchone()
+        return row[0] if row else None
+
+    def _set_meta(self, key: str, value):
+        self._conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)", (key, str(value)))
+
+    def reset(self):
+        """Xoá toàn bộ chỉ mục; lần đồng bộ sau sẽ lấy lại từ đầu."""
+        with self._lock, self._conn:
+            self._conn.execute("INSERT INTO messages_fts (messages_fts) VALUES ('delete-all')")
+            for table in ('meta', 'labels', 'messages', 'message_labels'):
+                self._conn.execute(f"DELETE FROM {table}")
+        self._synced_at = 0.0
+
+    # --- Ghi vào chỉ mục ---
+    def _upsert_messages(self, messages: list):
+        with self._lock, self._conn:
+            for message in messages:
+                self._delete(message['id'])
+                label_ids = set(message.get('labelIds', []))
+                if label_ids & EXCLUDED_LABELS:
+                    continue
+                base = int(message.get('internalDate', 0)) // 1000 * ROWID_SLOTS
+                last = self._conn.execute("SELECT max(rowid) FROM messages WHERE rowid BETWEEN ? AND ?", (base, base + ROWID_SLOTS - 1)).fetchone()[0]
+                rowid = base if last is None else last + 1
+                row = (rowid, message['id'], message.get('threadId'), _header(message, 'from'), _header(message, 'subject'), message.get('snippet', ''))
+                self._conn.execute("INSERT INTO messages (rowid, id, thread_id, sender, subject, snippet) VALUES (?, ?, ?, ?, ?, ?)", row)
+                self._conn.execute("INSERT INTO messages_fts (rowid, subject, snippet, sender) VALUES (?, ?, ?, ?)", (rowid, row[4], row[5], row[3]))
+                self._conn.executemany("INSERT INTO message_labels (label_id, message_rowid) VALUES (?, ?)", [(label, rowid) for label in label_ids])
+
+    def _delete(self, message_id: str):
+        row = self._conn.execute("SELECT rowid, subject, snippet, sender FROM messages WHERE id = ?", (message_id,)).fetchone()
+        if row is None:
+            return
+        # Bảng FTS external content cần đúng nội dung cũ để gỡ các token khỏi chỉ mục
+        self._conn.execute("INSERT INTO messages_fts (messages_fts, rowid, subject, snippet, sender) VALUES ('delete', ?, ?, ?, ?)", row)
+        self._conn.execute("DELETE FROM messages WHERE rowid = ?", row[:1])
+        self._conn.execute("DELETE FROM message_labels WHERE message_rowid = ?", row[:1])
+
+    def _set_labels(self, message_id: str, label_ids: list) -> bool:
+        """Cập nhật nhãn của một message đã có trong chỉ mục; False nếu cần lấy lại metadata."""
+        row = self._conn.execute("SELECT rowid FROM messages WHERE id = ?", (message_id,)).fetchone()
+        if row is None:
+            return False
+        if set(label_ids) & EXCLUDED_LABELS:
+            self._delete(message_id)
+            return True
+        self._conn.execute("DELETE FROM message_labels WHERE message_rowid = ?", row)
+        self._conn.executemany("INSERT INTO message_labels (label_id, message_rowid) VALUES (?, ?)", [(label, row[0]) for label in set(label_ids)])
+        return True
+
+    def _fetch_metadata(self, service, message_ids: list) -> list:
+        # Dựng resource một lần: mỗi lần gọi service.users().messages() đều tạo lại toàn bộ method từ discovery
+        resource = service.users().messages()
+        requests = [
+            resource.get(userId='me', id=message_id, format='metadata', metadataHeaders=['Subject', 'From'])
+            for message_id in message_ids
+        ]
+        fetched, failed = [], []
+        for request, (response, error) in zip(requests, execute_batch(service, requests)):
+            if error is None:
+                fetched.append(response)
+            elif not (isinstance(error, HttpError) and error.resp.status == 404):
+                failed.append(request)
+        if failed:
+            # Thử lại một lần cho các phần lỗi (thường là 429 trong batch); message đã bị xoá (404) thì bỏ qua
+            for response, error in execute_batch(service, failed):
+                if error is not None and not (isinstance(error, HttpError) and error.resp.status == 404):
+                    raise error
+                if error is None:
+                    fetched.append(response)
+            # Giữ đúng thứ tự của message_ids (thứ tự ghi quyết định rowid của các message cùng một giây)
+            position = {message_id: i for i, message_id in enumerate(message_ids)}
+            fetched.sort(key=lambda message: position[message['id']])
+        return fetched
+
+    # --- Đồng bộ ---
+    def _sync_labels(self, service):
+        labels = service.users().labels().list(userId='me').execute(http=thread_http(service)).get('labels', [])
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM labels")
+            self._conn.executemany("INSERT INTO labels (id, name) VALUES (?, ?)", [(label['id'], label['name']) for label in labels])
+
+    def _full_sync(self, service):
+        self.reset()
+        # historyId lấy trước khi liệt kê, để các thay đổi xảy ra trong lúc đồng bộ được áp dụng ở lần sau
+        history_id = service.users().getProfile(userId='me').execute(http=thread_http(service))['historyId']
+        self._sync_labels(service)
+        page_token, message_ids, complete = None, [], True
+        while True:
+            page_size = min(SYNC_PAGE_SIZE, self.max_messages - len(message_ids))
+            response = service.users().messages().list(userId='me', maxResults=page_size, pageToken=page_token).execute(http=thread_http(service))
+            message_ids.extend(m['id'] for m in response.get('messages', []))
+            page_token = response.get('nextPageToken')
+            if not page_token:
+                break
+            if len(message_ids) >= self.max_messages:
+                # Hộp thư lớn hơn giới hạn: chỉ mục chỉ chứa các message mới nhất
+                complete = False
+                break
+        # Gmail liệt kê mới nhất trước; ghi từ cũ nhất để các message cùng một giây có rowid đúng thứ tự thời gian
+        message_ids.reverse()
+        for start in range(0, len(message_ids), SYNC_PAGE_SIZE):
+            self._upsert_messages(self._fetch_metadata(service, message_ids[start:start + SYNC_PAGE_SIZE]))
+        with self._lock, self._conn:
+            self._set_meta('history_id', history_id)
+            self._set_meta('complete', int(complete))
+        self._full_syncs += 1
+
+    def _incremental_sync(self, service, history_id: str):
+        # dict dùng như tập có thứ tự: message được ghi theo thứ tự trong lịch sử (cũ trước)
+        page_token, added, labels_changed, latest = None, {}, False, history_id
+        while True:
+            response = service.users().history().list(
+                userId='me', startHistoryId=history_id, historyTypes=HISTORY_TYPES, pageToken=page_token
+            ).execute(http=thread_http(service))
+            with self._lock, self._conn:
+                for record in response.get('history', []):
+                    for item in record.get('messagesAdded', []):
+                        added[item['message']['id']] = None
+                    for item in record.get('messagesDeleted', []):
+                        added.pop(item['message']['id'], None)
+                        self._delete(item['message']['id'])
+                    for item in record.get('labelsAdded', []) + record.get('labelsRemoved', []):
+                        labels_changed = True
+                        message = item['message']
+                        if message['id'] not in added and not self._set_labels(message['id'], message.get('labelIds', [])):
+                            # Message chưa có trong chỉ mục (ví dụ vừa được đưa ra khỏi thùng rác)
+                            added[message['id']] = None
+            latest = response.get('historyId', latest)
+            page_token = response.get('nextPageToken')
+            if not page_token:
+                break
+        if added:
+            self._upsert_messages(self._fetch_metadata(service, list(added)))
+        if labels_changed:
+            # Có thể có nhãn người dùng mới
+            self._sync_labels(service)
+        with self._lock, self._conn:
+            self._set_meta('history_id', latest)
+        self._incremental_syncs += 1
+
+    def sync(self, service):
+        """Đồng bộ chỉ mục với Gmail (toàn bộ hoặc tăng dần). An toàn khi gọi từ bất kỳ thread nào."""
+        with self._sync_lock:
+            if time.monotonic() - self._synced_at < self.max_staleness:
+                return
+            with self._lock:
+                history_id = self._get_meta('history_id')
+            if history_id is None:
+                self._full_sync(service)
+            else:
+                try:
+                    self._incremental_sync(service, history_id)
+                except HttpError as e:
+                    if e.resp.status != 404:
+                        raise
+                    # historyId quá cũ (Gmail chỉ giữ lịch sử trong một khoảng thời gian): đồng bộ lại toàn bộ
+                    self._full_sync(service)
+            self._synced_at = time.monotonic()
+
+    # --- Truy vấn ---
+    def _label_id(self, label: str) -> Optional[str]:
+        row = self._conn.execute(
+            "SELECT id FROM labels WHERE lower(id) = lower(?) OR lower(name) = lower(?)", (label, label)
+        ).fetchone()
+        return row[0] if row else None
+
+    def search(self, query: Optional[str], from_sender: Optional[str], label: Optional[str], is_unread: bool, max_results: int) -> Optional[list]:
+        """
+        Tìm message theo cùng các tham số của list_emails, mới nhất trước.
+        Trả về danh sách (id, tiêu đề, người gửi), hoặc None nếu chỉ mục không trả lời được truy vấn này.
+        """
+        if query and (not _PLAIN_KEYWORDS.fullmatch(query) or _OPERATORS.search(query)):
+            self._misses += 1
+            return None
+        with self._lock:
+            if self._get_meta('history_id') is None:
+                self._misses += 1
+                return None
+            label_ids = []
+            if label:
+                label_id = self._label_id(label)
+                if label_id is None:
+                    self._misses += 1
+                    return None
+                label_ids.append(label_id)
+            if is_unread:
+                label_ids.append('UNREAD')
+            if not (query or from_sender or label or is_unread):
+                # Giống _build_search_query: không có bộ lọc nào thì lấy hộp thư đến
+                label_ids.append('INBOX')
+
+            params = []
+            if query:
+                # Đi theo bảng FTS5 (thứ tự rowid giảm dần) và nối sang messages
+                sql = "SELECT m.id, m.subject, m.sender FROM messages_fts f JOIN messages m ON m.rowid = f.rowid WHERE messages_fts MATCH ?"
+                params.append(" ".join('"' + term.replace('"', '""') + '"' for term in query.split()))
+                order = "f.rowid"
+            else:
+                sql = "SELECT m.id, m.subject, m.sender FROM messages m WHERE 1"
+                order = "m.rowid"
+            for label_id in label_ids:
+                sql += " AND EXISTS (SELECT 1 FROM message_labels l WHERE l.label_id = ? AND l.message_rowid = m.rowid)"
+                params.append(label_id)
+            if from_sender:
+                sql += " AND instr(lower(m.sender), lower(?)) > 0"
+                params.append(from_sender)
+            sql += f" ORDER BY {order} DESC LIMIT ?"
+            params.append(max_results)
+            rows = self._conn.execute(sql, params).fetchall()
+            complete = self._get_meta('complete') == '1'
+
+        if len(rows) < max_results and not complete:
+            # Chỉ mục chỉ có phần mới nhất của hộp thư: có thể còn kết quả cũ hơn mà chỉ API thấy được
+            self._misses += 1
+            return None
+        self._hits += 1
+        return rows
+
+    def record_error(self):
+        """Ghi nhận một lần chỉ mục lỗi (đồng bộ hoặc truy vấn) và caller phải hỏi Gmail API."""
+        with self._lock:
+            self._errors += 1
+
+    def stats(self) -> dict:
+        with self._lock:
+            count = self._conn.execute("SELECT count(*) FROM messages").fetchone()[0]
+        total = self._hits + self._misses
+        return {
+            "messages": count,
+            "hits": self._hits,
+            "misses": self._misses,
+            "errors": self._errors,
+            "full_syncs": self._full_syncs,
+            "incremental_syncs": self._incremental_syncs,
+            "hit_rate": self._hits / total if total else 0.0,
+        }
+
+
+def _index_path(user_id: Optional[str]) -> str:
+    # Server nhiều người dùng: mỗi người dùng một file chỉ mục, tên file không lộ user_id
+    if user_id is None:
+        return GMAIL_INDEX_DB
+    root, ext = os.path.splitext(GMAIL_INDEX_DB)
+    return f"{root}.{hashlib.sha256(user_id.encode()).hexdigest()[:16]}{ext}"
+
+
+# Factory chạy trong ngữ cảnh của người dùng hiện tại nên biết được file chỉ mục của người đó. Chỉ giữ
+# SERVER_MAX_CACHED_USERS chỉ mục gần nhất; kết nối sqlite của chỉ mục bị loại được đóng khi không còn ai dùng.
+_gmail_index = UserScoped(lambda: GmailIndex(_index_path(current_google_user())))
+
+
+def get_gmail_index() -> GmailIndex:
+    """Chỉ mục của người dùng hiện tại (cả process nếu không chạy server nhiều người dùng), tạo ở lần dùng đầu tiên."""
+    return _gmail_index.current()
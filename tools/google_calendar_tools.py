@@ -1,5 +1,7 @@
 import os.path
+import base64
 import datetime
+import json
 from typing import Optional, List
 
 from google.auth.transport.requests import Request
@@ -10,66 +12,282 @@ from googleapiclient.errors import HttpError
 from langchain_core.tools import tool
 
 # Import cấu hình từ file config.py
-from config import SCOPES, CALENDAR_ID, TOKEN_FILE, CREDENTIALS_FILE
+from config import (
+    SCOPES, CALENDAR_ID, TOKEN_FILE, CREDENTIALS_FILE, CALENDAR_MIRROR_ENABLED,
+    LIST_EVENTS_MAX_EVENTS, LIST_EVENTS_MAX_CHARS, EVENT_DESCRIPTION_MAX_CHARS,
+)
 from .common_auth import get_google_service
+from .common_async import aexecute
+from .common_batch import aexecute_batch, batch_item_error, execute_batch, prepare_bulk
+from .calendar_mirror import calendar_mirror
+from .common_format import EVENT_ID, format_bulk_result, format_item, format_items
+from .common_cache import cache_reads, invalidates
+from .common_patch import ConcurrentEditError, apatch_if_unchanged, patch_if_unchanged
+from tracing import span
 # --- CÁC TOOLS CHO GOOGLE CALENDAR ---
 SERVICE_NAME = "calendar"
 VERSION = "v3"
+
+# --- CÁC HÀM HỖ TRỢ (dùng chung cho bản đồng bộ và bất đồng bộ của tools) ---
+def _resolve_time_range(start_time: Optional[str], end_time: Optional[str]):
+    """Chuẩn hóa khoảng thời gian; mặc định là 7 ngày kể từ hôm nay."""
+    # Cải tiến: Nếu không có thời gian, mặc định lấy 7 ngày tới
+    if not start_time:
+        start_dt = datetime.datetime.now(datetime.timezone(datetime.timedelta(hours=7)))
+        start_time = start_dt.replace(hour=0, minute=0, second=1).isoformat()  # RFC 3339
+    else:
+        # Chuyển đổi string thành datetime có timezone
+        start_dt = datetime.datetime.fromisoformat(start_time)
+        if start_dt.tzinfo is None:
+            start_dt = start_dt.replace(tzinfo=datetime.timezone(datetime.timedelta(hours=7)))
+        start_time = start_dt.replace(hour=0, minute=0, second=1).isoformat()
+
+    if not end_time:
+        end_dt = start_dt + datetime.timedelta(days=7)
+        end_time = end_dt.isoformat()
+    else:
+        end_dt = datetime.datetime.fromisoformat(end_time)
+        if end_dt.tzinfo is None:
+            end_dt = end_dt.replace(tzinfo=datetime.timezone(datetime.timedelta(hours=7)))
+        end_time = end_dt.isoformat()
+    return start_time, end_time
+
+def _list_events_request(service, start_time: str, end_time: str, page_token: Optional[str] = None):
+    return service.events().list(
+        calendarId=CALENDAR_ID,
+        timeMin=start_time,
+        timeMax=end_time,
+        singleEvents=True,
+        orderBy='startTime',
+        # Mỗi trang vừa đủ cho một lần trả lời; trang tiếp theo chỉ được lấy khi thật sự cần
+        maxResults=LIST_EVENTS_MAX_EVENTS + 1,
+        pageToken=page_token,
+    )
+
+def iter_event_pages(service, start_time: str, end_time: str, page_token: Optional[str] = None):
+    """Generator đi qua các trang của events().list theo nextPageToken, trả về (pageToken của trang, response)."""
+    while True:
+        response = _list_events_request(service, start_time, end_time, page_token).execute()
+        yield page_token, response
+        page_token = response.get("nextPageToken")
+        if not page_token:
+            return
+
+async def aiter_event_pages(service, start_time: str, end_time: str, page_token: Optional[str] = None):
+    """Phiên bản bất đồng bộ của iter_event_pages."""
+    while True:
+        response = await aexecute(_list_events_request(service, start_time, end_time, page_token))
+        yield page_token, response
+        page_token = response.get("nextPageToken")
+        if not page_token:
+            return
+
+def _encode_continuation(start_time: str, end_time: str, page_token: Optional[str], skip: int) -> str:
+    """
+    Token "xem tiếp" cho model: khoảng thời gian, pageToken của Google (None nếu bắt đầu từ trang đầu
+    hoặc kết quả lấy từ bản sao cục bộ) và số sự kiện cần bỏ qua tính từ đầu trang đó.
+    """
+    payload = json.dumps({"s": start_time, "e": end_time, "p": page_token, "k": skip}, separators=(",", ":"))
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip("=")
+
+def _decode_continuation(token: str):
+    payload = json.loads(base64.urlsafe_b64decode(token + "=" * (-len(token) % 4)))
+    return payload["s"], payload["e"], payload["p"], payload["k"]
+
+EVENT_FIELDS = [("id", "ID"), ("summary", "Tóm tắt"), ("start", "Thời gian"), ("notes", "Ghi chú")]
+
+def _format_event(event: dict) -> str:
+    notes = event.get("description", "Không có mô tả")
+    if len(notes) > EVENT_DESCRIPTION_MAX_CHARS:
+        # Cắt mô tả trước khi định dạng để một sự kiện dài không chiếm hết ngân sách
+        notes = notes[:EVENT_DESCRIPTION_MAX_CHARS].rstrip() + "…"
+    record = {
+        "id": event.get("id", "Không có ID"),
+        "summary": event.get("summary", "Không có tiêu đề"),
+        "start": event["start"].get("dateTime", event["start"].get("date")),
+        "notes": notes,
+    }
+    return format_item(EVENT_FIELDS, record, id_kind=EVENT_ID)
+
+class _EventBudget:
+    """Gom các sự kiện đã định dạng cho tới khi chạm giới hạn số sự kiện hoặc số ký tự."""
+
+    def __init__(self, start_time: str, end_time: str):
+        self.start_time = start_time
+        self.end_time = end_time
+        self.lines = []
+        self.chars = 0
+        self.continuation = None
+
+    def add(self, page_token: Optional[str], index: int, event: dict) -> bool:
+        """Thêm một sự kiện; trả về False (và ghi lại vị trí để xem tiếp) khi đã hết ngân sách."""
+        line = _format_event(event)
+        if len(self.lines) >= LIST_EVENTS_MAX_EVENTS or (self.lines and self.chars + len(line) > LIST_EVENTS_MAX_CHARS):
+            self.continuation = _encode_continuation(self.start_time, self.end_time, page_token, index)
+            return False
+        self.lines.append(line)
+        self.chars += len(line) + 2
+        return True
+
+    def render(self) -> str:
+        if not self.lines:
+            return f"Không có sự kiện nào được tìm thấy trong khoảng thời gian này."
+        footer = None
+        if self.continuation:
+            footer = f"(Còn thêm sự kiện. Gọi lại list_events với page_token='{self.continuation}' để xem tiếp.)"
+        return format_items("Đây là các sự kiện được tìm thấy:", EVENT_FIELDS, self.lines, footer=footer)
+
+def _budget_from_list(events: list, start_time: str, end_time: str, skip: int) -> _EventBudget:
+    budget = _EventBudget(start_time, end_time)
+    for index in range(skip, len(events)):
+        if not budget.add(None, index, events[index]):
+            break
+    return budget
+
+def _add_page(budget: _EventBudget, page_token: Optional[str], items: list, skip: int):
+    """Thêm các sự kiện của một trang, bỏ qua `skip` sự kiện đầu; trả về (còn ngân sách không, số sự kiện còn phải bỏ qua)."""
+    if skip >= len(items):
+        return True, skip - len(items)
+    return all(budget.add(page_token, index, event) for index, event in enumerate(items[skip:], start=skip)), 0
+
+def _resolve_list_args(start_time: Optional[str], end_time: Optional[str], page_token: Optional[str]):
+    """(start, end, pageToken của Google, số sự kiện bỏ qua) cho list_events."""
+    if page_token:
+        return _decode_continuation(page_token)
+    start_time, end_time = _resolve_time_range(start_time, end_time)
+    return start_time, end_time, None, 0
+
+def _event_body(summary, start_time, end_time, description, location, reminders, attendees) -> dict:
+    return {
+        "summary": summary,
+        "location": location,
+        "description": description,
+        "start": {"dateTime": start_time, "timeZone": "Asia/Ho_Chi_Minh"},
+        "end": {"dateTime": end_time, "timeZone": "Asia/Ho_Chi_Minh"},
+        "reminders": reminders if reminders else {"useDefault": True},
+        "attendees": [{"email": email} for email in attendees] if attendees else []
+    }
+
+def _event_patch(new_summary, new_start_time, new_end_time, new_description, new_location, new_reminders, new_attendees) -> dict:
+    """Body của events.patch: chỉ các trường thay đổi (Google giữ nguyên các trường khác, gộp các object lồng nhau)."""
+    patch = {}
+    if new_summary:
+        patch['summary'] = new_summary
+    if new_start_time:
+        patch['start'] = {'dateTime': new_start_time}
+    if new_end_time:
+        patch['end'] = {'dateTime': new_end_time}
+    if new_description:
+        patch['description'] = new_description
+    if new_location:
+        patch['location'] = new_location
+    if new_reminders:
+        patch['reminders'] = new_reminders
+    if new_attendees:
+        patch['attendees'] = [{"email": email} for email in new_attendees]
+    return patch
+
+def _event_requests(service, event_id: str, patch: dict):
+    """(dựng request patch, dựng request đọc lại) cho patch_if_unchanged."""
+    return (
+        lambda: service.events().patch(calendarId=CALENDAR_ID, eventId=event_id, body=patch),
+        lambda: service.events().get(calendarId=CALENDAR_ID, eventId=event_id),
+    )
+
+def _event_conflict_message(error: ConcurrentEditError) -> str:
+    calendar_mirror.upsert(error.latest)
+    current = ", ".join(f"{key}={error.latest.get(key)!r}" for key in error.fields)
+    return (f"Lỗi: Sự kiện '{error.latest.get('summary')}' vừa bị thay đổi ở nơi khác nên chưa được cập nhật. "
+            f"Giá trị hiện tại: {current}. Hãy xác nhận lại với người dùng trước khi gọi lại update_event.")
+
+def _new_event_item(item: dict):
+    """(body, lỗi) cho một mục của create_events_bulk; thời gian được kiểm tra trước khi gửi."""
+    for key in ("summary", "start_time", "end_time"):
+        if not item.get(key):
+            return None, f"Lỗi: Thiếu '{key}'."
+    try:
+        start_dt = datetime.datetime.fromisoformat(item["start_time"])
+        end_dt = datetime.datetime.fromisoformat(item["end_time"])
+    except ValueError:
+        return None, "Lỗi: Thời gian phải có định dạng ISO 8601 (YYYY-MM-DDTHH:MM:SS)."
+    if (start_dt.tzinfo is None) != (end_dt.tzinfo is None):
+        return None, "Lỗi: 'start_time' và 'end_time' phải cùng có hoặc cùng không có múi giờ."
+    if end_dt <= start_dt:
+        return None, "Lỗi: 'end_time' phải sau 'start_time'."
+    body = _event_body(item["summary"], item["start_time"], item["end_time"], item.get("description"),
+                       item.get("location"), item.get("reminders"), item.get("attendees"))
+    return body, None
+
+def _event_id_item(event_id: str):
+    if not isinstance(event_id, str) or not event_id.strip():
+        return None, "Lỗi: ID sự kiện trống."
+    return event_id.strip(), None
+
+def _created_event_records(results: list, bodies: list) -> list:
+    records = []
+    for index, ((response, exception), body) in enumerate(zip(results, bodies), start=1):
+        if exception is not None:
+            records.append({"index": index, "result": batch_item_error(exception), "id": "", "title": body["summary"]})
+            continue
+        calendar_mirror.upsert(response)
+        records.append({"index": index, "result": "OK", "id": response.get("id", ""), "title": response.get("summary", body["summary"])})
+    return records
+
+def _deleted_event_records(results: list, event_ids: list) -> list:
+    records = []
+    for index, ((_, exception), event_id) in enumerate(zip(results, event_ids), start=1):
+        if exception is None or (isinstance(exception, HttpError) and exception.resp.status in (404, 410)):
+            # 404/410: sự kiện đã không còn trên Google, xoá khỏi bản sao cục bộ
+            calendar_mirror.remove(event_id)
+        result = "OK" if exception is None else batch_item_error(exception)
+        records.append({"index": index, "result": result, "id": event_id, "title": ""})
+    return records
+
+# --- CÁC TOOLS ---
 @tool
-def list_events(start_time: Optional[str] = None, end_time: Optional[str] = None) -> str:
+def list_events(start_time: Optional[str] = None, end_time: Optional[str] = None, page_token: Optional[str] = None) -> str:
     """
     Liệt kê các sự kiện trong một khoảng thời gian cụ thể.
     Nếu không cung cấp thời gian, hàm sẽ tự động lấy các sự kiện trong 7 ngày tới.
     'start_time' và 'end_time' phải ở định dạng ISO 8601 (ví dụ: '2025-08-06T00:00:00+07:00').
-    Hàm này trả về tóm tắt, thời gian bắt đầu, và ID của mỗi sự kiện.    """
+    Hàm này trả về tóm tắt, thời gian bắt đầu, và ID của mỗi sự kiện.
+    Nếu còn nhiều sự kiện hơn mức hiển thị, kết quả có kèm 'page_token'; truyền lại giá trị đó (không cần thời gian) để xem tiếp."""
     try:
         service = get_google_service(SERVICE_NAME, VERSION)
-        
-        # Cải tiến: Nếu không có thời gian, mặc định lấy 7 ngày tới
-        if not start_time:
-            start_dt = datetime.datetime.now(datetime.timezone(datetime.timedelta(hours=7)))
-            start_time = start_dt.replace(hour=0, minute=0, second=1).isoformat()  # RFC 3339
-        else:
-            # Chuyển đổi string thành datetime có timezone
-            start_dt = datetime.datetime.fromisoformat(start_time)
-            if start_dt.tzinfo is None:
-                start_dt = start_dt.replace(tzinfo=datetime.timezone(datetime.timedelta(hours=7)))
-            start_time = start_dt.replace(hour=0, minute=0, second=1).isoformat()
-
-        if not end_time:
-            end_dt = start_dt + datetime.timedelta(days=7)
-            end_time = end_dt.isoformat()
-        else:
-            end_dt = datetime.datetime.fromisoformat(end_time)
-            if end_dt.tzinfo is None:
-                end_dt = end_dt.replace(tzinfo=datetime.timezone(datetime.timedelta(hours=7)))
-            end_time = end_dt.isoformat()
-
-        print(f"DEBUG: Tìm kiếm sự kiện từ {start_time} đến {end_time}")
-
-
-        events_result = service.events().list(
-            calendarId=CALENDAR_ID,
-            timeMin=start_time,
-            timeMax=end_time,
-            singleEvents=True,
-            orderBy='startTime'
-        ).execute()
-        
-        events = events_result.get("items", [])
-        if not events:
-            return f"Không có sự kiện nào được tìm thấy trong khoảng thời gian này."
+        start_time, end_time, google_page, skip = _resolve_list_args(start_time, end_time, page_token)
+        with span("query", "calendar list_events", start_time=start_time, end_time=end_time) as attrs:
+            # Ưu tiên bản sao cục bộ; None nghĩa là khoảng thời gian nằm ngoài phạm vi bản sao
+            events = calendar_mirror.query(service, start_time, end_time) if CALENDAR_MIRROR_ENABLED and google_page is None else None
+            attrs["source"] = "mirror" if events is not None else "api"
+            if events is not None:
+                return _budget_from_list(events, start_time, end_time, skip).render()
 
-        formatted_events = []
-        for event in events:
-            id = event.get("id", "Không có ID")
-            start = event["start"].get("dateTime", event["start"].get("date"))
-            summary = event.get("summary", "Không có tiêu đề")
-            notes = event.get("description", "Không có mô tả")
-            formatted_events.append(
-                f"- ID: {id}\n  Tóm tắt: {summary}\n  Thời gian: {start}\n  Ghi chú: {notes}"
-            )
-        return "Đây là các sự kiện được tìm thấy:\n" + "\n\n".join(formatted_events)
+            # Đọc từng trang, dừng ngay khi đã đủ ngân sách
+            budget = _EventBudget(start_time, end_time)
+            for page, response in iter_event_pages(service, start_time, end_time, google_page):
+                has_room, skip = _add_page(budget, page, response.get("items", []), skip)
+                if not has_room:
+                    break
+            return budget.render()
+    except Exception as e:
+        return f"Lỗi khi liệt kê sự kiện: {e}. Hãy chắc chắn định dạng thời gian là đúng (YYYY-MM-DDTHH:MM:SS)."
+
+async def _alist_events(start_time: Optional[str] = None, end_time: Optional[str] = None, page_token: Optional[str] = None) -> str:
+    try:
+        service = get_google_service(SERVICE_NAME, VERSION)
+        start_time, end_time, google_page, skip = _resolve_list_args(start_time, end_time, page_token)
+        with span("query", "calendar list_events", start_time=start_time, end_time=end_time) as attrs:
+            events = await calendar_mirror.aquery(service, start_time, end_time) if CALENDAR_MIRROR_ENABLED and google_page is None else None
+            attrs["source"] = "mirror" if events is not None else "api"
+            if events is not None:
+                return _budget_from_list(events, start_time, end_time, skip).render()
+
+            budget = _EventBudget(start_time, end_time)
+            async for page, response in aiter_event_pages(service, start_time, end_time, google_page):
+                has_room, skip = _add_page(budget, page, response.get("items", []), skip)
+                if not has_room:
+                    break
+            return budget.render()
     except Exception as e:
         return f"Lỗi khi liệt kê sự kiện: {e}. Hãy chắc chắn định dạng thời gian là đúng (YYYY-MM-DDTHH:MM:SS)."
 
@@ -84,16 +302,19 @@ def create_event(summary: str, start_time: str, end_time: str, description: Opti
     """
     try:
         service = get_google_service(SERVICE_NAME, VERSION)
-        event_body = {
-            "summary": summary,
-            "location": location,
-            "description": description,
-            "start": {"dateTime": start_time, "timeZone": "Asia/Ho_Chi_Minh"},
-            "end": {"dateTime": end_time, "timeZone": "Asia/Ho_Chi_Minh"},
-            "reminders": reminders if reminders else {"useDefault": True},
-            "attendees": [{"email": email} for email in attendees] if attendees else []
-        }
+        event_body = _event_body(summary, start_time, end_time, description, location, reminders, attendees)
         created_event = service.events().insert(calendarId=CALENDAR_ID, body=event_body).execute()
+        calendar_mirror.upsert(created_event)
+        return f"Đã tạo thành công sự kiện '{created_event.get('summary')}' vào lúc {created_event['start'].get('dateTime')}."
+    except Exception as e:
+        return f"Lỗi khi tạo sự kiện: {e}. Hãy chắc chắn định dạng thời gian là đúng (YYYY-MM-DDTHH:MM:SS)."
+
+async def _acreate_event(summary: str, start_time: str, end_time: str, description: Optional[str] = None, location: Optional[str] = None, reminders: Optional[dict] = None, attendees: Optional[List[str]] = None) -> str:
+    try:
+        service = get_google_service(SERVICE_NAME, VERSION)
+        event_body = _event_body(summary, start_time, end_time, description, location, reminders, attendees)
+        created_event = await aexecute(service.events().insert(calendarId=CALENDAR_ID, body=event_body))
+        calendar_mirror.upsert(created_event)
         return f"Đã tạo thành công sự kiện '{created_event.get('summary')}' vào lúc {created_event['start'].get('dateTime')}."
     except Exception as e:
         return f"Lỗi khi tạo sự kiện: {e}. Hãy chắc chắn định dạng thời gian là đúng (YYYY-MM-DDTHH:MM:SS)."
@@ -105,28 +326,35 @@ def update_event(event_id: str, new_summary: Optional[str] = None, new_start_tim
     Bạn có thể cung cấp các giá trị mới cho 'new_summary', 'new_start_time', 'new_end_time', 'new_description', 'new_location', 'new_reminders', 'new_attendees'.
     Định dạng thời gian mới phải là ISO 8601.
     """
+    patch = _event_patch(new_summary, new_start_time, new_end_time, new_description, new_location, new_reminders, new_attendees)
+    if not patch:
+        return "Lỗi: Không có thông tin gì để cập nhật."
+    try:
+        service = get_google_service(SERVICE_NAME, VERSION)
+        # Một request patch, có điều kiện theo ETag của bản đã đồng bộ (nếu sự kiện có trong bản sao)
+        updated_event = patch_if_unchanged(patch, *_event_requests(service, event_id, patch), calendar_mirror.get(event_id))
+        calendar_mirror.upsert(updated_event)
+        return f"Đã cập nhật thành công sự kiện '{updated_event.get('summary')}'."
+    except ConcurrentEditError as e:
+        return _event_conflict_message(e)
+    except HttpError as e:
+        if e.resp.status == 404:
+            return f"Lỗi: Không tìm thấy sự kiện với ID '{event_id}'."
+        return f"Lỗi HTTP khi cập nhật sự kiện: {e}"
+    except Exception as e:
+        return f"Lỗi không xác định khi cập nhật sự kiện: {e}"
+
+async def _aupdate_event(event_id: str, new_summary: Optional[str] = None, new_start_time: Optional[str] = None, new_end_time: Optional[str] = None, new_description: Optional[str] = None, new_location: Optional[str] = None, new_reminders: Optional[dict] = None, new_attendees: Optional[List[str]] = None) -> str:
+    patch = _event_patch(new_summary, new_start_time, new_end_time, new_description, new_location, new_reminders, new_attendees)
+    if not patch:
+        return "Lỗi: Không có thông tin gì để cập nhật."
     try:
         service = get_google_service(SERVICE_NAME, VERSION)
-        # Đầu tiên, lấy sự kiện hiện tại để không ghi đè mất các thông tin khác
-        event = service.events().get(calendarId=CALENDAR_ID, eventId=event_id).execute()
-
-        if new_summary:
-            event['summary'] = new_summary
-        if new_start_time:
-            event['start']['dateTime'] = new_start_time
-        if new_end_time:
-            event['end']['dateTime'] = new_end_time
-        if new_description:
-            event['description'] = new_description
-        if new_location:
-            event['location'] = new_location
-        if new_reminders:
-            event['reminders'] = new_reminders
-        if new_attendees:
-            event['attendees'] = [{"email": email} for email in new_attendees]
-
-        updated_event = service.events().update(calendarId=CALENDAR_ID, eventId=event_id, body=event).execute()
+        updated_event = await apatch_if_unchanged(patch, *_event_requests(service, event_id, patch), calendar_mirror.get(event_id))
+        calendar_mirror.upsert(updated_event)
         return f"Đã cập nhật thành công sự kiện '{updated_event.get('summary')}'."
+    except ConcurrentEditError as e:
+        return _event_conflict_message(e)
     except HttpError as e:
         if e.resp.status == 404:
             return f"Lỗi: Không tìm thấy sự kiện với ID '{event_id}'."
@@ -140,12 +368,103 @@ def delete_event(event_id: str) -> str:
     try:
         service = get_google_service(SERVICE_NAME, VERSION)
         service.events().delete(calendarId=CALENDAR_ID, eventId=event_id).execute()
+        calendar_mirror.remove(event_id)
+        return f"Đã xóa thành công sự kiện với ID: {event_id}."
+    except HttpError as e:
+        if e.resp.status == 404:
+            calendar_mirror.remove(event_id)
+            return f"Lỗi: Không tìm thấy sự kiện với ID '{event_id}' để xóa."
+        return f"Lỗi HTTP khi xóa sự kiện: {e}"
+    except Exception as e:
+        return f"Lỗi không xác định khi xóa sự kiện: {e}"
+
+async def _adelete_event(event_id: str) -> str:
+    try:
+        service = get_google_service(SERVICE_NAME, VERSION)
+        await aexecute(service.events().delete(calendarId=CALENDAR_ID, eventId=event_id))
+        calendar_mirror.remove(event_id)
         return f"Đã xóa thành công sự kiện với ID: {event_id}."
     except HttpError as e:
         if e.resp.status == 404:
+            calendar_mirror.remove(event_id)
             return f"Lỗi: Không tìm thấy sự kiện với ID '{event_id}' để xóa."
         return f"Lỗi HTTP khi xóa sự kiện: {e}"
     except Exception as e:
         return f"Lỗi không xác định khi xóa sự kiện: {e}"
 
-calendar_tools = [list_events, create_event, update_event, delete_event]
\ No newline at end of file
+@tool
+def create_events_bulk(events: List[dict]) -> str:
+    """
+    Tạo nhiều sự kiện cùng lúc (dùng thay cho việc gọi create_event nhiều lần).
+    'events' là danh sách các mục, mỗi mục có 'summary', 'start_time', 'end_time' (bắt buộc, ISO 8601,
+    ví dụ '2025-08-06T15:00:00+07:00') và 'description', 'location', 'attendees' (danh sách email) tùy chọn.
+    Mọi mục được kiểm tra trước; nếu có mục không hợp lệ thì không sự kiện nào được tạo.
+    Kết quả báo thành công hoặc lỗi cho từng mục.
+    """
+    bodies, error = prepare_bulk(events, _new_event_item)
+    if error:
+        return error
+    try:
+        service = get_google_service(SERVICE_NAME, VERSION)
+        requests = [service.events().insert(calendarId=CALENDAR_ID, body=body) for body in bodies]
+        return format_bulk_result("Tạo sự kiện", _created_event_records(execute_batch(service, requests), bodies), id_kind=EVENT_ID)
+    except Exception as e:
+        return f"Lỗi khi tạo hàng loạt sự kiện: {e}"
+
+async def _acreate_events_bulk(events: List[dict]) -> str:
+    bodies, error = prepare_bulk(events, _new_event_item)
+    if error:
+        return error
+    try:
+        service = get_google_service(SERVICE_NAME, VERSION)
+        requests = [service.events().insert(calendarId=CALENDAR_ID, body=body) for body in bodies]
+        return format_bulk_result("Tạo sự kiện", _created_event_records(await aexecute_batch(service, requests), bodies), id_kind=EVENT_ID)
+    except Exception as e:
+        return f"Lỗi khi tạo hàng loạt sự kiện: {e}"
+
+@tool
+def delete_events_bulk(event_ids: List[str]) -> str:
+    """
+    Xóa nhiều sự kiện cùng lúc bằng ID của chúng (dùng thay cho việc gọi delete_event nhiều lần).
+    Hành động này không thể hoàn tác. Kết quả báo thành công hoặc lỗi cho từng ID.
+    """
+    ids, error = prepare_bulk(event_ids, _event_id_item)
+    if error:
+        return error
+    try:
+        service = get_google_service(SERVICE_NAME, VERSION)
+        ids = list(dict.fromkeys(ids))
+        requests = [service.events().delete(calendarId=CALENDAR_ID, eventId=event_id) for event_id in ids]
+        return format_bulk_result("Xóa sự kiện", _deleted_event_records(execute_batch(service, requests), ids), id_kind=EVENT_ID)
+    except Exception as e:
+        return f"Lỗi khi xóa hàng loạt sự kiện: {e}"
+
+async def _adelete_events_bulk(event_ids: List[str]) -> str:
+    ids, error = prepare_bulk(event_ids, _event_id_item)
+    if error:
+        return error
+    try:
+        service = get_google_service(SERVICE_NAME, VERSION)
+        ids = list(dict.fromkeys(ids))
+        requests = [service.events().delete(calendarId=CALENDAR_ID, eventId=event_id) for event_id in ids]
+        return format_bulk_result("Xóa sự kiện", _deleted_event_records(await aexecute_batch(service, requests), ids), id_kind=EVENT_ID)
+    except Exception as e:
+        return f"Lỗi khi xóa hàng loạt sự kiện: {e}"
+
+# Gắn bản bất đồng bộ: agent async (ainvoke) sẽ dùng coroutine thay vì chặn thread bằng googleapiclient
+list_events.coroutine = _alist_events
+create_event.coroutine = _acreate_event
+update_event.coroutine = _aupdate_event
+delete_event.coroutine = _adelete_event
+create_events_bulk.coroutine = _acreate_events_bulk
+delete_events_bulk.coroutine = _adelete_events_bulk
+
+# Cache kết quả đọc; mỗi tool ghi xoá cache của service Calendar
+cache_reads(list_events, SERVICE_NAME)
+invalidates(create_event, SERVICE_NAME)
+invalidates(update_event, SERVICE_NAME)
+invalidates(delete_event, SERVICE_NAME)
+invalidates(create_events_bulk, SERVICE_NAME)
+invalidates(delete_events_bulk, SERVICE_NAME)
+
+calendar_tools = [list_events, create_event, update_event, delete_event, create_events_bulk, delete_events_bulk]
\ No newline at end of file
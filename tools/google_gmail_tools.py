@@ -1,3 +1,4 @@
+import asyncio
 import base64
 from typing import Optional, List
 from googleapiclient.errors import HttpError
@@ -5,21 +6,180 @@ from langchain_core.tools import tool
 
 # Import hàm xác thực chung
 from .common_auth import get_google_service
+from .common_batch import execute_batch
+from .common_async import aexecute, aexecute_all
+from .gmail_index import get_gmail_index
+from .common_format import DRAFT_ID, MESSAGE_ID, format_records
+from .common_cache import cache_reads
+from config import ASYNC_FETCH_CONCURRENCY, GMAIL_INDEX_ENABLED
+from tracing import span
 VERSION = "v1"
 SERVICE_NAME = "gmail"
+
+# --- CÁC HÀM HỖ TRỢ (dùng chung cho bản đồng bộ và bất đồng bộ của tools) ---
+LABEL_FIELDS = [("name", "Tên nhãn")]
+EMAIL_FIELDS = [("id", "ID"), ("subject", "Tiêu đề"), ("sender", "Người gửi")]
+DRAFT_FIELDS = [("id", "ID Nháp"), ("subject", "Tiêu đề")]
+
+def _format_labels(labels: list) -> str:
+    records = [{"name": label['name']} for label in labels]
+    return format_records("Đây là danh sách các nhãn của bạn:", LABEL_FIELDS, records, "Không tìm thấy nhãn nào.")
+
+def _build_search_query(query: Optional[str], from_sender: Optional[str], label: Optional[str], is_unread: bool) -> str:
+    # --- Xây dựng chuỗi query động từ các tham số (Phiên bản đơn giản và mạnh mẽ) ---
+    search_parts = []
+    if query:
+        search_parts.append(query)
+    if from_sender:
+        search_parts.append(f"from:{from_sender}")
+    if label:
+        # Cú pháp `label:` hoạt động cho cả nhãn hệ thống và nhãn người dùng.
+        # Thêm dấu ngoặc kép để xử lý các nhãn có dấu cách (ví dụ: "Project X").
+        search_parts.append(f"label:\"{label}\"")
+    if is_unread:
+        search_parts.append("is:unread")
+        
+    return " ".join(search_parts) if search_parts else 'in:inbox'
+
+def _metadata_requests(service, messages: list) -> list:
+    # Dựng resource một lần thay vì cho mỗi email (mỗi lần dựng phải tạo lại các method từ discovery)
+    resource = service.users().messages()
+    return [
+        resource.get(userId='me', id=msg['id'], format='metadata', metadataHeaders=['Subject', 'From'])
+        for msg in messages
+    ]
+
+def _email_record(msg_id: str, subject: Optional[str], sender: Optional[str]) -> dict:
+    return {"id": msg_id, "subject": subject or 'Không có tiêu đề', "sender": sender or 'Không rõ người gửi'}
+
+def _format_email_list(records: list) -> str:
+    return format_records(
+        "Đây là các email được tìm thấy:", EMAIL_FIELDS, records,
+        "Không tìm thấy email nào khớp với tiêu chí của bạn.", id_kind=MESSAGE_ID,
+    )
+
+def _format_email_previews(messages: list, results: list) -> str:
+    records = []
+    for msg, (msg_content, error) in zip(messages, results):
+        msg_id = msg['id']
+        if error:
+            records.append({"id": msg_id, "subject": f"Lỗi khi lấy thông tin: {error}", "sender": ""})
+            continue
+        headers = msg_content['payload']['headers']
+        
+        subject = next((h['value'] for h in headers if h['name'].lower() == 'subject'), None)
+        sender = next((h['value'] for h in headers if h['name'].lower() == 'from'), None)
+        
+        records.append(_email_record(msg_id, subject, sender))
+        
+    return _format_email_list(records)
+
+def _format_indexed_previews(rows: list) -> str:
+    return _format_email_list([_email_record(*row) for row in rows])
+
+def _search_index(service, query, from_sender, label, is_unread, max_results) -> Optional[list]:
+    """Tìm trong chỉ mục cục bộ (nếu bật); None nghĩa là phải hỏi Gmail API."""
+    if not GMAIL_INDEX_ENABLED:
+        return None
+    index = None
+    try:
+        index = get_gmail_index()
+        index.sync(service)
+        return index.search(query, from_sender, label, is_unread, max_results)
+    except Exception:
+        # Chỉ mục lỗi (mất mạng khi đồng bộ, file SQLite hỏng...): đếm trong GmailIndex.stats() và hỏi Gmail API như cũ
+        if index is not None:
+            index.record_error()
+        return None
+
+def _draft_requests(service, drafts: list) -> list:
+    resource = service.users().drafts()
+    return [
+        resource.get(userId='me', id=draft['id'], format='metadata')
+        for draft in drafts
+    ]
+
+def _format_draft_previews(drafts: list, results: list) -> str:
+    records = []
+    for draft, (draft_content, error) in zip(drafts, results):
+        draft_id = draft['id']
+        if error:
+            records.append({"id": draft_id, "subject": f"Lỗi khi lấy thông tin: {error}"})
+            continue
+        headers = draft_content['message']['payload']['headers']
+        subject = next((h['value'] for h in headers if h['name'].lower() == 'subject'), 'Không có tiêu đề')
+        records.append({"id": draft_id, "subject": subject})
+    
+    return format_records(
+        "Đây là danh sách các thư nháp của bạn:", DRAFT_FIELDS, records,
+        "Bạn không có thư nháp nào.", id_kind=DRAFT_ID,
+    )
+
+def _extract_text_body(payload: dict) -> str:
+    """Lấy phần nội dung text/plain (đã mã hóa base64url) của email."""
+    body_data = ""
+    parts = payload.get('parts', [])
+    if parts:
+        # Tìm phần nội dung là text/plain
+        part = next((p for p in parts if p.get('mimeType') == 'text/plain'), None)
+        if part:
+            body_data = part.get('body', {}).get('data', '')
+    # Nếu email không có parts (email đơn giản)
+    elif 'body' in payload and 'data' in payload['body']:
+        body_data = payload['body']['data']
+    return body_data
+
+def _format_email_content(message: dict) -> str:
+    body_data = _extract_text_body(message.get('payload', {}))
+    if not body_data:
+        return "Không thể trích xuất nội dung văn bản từ email này."
+    
+    # Dữ liệu được mã hóa base64url, cần giải mã
+    decoded_data = base64.urlsafe_b64decode(body_data).decode('utf-8')
+    
+    snippet = message.get('snippet', 'Không có tóm tắt.')
+    return f"Tóm tắt ngắn: {snippet}\n\nNội dung đầy đủ:\n---\n{decoded_data[:2000]}..." # Giới hạn độ dài để tránh quá tải
+
+def _format_draft_content(draft: dict) -> str:
+    message = draft.get('message', {})
+    payload = message.get('payload', {})
+    headers = payload.get('headers', [])
+    
+    # Trích xuất các thông tin quan trọng từ headers
+    recipient = next((h['value'] for h in headers if h['name'].lower() == 'to'), 'Chưa có người nhận')
+    subject = next((h['value'] for h in headers if h['name'].lower() == 'subject'), 'Không có tiêu đề')
+    
+    # Trích xuất nội dung (tương tự như read_email_content)
+    body_data = _extract_text_body(payload)
+
+    content = "Nội dung trống."
+    if body_data:
+        decoded_data = base64.urlsafe_b64decode(body_data).decode('utf-8')
+        content = decoded_data
+        
+    return (
+        f"Người nhận: {recipient}\n"
+        f"Tiêu đề: {subject}\n"
+        f"--- Nội dung ---\n"
+        f"{content}"
+    )
+
+# --- CÁC TOOLS ---
 @tool
 def list_labels() -> str:
     """Liệt kê tất cả các nhãn (labels) có trong hộp thư của người dùng."""
     try:
         service = get_google_service(SERVICE_NAME, VERSION)
         results = service.users().labels().list(userId='me').execute()
-        labels = results.get('labels', [])
-
-        if not labels:
-            return "Không tìm thấy nhãn nào."
+        return _format_labels(results.get('labels', []))
+    except Exception as e:
+        return f"Lỗi khi liệt kê nhãn: {e}"
 
-        label_names = [label['name'] for label in labels]
-        return "Đây là danh sách các nhãn của bạn:\n- " + "\n- ".join(label_names)
+async def _alist_labels() -> str:
+    try:
+        service = get_google_service(SERVICE_NAME, VERSION)
+        results = await aexecute(service.users().labels().list(userId='me'))
+        return _format_labels(results.get('labels', []))
     except Exception as e:
         return f"Lỗi khi liệt kê nhãn: {e}"
 
@@ -42,42 +202,51 @@ def list_emails(
     """
     try:
         service = get_google_service(SERVICE_NAME, VERSION)
-        
-        # --- Xây dựng chuỗi query động từ các tham số (Phiên bản đơn giản và mạnh mẽ) ---
-        search_parts = []
-        if query:
-            search_parts.append(query)
-        if from_sender:
-            search_parts.append(f"from:{from_sender}")
-        if label:
-            # Cú pháp `label:` hoạt động cho cả nhãn hệ thống và nhãn người dùng.
-            # Thêm dấu ngoặc kép để xử lý các nhãn có dấu cách (ví dụ: "Project X").
-            search_parts.append(f"label:\"{label}\"")
-        if is_unread:
-            search_parts.append("is:unread")
-            
-        search_query = " ".join(search_parts) if search_parts else 'in:inbox'
-        print(f"DEBUG: Gmail search query constructed: '{search_query}'")
+        search_query = _build_search_query(query, from_sender, label, is_unread)
+        with span("query", "gmail list_emails", query=search_query, max_results=max_results) as attrs:
+            rows = _search_index(service, query, from_sender, label, is_unread, max_results)
+            attrs["source"] = "index" if rows is not None else "api"
+            if rows is not None:
+                return _format_indexed_previews(rows)
 
-        # Lấy danh sách ID của các message khớp với query
-        response = service.users().messages().list(userId='me', q=search_query, maxResults=max_results).execute()
-        messages = response.get('messages', [])
+            # Lấy danh sách ID của các message khớp với query
+            response = service.users().messages().list(userId='me', q=search_query, maxResults=max_results).execute()
+            messages = response.get('messages', [])
 
-        if not messages:
-            return f"Không tìm thấy email nào khớp với tiêu chí của bạn."
+            if not messages:
+                return f"Không tìm thấy email nào khớp với tiêu chí của bạn."
 
-        email_previews = []
-        for msg in messages:
-            msg_id = msg['id']
-            msg_content = service.users().messages().get(userId='me', id=msg_id, format='metadata').execute()
-            headers = msg_content['payload']['headers']
-            
-            subject = next((h['value'] for h in headers if h['name'].lower() == 'subject'), 'Không có tiêu đề')
-            sender = next((h['value'] for h in headers if h['name'].lower() == 'from'), 'Không rõ người gửi')
-            
-            email_previews.append(f"- ID: {msg_id}\n  Tiêu đề: {subject}\n  Người gửi: {sender}")
-            
-        return "Đây là các email được tìm thấy:\n\n" + "\n\n".join(email_previews)
+            # Lấy metadata của tất cả email trong một (vài) batch request thay vì gọi từng cái một
+            return _format_email_previews(messages, execute_batch(service, _metadata_requests(service, messages)))
+
+    except Exception as e:
+        return f"Lỗi khi tìm kiếm email: {e}"
+
+async def _alist_emails(
+    query: Optional[str] = None, 
+    from_sender: Optional[str] = None, 
+    label: Optional[str] = None, 
+    is_unread: bool = False,
+    max_results: int = 5
+) -> str:
+    try:
+        service = get_google_service(SERVICE_NAME, VERSION)
+        search_query = _build_search_query(query, from_sender, label, is_unread)
+        with span("query", "gmail list_emails", query=search_query, max_results=max_results) as attrs:
+            # Đồng bộ chỉ mục dùng googleapiclient (chặn), nên chạy trong thread riêng
+            rows = await asyncio.to_thread(_search_index, service, query, from_sender, label, is_unread, max_results) if GMAIL_INDEX_ENABLED else None
+            attrs["source"] = "index" if rows is not None else "api"
+            if rows is not None:
+                return _format_indexed_previews(rows)
+            response = await aexecute(service.users().messages().list(userId='me', q=search_query, maxResults=max_results))
+            messages = response.get('messages', [])
+
+            if not messages:
+                return f"Không tìm thấy email nào khớp với tiêu chí của bạn."
+
+            # Lấy metadata song song trên pool kết nối của event loop
+            results = await aexecute_all(_metadata_requests(service, messages), ASYNC_FETCH_CONCURRENCY)
+            return _format_email_previews(messages, results)
 
     except Exception as e:
         return f"Lỗi khi tìm kiếm email: {e}"
@@ -91,28 +260,19 @@ def read_email_content(email_id: str) -> str:
     try:
         service = get_google_service(SERVICE_NAME, VERSION)
         message = service.users().messages().get(userId='me', id=email_id, format='full').execute()
-        
-        payload = message.get('payload', {})
-        parts = payload.get('parts', [])
-        
-        body_data = ""
-        if parts:
-            # Tìm phần nội dung là text/plain
-            part = next((p for p in parts if p.get('mimeType') == 'text/plain'), None)
-            if part:
-                body_data = part.get('body', {}).get('data', '')
-        # Nếu email không có parts (email đơn giản)
-        elif 'body' in payload and 'data' in payload['body']:
-            body_data = payload['body']['data']
-
-        if not body_data:
-            return "Không thể trích xuất nội dung văn bản từ email này."
-        
-        # Dữ liệu được mã hóa base64url, cần giải mã
-        decoded_data = base64.urlsafe_b64decode(body_data).decode('utf-8')
-        
-        snippet = message.get('snippet', 'Không có tóm tắt.')
-        return f"Tóm tắt ngắn: {snippet}\n\nNội dung đầy đủ:\n---\n{decoded_data[:2000]}..." # Giới hạn độ dài để tránh quá tải
+        return _format_email_content(message)
+    except HttpError as e:
+        if e.resp.status == 404:
+            return f"Lỗi: Không tìm thấy email với ID '{email_id}'."
+        return f"Lỗi HTTP khi đọc email: {e}"
+    except Exception as e:
+        return f"Lỗi không xác định khi đọc email: {e}"
+
+async def _aread_email_content(email_id: str) -> str:
+    try:
+        service = get_google_service(SERVICE_NAME, VERSION)
+        message = await aexecute(service.users().messages().get(userId='me', id=email_id, format='full'))
+        return _format_email_content(message)
     except HttpError as e:
         if e.resp.status == 404:
             return f"Lỗi: Không tìm thấy email với ID '{email_id}'."
@@ -131,16 +291,22 @@ def list_drafts(max_results: int = 5) -> str:
         if not drafts:
             return "Bạn không có thư nháp nào."
             
-        draft_previews = []
-        for draft in drafts:
-            draft_id = draft['id']
-            # Lấy thông tin của thư nháp
-            draft_content = service.users().drafts().get(userId='me', id=draft_id).execute()
-            headers = draft_content['message']['payload']['headers']
-            subject = next((h['value'] for h in headers if h['name'].lower() == 'subject'), 'Không có tiêu đề')
-            draft_previews.append(f"- ID Nháp: {draft_id}\n  Tiêu đề: {subject}")
+        # Lấy thông tin của các thư nháp trong một (vài) batch request
+        return _format_draft_previews(drafts, execute_batch(service, _draft_requests(service, drafts)))
+    except Exception as e:
+        return f"Lỗi khi liệt kê thư nháp: {e}"
+
+async def _alist_drafts(max_results: int = 5) -> str:
+    try:
+        service = get_google_service(SERVICE_NAME, VERSION)
+        response = await aexecute(service.users().drafts().list(userId='me', maxResults=max_results))
+        drafts = response.get('drafts', [])
         
-        return "Đây là danh sách các thư nháp của bạn:\n\n" + "\n\n".join(draft_previews)
+        if not drafts:
+            return "Bạn không có thư nháp nào."
+            
+        results = await aexecute_all(_draft_requests(service, drafts), ASYNC_FETCH_CONCURRENCY)
+        return _format_draft_previews(drafts, results)
     except Exception as e:
         return f"Lỗi khi liệt kê thư nháp: {e}"
 
@@ -155,36 +321,20 @@ def read_draft_content(draft_id: str) -> str:
 
         # Lấy thông tin chi tiết của thư nháp
         draft = service.users().drafts().get(userId='me', id=draft_id, format='full').execute()
-        
-        message = draft.get('message', {})
-        payload = message.get('payload', {})
-        headers = payload.get('headers', [])
-        
-        # Trích xuất các thông tin quan trọng từ headers
-        recipient = next((h['value'] for h in headers if h['name'].lower() == 'to'), 'Chưa có người nhận')
-        subject = next((h['value'] for h in headers if h['name'].lower() == 'subject'), 'Không có tiêu đề')
-        
-        # Trích xuất nội dung (tương tự như read_email_content)
-        body_data = ""
-        parts = payload.get('parts', [])
-        if parts:
-            part = next((p for p in parts if p.get('mimeType') == 'text/plain'), None)
-            if part:
-                body_data = part.get('body', {}).get('data', '')
-        elif 'body' in payload and 'data' in payload['body']:
-            body_data = payload['body']['data']
-
-        content = "Nội dung trống."
-        if body_data:
-            decoded_data = base64.urlsafe_b64decode(body_data).decode('utf-8')
-            content = decoded_data
-            
-        return (
-            f"Người nhận: {recipient}\n"
-            f"Tiêu đề: {subject}\n"
-            f"--- Nội dung ---\n"
-            f"{content}"
-        )
+        return _format_draft_content(draft)
+
+    except HttpError as e:
+        if e.resp.status == 404:
+            return f"Lỗi: Không tìm thấy thư nháp với ID '{draft_id}'."
+        return f"Lỗi HTTP khi đọc thư nháp: {e}"
+    except Exception as e:
+        return f"Lỗi không xác định khi đọc thư nháp: {e}"
+
+async def _aread_draft_content(draft_id: str) -> str:
+    try:
+        service = get_google_service(SERVICE_NAME, VERSION)
+        draft = await aexecute(service.users().drafts().get(userId='me', id=draft_id, format='full'))
+        return _format_draft_content(draft)
 
     except HttpError as e:
         if e.resp.status == 404:
@@ -193,6 +343,20 @@ def read_draft_content(draft_id: str) -> str:
     except Exception as e:
         return f"Lỗi không xác định khi đọc thư nháp: {e}"
 
+# Gắn bản bất đồng bộ: agent async (ainvoke) sẽ dùng coroutine thay vì chặn thread bằng googleapiclient
+list_labels.coroutine = _alist_labels
+list_emails.coroutine = _alist_emails
+read_email_content.coroutine = _aread_email_content
+list_drafts.coroutine = _alist_drafts
+read_draft_content.coroutine = _aread_draft_content
+
+# Cache kết quả đọc (Gmail chưa có tool ghi nên chỉ hết hạn theo TOOL_CACHE_TTL)
+cache_reads(list_labels, SERVICE_NAME)
+cache_reads(list_emails, SERVICE_NAME)
+cache_reads(read_email_content, SERVICE_NAME)
+cache_reads(list_drafts, SERVICE_NAME)
+cache_reads(read_draft_content, SERVICE_NAME)
+
 
 # ... (tool list_drafts giữ nguyên) ...
 
@@ -8,6 +8,12 @@ from langchain_core.tools import tool
 
 # Import hàm xác thực chung và cấu hình
 from .common_auth import get_google_service
+from .common_async import aexecute
+from .common_batch import aexecute_batch, batch_item_error, execute_batch, prepare_bulk
+from .tasks_cache import task_cache
+from .common_format import TASK_ID, format_bulk_result, format_records
+from .common_cache import cache_reads, invalidates
+from .common_patch import ConcurrentEditError, apatch_if_unchanged, if_match, patch_if_unchanged
 from config import TASK_LIST_ID
 SERVICE_NAME = "tasks"
 VERSION = "v1"
@@ -21,33 +27,125 @@ def _format_due_date(date_str: str) -> Optional[str]:
         # Nếu định dạng sai hoặc date_str là None
         return None
 
+def _check_due_filters(due_from: Optional[str], due_to: Optional[str]):
+    """Kiểm tra bộ lọc hạn chót của list_tasks; trả về lỗi (chuỗi) hoặc None."""
+    for value in (due_from, due_to):
+        if value and _format_due_date(value) is None:
+            return f"Lỗi: Định dạng ngày '{value}' không hợp lệ. Vui lòng dùng YYYY-MM-DD."
+    return None
+
+TASK_FIELDS = [("id", "ID"), ("title", "Tiêu đề"), ("due", "Hạn chót"), ("status", "Trạng thái")]
+
+def _format_tasks(items: list, filtered: bool = False) -> str:
+    records = [
+        {
+            "id": item.get('id', 'Không có ID'),
+            "title": item.get('title', 'Không có tiêu đề'),
+            "due": item.get('due', 'Không có hạn').split('T')[0], # Chỉ lấy phần ngày
+            "status": item.get('status', 'needsAction'),
+        }
+        for item in items
+    ]
+    empty = "Không có công việc nào khớp với bộ lọc." if filtered else "Bạn không có công việc nào."
+    return format_records("Đây là danh sách các công việc của bạn:", TASK_FIELDS, records, empty, id_kind=TASK_ID)
+
+def _task_body(title: str, notes: Optional[str], due_date: Optional[str]):
+    """Trả về (body, lỗi) cho create_task."""
+    task_body = {"title": title}
+    if notes:
+        task_body["notes"] = notes
+    if due_date:
+        formatted_due = _format_due_date(due_date)
+        if formatted_due:
+            task_body["due"] = formatted_due
+        else:
+            return None, f"Lỗi: Định dạng ngày '{due_date}' không hợp lệ. Vui lòng dùng YYYY-MM-DD."
+    return task_body, None
+
+def _task_update_body(new_title: Optional[str], new_notes: Optional[str], new_status: Optional[str]):
+    """Trả về (body, lỗi) cho update_task."""
+    update_body = {}
+    if new_title:
+        update_body['title'] = new_title
+    if new_notes:
+        update_body['notes'] = new_notes
+    if new_status:
+        if new_status not in ['completed', 'needsAction']:
+            return None, "Lỗi: Trạng thái mới phải là 'completed' hoặc 'needsAction'."
+        update_body['status'] = new_status
+    
+    if not update_body:
+        return None, "Lỗi: Không có thông tin gì để cập nhật."
+    return update_body, None
+
+
+def _task_requests(service, task_id: str, update_body: dict):
+    """(dựng request patch, dựng request đọc lại) cho patch_if_unchanged."""
+    return (
+        lambda: service.tasks().patch(tasklist=TASK_LIST_ID, task=task_id, body=update_body),
+        lambda: service.tasks().get(tasklist=TASK_LIST_ID, task=task_id),
+    )
+
+def _conditional_patch(service, task_id: str, update_body: dict):
+    """Request patch cho update_tasks_bulk, kèm If-Match nếu công việc có trong cache (mục bị sửa ở nơi khác nhận 412)."""
+    return if_match(service.tasks().patch(tasklist=TASK_LIST_ID, task=task_id, body=update_body), (task_cache.get(task_id) or {}).get("etag"))
+
+def _task_conflict_message(error: ConcurrentEditError) -> str:
+    task_cache.upsert(error.latest)
+    current = ", ".join(f"{key}={error.latest.get(key)!r}" for key in error.fields)
+    return (f"Lỗi: Công việc '{error.latest.get('title')}' vừa bị thay đổi ở nơi khác nên chưa được cập nhật. "
+            f"Giá trị hiện tại: {current}. Hãy xác nhận lại với người dùng trước khi gọi lại update_task.")
+
+def _new_task_item(item: dict):
+    """(body, lỗi) cho một mục của create_tasks_bulk."""
+    if not item.get("title"):
+        return None, "Lỗi: Không thể tạo task mà không có tiêu đề."
+    return _task_body(item["title"], item.get("notes"), item.get("due_date"))
+
+def _task_update_item(item: dict):
+    """((task_id, body), lỗi) cho một mục của update_tasks_bulk."""
+    if not item.get("task_id"):
+        return None, "Lỗi: Cần phải có ID của công việc để cập nhật."
+    update_body, error = _task_update_body(item.get("new_title"), item.get("new_notes"), item.get("new_status"))
+    return (item["task_id"], update_body), error
+
+def _bulk_task_records(results: list, task_ids: list, titles: list) -> list:
+    """Cập nhật cache theo kết quả batch và tạo các dòng báo cáo (một dòng mỗi mục)."""
+    records = []
+    for index, ((response, exception), task_id, title) in enumerate(zip(results, task_ids, titles), start=1):
+        if exception is not None:
+            records.append({"index": index, "result": batch_item_error(exception), "id": task_id or "", "title": title})
+            continue
+        task_cache.upsert(response)
+        records.append({"index": index, "result": "OK", "id": response.get("id", ""), "title": response.get("title", title)})
+    return records
 
 @tool
-def list_tasks() -> str:
+def list_tasks(only_open: bool = False, due_from: Optional[str] = None, due_to: Optional[str] = None) -> str:
     """
     Liệt kê các công việc trong danh sách mặc định.
+    'only_open' là True để chỉ lấy các công việc chưa hoàn thành.
+    'due_from' và 'due_to' (định dạng 'YYYY-MM-DD', tính cả hai đầu) để chỉ lấy các công việc có hạn chót trong khoảng đó.
     """
+    error = _check_due_filters(due_from, due_to)
+    if error:
+        return error
     try:
         service = get_google_service(SERVICE_NAME, VERSION)
-        results = service.tasks().list(
-            tasklist=TASK_LIST_ID, 
-            showCompleted='true',
-            showHidden='true',
-        ).execute()
-        
-        items = results.get("items", [])
-        if not items:
-            return f"Bạn không có công việc nào."
-
-        formatted_tasks = []
-        for item in items:
-            taskId = item.get('id', 'Không có ID')
-            status = item.get('status', 'needsAction')
-            title = item.get('title', 'Không có tiêu đề')
-            due_date = item.get('due', 'Không có hạn').split('T')[0] # Chỉ lấy phần ngày
-            formatted_tasks.append(f"-  ID: {taskId}\n  Tiêu đề: {title}\n  Hạn chót: {due_date}\n  Trạng thái: {status}")
-
-        return "Đây là danh sách các công việc của bạn:\n" + "\n\n".join(formatted_tasks)
+        # Lấy từ cache (đủ mọi trang, làm mới bằng updatedMin + ETag) rồi lọc tại chỗ
+        items = task_cache.query(service, only_open, due_from, due_to)
+        return _format_tasks(items, filtered=bool(only_open or due_from or due_to))
+    except Exception as e:
+        return f"Lỗi khi liệt kê công việc: {e}"
+
+async def _alist_tasks(only_open: bool = False, due_from: Optional[str] = None, due_to: Optional[str] = None) -> str:
+    error = _check_due_filters(due_from, due_to)
+    if error:
+        return error
+    try:
+        service = get_google_service(SERVICE_NAME, VERSION)
+        items = await task_cache.aquery(service, only_open, due_from, due_to)
+        return _format_tasks(items, filtered=bool(only_open or due_from or due_to))
     except Exception as e:
         return f"Lỗi khi liệt kê công việc: {e}"
 
@@ -63,17 +161,27 @@ def create_task(title: str, notes: Optional[str] = None, due_date: Optional[str]
         return "Lỗi: Không thể tạo task mà không có tiêu đề."
     try:
         service = get_google_service(SERVICE_NAME, VERSION)
-        task_body = {"title": title}
-        if notes:
-            task_body["notes"] = notes
-        if due_date:
-            formatted_due = _format_due_date(due_date)
-            if formatted_due:
-                task_body["due"] = formatted_due
-            else:
-                return f"Lỗi: Định dạng ngày '{due_date}' không hợp lệ. Vui lòng dùng YYYY-MM-DD."
+        task_body, error = _task_body(title, notes, due_date)
+        if error:
+            return error
 
         created_task = service.tasks().insert(tasklist=TASK_LIST_ID, body=task_body).execute()
+        task_cache.upsert(created_task)
+        return f"Đã tạo thành công công việc: '{created_task.get('title')}'."
+    except Exception as e:
+        return f"Lỗi khi tạo công việc: {e}"
+
+async def _acreate_task(title: str, notes: Optional[str] = None, due_date: Optional[str] = None) -> str:
+    if not title:
+        return "Lỗi: Không thể tạo task mà không có tiêu đề."
+    try:
+        service = get_google_service(SERVICE_NAME, VERSION)
+        task_body, error = _task_body(title, notes, due_date)
+        if error:
+            return error
+
+        created_task = await aexecute(service.tasks().insert(tasklist=TASK_LIST_ID, body=task_body))
+        task_cache.upsert(created_task)
         return f"Đã tạo thành công công việc: '{created_task.get('title')}'."
     except Exception as e:
         return f"Lỗi khi tạo công việc: {e}"
@@ -91,21 +199,37 @@ def update_task(task_id: str, new_title: Optional[str] = None, new_notes: Option
         return "Lỗi: Cần phải có ID của công việc để cập nhật."
     try:
         service = get_google_service(SERVICE_NAME, VERSION)
-        update_body = {}
-        if new_title:
-            update_body['title'] = new_title
-        if new_notes:
-            update_body['notes'] = new_notes
-        if new_status:
-            if new_status not in ['completed', 'needsAction']:
-                return "Lỗi: Trạng thái mới phải là 'completed' hoặc 'needsAction'."
-            update_body['status'] = new_status
-        
-        if not update_body:
-            return "Lỗi: Không có thông tin gì để cập nhật."
-
-        updated_task = service.tasks().patch(tasklist=TASK_LIST_ID, task=task_id, body=update_body).execute()
+        update_body, error = _task_update_body(new_title, new_notes, new_status)
+        if error:
+            return error
+
+        # If-Match là ETag của bản trong cache: không ghi đè thay đổi của phiên khác mà model chưa thấy
+        updated_task = patch_if_unchanged(update_body, *_task_requests(service, task_id, update_body), task_cache.get(task_id))
+        task_cache.upsert(updated_task)
         return f"Đã cập nhật thành công công việc ID {task_id}. Tiêu đề mới: '{updated_task.get('title')}'."
+    except ConcurrentEditError as e:
+        return _task_conflict_message(e)
+    except HttpError as e:
+        if e.resp.status == 404:
+            return f"Lỗi: Không tìm thấy công việc với ID '{task_id}'."
+        return f"Lỗi HTTP khi cập nhật công việc: {e}"
+    except Exception as e:
+        return f"Lỗi không xác định khi cập nhật công việc: {e}"
+
+async def _aupdate_task(task_id: str, new_title: Optional[str] = None, new_notes: Optional[str] = None, new_status: Optional[str] = None) -> str:
+    if not task_id:
+        return "Lỗi: Cần phải có ID của công việc để cập nhật."
+    try:
+        service = get_google_service(SERVICE_NAME, VERSION)
+        update_body, error = _task_update_body(new_title, new_notes, new_status)
+        if error:
+            return error
+
+        updated_task = await apatch_if_unchanged(update_body, *_task_requests(service, task_id, update_body), task_cache.get(task_id))
+        task_cache.upsert(updated_task)
+        return f"Đã cập nhật thành công công việc ID {task_id}. Tiêu đề mới: '{updated_task.get('title')}'."
+    except ConcurrentEditError as e:
+        return _task_conflict_message(e)
     except HttpError as e:
         if e.resp.status == 404:
             return f"Lỗi: Không tìm thấy công việc với ID '{task_id}'."
@@ -121,12 +245,111 @@ def delete_task(task_id: str) -> str:
     try:
         service = get_google_service(SERVICE_NAME, VERSION)
         service.tasks().delete(tasklist=TASK_LIST_ID, task=task_id).execute()
+        task_cache.remove(task_id)
         return f"Đã xóa thành công công việc với ID: {task_id}."
     except HttpError as e:
         if e.resp.status == 404:
+            task_cache.remove(task_id)
             return f"Lỗi: Không tìm thấy công việc với ID '{task_id}' để xóa."
         return f"Lỗi HTTP khi xóa công việc: {e}"
     except Exception as e:
         return f"Lỗi không xác định khi xóa công việc: {e}"
 
-tasks_tools = [list_tasks, create_task, update_task, delete_task]
\ No newline at end of file
+async def _adelete_task(task_id: str) -> str:
+    if not task_id:
+        return "Lỗi: Cần phải có ID của công việc để xóa."
+    try:
+        service = get_google_service(SERVICE_NAME, VERSION)
+        await aexecute(service.tasks().delete(tasklist=TASK_LIST_ID, task=task_id))
+        task_cache.remove(task_id)
+        return f"Đã xóa thành công công việc với ID: {task_id}."
+    except HttpError as e:
+        if e.resp.status == 404:
+            task_cache.remove(task_id)
+            return f"Lỗi: Không tìm thấy công việc với ID '{task_id}' để xóa."
+        return f"Lỗi HTTP khi xóa công việc: {e}"
+    except Exception as e:
+        return f"Lỗi không xác định khi xóa công việc: {e}"
+
+@tool
+def create_tasks_bulk(tasks: List[dict]) -> str:
+    """
+    Tạo nhiều công việc cùng lúc (dùng thay cho việc gọi create_task nhiều lần).
+    'tasks' là danh sách các mục, mỗi mục có 'title' (bắt buộc), 'notes' và 'due_date' (định dạng 'YYYY-MM-DD') tùy chọn.
+    Mọi mục được kiểm tra trước; nếu có mục không hợp lệ thì không công việc nào được tạo.
+    Kết quả báo thành công hoặc lỗi cho từng mục.
+    """
+    bodies, error = prepare_bulk(tasks, _new_task_item)
+    if error:
+        return error
+    try:
+        service = get_google_service(SERVICE_NAME, VERSION)
+        requests = [service.tasks().insert(tasklist=TASK_LIST_ID, body=body) for body in bodies]
+        records = _bulk_task_records(execute_batch(service, requests), [None] * len(bodies), [body["title"] for body in bodies])
+        return format_bulk_result("Tạo công việc", records, id_kind=TASK_ID)
+    except Exception as e:
+        return f"Lỗi khi tạo hàng loạt công việc: {e}"
+
+async def _acreate_tasks_bulk(tasks: List[dict]) -> str:
+    bodies, error = prepare_bulk(tasks, _new_task_item)
+    if error:
+        return error
+    try:
+        service = get_google_service(SERVICE_NAME, VERSION)
+        requests = [service.tasks().insert(tasklist=TASK_LIST_ID, body=body) for body in bodies]
+        records = _bulk_task_records(await aexecute_batch(service, requests), [None] * len(bodies), [body["title"] for body in bodies])
+        return format_bulk_result("Tạo công việc", records, id_kind=TASK_ID)
+    except Exception as e:
+        return f"Lỗi khi tạo hàng loạt công việc: {e}"
+
+@tool
+def update_tasks_bulk(updates: List[dict]) -> str:
+    """
+    Cập nhật nhiều công việc cùng lúc (dùng thay cho việc gọi update_task nhiều lần, ví dụ đánh dấu hoàn thành cả danh sách).
+    'updates' là danh sách các mục, mỗi mục có 'task_id' (bắt buộc) và ít nhất một trong 'new_title', 'new_notes',
+    'new_status' ('completed' hoặc 'needsAction').
+    Mọi mục được kiểm tra trước; nếu có mục không hợp lệ thì không công việc nào được cập nhật.
+    Kết quả báo thành công hoặc lỗi cho từng mục.
+    """
+    items, error = prepare_bulk(updates, _task_update_item)
+    if error:
+        return error
+    try:
+        service = get_google_service(SERVICE_NAME, VERSION)
+        requests = [_conditional_patch(service, task_id, body) for task_id, body in items]
+        task_ids = [task_id for task_id, _ in items]
+        records = _bulk_task_records(execute_batch(service, requests), task_ids, [body.get("title", "") for _, body in items])
+        return format_bulk_result("Cập nhật công việc", records, id_kind=TASK_ID)
+    except Exception as e:
+        return f"Lỗi khi cập nhật hàng loạt công việc: {e}"
+
+async def _aupdate_tasks_bulk(updates: List[dict]) -> str:
+    items, error = prepare_bulk(updates, _task_update_item)
+    if error:
+        return error
+    try:
+        service = get_google_service(SERVICE_NAME, VERSION)
+        requests = [_conditional_patch(service, task_id, body) for task_id, body in items]
+        task_ids = [task_id for task_id, _ in items]
+        records = _bulk_task_records(await aexecute_batch(service, requests), task_ids, [body.get("title", "") for _, body in items])
+        return format_bulk_result("Cập nhật công việc", records, id_kind=TASK_ID)
+    except Exception as e:
+        return f"Lỗi khi cập nhật hàng loạt công việc: {e}"
+
+# Gắn bản bất đồng bộ: agent async (ainvoke) sẽ dùng coroutine thay vì chặn thread bằng googleapiclient
+list_tasks.coroutine = _alist_tasks
+create_task.coroutine = _acreate_task
+update_task.coroutine = _aupdate_task
+delete_task.coroutine = _adelete_task
+create_tasks_bulk.coroutine = _acreate_tasks_bulk
+update_tasks_bulk.coroutine = _aupdate_tasks_bulk
+
+# Cache kết quả đọc; mỗi tool ghi xoá cache của service Tasks
+cache_reads(list_tasks, SERVICE_NAME)
+invalidates(create_task, SERVICE_NAME)
+invalidates(update_task, SERVICE_NAME)
+invalidates(delete_task, SERVICE_NAME)
+invalidates(create_tasks_bulk, SERVICE_NAME)
+invalidates(update_tasks_bulk, SERVICE_NAME)
+
+tasks_tools = [list_tasks, create_task, update_task, delete_task, create_tasks_bulk, update_tasks_bulk]
\ No newline at end of file
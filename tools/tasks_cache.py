@@ -0,0 +1,202 @@
+# intelligent_agent_platform/tools/tasks_cache.py
+
+import datetime
+import threading
+import time
+from typing import Optional
+
+from googleapiclient.errors import HttpError
+
+from config import TASK_LIST_ID, TASKS_CACHE_MAX_STALENESS
+from .common_async import aexecute, async_lock
+from .common_auth import UserScoped
+
+# Số công việc mỗi trang (tối đa của Tasks API)
+PAGE_SIZE = 100
+
+
+def _page_request(service, page_token: Optional[str], updated_min: Optional[str], etag: Optional[str]):
+    params = {
+        "tasklist": TASK_LIST_ID,
+        "showCompleted": True,
+        "showHidden": True,
+        "maxResults": PAGE_SIZE,
+    }
+    if page_token:
+        params["pageToken"] = page_token
+    if updated_min:
+        # Lần làm mới chỉ lấy các công việc thay đổi sau mốc, kể cả công việc đã bị xoá
+        params["updatedMin"] = updated_min
+        params["showDeleted"] = True
+    request = service.tasks().list(**params)
+    if etag:
+        request.headers["If-None-Match"] = etag
+    return request
+
+
+def iter_task_pages(service, updated_min: Optional[str] = None, etag: Optional[str] = None):
+    """
+    Generator đi qua tất cả các trang của tasks().list theo nextPageToken, trả về từng response.
+    Nếu có `etag` và danh sách không đổi, Google trả về 304 và generator kết thúc ngay (không có trang nào).
+    """
+    page_token = None
+    while True:
+        try:
+            response = _page_request(service, page_token, updated_min, etag if page_token is None else None).execute()
+        except HttpError as e:
+            if e.resp.status == 304:
+                return
+            raise
+        yield response
+        page_token = response.get("nextPageToken")
+        if not page_token:
+            return
+
+
+async def aiter_task_pages(service, updated_min: Optional[str] = None, etag: Optional[str] = None):
+    """Phiên bản bất đồng bộ của iter_task_pages."""
+    page_token = None
+    while True:
+        try:
+            response = await aexecute(_page_request(service, page_token, updated_min, etag if page_token is None else None))
+        except HttpError as e:
+            if e.resp.status == 304:
+                return
+            raise
+        yield response
+        page_token = response.get("nextPageToken")
+        if not page_token:
+            return
+
+
+def _matches(task: dict, only_open: bool, due_from: Optional[str], due_to: Optional[str]) -> bool:
+    if only_open and task.get("status") == "completed":
+        return False
+    if due_from or due_to:
+        due = task.get("due", "")[:10]
+        if not due or (due_from and due < due_from) or (due_to and due > due_to):
+            return False
+    return True
+
+
+class TaskCache:
+    """
+    Bản sao trong bộ nhớ của danh sách công việc TASK_LIST_ID.
+    Lần đầu lấy toàn bộ (theo từng trang), sau đó khi cũ hơn TASKS_CACHE_MAX_STALENESS giây thì gửi một request
+    `updatedMin` = thời điểm thay đổi mới nhất đã biết, kèm If-None-Match là ETag của lần trước:
+    danh sách không đổi chỉ tốn một phản hồi 304 rỗng. Các tool ghi vá trực tiếp vào cache.
+    """
+
+    def __init__(self, max_staleness: float = TASKS_CACHE_MAX_STALENESS):
+        self.max_staleness = max_staleness
+        self._lock = threading.Lock()
+        self._refresh_lock = threading.Lock()
+        self.reset()
+        self._full_syncs = 0
+        self._refreshes = 0
+        self._not_modified = 0
+
+    def reset(self):
+        with self._lock:
+            self._tasks = None
+            self._cursor = None
+            self._etag = None
+            self._synced_at = 0.0
+
+    def _is_fresh(self) -> bool:
+        return self._tasks is not None and time.monotonic() - self._synced_at < self.max_staleness
+
+    def _plan(self):
+        """(updatedMin, ETag) của lần làm mới tiếp theo; (None, None) nghĩa là lấy toàn bộ."""
+        with self._lock:
+            return (self._cursor, self._etag) if self._tasks is not None else (None, None)
+
+    @staticmethod
+    def _advance_cursor(cursor: Optional[str], items: list) -> str:
+        # Chuỗi RFC 3339 của Google cùng định dạng nên so sánh chuỗi đúng với so sánh thời gian
+        latest = max([item["updated"] for item in items if "updated" in item] + ([cursor] if cursor else []), default=None)
+        if latest is None:
+            latest = datetime.datetime.now(datetime.timezone.utc).strftime("%Y-%m-%dT%H:%M:%S.000Z")
+        return latest
+
+    def _apply(self, updated_min: Optional[str], pages: list):
+        with self._lock:
+            if not pages:
+                # 304: không có gì thay đổi kể từ lần trước
+                self._not_modified += 1
+            elif updated_min is None:
+                items = [item for page in pages for item in page.get("items", [])]
+                self._tasks = {item["id"]: item for item in items}
+                self._cursor = self._advance_cursor(None, items)
+                self._etag = None
+                self._full_syncs += 1
+            else:
+                items = [item for page in pages for item in page.get("items", [])]
+                for item in items:
+                    if item.get("deleted"):
+                        self._tasks.pop(item["id"], None)
+                    else:
+                        self._tasks[item["id"]] = item
+                new_cursor = self._advance_cursor(self._cursor, items)
+                # ETag chỉ có nghĩa với đúng câu truy vấn đã gửi (cùng updatedMin, một trang)
+                self._etag = pages[0].get("etag") if new_cursor == self._cursor and len(pages) == 1 else None
+                self._cursor = new_cursor
+                self._refreshes += 1
+            self._synced_at = time.monotonic()
+
+    def refresh(self, service):
+        with self._refresh_lock:
+            if self._is_fresh():
+                return
+            updated_min, etag = self._plan()
+            self._apply(updated_min, list(iter_task_pages(service, updated_min, etag)))
+
+    async def arefresh(self, service):
+        # Cùng lock với refresh: hai lần làm mới song song sẽ gửi cùng updatedMin và ghi đè cursor của nhau
+        async with async_lock(self._refresh_lock):
+            if self._is_fresh():
+                return
+            updated_min, etag = self._plan()
+            self._apply(updated_min, [page async for page in aiter_task_pages(service, updated_min, etag)])
+
+    def _select(self, only_open: bool, due_from: Optional[str], due_to: Optional[str]) -> list:
+        with self._lock:
+            tasks = sorted(self._tasks.values(), key=lambda task: (task.get("parent", ""), task.get("position", "")))
+        return [task for task in tasks if _matches(task, only_open, due_from, due_to)]
+
+    def query(self, service, only_open: bool = False, due_from: Optional[str] = None, due_to: Optional[str] = None) -> list:
+        """Các công việc thoả bộ lọc (due_from/due_to dạng 'YYYY-MM-DD', tính cả hai đầu)."""
+        self.refresh(service)
+        return self._select(only_open, due_from, due_to)
+
+    async def aquery(self, service, only_open: bool = False, due_from: Optional[str] = None, due_to: Optional[str] = None) -> list:
+        await self.arefresh(service)
+        return self._select(only_open, due_from, due_to)
+
+    # --- Vá cache sau khi ghi ---
+    def upsert(self, task: dict):
+        with self._lock:
+            if self._tasks is not None:
+                self._tasks[task["id"]] = task
+
+    def remove(self, task_id: str):
+        with self._lock:
+            if self._tasks is not None:
+                self._tasks.pop(task_id, None)
+
+    def get(self, task_id: str) -> Optional[dict]:
+        """Bản đã lưu của một công việc (kèm ETag), hoặc None nếu chưa có trong cache."""
+        with self._lock:
+            return (self._tasks or {}).get(task_id)
+
+    def stats(self) -> dict:
+        return {
+            "tasks": len(self._tasks or {}),
+            "full_syncs": self._full_syncs,
+            "refreshes": self._refreshes,
+            "not_modified": self._not_modified,
+        }
+
+
+# Mỗi người dùng của server nhiều người dùng có cache riêng (xem common_auth.UserScoped)
+task_cache = UserScoped(TaskCache)
@@ -0,0 +1,341 @@
+# intelligent_agent_platform/tracing.py
+
+"""
+Tracing cho agent: mỗi lần gọi model, mỗi node của graph (call_model là node "agent", ToolNode là node "tools"),
+mỗi lần chạy tool và mỗi request HTTP tới Google là một span (thời gian, số token, kích thước payload).
+
+- TracingCallbackHandler (callback của LangChain, create_agent và create_supervisor tự gắn vào graph) tạo span
+  cho node, model và tool. Request Google API tạo span qua `span("http", ...)` trong tools.common_execution;
+  list_events và list_emails thêm span "query" ghi khoảng thời gian / câu truy vấn và nguồn trả lời (bản sao cục bộ hay API).
+- Span được ghi từng dòng JSON vào TRACE_FILE và cộng vào histogram độ trễ, xuất ra dạng Prometheus text
+  tại http://127.0.0.1:METRICS_PORT/metrics (start_metrics_server). Tracing, file span và endpoint đều tắt mặc định
+  (xem phần cấu hình tracing trong config.py); file span được xoay vòng khi vượt TRACE_FILE_MAX_BYTES.
+
+Span của request Google được gắn vào span của tool đang chạy nhờ contextvars (đi theo thread của ToolNode
+và task asyncio), nên có thể biết một lượt chậm là do model, do Google API hay do số vòng lặp agent <-> tools.
+"""
+
+import contextlib
+import contextvars
+import json
+import os
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Optional
+
+from langchain_core.callbacks import BaseCallbackHandler
+from langchain_core.messages import AIMessage, BaseMessage
+
+from config import (
+    TRACING_ENABLED, TRACE_FILE, TRACE_FILE_MAX_BYTES, TRACE_FILE_BACKUPS, TRACE_LATENCY_BUCKETS, METRICS_HOST, METRICS_PORT,
+)
+
+# (trace_id, span_id) của span đang chạy (tool hoặc node) để span con (request Google) biết span cha
+_current_span = contextvars.ContextVar("current_span", default=(None, None))
+
+
+def _message_size(message: BaseMessage) -> int:
+    """Số ký tự của message (nội dung và tham số tool call), ước lượng kích thước payload gửi/nhận của model."""
+    size = len(message.content) if isinstance(message.content, str) else len(json.dumps(message.content, ensure_ascii=False, default=str))
+    if isinstance(message, AIMessage) and message.tool_calls:
+        size += len(json.dumps([call["args"] for call in message.tool_calls], ensure_ascii=False, default=str))
+    return size
+
+
+def _label(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", " ")
+
+
+class Histogram:
+    """Histogram tích luỹ theo `buckets` (giây), cùng tổng và số lần quan sát."""
+
+    def __init__(self, buckets: tuple):
+        self.buckets = buckets
+        self.counts = [0] * len(buckets)
+        self.total = 0.0
+        self.count = 0
+
+    def observe(self, value: float):
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                self.counts[i] += 1
+        self.total += value
+        self.count += 1
+
+
+class Tracer:
+    """Nhận span đã kết thúc: ghi vào file JSONL (nếu có `path`) và cập nhật các số liệu Prometheus."""
+
+    def __init__(self, path: Optional[str] = TRACE_FILE, buckets: tuple = TRACE_LATENCY_BUCKETS,
+                 max_bytes: int = TRACE_FILE_MAX_BYTES, backups: int = TRACE_FILE_BACKUPS):
+        self.buckets = tuple(buckets)
+        self.path = path
+        self.max_bytes = max_bytes
+        self.backups = backups
+        self._lock = threading.Lock()
+        self._file = self._open() if path else None
+        self._durations = {}
+        self._errors = {}
+        self._tokens = {}
+        self._payload = {}
+        self.handler = TracingCallbackHandler(self)
+
+    def record(self, span: dict):
+        attrs = span.get("attrs", {})
+        key = (span["kind"], span["name"])
+        line = json.dumps(span, ensure_ascii=False, default=str) if self._file else None
+        with self._lock:
+            histogram = self._durations.get(key)
+            if histogram is None:
+                histogram = self._durations[key] = Histogram(self.buckets)
+            histogram.observe(span["duration"])
+            if span.get("error"):
+                self._errors[key] = self._errors.get(key, 0) + 1
+            for kind in ("input", "output"):
+                if attrs.get(f"{kind}_tokens"):
+                    token_key = (span["name"], kind)
+                    self._tokens[token_key] = self._tokens.get(token_key, 0) + attrs[f"{kind}_tokens"]
+            for direction in ("request", "response"):
+                if attrs.get(f"{direction}_bytes"):
+                    payload_key = (*key, direction)
+                    self._payload[payload_key] = self._payload.get(payload_key, 0) + attrs[f"{direction}_bytes"]
+            if line is not None:
+                self._file.write(line + "\n")
+                if self.max_bytes and self._file.tell() >= self.max_bytes:
+                    self._rotate()
+
+    def _open(self):
+        # Ghi theo dòng: một span hỏng (process bị dừng giữa chừng) không làm hỏng các dòng trước
+        return open(self.path, "a", encoding="utf-8", buffering=1)
+
+    def _rotate(self):
+        """traces.jsonl -> traces.jsonl.1 -> ... -> traces.jsonl.<backups> (file cũ nhất bị xoá); gọi khi giữ khoá."""
+        self._file.close()
+        for i in range(self.backups - 1, 0, -1):
+            if os.path.exists(f"{self.path}.{i}"):
+                os.replace(f"{self.path}.{i}", f"{self.path}.{i + 1}")
+        if self.backups:
+            os.replace(self.path, f"{self.path}.1")
+        else:
+            os.remove(self.path)
+        self._file = self._open()
+
+    def metrics(self) -> str:
+        """Các số liệu dạng Prometheus text exposition (version 0.0.4)."""
+        with self._lock:
+            lines = [
+                "# HELP agent_span_duration_seconds Thời gian của span theo loại (node, model, tool, query, http) và tên.",
+                "# TYPE agent_span_duration_seconds histogram",
+            ]
+            for (kind, name), histogram in sorted(self._durations.items()):
+                labels = f'kind="{_label(kind)}",name="{_label(name)}"'
+                for bound, count in zip(histogram.buckets, histogram.counts):
+                    lines.append(f'agent_span_duration_seconds_bucket{{{labels},le="{bound:g}"}} {count}')
+                lines.append(f'agent_span_duration_seconds_bucket{{{labels},le="+Inf"}} {histogram.count}')
+                lines.append(f"agent_span_duration_seconds_sum{{{labels}}} {histogram.total:.6f}")
+                lines.append(f"agent_span_duration_seconds_count{{{labels}}} {histogram.count}")
+            lines += ["# HELP agent_span_errors_total Số span kết thúc bằng lỗi.", "# TYPE agent_span_errors_total counter"]
+            for (kind, name), count in sorted(self._errors.items()):
+                lines.append(f'agent_span_errors_total{{kind="{_label(kind)}",name="{_label(name)}"}} {count}')
+            lines += ["# HELP agent_model_tokens_total Số token model đã dùng.", "# TYPE agent_model_tokens_total counter"]
+            for (model, kind), count in sorted(self._tokens.items()):
+                lines.append(f'agent_model_tokens_total{{model="{_label(model)}",type="{kind}"}} {count}')
+            lines += [
+                "# HELP agent_payload_size_total Kích thước payload gửi/nhận (byte với HTTP, ký tự với model).",
+                "# TYPE agent_payload_size_total counter",
+            ]
+            for (kind, name, direction), size in sorted(self._payload.items()):
+                lines.append(f'agent_payload_size_total{{kind="{_label(kind)}",name="{_label(name)}",direction="{direction}"}} {size}')
+        return "\n".join(lines) + "\n"
+
+    def close(self):
+        with self._lock:
+            if self._file:
+                self._file.close()
+                self._file = None
+
+
+class TracingCallbackHandler(BaseCallbackHandler):
+    """
+    Callback tạo span cho node của graph, lần gọi model và lần chạy tool. Một handler dùng chung cho cả process
+    (graph lồng nhau như supervisor -> sub-agent không tạo span trùng vì LangChain bỏ handler lặp lại).
+    """
+
+    # Chạy ngay trong thread/task gọi callback: cần để contextvar của span tool có hiệu lực với request Google
+    run_inline = True
+
+    def __init__(self, tracer: Tracer):
+        self.tracer = tracer
+        self._lock = threading.Lock()
+        # run_id -> (trace_id, span hoặc None nếu run này không được ghi thành span)
+        self._runs = {}
+
+    def _trace_id(self, run_id, parent_run_id) -> str:
+        parent = self._runs.get(parent_run_id) if parent_run_id else None
+        return parent[0] if parent else str(run_id)
+
+    def _start(self, run_id, parent_run_id, kind: Optional[str], name: Optional[str], attrs: dict = None):
+        with self._lock:
+            trace_id = self._trace_id(run_id, parent_run_id)
+            span = None
+            if kind:
+                span = {
+                    "trace_id": trace_id, "span_id": str(run_id), "parent_id": str(parent_run_id) if parent_run_id else None,
+                    "kind": kind, "name": name, "start": time.time(), "_t0": time.perf_counter(), "attrs": attrs or {},
+                }
+            self._runs[run_id] = (trace_id, span)
+        if span:
+            _current_span.set((trace_id, span["span_id"]))
+
+    def _end(self, run_id, error: BaseException = None, **attrs):
+        with self._lock:
+            _, span = self._runs.pop(run_id, (None, None))
+        if span is None:
+            return
+        span["duration"] = time.perf_counter() - span.pop("_t0")
+        span["attrs"].update({key: value for key, value in attrs.items() if value is not None})
+        if error is not None:
+            span["error"] = f"{type(error).__name__}: {error}"
+        self.tracer.record(span)
+
+    def _span(self, run_id) -> Optional[dict]:
+        with self._lock:
+            return self._runs.get(run_id, (None, None))[1]
+
+    # --- Node của graph (call_model = "agent", ToolNode = "tools", ...) ---
+    def on_chain_start(self, serialized, inputs, *, run_id, parent_run_id=None, metadata=None, **kwargs):
+        name = kwargs.get("name") or (serialized or {}).get("name")
+        node = (metadata or {}).get("langgraph_node")
+        # Chỉ chính node (không phải runnable con bên trong, hay hàm điều kiện của cạnh) được ghi thành span
+        if parent_run_id is None:
+            self._start(run_id, None, "graph", name or "graph")
+        elif node and name == node:
+            self._start(run_id, parent_run_id, "node", node, {"step": (metadata or {}).get("langgraph_step")})
+        else:
+            self._start(run_id, parent_run_id, None, None)
+
+    def on_chain_end(self, outputs, *, run_id, **kwargs):
+        self._end(run_id)
+
+    def on_chain_error(self, error, *, run_id, **kwargs):
+        self._end(run_id, error)
+
+    # --- Model ---
+    def on_chat_model_start(self, serialized, messages, *, run_id, parent_run_id=None, metadata=None, **kwargs):
+        name = (metadata or {}).get("ls_model_name") or kwargs.get("name") or (serialized or {}).get("name", "model")
+        size = sum(_message_size(message) for batch in messages for message in batch)
+        self._start(run_id, parent_run_id, "model", name, {"request_bytes": size, "messages": sum(map(len, messages))})
+
+    def on_llm_new_token(self, token, *, run_id, **kwargs):
+        span = self._span(run_id)
+        if span is not None and "first_token" not in span["attrs"]:
+            span["attrs"]["first_token"] = time.perf_counter() - span["_t0"]
+
+    def on_llm_end(self, response, *, run_id, **kwargs):
+        generation = response.generations[0][0] if response.generations and response.generations[0] else None
+        message = getattr(generation, "message", None)
+        usage = getattr(message, "usage_metadata", None) or {}
+        self._end(
+            run_id,
+            input_tokens=usage.get("input_tokens"),
+            output_tokens=usage.get("output_tokens"),
+            response_bytes=_message_size(message) if message is not None else None,
+            tool_calls=len(message.tool_calls) if isinstance(message, AIMessage) else None,
+        )
+
+    def on_llm_error(self, error, *, run_id, **kwargs):
+        self._end(run_id, error)
+
+    # --- Tool ---
+    def on_tool_start(self, serialized, input_str, *, run_id, parent_run_id=None, **kwargs):
+        name = kwargs.get("name") or (serialized or {}).get("name", "tool")
+        self._start(run_id, parent_run_id, "tool", name, {"request_bytes": len(input_str or "")})
+
+    def on_tool_end(self, output, *, run_id, **kwargs):
+        content = getattr(output, "content", output)
+        self._end(run_id, response_bytes=len(content) if isinstance(content, str) else None)
+
+    def on_tool_error(self, error, *, run_id, **kwargs):
+        self._end(run_id, error)
+
+
+_tracer = None
+_tracer_lock = threading.Lock()
+
+
+def get_tracer() -> Optional[Tracer]:
+    """Tracer dùng chung trong tiến trình (tạo khi cần), hoặc None nếu TRACING_ENABLED tắt."""
+    global _tracer
+    if not TRACING_ENABLED:
+        return None
+    with _tracer_lock:
+        if _tracer is None:
+            _tracer = Tracer()
+        return _tracer
+
+
+def with_tracing(graph):
+    """Gắn TracingCallbackHandler vào graph đã biên dịch (mọi lần invoke/stream đều được trace)."""
+    tracer = get_tracer()
+    return graph.with_config(callbacks=[tracer.handler]) if tracer else graph
+
+
+@contextlib.contextmanager
+def span(kind: str, name: str, **attrs):
+    """
+    Span cho một đoạn code (ví dụ request Google API), con của span tool/node đang chạy.
+    Trả về dict thuộc tính để khối `with` bổ sung (ví dụ response_bytes).
+    """
+    tracer = get_tracer()
+    if tracer is None:
+        yield attrs
+        return
+    trace_id, parent_id = _current_span.get()
+    start, t0 = time.time(), time.perf_counter()
+    error = None
+    try:
+        yield attrs
+    except BaseException as e:
+        error = e
+        raise
+    finally:
+        record = {
+            "trace_id": trace_id, "span_id": uuid.uuid4().hex, "parent_id": parent_id, "kind": kind, "name": name,
+            "start": start, "duration": time.perf_counter() - t0, "attrs": attrs,
+        }
+        if error is not None:
+            record["error"] = f"{type(error).__name__}: {error}"
+        tracer.record(record)
+
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    def log_message(self, *args):
+        pass
+
+    def do_GET(self):
+        tracer = get_tracer()
+        if self.path.split("?")[0] != "/metrics" or tracer is None:
+            self.send_error(404)
+            return
+        body = tracer.metrics().encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+def start_metrics_server(port: Optional[int] = METRICS_PORT, host: str = METRICS_HOST) -> Optional[ThreadingHTTPServer]:
+    """Chạy endpoint /metrics (Prometheus) trong một thread nền; trả về None nếu tắt hoặc cổng đang bận."""
+    if not port or not TRACING_ENABLED:
+        return None
+    try:
+        server = ThreadingHTTPServer((host, port), _MetricsHandler)
+    except OSError as e:
+        print(f"Không mở được endpoint metrics ở {host}:{port}: {e}")
+        return None
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True, name="metrics").start()
+    return server